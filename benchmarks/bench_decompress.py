@@ -0,0 +1,86 @@
+"""
+Compare extracting an archive with zipfile_deflate64 against ArchiveReader,
+in this process and across worker processes
+
+Run from the repository root with ``PYTHONPATH=src python benchmarks/bench_decompress.py``
+"""
+
+import argparse
+import io
+import pathlib
+import shutil
+import tempfile
+import time
+from typing import Callable
+
+import zipfile_deflate64 as zipfile
+
+from irs990_parser import archive_reader
+from synthetic_corpus import SyntheticCorpus
+
+
+def time_extraction(
+    extract: Callable[[pathlib.Path], None], directory: pathlib.Path, repeats: int
+) -> float:
+    """Return the fastest of several extractions into a fresh directory
+
+    :param extract: Extracts the archive into a directory
+    :type extract: Callable[[pathlib.Path], None]
+    :param directory: The directory extracted into, emptied before every run
+    :type directory: pathlib.Path
+    :param repeats: The number of extractions
+    :type repeats: int
+    :return: The fastest wall time in seconds
+    :rtype: float
+    """
+    times = []
+    for _ in range(repeats):
+        shutil.rmtree(directory, ignore_errors=True)
+        start = time.perf_counter()
+        extract(directory)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--archive", type=str)
+    arg_parser.add_argument("--filings", type=int, default=5000)
+    arg_parser.add_argument("--workers", type=int, action="append", default=[])
+    arg_parser.add_argument("--repeats", type=int, default=3)
+    args = arg_parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir_path:
+        temp_dir = pathlib.Path(temp_dir_path)
+        if args.archive is not None:
+            archive_path = pathlib.Path(args.archive)
+        else:
+            archive_path = SyntheticCorpus().write_archive(
+                temp_dir, "2024_TEOS_XML_01A", args.filings
+            )
+        content = archive_path.read_bytes()
+        target_dir = temp_dir / "extracted"
+
+        def extract_with_zipfile(directory: pathlib.Path) -> None:
+            with zipfile.ZipFile(io.BytesIO(content)) as zip_file:
+                zip_file.extractall(directory)
+
+        results = {
+            "zipfile": time_extraction(extract_with_zipfile, target_dir, args.repeats)
+        }
+        for workers in [1, *args.workers]:
+            reader = archive_reader.ArchiveReader(workers)
+            # Starts the workers, so their start-up is not timed
+            reader.extract(content, temp_dir / "warm-up")
+            results[f"reader x{workers}"] = time_extraction(
+                lambda directory: reader.extract(content, directory),
+                target_dir,
+                args.repeats,
+            )
+            reader.close()
+
+    size_mib = len(content) / 1024 / 1024
+    for name, seconds in results.items():
+        print(
+            f"{name:>12}: {seconds:7.3f}s ({size_mib / seconds:7.1f} MiB/s compressed)"
+        )
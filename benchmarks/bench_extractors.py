@@ -0,0 +1,287 @@
+"""
+Time each field extractor and the full per-filing extraction on the sample XML
+files, and compare the results against a saved baseline
+
+Run from the repository root with ``PYTHONPATH=src python benchmarks/bench_extractors.py``
+"""
+
+import argparse
+import json
+import pathlib
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from typing import Any, Callable, NamedTuple
+
+import bs4
+
+from irs990_parser import filing_parser, gender_guesser, irs_field_extractor
+
+SAMPLE_FILES_DIR = pathlib.Path("tests/sample_irs_xml_files")
+# Each repeat runs a case for at least this long, to smooth out timer noise
+MIN_REPEAT_SECONDS = 0.2
+# Medians of separate runs on one machine differ by up to about 35%, so only
+# larger slowdowns are reported as regressions by default
+DEFAULT_THRESHOLD = 0.5
+
+
+class BenchmarkCase(NamedTuple):
+    """A function timed on a fixed set of sample files"""
+
+    name: str
+    sample_files: list[str]
+    run: Callable[[str, bs4.BeautifulSoup], Any]
+
+
+def make_cases(guesser: gender_guesser.GenderGuesser) -> list[BenchmarkCase]:
+    """Create a case for every extractor and for the full per-filing extraction
+
+    :param guesser: A class to guess gender based off name
+    :type guesser: gender_guesser.GenderGuesser
+    :return: The benchmark cases
+    :rtype: list[BenchmarkCase]
+    """
+    parser = filing_parser.FilingParser(guesser)
+    # Filings every extractor succeeds on, used for the per-filing cases
+    complete_filings = [
+        "key_employees/both.xml",
+        "key_employees/has_non_key_employees.xml",
+        "trustees/both.xml",
+        "compensation_review/ceo/true.xml",
+        "whistleblower_policy/true.xml",
+    ]
+    return [
+        BenchmarkCase(
+            "EINEXtractor.extract",
+            ["ein/contains_ein.xml"],
+            lambda name, xml: irs_field_extractor.EINEXtractor(name, xml).extract(),
+        ),
+        BenchmarkCase(
+            "OrgNameExtractor.extract",
+            ["org_name/one_line_name.xml", "org_name/multiple_line_name.xml"],
+            lambda name, xml: irs_field_extractor.OrgNameExtractor(name, xml).extract(),
+        ),
+        BenchmarkCase(
+            "StateExtractor.extract",
+            ["state/us_address.xml", "state/foreign_address.xml"],
+            lambda name, xml: irs_field_extractor.StateExtractor(name, xml).extract(),
+        ),
+        BenchmarkCase(
+            "TotalCompensationExtractor.extract",
+            ["total_compensation/compensation.xml"],
+            lambda name, xml: irs_field_extractor.TotalCompensationExtractor(
+                name, xml
+            ).extract(),
+        ),
+        BenchmarkCase(
+            "TotalEmployeesExtractor.extract",
+            ["total_employees/multiple_employees.xml"],
+            lambda name, xml: irs_field_extractor.TotalEmployeesExtractor(
+                name, xml
+            ).extract(),
+        ),
+        BenchmarkCase(
+            "WhistleblowerPolicyExtractor.extract",
+            ["whistleblower_policy/true.xml", "whistleblower_policy/false.xml"],
+            lambda name, xml: irs_field_extractor.WhistleblowerPolicyExtractor(
+                name, xml
+            ).extract(),
+        ),
+        BenchmarkCase(
+            "CEOCompensationReviewExtractor.extract",
+            ["compensation_review/ceo/true.xml", "compensation_review/ceo/false.xml"],
+            lambda name, xml: irs_field_extractor.CEOCompensationReviewExtractor(
+                name, xml
+            ).extract(),
+        ),
+        BenchmarkCase(
+            "OtherCompensationReviewExtractor.extract",
+            [
+                "compensation_review/other/true.xml",
+                "compensation_review/other/false.xml",
+            ],
+            lambda name, xml: irs_field_extractor.OtherCompensationReviewExtractor(
+                name, xml
+            ).extract(),
+        ),
+        BenchmarkCase(
+            "TrusteeExtractor.calculate_trustee_female_percentage",
+            ["trustees/both.xml"],
+            lambda name, xml: irs_field_extractor.TrusteeExtractor(
+                name, xml, guesser
+            ).calculate_trustee_female_percentage(),
+        ),
+        BenchmarkCase(
+            "KeyEmployeeExtractor.calculate_key_employee_female_percentage",
+            ["key_employees/both.xml"],
+            lambda name, xml: irs_field_extractor.KeyEmployeeExtractor(
+                name, xml, guesser
+            ).calculate_key_employee_female_percentage(),
+        ),
+        BenchmarkCase(
+            "KeyEmployeeExtractor.calculate_male_to_female_pay_ratio",
+            ["key_employees/both.xml"],
+            lambda name, xml: irs_field_extractor.KeyEmployeeExtractor(
+                name, xml, guesser
+            ).calculate_male_to_female_pay_ratio(),
+        ),
+        BenchmarkCase(
+            "KeyEmployeeExtractor.calculate_president_to_average_pay_ratio",
+            ["key_employees/both.xml"],
+            lambda name, xml: irs_field_extractor.KeyEmployeeExtractor(
+                name, xml, guesser
+            ).calculate_president_to_average_pay_ratio(),
+        ),
+        BenchmarkCase(
+            "PersonExtractor.extract",
+            ["key_employees/both.xml"],
+            lambda name, xml: irs_field_extractor.PersonExtractor(
+                name, xml, guesser
+            ).extract(),
+        ),
+        BenchmarkCase(
+            "FilingParser.parse_organization",
+            complete_filings,
+            lambda name, xml: parser.parse_organization(name, xml, "01A", 2024),
+        ),
+        BenchmarkCase(
+            "FilingParser.parse_people",
+            complete_filings,
+            parser.parse_people,
+        ),
+    ]
+
+
+def time_case(
+    case: BenchmarkCase, parsed_samples: dict[str, bs4.BeautifulSoup], repeats: int
+) -> dict[str, float]:
+    """Time a case, calibrating the loop count like ``timeit.Timer.autorange``
+
+    :param case: The case to time
+    :type case: BenchmarkCase
+    :param parsed_samples: Every sample file parsed up front, keyed by path
+    :type parsed_samples: dict[str, bs4.BeautifulSoup]
+    :param repeats: The number of timed repeats
+    :type repeats: int
+    :return: Per-filing timings in seconds and the loop count
+    :rtype: dict[str, float]
+    """
+    samples = [
+        (pathlib.Path(sample_file).name, parsed_samples[sample_file])
+        for sample_file in case.sample_files
+    ]
+
+    def run_loops(loops: int) -> float:
+        start = time.perf_counter()
+        for _ in range(loops):
+            for name, parsed_xml in samples:
+                case.run(name, parsed_xml)
+        return time.perf_counter() - start
+
+    loops = 1
+    while run_loops(loops) < MIN_REPEAT_SECONDS:
+        loops *= 2
+
+    calls = loops * len(samples)
+    per_call = [run_loops(loops) / calls for _ in range(repeats)]
+    return {
+        "median_seconds": statistics.median(per_call),
+        "min_seconds": min(per_call),
+        "loops": loops,
+    }
+
+
+def compare(
+    results: dict[str, dict[str, float]],
+    baseline: dict[str, dict[str, float]],
+    threshold: float,
+) -> list[str]:
+    """Compare median timings against a baseline
+
+    :param results: Timings of this run, keyed by case name
+    :type results: dict[str, dict[str, float]]
+    :param baseline: Timings of the baseline run, keyed by case name
+    :type baseline: dict[str, dict[str, float]]
+    :param threshold: The allowed slowdown, e.g. 0.1 for 10%
+    :type threshold: float
+    :return: The names of the cases slower than the threshold allows
+    :rtype: list[str]
+    """
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            print(f"{name:<64} {'(new)':>10}")
+            continue
+        change = result["median_seconds"] / baseline[name]["median_seconds"] - 1
+        regressed = change > threshold
+        if regressed:
+            regressions.append(name)
+        print(f"{name:<64} {change:>+10.1%}{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--repeats", type=int, default=7)
+    arg_parser.add_argument("--filter", type=str, default="")
+    arg_parser.add_argument("--output", type=str)
+    arg_parser.add_argument("--baseline", type=str)
+    arg_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    arg_parser.add_argument("--fail-on-regression", action="store_true")
+    args = arg_parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir_path:
+        # Guesses fall back to a coin flip for every name, which costs the same
+        # as a lookup hit and keeps the benchmark free of the large name CSV
+        csv_file_path = pathlib.Path(temp_dir_path) / "names.csv"
+        csv_file_path.write_text(
+            f"{gender_guesser.GenderGuesser.NAME_COL},{gender_guesser.GenderGuesser.PROB_COL}\n",
+            encoding="utf-8",
+        )
+        cases = [
+            case
+            for case in make_cases(gender_guesser.GenderGuesser(csv_file_path))
+            if args.filter in case.name
+        ]
+
+    parsed_samples = {}
+    for case in cases:
+        for sample_file in case.sample_files:
+            if sample_file not in parsed_samples:
+                with open(SAMPLE_FILES_DIR / sample_file, "r", encoding="utf-8") as f:
+                    parsed_samples[sample_file] = bs4.BeautifulSoup(f.read(), "xml")
+
+    results = {}
+    for case in cases:
+        results[case.name] = time_case(case, parsed_samples, args.repeats)
+        print(
+            f"{case.name:<64} {1e6 * results[case.name]['median_seconds']:>10.1f} us/filing"
+        )
+
+    if args.output is not None:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                    "bs4": bs4.__version__,
+                    "results": results,
+                },
+                f,
+                indent=2,
+            )
+
+    if args.baseline is not None:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        print()
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(
+                f"{len(regressions)} case(s) regressed by more than {args.threshold:.0%}"
+            )
+            # Timings are noisy, so regressions only fail the run when asked
+            if args.fail_on_regression:
+                sys.exit(1)
@@ -0,0 +1,138 @@
+"""
+Compare the pandas and executemany load paths of Loader on a SQLite database
+
+Run from the repository root with ``PYTHONPATH=src python benchmarks/bench_loader.py``
+"""
+
+import argparse
+import configparser
+import pathlib
+import random
+import sqlite3
+import tempfile
+import time
+
+from irs990_parser import irs_field_extractor, loader
+
+TABLE_NAME = "Organizations"
+
+
+def make_rows(row_count: int, seed: int) -> list[irs_field_extractor.OrganizationRow]:
+    """Generate organization rows with a realistic mix of empty metrics
+
+    :param row_count: The number of rows
+    :type row_count: int
+    :param seed: The random seed
+    :type seed: int
+    :return: Organization rows with unique primary keys
+    :rtype: list[irs_field_extractor.OrganizationRow]
+    """
+    rng = random.Random(seed)
+
+    def maybe(value: object) -> object:
+        return value if rng.random() < 0.8 else None
+
+    return [
+        irs_field_extractor.OrganizationRow(
+            ein=f"{index:09d}",
+            instnm=f"ORGANIZATION {index}",
+            irs_month=f"{index % 12 + 1:02d}A",
+            year=2024,
+            percentage_women_trustees=maybe(rng.random()),
+            percentage_women_key_employees=maybe(rng.random()),
+            whistleblower_policy=maybe(rng.random() < 0.5),
+            ceo_reviewed_compensation=maybe(rng.random() < 0.5),
+            other_reviewed_compensation=maybe(rng.random() < 0.5),
+            male_to_female_pay_ratio=maybe(rng.uniform(0, 5)),
+            president_to_average_pay_ratio=maybe(rng.uniform(0, 50)),
+        )
+        for index in range(row_count)
+    ]
+
+
+def make_sqlite_credentials(directory: pathlib.Path, name: str) -> pathlib.Path:
+    """Create a fresh SQLite database and a credentials file pointing to it
+
+    :param directory: The directory holding the database
+    :type directory: pathlib.Path
+    :param name: The name of the database file
+    :type name: str
+    :return: The path to the credentials file
+    :rtype: pathlib.Path
+    """
+    database = directory / f"{name}.sqlite"
+    with sqlite3.connect(database) as connection:
+        connection.execute(
+            f"CREATE TABLE {TABLE_NAME} ({', '.join(irs_field_extractor.OrganizationRow._fields)}, PRIMARY KEY (ein, irs_month, year))"
+        )
+
+    config = configparser.ConfigParser()
+    config[loader.Loader.CONFIG_SECTION] = {
+        loader.Loader.DRIVERNAME_CONFIG_KEY: "sqlite",
+        loader.Loader.DATABASE_CONFIG_KEY: str(database),
+        loader.Loader.TABLE_NAME_CONFIG_KEY: TABLE_NAME,
+    }
+    config_path = directory / f"{name}.ini"
+    with open(config_path, "w", encoding="utf-8") as f:
+        config.write(f)
+    return config_path
+
+
+def make_loader(directory: pathlib.Path, name: str) -> loader.Loader:
+    """Create a loader writing into a fresh SQLite database
+
+    :param directory: The directory holding the database
+    :type directory: pathlib.Path
+    :param name: The name of the database file
+    :type name: str
+    :return: A loader connected to an empty Organizations table
+    :rtype: loader.Loader
+    """
+    return loader.Loader(make_sqlite_credentials(directory, name))
+
+
+def time_load(data_loader: loader.Loader, name: str, label: str, rows: list) -> None:
+    """Time one load of the rows and print its throughput
+
+    :param data_loader: The loader
+    :type data_loader: loader.Loader
+    :param name: The name of the load method
+    :type name: str
+    :param label: The label printed for the load
+    :type label: str
+    :param rows: The rows to load
+    :type rows: list
+    """
+    start = time.perf_counter()
+    getattr(data_loader, name)(rows)
+    elapsed = time.perf_counter() - start
+    print(f"{label:>14}: {elapsed:7.2f}s ({len(rows) / elapsed:,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--rows", type=int, default=500_000)
+    arg_parser.add_argument("--seed", type=int, default=0)
+    arg_parser.add_argument(
+        "--credentials-file",
+        type=pathlib.Path,
+        help="Time load_rows against this database instead of SQLite. Its "
+        "table must have the primary key (ein, irs_month, year), and rows "
+        "with the generated EINs are replaced",
+    )
+    args = arg_parser.parse_args()
+
+    rows = make_rows(args.rows, args.seed)
+    if args.credentials_file is not None:
+        data_loader = loader.Loader(args.credentials_file)
+        time_load(data_loader, "load_rows", "load_rows", rows)
+        time_load(data_loader, "load_rows", "reload_rows", rows)
+        data_loader.close()
+    else:
+        with tempfile.TemporaryDirectory() as temp_dir_path:
+            for name in ["load_into_db", "load_rows"]:
+                data_loader = make_loader(pathlib.Path(temp_dir_path), name)
+                time_load(data_loader, name, name, rows)
+                if name == "load_rows":
+                    time_load(data_loader, name, "reload_rows", rows)
+                data_loader.close()
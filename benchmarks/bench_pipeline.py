@@ -0,0 +1,219 @@
+"""
+Run the whole pipeline in main.py against a local stand-in for the IRS website,
+loading into SQLite, and report wall time, per-stage time and peak RSS
+
+Run from the repository root with ``PYTHONPATH=src python benchmarks/bench_pipeline.py``
+"""
+
+import argparse
+import functools
+import http.server
+import json
+import pathlib
+import resource
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from bench_loader import TABLE_NAME, make_sqlite_credentials
+from synthetic_corpus import (
+    SyntheticCorpus,
+    parse_return_type_mix,
+    parse_row_range,
+)
+
+SRC_DIR = pathlib.Path("src")
+YEAR = 2024
+# Mirrors the IRS layout, since the year is read from the URL path
+DOWNLOADS_PAGE_PATH = "charities-non-profits/form-990-series-downloads"
+ZIP_DIR_PATH = f"pub/epostcard/990/xml/{YEAR}"
+
+
+def make_site(
+    site_dir: pathlib.Path, zip_paths: list[pathlib.Path], base_url: str
+) -> None:
+    """Lay out the downloads page and zip files served by the stand-in
+
+    :param site_dir: The directory served over HTTP
+    :type site_dir: pathlib.Path
+    :param zip_paths: The zip files to link to
+    :type zip_paths: list[pathlib.Path]
+    :param base_url: The URL the site is served at
+    :type base_url: str
+    """
+    zip_dir = site_dir / ZIP_DIR_PATH
+    zip_dir.mkdir(parents=True)
+    links = []
+    for zip_path in zip_paths:
+        shutil.copy(zip_path, zip_dir / zip_path.name)
+        links.append(
+            f'<a href="{base_url}/{ZIP_DIR_PATH}/{zip_path.name}">{zip_path.name}</a>'
+        )
+
+    downloads_page = site_dir / DOWNLOADS_PAGE_PATH
+    downloads_page.parent.mkdir(parents=True)
+    downloads_page.write_text(
+        f'<html><body><div class="collapsible-item-body">{"".join(links)}</div></body></html>',
+        encoding="utf-8",
+    )
+
+
+class QuietHandler(http.server.SimpleHTTPRequestHandler):
+    """Serve files without logging every request"""
+
+    def log_message(self, format: str, *args: object) -> None:
+        pass
+
+
+def run_pipeline(
+    downloads_url: str,
+    credentials_file: pathlib.Path,
+    report_path: pathlib.Path,
+    workers: int,
+) -> float:
+    """Run main.py in a child process
+
+    :param downloads_url: The URL of the stand-in downloads page
+    :type downloads_url: str
+    :param credentials_file: The credentials file of the SQLite sink
+    :type credentials_file: pathlib.Path
+    :param report_path: The path the run report is written to
+    :type report_path: pathlib.Path
+    :param workers: The number of parse workers
+    :type workers: int
+    :return: The wall time of the run in seconds
+    :rtype: float
+    """
+    start = time.perf_counter()
+    # main.py resolves the gender CSV relative to a directory inside the repo
+    completed = subprocess.run(
+        [
+            sys.executable,
+            "main.py",
+            "--start-year",
+            str(YEAR),
+            "--end-year",
+            str(YEAR),
+            "--irs-url",
+            downloads_url,
+            # Every run serves the page on a new port, so caching it is useless
+            "--link-cache",
+            "",
+            "--credentials-file",
+            str(credentials_file.resolve()),
+            "--run-report",
+            str(report_path.resolve()),
+            "--workers",
+            str(workers),
+        ],
+        cwd=SRC_DIR,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    elapsed = time.perf_counter() - start
+    if completed.returncode != 0:
+        sys.exit(f"main.py failed:\n{completed.stderr}")
+    return elapsed
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--archives", type=int, default=2)
+    arg_parser.add_argument("--filings-per-archive", type=int, default=1000)
+    arg_parser.add_argument("--deflate64-archives", type=int, default=1)
+    arg_parser.add_argument("--archive", type=str, action="append", default=[])
+    arg_parser.add_argument("--seed", type=int, default=0)
+    arg_parser.add_argument("--part-vii-rows", type=str)
+    arg_parser.add_argument("--schedule-j-rows", type=str)
+    arg_parser.add_argument("--missing-rate", type=float, default=0.0)
+    arg_parser.add_argument("--return-types", type=str, default="990")
+    arg_parser.add_argument("--workers", type=int, default=1)
+    arg_parser.add_argument("--output", type=str)
+    args = arg_parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir_path:
+        temp_dir = pathlib.Path(temp_dir_path)
+        if args.archive:
+            zip_paths = [pathlib.Path(archive) for archive in args.archive]
+        else:
+            corpus = SyntheticCorpus(
+                args.seed,
+                parse_row_range(args.part_vii_rows),
+                parse_row_range(args.schedule_j_rows),
+                args.missing_rate,
+                parse_return_type_mix(args.return_types),
+            )
+            # The IRS compresses its archives with Deflate64, which is decoded
+            # by a different, slower decoder than Deflate
+            zip_paths = [
+                corpus.write_archive(
+                    temp_dir,
+                    f"{YEAR}_TEOS_XML_{month:02d}A",
+                    args.filings_per_archive,
+                    (month - 1) * args.filings_per_archive,
+                    deflate64=month > args.archives - args.deflate64_archives,
+                )
+                for month in range(1, args.archives + 1)
+            ]
+
+        site_dir = temp_dir / "site"
+        server = http.server.ThreadingHTTPServer(
+            ("127.0.0.1", 0),
+            functools.partial(QuietHandler, directory=str(site_dir)),
+        )
+        base_url = f"http://127.0.0.1:{server.server_address[1]}"
+        make_site(site_dir, zip_paths, base_url)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+        credentials_file = make_sqlite_credentials(temp_dir, "pipeline")
+        report_path = temp_dir / "report.json"
+        try:
+            wall_seconds = run_pipeline(
+                f"{base_url}/{DOWNLOADS_PAGE_PATH}",
+                credentials_file,
+                report_path,
+                args.workers,
+            )
+        finally:
+            server.shutdown()
+
+        with open(report_path, "r", encoding="utf-8") as f:
+            report = json.load(f)
+        with sqlite3.connect(temp_dir / "pipeline.sqlite") as connection:
+            (row_count,) = connection.execute(
+                f"SELECT COUNT(*) FROM {TABLE_NAME}"
+            ).fetchone()
+
+    # Largest resident set of any finished child process, in KiB on Linux
+    peak_rss_kib = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    if sys.platform == "darwin":
+        peak_rss_kib //= 1024
+
+    print(f"{'wall':>12}: {wall_seconds:8.2f}s")
+    for stage, summary in report["stages"].items():
+        print(
+            f"{stage:>12}: {summary.get('seconds', 0):8.2f}s ({summary['count']} items)"
+        )
+    print(f"{'rows':>12}: {row_count:8d}")
+    print(f"{'peak RSS':>12}: {peak_rss_kib / 1024:8.1f} MiB")
+
+    if args.output is not None:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "wall_seconds": wall_seconds,
+                    "stage_seconds": {
+                        stage: summary.get("seconds", 0)
+                        for stage, summary in report["stages"].items()
+                    },
+                    "rows_loaded": row_count,
+                    "peak_rss_bytes": peak_rss_kib * 1024,
+                },
+                f,
+                indent=2,
+            )
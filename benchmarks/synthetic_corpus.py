@@ -0,0 +1,435 @@
+"""
+Generate arbitrarily large, deterministic corpora of IRS 990 filings from the
+sample XML files, as directories or zip archives laid out like the IRS ones
+
+Run from the repository root with ``PYTHONPATH=src python benchmarks/synthetic_corpus.py``
+"""
+
+import argparse
+import pathlib
+import random
+import re
+import struct
+import zipfile
+import zlib
+from typing import Iterable, Iterator, NamedTuple, Optional
+
+from irs990_parser.archive_reader import ZIP_DEFLATED64
+
+SAMPLE_FILES_DIR = pathlib.Path("tests/sample_irs_xml_files")
+PART_VII_PATTERN = re.compile(
+    r"<Form990PartVIISectionAGrp>.*?</Form990PartVIISectionAGrp>", re.DOTALL
+)
+SCHEDULE_J_PATTERN = re.compile(
+    r"\s*<IRS990ScheduleJ\b.*?</IRS990ScheduleJ>", re.DOTALL
+)
+SCHEDULE_J_ROW_PATTERN = re.compile(
+    r"<RltdOrgOfficerTrstKeyEmplGrp>.*?</RltdOrgOfficerTrstKeyEmplGrp>", re.DOTALL
+)
+EIN_PATTERN = re.compile(r"<EIN>\d+</EIN>")
+RETURN_TYPE_PATTERN = re.compile(r"<ReturnTypeCd>[^<]*</ReturnTypeCd>")
+RETURN_DATA_END = "</ReturnData>"
+# Stand in for the generated rows while a template is being filled in
+PART_VII_MARKER = "<!--PART_VII-->"
+SCHEDULE_J_MARKER = "<!--SCHEDULE_J-->"
+# Leaf tags the extractors treat as optional, dropped at the missing-field rate
+MISSABLE_TAGS = [
+    "WhistleblowerPolicyInd",
+    "CompensationProcessCEOInd",
+    "CompensationProcessOtherInd",
+    "EmployeeCnt",
+]
+# Tags every template needs so that each extractor succeeds on it
+REQUIRED_TAGS = ["<EIN>", "<BusinessNameLine1Txt>", "<CYSalariesCompEmpBnftPaidAmt>"]
+# 990-EZ and 990-PF returns have neither Part VII, Section A nor Schedule J
+RETURN_TYPES = ["990", "990EZ", "990PF"]
+ZIP_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+# ZIP_DATE_TIME in the MS-DOS format of zip headers
+ZIP_DOS_TIME = 0
+ZIP_DOS_DATE = (1 << 5) | 1
+ZIP_DEFLATE64_VERSION = 21
+LOCAL_HEADER = struct.Struct("<4s5H3L2H")
+CENTRAL_HEADER = struct.Struct("<4s6H3L5H2L")
+END_OF_CENTRAL_DIRECTORY = struct.Struct("<4s4H2LH")
+
+
+def write_deflate64_zip(
+    zip_path: pathlib.Path, members: Iterable[tuple[str, bytes]]
+) -> None:
+    """Write a zip file whose members are compressed with Deflate64, the method
+    of the IRS archives. Python cannot write Deflate64, so each member holds
+    literal-only Huffman blocks, which mean the same in Deflate and Deflate64.
+    The members are larger than the IRS ones, but are decoded by the same
+    Deflate64 decoder
+
+    :param zip_path: The path of the zip file
+    :type zip_path: pathlib.Path
+    :param members: The name and contents of each member
+    :type members: Iterable[tuple[str, bytes]]
+    """
+    central_headers = []
+    with open(zip_path, "wb") as f:
+        for name, contents in members:
+            compressor = zlib.compressobj(
+                zlib.Z_DEFAULT_COMPRESSION,
+                zlib.DEFLATED,
+                -15,
+                strategy=zlib.Z_HUFFMAN_ONLY,
+            )
+            data = compressor.compress(contents) + compressor.flush()
+            encoded_name = name.encode("utf-8")
+            fields = (
+                ZIP_DEFLATED64,
+                ZIP_DOS_TIME,
+                ZIP_DOS_DATE,
+                zlib.crc32(contents),
+                len(data),
+                len(contents),
+                len(encoded_name),
+            )
+            offset = f.tell()
+            f.write(
+                LOCAL_HEADER.pack(b"PK\x03\x04", ZIP_DEFLATE64_VERSION, 0, *fields, 0)
+            )
+            f.write(encoded_name)
+            f.write(data)
+            central_headers.append(
+                CENTRAL_HEADER.pack(
+                    b"PK\x01\x02",
+                    ZIP_DEFLATE64_VERSION,
+                    ZIP_DEFLATE64_VERSION,
+                    0,
+                    *fields,
+                    0,
+                    0,
+                    0,
+                    0,
+                    0,
+                    offset,
+                )
+                + encoded_name
+            )
+        central_directory_offset = f.tell()
+        f.write(b"".join(central_headers))
+        f.write(
+            END_OF_CENTRAL_DIRECTORY.pack(
+                b"PK\x05\x06",
+                0,
+                0,
+                len(central_headers),
+                len(central_headers),
+                f.tell() - central_directory_offset,
+                central_directory_offset,
+                0,
+            )
+        )
+
+
+class Template(NamedTuple):
+    """A sample filing with its Part VII and Schedule J rows taken out"""
+
+    xml: str
+    part_vii_rows: list[str]
+    schedule_j_rows: list[str]
+
+
+def parse_row_range(row_range: Optional[str]) -> Optional[tuple[int, int]]:
+    """Parse a row count range such as ``5-40`` or ``10``
+
+    :param row_range: The range, inclusive on both ends
+    :type row_range: Optional[str]
+    :return: The lowest and highest row count, or None to keep the template's rows
+    :rtype: Optional[tuple[int, int]]
+    """
+    if row_range is None:
+        return None
+
+    low, _, high = row_range.partition("-")
+    return int(low), int(high or low)
+
+
+def parse_return_type_mix(mix: str) -> dict[str, float]:
+    """Parse a return type mix such as ``990=0.8,990EZ=0.15,990PF=0.05``
+
+    :param mix: Comma-separated return types and weights
+    :type mix: str
+    :raises ValueError: A return type is not supported
+    :return: The weight of each return type
+    :rtype: dict[str, float]
+    """
+    weights = {}
+    for item in mix.split(","):
+        return_type, _, weight = item.partition("=")
+        if return_type not in RETURN_TYPES:
+            raise ValueError(
+                f"Invalid return type {return_type}. Supported types are {RETURN_TYPES}"
+            )
+        weights[return_type] = float(weight or 1)
+    return weights
+
+
+class SyntheticCorpus:
+    """Generate filings by filling sample filings with Part VII and Schedule J
+    rows drawn from every sample, then dropping fields and changing the return
+    type at random. Each filing depends only on the seed and its index, so
+    corpora are reproducible and can be generated in any order or in parts.
+
+    :param seed: The random seed
+    :type seed: int
+    :param part_vii_rows: The range of Part VII rows, or None to keep the template's
+    :type part_vii_rows: Optional[tuple[int, int]]
+    :param schedule_j_rows: The range of Schedule J rows, or None to keep the template's
+    :type schedule_j_rows: Optional[tuple[int, int]]
+    :param missing_rate: The probability each optional field, and Schedule J, is left out
+    :type missing_rate: float
+    :param return_types: The weight of each return type
+    :type return_types: dict[str, float]
+    :param samples_dir: The directory of sample filings used as templates
+    :type samples_dir: pathlib.Path
+    """
+
+    def __init__(
+        self,
+        seed: int = 0,
+        part_vii_rows: Optional[tuple[int, int]] = None,
+        schedule_j_rows: Optional[tuple[int, int]] = None,
+        missing_rate: float = 0.0,
+        return_types: Optional[dict[str, float]] = None,
+        samples_dir: pathlib.Path = SAMPLE_FILES_DIR,
+    ) -> None:
+        self.seed = seed
+        self.part_vii_rows = part_vii_rows
+        self.schedule_j_rows = schedule_j_rows
+        self.missing_rate = missing_rate
+        self.return_types = return_types if return_types is not None else {"990": 1.0}
+        self.templates = self._load_templates(samples_dir)
+        self._part_vii_pool = [
+            row for template in self.templates for row in template.part_vii_rows
+        ]
+        self._schedule_j_pool = [
+            row for template in self.templates for row in template.schedule_j_rows
+        ]
+
+    def _load_templates(self, samples_dir: pathlib.Path) -> list[Template]:
+        """Load every sample filing that all extractors succeed on
+
+        :param samples_dir: The directory of sample filings
+        :type samples_dir: pathlib.Path
+        :return: The templates, in a stable order
+        :rtype: list[Template]
+        """
+        templates = []
+        for sample_path in sorted(samples_dir.rglob("*.xml")):
+            xml = sample_path.read_text(encoding="utf-8")
+            if not all(tag in xml for tag in REQUIRED_TAGS):
+                continue
+            part_vii_rows = PART_VII_PATTERN.findall(xml)
+            if not part_vii_rows:
+                continue
+
+            first_row = xml.index(part_vii_rows[0])
+            last_row = xml.index(part_vii_rows[-1]) + len(part_vii_rows[-1])
+            xml = xml[:first_row] + PART_VII_MARKER + xml[last_row:]
+
+            schedule_j = SCHEDULE_J_PATTERN.search(xml)
+            schedule_j_rows = (
+                []
+                if schedule_j is None
+                else SCHEDULE_J_ROW_PATTERN.findall(schedule_j.group())
+            )
+            xml = SCHEDULE_J_PATTERN.sub("", xml)
+            xml = xml.replace(
+                RETURN_DATA_END, f"{SCHEDULE_J_MARKER}\n  {RETURN_DATA_END}"
+            )
+            templates.append(Template(xml, part_vii_rows, schedule_j_rows))
+
+        if not templates:
+            raise ValueError(f"No usable sample filings in {samples_dir}")
+        return templates
+
+    def generate(self, index: int) -> tuple[str, str]:
+        """Generate a single filing
+
+        :param index: The index of the filing, which also sets its EIN and object id
+        :type index: int
+        :return: The object id and XML contents of the filing
+        :rtype: tuple[str, str]
+        """
+        rng = random.Random(f"{self.seed}-{index}")
+        template = rng.choice(self.templates)
+        return_type = rng.choices(
+            list(self.return_types), weights=list(self.return_types.values())
+        )[0]
+
+        xml = template.xml
+        if return_type == "990":
+            part_vii_rows = self._pick_rows(
+                rng, self.part_vii_rows, template.part_vii_rows, self._part_vii_pool
+            )
+            schedule_j_rows = self._pick_rows(
+                rng,
+                self.schedule_j_rows,
+                template.schedule_j_rows,
+                self._schedule_j_pool,
+            )
+            if rng.random() < self.missing_rate:
+                schedule_j_rows = []
+        else:
+            part_vii_rows = []
+            schedule_j_rows = []
+            xml = xml.replace("<IRS990 ", f"<IRS{return_type} ").replace(
+                "</IRS990>", f"</IRS{return_type}>"
+            )
+
+        row_separator = "\n      "
+        xml = xml.replace(PART_VII_MARKER, row_separator.join(part_vii_rows))
+        schedule_j = ""
+        if schedule_j_rows:
+            schedule_j = f'\n    <IRS990ScheduleJ documentId="RetDocJ">{row_separator}{row_separator.join(schedule_j_rows)}\n    </IRS990ScheduleJ>'
+        xml = xml.replace(SCHEDULE_J_MARKER, schedule_j)
+        for tag in MISSABLE_TAGS:
+            if return_type != "990" or rng.random() < self.missing_rate:
+                xml = re.sub(rf"\s*<{tag}>[^<]*</{tag}>", "", xml)
+
+        xml = EIN_PATTERN.sub(f"<EIN>{index:09d}</EIN>", xml, count=1)
+        xml = RETURN_TYPE_PATTERN.sub(
+            f"<ReturnTypeCd>{return_type}</ReturnTypeCd>", xml, count=1
+        )
+        return f"{index:018d}", xml
+
+    def _pick_rows(
+        self,
+        rng: random.Random,
+        row_range: Optional[tuple[int, int]],
+        template_rows: list[str],
+        pool: list[str],
+    ) -> list[str]:
+        """Pick the rows of a filing
+
+        :param rng: The filing's random number generator
+        :type rng: random.Random
+        :param row_range: The range of the row count, or None to keep the template's rows
+        :type row_range: Optional[tuple[int, int]]
+        :param template_rows: The rows of the template
+        :type template_rows: list[str]
+        :param pool: The rows of every template
+        :type pool: list[str]
+        :return: The rows
+        :rtype: list[str]
+        """
+        if row_range is None:
+            return template_rows
+        if not pool:
+            return []
+        return rng.choices(pool, k=rng.randint(*row_range))
+
+    def filings(self, count: int, first_index: int = 0) -> Iterator[tuple[str, str]]:
+        """Generate consecutive filings
+
+        :param count: The number of filings
+        :type count: int
+        :param first_index: The index of the first filing
+        :type first_index: int
+        :return: The object id and XML contents of each filing
+        :rtype: Iterator[tuple[str, str]]
+        """
+        for index in range(first_index, first_index + count):
+            yield self.generate(index)
+
+    def write_archive(
+        self,
+        directory: pathlib.Path,
+        archive_name: str,
+        count: int,
+        first_index: int = 0,
+        deflate64: bool = False,
+    ) -> pathlib.Path:
+        """Write filings into a zip file laid out like an IRS monthly archive.
+        Entries carry a fixed timestamp, so the archive bytes are reproducible
+
+        :param directory: The directory the zip file is written to
+        :type directory: pathlib.Path
+        :param archive_name: The name of the archive, e.g. 2024_TEOS_XML_01A
+        :type archive_name: str
+        :param count: The number of filings
+        :type count: int
+        :param first_index: The index of the first filing
+        :type first_index: int
+        :param deflate64: Whether to compress the filings with Deflate64 as
+            written by write_deflate64_zip, rather than Deflate
+        :type deflate64: bool
+        :return: The path to the zip file
+        :rtype: pathlib.Path
+        """
+        zip_path = directory / f"{archive_name}.zip"
+        if deflate64:
+            write_deflate64_zip(
+                zip_path,
+                (
+                    (f"{archive_name}/{object_id}_public.xml", xml.encode("utf-8"))
+                    for object_id, xml in self.filings(count, first_index)
+                ),
+            )
+            return zip_path
+        with zipfile.ZipFile(zip_path, "w") as zip_file:
+            for object_id, xml in self.filings(count, first_index):
+                zip_info = zipfile.ZipInfo(
+                    f"{archive_name}/{object_id}_public.xml", ZIP_DATE_TIME
+                )
+                zip_info.compress_type = zipfile.ZIP_DEFLATED
+                zip_file.writestr(zip_info, xml)
+        return zip_path
+
+    def write_directory(
+        self, directory: pathlib.Path, count: int, first_index: int = 0
+    ) -> pathlib.Path:
+        """Write filings as XML files into a directory
+
+        :param directory: The directory the XML files are written to
+        :type directory: pathlib.Path
+        :param count: The number of filings
+        :type count: int
+        :param first_index: The index of the first filing
+        :type first_index: int
+        :return: The directory
+        :rtype: pathlib.Path
+        """
+        directory.mkdir(parents=True, exist_ok=True)
+        for object_id, xml in self.filings(count, first_index):
+            (directory / f"{object_id}_public.xml").write_text(xml, encoding="utf-8")
+        return directory
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--output-dir", type=str, required=True)
+    arg_parser.add_argument("--filings", type=int, default=50_000)
+    arg_parser.add_argument("--archives", type=int, default=1)
+    arg_parser.add_argument("--format", choices=["zip", "dir"], default="zip")
+    arg_parser.add_argument("--year", type=int, default=2024)
+    arg_parser.add_argument("--seed", type=int, default=0)
+    arg_parser.add_argument("--part-vii-rows", type=str)
+    arg_parser.add_argument("--schedule-j-rows", type=str)
+    arg_parser.add_argument("--missing-rate", type=float, default=0.0)
+    arg_parser.add_argument("--return-types", type=str, default="990")
+    args = arg_parser.parse_args()
+
+    corpus = SyntheticCorpus(
+        args.seed,
+        parse_row_range(args.part_vii_rows),
+        parse_row_range(args.schedule_j_rows),
+        args.missing_rate,
+        parse_return_type_mix(args.return_types),
+    )
+    output_dir = pathlib.Path(args.output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    filings_per_archive = -(-args.filings // args.archives)
+    for month in range(1, args.archives + 1):
+        archive_name = f"{args.year}_TEOS_XML_{month:02d}A"
+        first_index = (month - 1) * filings_per_archive
+        count = min(filings_per_archive, args.filings - first_index)
+        if args.format == "zip":
+            path = corpus.write_archive(output_dir, archive_name, count, first_index)
+        else:
+            path = corpus.write_directory(output_dir / archive_name, count, first_index)
+        print(f"{path}: {count} filings")
@@ -10,5 +10,6 @@ CREATE TABLE`irs990`.`Organizations`(
   OTHER_REVIEWED_COMPENSATION BOOLEAN,
   MALE_TO_FEMALE_PAY_RATIO DOUBLE,
   PRESIDENT_TO_AVERAGE_PAY_RATIO DOUBLE,
+  STATE VARCHAR(2),
   PRIMARY KEY(EIN, IRS_MONTH, `YEAR`)
 );
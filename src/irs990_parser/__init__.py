@@ -0,0 +1,27 @@
+"""
+Extract organization-level metrics from IRS 990 filings
+"""
+
+import importlib
+import typing
+
+if typing.TYPE_CHECKING:
+    from irs990_parser.api import iter_row_batches, iter_rows, parse_filing
+
+__all__ = ["iter_row_batches", "iter_rows", "parse_filing"]
+
+
+def __getattr__(name: str) -> object:
+    """Import the library API on first use. Every submodule import, including
+    those of spawned workers, runs this package first, so the parser and its
+    dependencies are not imported here
+
+    :param name: The attribute being looked up
+    :type name: str
+    :raises AttributeError: The package has no such attribute
+    :return: The attribute
+    :rtype: object
+    """
+    if name in __all__:
+        return getattr(importlib.import_module("irs990_parser.api"), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,271 @@
+"""
+Parse IRS 990 filings from other programs, without running the pipeline
+"""
+
+import functools
+import io
+import os
+import pathlib
+from typing import BinaryIO, Callable, Iterator, Optional, Union
+
+from irs990_parser import (
+    archive_reader,
+    filing_parser,
+    gender_guesser,
+    irs_field_extractor,
+    parse_pool,
+    profiling,
+)
+
+PathLike = Union[str, os.PathLike]
+
+GENDER_PROBABILITY_CSV = (
+    pathlib.Path(__file__).parent / "first_name_gender_probabilities.csv"
+)
+DEFAULT_FILE_NAME = "filing.xml"
+DEFAULT_BATCH_SIZE = 10_000
+
+
+@functools.cache
+def _default_guesser() -> gender_guesser.GenderGuesser:
+    """Load the gender guesser bundled with the package once per process
+
+    :return: The gender guesser
+    :rtype: gender_guesser.GenderGuesser
+    """
+    return gender_guesser.GenderGuesser(GENDER_PROBABILITY_CSV)
+
+
+def _make_file_parser(
+    guesser: Optional[gender_guesser.GenderGuesser],
+) -> filing_parser.FilingFileParser:
+    """Create a file parser
+
+    :param guesser: Guesses gender from first names, defaults to the chart
+        bundled with the package
+    :type guesser: Optional[gender_guesser.GenderGuesser]
+    :return: The file parser
+    :rtype: filing_parser.FilingFileParser
+    """
+    return filing_parser.FilingFileParser(
+        filing_parser.FilingParser(
+            guesser if guesser is not None else _default_guesser()
+        )
+    )
+
+
+def parse_filing(
+    filing: Union[bytes, PathLike],
+    irs_month: str,
+    year: int,
+    guesser: Optional[gender_guesser.GenderGuesser] = None,
+) -> irs_field_extractor.OrganizationRow:
+    """Extract the organization row of a single filing. The row is not
+    validated; sinks validate rows once per batch
+
+    :param filing: The contents of the XML file, or its path
+    :type filing: Union[bytes, PathLike]
+    :param irs_month: The IRS month the filing was published in, e.g. 01A
+    :type irs_month: str
+    :param year: The year the filing was published in
+    :type year: int
+    :param guesser: Guesses gender from first names, defaults to the chart
+        bundled with the package
+    :type guesser: Optional[gender_guesser.GenderGuesser]
+    :return: The organization row
+    :rtype: irs_field_extractor.OrganizationRow
+    """
+    file_parser = _make_file_parser(guesser)
+    if isinstance(filing, bytes):
+        document = (DEFAULT_FILE_NAME, filing)
+    else:
+        with open(filing, "rb") as f:
+            document = (os.path.basename(filing), f.read())
+    pool = parse_pool.ParsePool(file_parser, 1, profiling.ParseInstrumentation())
+    try:
+        (parsed_filing,) = pool.parse_documents([document], irs_month, year)
+    finally:
+        pool.close()
+    return parsed_filing.organization
+
+
+def iter_rows(
+    source: Union[bytes, PathLike],
+    irs_month: Optional[str] = None,
+    year: Optional[int] = None,
+    workers: int = 1,
+    guesser: Optional[gender_guesser.GenderGuesser] = None,
+    member_filter: Optional[Callable[[str], bool]] = None,
+) -> Iterator[irs_field_extractor.OrganizationRow]:
+    """Lazily extract the organization row of every filing in a monthly zip
+    file or a directory of XML files. Zip members are decompressed in memory
+    one at a time, and only a few chunks of filings are parsed ahead of the
+    rows being consumed, so memory stays bounded however large the month is.
+    Rows are not validated; sinks validate rows once per batch
+
+    :param source: The contents or path of a zip file, or a directory of XML
+        files
+    :type source: Union[bytes, PathLike]
+    :param irs_month: The IRS month the filings were published in, defaults to
+        the one in a name such as 2024_TEOS_XML_01A
+    :type irs_month: Optional[str]
+    :param year: The year the filings were published in, defaults to the one in
+        a name such as 2024_TEOS_XML_01A
+    :type year: Optional[int]
+    :param workers: The number of worker processes, 1 to parse in this process
+    :type workers: int
+    :param guesser: Guesses gender from first names, defaults to the chart
+        bundled with the package
+    :type guesser: Optional[gender_guesser.GenderGuesser]
+    :param member_filter: Selects the XML files by file name, defaults to all
+    :type member_filter: Optional[Callable[[str], bool]]
+    :raises ValueError: The IRS month or year was not given and is not in the
+        name of the source
+    :return: The organization row of each filing, in storage order
+    :rtype: Iterator[irs_field_extractor.OrganizationRow]
+    """
+    if irs_month is None or year is None:
+        if isinstance(source, bytes):
+            raise ValueError("irs_month and year are required for zip file contents")
+        name_irs_month, name_year = _read_archive_name(source)
+        irs_month = irs_month if irs_month is not None else name_irs_month
+        year = year if year is not None else name_year
+
+    pool = parse_pool.ParsePool(
+        _make_file_parser(guesser), workers, profiling.ParseInstrumentation()
+    )
+    try:
+        for parsed_filing in pool.parse_documents(
+            _iter_documents(source, member_filter), irs_month, year
+        ):
+            yield parsed_filing.organization
+    finally:
+        pool.close()
+
+
+def iter_row_batches(
+    source: Union[bytes, PathLike],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    irs_month: Optional[str] = None,
+    year: Optional[int] = None,
+    workers: int = 1,
+    guesser: Optional[gender_guesser.GenderGuesser] = None,
+    member_filter: Optional[Callable[[str], bool]] = None,
+) -> Iterator[dict[str, list]]:
+    """Lazily extract organization rows as columnar batches, which
+    ``pandas.DataFrame`` and ``pyarrow.Table.from_pydict`` accept as they are
+
+    :param source: The contents or path of a zip file, or a directory of XML
+        files
+    :type source: Union[bytes, PathLike]
+    :param batch_size: The most rows in a batch
+    :type batch_size: int
+    :param irs_month: The IRS month the filings were published in, defaults to
+        the one in a name such as 2024_TEOS_XML_01A
+    :type irs_month: Optional[str]
+    :param year: The year the filings were published in, defaults to the one in
+        a name such as 2024_TEOS_XML_01A
+    :type year: Optional[int]
+    :param workers: The number of worker processes, 1 to parse in this process
+    :type workers: int
+    :param guesser: Guesses gender from first names, defaults to the chart
+        bundled with the package
+    :type guesser: Optional[gender_guesser.GenderGuesser]
+    :param member_filter: Selects the XML files by file name, defaults to all
+    :type member_filter: Optional[Callable[[str], bool]]
+    :raises ValueError: The IRS month or year was not given and is not in the
+        name of the source
+    :return: The values of each OrganizationRow field, keyed by field name
+    :rtype: Iterator[dict[str, list]]
+    """
+    batch: list[irs_field_extractor.OrganizationRow] = []
+    for row in iter_rows(source, irs_month, year, workers, guesser, member_filter):
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield _to_columns(batch)
+            batch = []
+    if batch:
+        yield _to_columns(batch)
+
+
+def _to_columns(
+    rows: list[irs_field_extractor.OrganizationRow],
+) -> dict[str, list]:
+    """Turn rows into columns
+
+    :param rows: The rows
+    :type rows: list[irs_field_extractor.OrganizationRow]
+    :return: The values of each field, keyed by field name
+    :rtype: dict[str, list]
+    """
+    return {
+        field: list(values)
+        for field, values in zip(
+            irs_field_extractor.OrganizationRow._fields, zip(*rows)
+        )
+    }
+
+
+def _read_archive_name(source: PathLike) -> tuple[str, int]:
+    """Read the IRS month and year in the name of an archive or directory,
+    such as 2024_TEOS_XML_01A
+
+    :param source: The path to the archive or directory
+    :type source: PathLike
+    :raises ValueError: The name does not hold an IRS month and year
+    :return: The IRS month and year
+    :rtype: tuple[str, int]
+    """
+    name = os.path.basename(os.path.normpath(source))
+    parts = os.path.splitext(name)[0].split("_")
+    if len(parts) < 2 or not parts[0].isdigit():
+        raise ValueError(
+            f"Cannot read the IRS month and year from {name}. Pass irs_month and year"
+        )
+    return parts[-1], int(parts[0])
+
+
+def _iter_documents(
+    source: Union[bytes, PathLike], member_filter: Optional[Callable[[str], bool]]
+) -> Iterator[tuple[str, bytes]]:
+    """Read the XML files of a zip file or directory one at a time
+
+    :param source: The contents or path of a zip file, or a directory of XML
+        files
+    :type source: Union[bytes, PathLike]
+    :param member_filter: Selects the XML files by file name, defaults to all
+    :type member_filter: Optional[Callable[[str], bool]]
+    :return: The name and contents of each XML file
+    :rtype: Iterator[tuple[str, bytes]]
+    """
+    if isinstance(source, bytes):
+        yield from _iter_members(io.BytesIO(source), member_filter)
+    elif os.path.isdir(source):
+        for file_name in sorted(os.listdir(source)):
+            path = os.path.join(source, file_name)
+            if not os.path.isfile(path) or (
+                member_filter is not None and not member_filter(file_name)
+            ):
+                continue
+            with open(path, "rb") as f:
+                yield file_name, f.read()
+    else:
+        with open(source, "rb") as archive:
+            yield from _iter_members(archive, member_filter)
+
+
+def _iter_members(
+    archive: BinaryIO, member_filter: Optional[Callable[[str], bool]]
+) -> Iterator[tuple[str, bytes]]:
+    """Decompress the members of a zip file one at a time
+
+    :param archive: The zip file, opened for reading
+    :type archive: BinaryIO
+    :param member_filter: Selects the XML files by file name, defaults to all
+    :type member_filter: Optional[Callable[[str], bool]]
+    :return: The name and contents of each member
+    :rtype: Iterator[tuple[str, bytes]]
+    """
+    entries = archive_reader.read_entries(archive, member_filter)
+    for entry, contents in archive_reader.iter_members(archive, entries):
+        yield os.path.basename(entry.name), contents
@@ -0,0 +1,412 @@
+"""
+Download several IRS archives at once while earlier ones are being parsed, or
+read parts of an archive with byte range requests
+"""
+
+import asyncio
+import concurrent.futures
+import functools
+import io
+import os
+import queue
+import threading
+import time
+from typing import Iterator, NamedTuple, Optional
+
+import requests
+
+from irs990_parser import http_client
+
+
+class FetchedArchive(NamedTuple):
+    """A downloaded archive"""
+
+    url: str
+    content: bytes
+    seconds: float
+
+
+class ArchiveFetcher:
+    """Download archives concurrently on an asyncio event loop running in a
+    background thread. Large archives are split into byte ranges fetched in
+    parallel, so a download is limited by bandwidth rather than by the latency
+    of one connection. Downloaded archives are handed over as they complete,
+    and downloading pauses while ``prefetch`` archives wait to be consumed, so
+    memory stays bounded.
+
+    The requests themselves go through the blocking shared client, which keeps
+    its retries, rate limit and cap on requests in flight.
+
+    :param client: Sends the requests, defaults to the client shared by the
+        package
+    :type client: Optional[http_client.HTTPClient]
+    :param max_parallel: The most archives downloaded at once
+    :type max_parallel: int
+    :param prefetch: The most downloaded archives waiting to be consumed
+    :type prefetch: int
+    :param range_size: The size of each byte range, in bytes
+    :type range_size: int
+    """
+
+    MAX_PARALLEL = 2
+    PREFETCH = 1
+    RANGE_SIZE = 64 * 1024 * 1024
+    TIMEOUT_SEC = 30
+    HTTP_PARTIAL_CONTENT = 206
+    # How often a blocked hand-over checks whether the consumer stopped
+    HAND_OVER_POLL_SEC = 0.1
+
+    def __init__(
+        self,
+        client: Optional[http_client.HTTPClient] = None,
+        max_parallel: int = MAX_PARALLEL,
+        prefetch: int = PREFETCH,
+        range_size: int = RANGE_SIZE,
+    ) -> None:
+        self.client = client if client is not None else http_client.get_default_client()
+        self.max_parallel = max_parallel
+        self.prefetch = prefetch
+        self.range_size = range_size
+
+    def fetch(self, urls: list[str]) -> Iterator[FetchedArchive]:
+        """Download archives, yielding each as soon as it completes
+
+        :param urls: The links to the archives
+        :type urls: list[str]
+        :raises requests.HTTPError: An archive could not be downloaded
+        :return: The downloaded archives, in the order they completed
+        :rtype: Iterator[FetchedArchive]
+        """
+        results: queue.Queue = queue.Queue(maxsize=self.prefetch)
+        stopped = threading.Event()
+        threading.Thread(
+            target=asyncio.run,
+            args=(self._fetch_all(urls, results, stopped),),
+            daemon=True,
+        ).start()
+        try:
+            for _ in urls:
+                result = results.get()
+                if isinstance(result, Exception):
+                    raise result
+                yield result
+        finally:
+            # Downloads still in flight finish in the background, but no new
+            # ones start
+            stopped.set()
+
+    async def _fetch_all(
+        self, urls: list[str], results: queue.Queue, stopped: threading.Event
+    ) -> None:
+        """Download every archive with bounded parallelism
+
+        :param urls: The links to the archives
+        :type urls: list[str]
+        :param results: Receives each archive, or the error that stopped it
+        :type results: queue.Queue
+        :param stopped: Set once the consumer stops reading results
+        :type stopped: threading.Event
+        """
+        loop = asyncio.get_running_loop()
+        downloads = asyncio.Semaphore(self.max_parallel)
+        # The shared client caps the requests actually in flight
+        with concurrent.futures.ThreadPoolExecutor(
+            max_workers=self.client.max_concurrency
+        ) as executor:
+
+            async def fetch_one(url: str) -> None:
+                async with downloads:
+                    if stopped.is_set():
+                        return
+                    start = time.perf_counter()
+                    try:
+                        content = await self._download(url, loop, executor)
+                        result = FetchedArchive(
+                            url, content, time.perf_counter() - start
+                        )
+                    except Exception as e:
+                        result = e
+                    # Holding the semaphore while the hand-over waits for room
+                    # keeps new downloads from starting
+                    await loop.run_in_executor(
+                        None, self._hand_over, result, results, stopped
+                    )
+
+            await asyncio.gather(*(fetch_one(url) for url in urls))
+
+    async def _download(
+        self,
+        url: str,
+        loop: asyncio.AbstractEventLoop,
+        executor: concurrent.futures.Executor,
+    ) -> bytes:
+        """Download an archive, in parallel byte ranges if the server supports
+        them. Later ranges are only served from the version of the archive the
+        first range came from. If any range is not exactly the part asked for,
+        such as when the archive is republished during the download, the
+        archive is downloaded again in one request
+
+        :param url: The link to the archive
+        :type url: str
+        :param loop: The running event loop
+        :type loop: asyncio.AbstractEventLoop
+        :param executor: Runs the blocking requests
+        :type executor: concurrent.futures.Executor
+        :raises requests.HTTPError: The server answered with an error
+        :return: The contents of the archive
+        :rtype: bytes
+        """
+
+        async def get(headers: dict[str, str]) -> requests.Response:
+            response = await loop.run_in_executor(
+                executor,
+                functools.partial(
+                    self.client.get,
+                    url,
+                    timeout=ArchiveFetcher.TIMEOUT_SEC,
+                    headers=headers,
+                ),
+            )
+            response.raise_for_status()
+            return response
+
+        # The first range also reveals the size, the version, and whether
+        # ranges are served
+        first = await get({"Range": f"bytes=0-{self.range_size - 1}"})
+        if first.status_code != ArchiveFetcher.HTTP_PARTIAL_CONTENT:
+            return first.content
+
+        total_size = self._total_size(first)
+        etag = first.headers.get("ETag")
+        if total_size is None or not self._is_range(
+            first, 0, min(self.range_size, total_size) - 1, total_size, etag
+        ):
+            return (await get({})).content
+
+        # A server whose archive changed answers If-Range with the whole new
+        # archive instead of a range
+        validator = self._range_validator(first)
+        headers = {"If-Range": validator} if validator is not None else {}
+        byte_ranges = [
+            (start, min(start + self.range_size, total_size) - 1)
+            for start in range(self.range_size, total_size, self.range_size)
+        ]
+        rest = await asyncio.gather(
+            *(
+                get({**headers, "Range": f"bytes={first_byte}-{last_byte}"})
+                for first_byte, last_byte in byte_ranges
+            )
+        )
+        if not all(
+            self._is_range(response, first_byte, last_byte, total_size, etag)
+            for (first_byte, last_byte), response in zip(byte_ranges, rest)
+        ):
+            return (await get({})).content
+        return b"".join([first.content, *(response.content for response in rest)])
+
+    def _total_size(self, response: requests.Response) -> Optional[int]:
+        """Return the size of the whole archive reported by a range response
+
+        :param response: The response to a range request
+        :type response: requests.Response
+        :return: The size, or None if it was not reported
+        :rtype: Optional[int]
+        """
+        total_size = response.headers.get("Content-Range", "").rsplit("/", 1)[-1]
+        return int(total_size) if total_size.isdigit() else None
+
+    def _range_validator(self, response: requests.Response) -> Optional[str]:
+        """Return the version of the archive that If-Range can require. Weak
+        ETags cannot be used, so the Last-Modified date is used instead
+
+        :param response: The response to the first range request
+        :type response: requests.Response
+        :return: The ETag or Last-Modified date, or None if neither was sent
+        :rtype: Optional[str]
+        """
+        etag = response.headers.get("ETag")
+        if etag is not None and not etag.startswith("W/"):
+            return etag
+        return response.headers.get("Last-Modified")
+
+    def _is_range(
+        self,
+        response: requests.Response,
+        first_byte: int,
+        last_byte: int,
+        total_size: int,
+        etag: Optional[str],
+    ) -> bool:
+        """Check that a response holds exactly a range of one version of the
+        archive
+
+        :param response: The response to a range request
+        :type response: requests.Response
+        :param first_byte: The first byte asked for
+        :type first_byte: int
+        :param last_byte: The last byte asked for
+        :type last_byte: int
+        :param total_size: The size of the archive
+        :type total_size: int
+        :param etag: The ETag of the version, if the server sent one
+        :type etag: Optional[str]
+        :return: True if the response is the range, from that version
+        :rtype: bool
+        """
+        return (
+            response.status_code == ArchiveFetcher.HTTP_PARTIAL_CONTENT
+            and response.headers.get("ETag") == etag
+            and response.headers.get("Content-Range")
+            == f"bytes {first_byte}-{last_byte}/{total_size}"
+            and len(response.content) == last_byte - first_byte + 1
+        )
+
+    def _hand_over(
+        self,
+        result: FetchedArchive | Exception,
+        results: queue.Queue,
+        stopped: threading.Event,
+    ) -> None:
+        """Wait for room to hand a result to the consumer, unless it stopped
+
+        :param result: The downloaded archive, or the error that stopped it
+        :type result: FetchedArchive | Exception
+        :param results: Receives the result
+        :type results: queue.Queue
+        :param stopped: Set once the consumer stops reading results
+        :type stopped: threading.Event
+        """
+        while not stopped.is_set():
+            try:
+                results.put(result, timeout=ArchiveFetcher.HAND_OVER_POLL_SEC)
+                return
+            except queue.Full:
+                pass
+
+
+class RemoteFile(io.RawIOBase):
+    """A read-only, seekable file on an HTTP server, such as a zip file whose
+    central directory and a few members are read without downloading the
+    rest. Each read that misses the last block fetched requests a byte range of
+    at least ``block_size``, so a member's header and contents usually come in
+    one request. A server that ignores ranges answers the first request with
+    the whole file, which is then read from memory.
+
+    :param url: The link to the file
+    :type url: str
+    :param client: Sends the requests, defaults to the client shared by the
+        package
+    :type client: Optional[http_client.HTTPClient]
+    :param block_size: The smallest range requested, in bytes
+    :type block_size: int
+    :raises requests.HTTPError: The server answered with an error
+    """
+
+    BLOCK_SIZE = 64 * 1024
+    TIMEOUT_SEC = 30
+    HTTP_PARTIAL_CONTENT = 206
+
+    def __init__(
+        self,
+        url: str,
+        client: Optional[http_client.HTTPClient] = None,
+        block_size: int = BLOCK_SIZE,
+    ) -> None:
+        super().__init__()
+        self.url = url
+        self.client = client if client is not None else http_client.get_default_client()
+        self.block_size = block_size
+        self.fetched_bytes = 0
+        self._position = 0
+
+        # The end of the file holds a zip file's central directory, so it is
+        # read first, and reveals the size and whether ranges are served
+        response = self._get(f"bytes=-{block_size}")
+        if response.status_code == RemoteFile.HTTP_PARTIAL_CONTENT:
+            self.size = int(response.headers["Content-Range"].rsplit("/", 1)[1])
+            self.supports_ranges = True
+        else:
+            self.size = len(response.content)
+            self.supports_ranges = False
+        self._block_start = self.size - len(response.content)
+        self._block = response.content
+
+    def ranges_save_bandwidth(self, reads: int, fraction: float = 0.5) -> bool:
+        """Return whether reading parts of the file by ranges transfers less
+        than downloading it whole
+
+        :param reads: The number of separate parts to read
+        :type reads: int
+        :param fraction: The share of the file that reads may transfer
+        :type fraction: float
+        :return: True if ranges are served and transfer under the fraction
+        :rtype: bool
+        """
+        return self.supports_ranges and reads * self.block_size < self.size * fraction
+
+    def read_all(self) -> bytes:
+        """Return the whole file, downloading it if only parts were read
+
+        :raises requests.HTTPError: The server answered with an error
+        :return: The contents of the file
+        :rtype: bytes
+        """
+        if self._block_start == 0 and len(self._block) == self.size:
+            return self._block
+        response = self.client.get(self.url, timeout=RemoteFile.TIMEOUT_SEC)
+        response.raise_for_status()
+        self.fetched_bytes += len(response.content)
+        self._block_start = 0
+        self._block = response.content
+        return self._block
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = os.SEEK_SET) -> int:
+        if whence == os.SEEK_CUR:
+            offset += self._position
+        elif whence == os.SEEK_END:
+            offset += self.size
+        if offset < 0:
+            raise ValueError(f"Negative seek position {offset}")
+        self._position = offset
+        return self._position
+
+    def readinto(self, buffer: bytearray) -> int:
+        end = min(self._position + len(buffer), self.size)
+        if end <= self._position:
+            return 0
+        block_end = self._block_start + len(self._block)
+        if not self._block_start <= self._position < end <= block_end:
+            last_byte = min(max(end, self._position + self.block_size), self.size) - 1
+            response = self._get(f"bytes={self._position}-{last_byte}")
+            self._block_start = self._position
+            self._block = response.content
+        start = self._position - self._block_start
+        data = self._block[start : start + end - self._position]
+        buffer[: len(data)] = data
+        self._position += len(data)
+        return len(data)
+
+    def _get(self, byte_range: str) -> requests.Response:
+        """Request a byte range of the file
+
+        :param byte_range: The value of the Range header
+        :type byte_range: str
+        :raises requests.HTTPError: The server answered with an error
+        :return: The response
+        :rtype: requests.Response
+        """
+        response = self.client.get(
+            self.url, timeout=RemoteFile.TIMEOUT_SEC, headers={"Range": byte_range}
+        )
+        response.raise_for_status()
+        self.fetched_bytes += len(response.content)
+        return response
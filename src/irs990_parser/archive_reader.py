@@ -0,0 +1,280 @@
+"""
+Extract the members of IRS zip files with the fastest decompressor for each,
+optionally across worker processes
+"""
+
+import concurrent.futures
+import io
+import multiprocessing
+import os
+import pathlib
+import struct
+import tempfile
+import zipfile
+import zlib
+from typing import BinaryIO, Callable, Iterator, NamedTuple, Optional
+
+
+class MemberEntry(NamedTuple):
+    """Where a member is stored in a zip file and how to decompress it"""
+
+    name: str
+    compress_type: int
+    header_offset: int
+    compress_size: int
+    file_size: int
+    crc: int
+
+
+ZIP_DEFLATED64 = 9
+LOCAL_HEADER_FORMAT = "<IHHHHHIIIHH"
+LOCAL_HEADER_SIGNATURE = 0x04034B50
+ENCRYPTED_FLAG = 0x1
+
+
+def read_entries(
+    archive: BinaryIO, member_filter: Optional[Callable[[str], bool]] = None
+) -> list[MemberEntry]:
+    """List the files of a zip file from its central directory
+
+    :param archive: The zip file, opened for reading
+    :type archive: BinaryIO
+    :param member_filter: Selects the files by file name, defaults to all
+    :type member_filter: Optional[Callable[[str], bool]]
+    :raises zipfile.BadZipFile: The file is not a zip file, or is encrypted
+    :return: The files, in the order they are stored
+    :rtype: list[MemberEntry]
+    """
+    with zipfile.ZipFile(archive) as zip_file:
+        infos = zip_file.infolist()
+
+    entries = []
+    for info in infos:
+        if info.is_dir():
+            continue
+        if member_filter is not None and not member_filter(
+            os.path.basename(info.filename)
+        ):
+            continue
+        if info.flag_bits & ENCRYPTED_FLAG:
+            raise zipfile.BadZipFile(f"{info.filename} is encrypted")
+        entries.append(
+            MemberEntry(
+                info.filename,
+                info.compress_type,
+                info.header_offset,
+                info.compress_size,
+                info.file_size,
+                info.CRC,
+            )
+        )
+    # Reading in storage order keeps each worker's reads sequential
+    return sorted(entries, key=lambda entry: entry.header_offset)
+
+
+def decompress(entry: MemberEntry, data: bytes) -> bytes:
+    """Decompress a member, using zlib directly for plain deflate
+
+    :param entry: The member
+    :type entry: MemberEntry
+    :param data: The compressed contents of the member
+    :type data: bytes
+    :raises zipfile.BadZipFile: The compression method is not supported, or the
+        contents do not match their checksum
+    :return: The contents of the member
+    :rtype: bytes
+    """
+    if entry.compress_type == zipfile.ZIP_STORED:
+        contents = data
+    elif entry.compress_type == zipfile.ZIP_DEFLATED:
+        # Raw deflate stream, without a zlib header
+        contents = zlib.decompress(data, -zlib.MAX_WBITS)
+    elif entry.compress_type == ZIP_DEFLATED64:
+        # Only some archives use Deflate64, so its extension is loaded on demand
+        from zipfile_deflate64 import deflate64
+
+        contents = deflate64.Deflate64().decompress(data)
+    else:
+        raise zipfile.BadZipFile(
+            f"Unsupported compression method {entry.compress_type} for {entry.name}"
+        )
+
+    if len(contents) != entry.file_size or zlib.crc32(contents) != entry.crc:
+        raise zipfile.BadZipFile(f"Bad CRC-32 for file {entry.name}")
+    return contents
+
+
+def iter_members(
+    archive: BinaryIO, entries: list[MemberEntry]
+) -> Iterator[tuple[MemberEntry, bytes]]:
+    """Decompress members one at a time by reading their compressed bytes at
+    their offsets, so only one member is held in memory
+
+    :param archive: The zip file, opened for reading
+    :type archive: BinaryIO
+    :param entries: The members to decompress
+    :type entries: list[MemberEntry]
+    :raises zipfile.BadZipFile: A member's local header is corrupt
+    :return: Each member with its contents
+    :rtype: Iterator[tuple[MemberEntry, bytes]]
+    """
+    header_size = struct.calcsize(LOCAL_HEADER_FORMAT)
+    for entry in entries:
+        archive.seek(entry.header_offset)
+        header = struct.unpack(LOCAL_HEADER_FORMAT, archive.read(header_size))
+        if header[0] != LOCAL_HEADER_SIGNATURE:
+            raise zipfile.BadZipFile(f"Bad local file header for {entry.name}")
+        # The name and extra field lengths may differ from the central directory
+        name_length, extra_length = header[9], header[10]
+        archive.seek(name_length + extra_length, os.SEEK_CUR)
+        yield entry, decompress(entry, archive.read(entry.compress_size))
+
+
+def extract_entries(
+    archive: BinaryIO, entries: list[MemberEntry], directory: pathlib.Path
+) -> None:
+    """Extract members by reading their compressed bytes at their offsets
+
+    :param archive: The zip file, opened for reading
+    :type archive: BinaryIO
+    :param entries: The members to extract
+    :type entries: list[MemberEntry]
+    :param directory: The directory to extract the members into
+    :type directory: pathlib.Path
+    :raises zipfile.BadZipFile: A member's local header is corrupt
+    """
+    for entry, contents in iter_members(archive, entries):
+        target_path = _target_path(directory, entry.name)
+        target_path.parent.mkdir(parents=True, exist_ok=True)
+        target_path.write_bytes(contents)
+
+
+def _target_path(directory: pathlib.Path, name: str) -> pathlib.Path:
+    """Return where a member is extracted, keeping it inside the directory as
+    zipfile does
+
+    :param directory: The directory to extract the members into
+    :type directory: pathlib.Path
+    :param name: The name of the member
+    :type name: str
+    :return: The path to extract the member to
+    :rtype: pathlib.Path
+    """
+    parts = [
+        part
+        for part in name.replace("\\", "/").split("/")
+        if part not in ("", ".", "..")
+    ]
+    return directory.joinpath(*parts)
+
+
+def _extract_batch_in_worker(
+    archive_path: str, entries: list[MemberEntry], directory: pathlib.Path
+) -> None:
+    """Extract a batch of members from a zip file on disk in a worker process
+
+    :param archive_path: The path to the zip file
+    :type archive_path: str
+    :param entries: The members to extract
+    :type entries: list[MemberEntry]
+    :param directory: The directory to extract the members into
+    :type directory: pathlib.Path
+    """
+    with open(archive_path, "rb") as archive:
+        extract_entries(archive, entries, directory)
+
+
+class ArchiveReader:
+    """Extract zip files, decompressing their members in this process or across
+    a pool of worker processes that read the members at their offsets
+
+    :param workers: The number of worker processes, 1 to extract in this process
+    :type workers: int
+    """
+
+    # Large enough that sending a batch to a worker costs little in comparison
+    BATCH_BYTES = 8 * 1024 * 1024
+
+    def __init__(self, workers: int = 1) -> None:
+        self.workers = workers
+        self._executor: Optional[concurrent.futures.ProcessPoolExecutor] = None
+
+    def extract(
+        self,
+        content: bytes | BinaryIO,
+        directory: pathlib.Path,
+        member_filter: Optional[Callable[[str], bool]] = None,
+    ) -> int:
+        """Extract the members of a zip file
+
+        :param content: The contents of the zip file, or the zip file opened
+            for reading. Open files, such as remote files read by byte ranges,
+            are extracted in this process so each member is only read once
+        :type content: bytes | BinaryIO
+        :param directory: The directory to extract the members into
+        :type directory: pathlib.Path
+        :param member_filter: Selects the files by file name, defaults to all
+        :type member_filter: Optional[Callable[[str], bool]]
+        :raises zipfile.BadZipFile: The content is not a valid zip file
+        :return: The number of extracted files
+        :rtype: int
+        """
+        archive = io.BytesIO(content) if isinstance(content, bytes) else content
+        entries = read_entries(archive, member_filter)
+        if self.workers <= 1 or not isinstance(content, bytes):
+            extract_entries(archive, entries, directory)
+            return len(entries)
+
+        if self._executor is None:
+            # Matches the parse pool, as forking a multi-threaded process is unsafe
+            self._executor = concurrent.futures.ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        # Workers read their members from a file rather than receiving the
+        # whole archive
+        with tempfile.NamedTemporaryFile(suffix=".zip") as archive_file:
+            archive_file.write(content)
+            archive_file.flush()
+            futures = [
+                self._executor.submit(
+                    _extract_batch_in_worker, archive_file.name, batch, directory
+                )
+                for batch in self._batches(entries)
+            ]
+            for future in futures:
+                future.result()
+        return len(entries)
+
+    def close(self) -> None:
+        """Shut down the worker processes"""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def _batches(self, entries: list[MemberEntry]) -> list[list[MemberEntry]]:
+        """Split members into batches of roughly equal compressed size
+
+        :param entries: The members, in storage order
+        :type entries: list[MemberEntry]
+        :return: The batches
+        :rtype: list[list[MemberEntry]]
+        """
+        # Small archives are still spread over every worker
+        batch_bytes = min(
+            ArchiveReader.BATCH_BYTES,
+            max(1, sum(entry.compress_size for entry in entries) // self.workers),
+        )
+        batches = []
+        batch: list[MemberEntry] = []
+        size = 0
+        for entry in entries:
+            batch.append(entry)
+            size += entry.compress_size
+            if size >= batch_bytes:
+                batches.append(batch)
+                batch = []
+                size = 0
+        if batch:
+            batches.append(batch)
+        return batches
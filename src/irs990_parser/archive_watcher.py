@@ -0,0 +1,193 @@
+"""
+Watch the IRS downloads page for archives that are new or were republished
+"""
+
+import datetime
+import json
+import os
+import pathlib
+import time
+from typing import Iterator, NamedTuple, Optional
+
+import requests
+
+from irs990_parser import http_client, link_retriever
+
+
+class ArchiveVersion(NamedTuple):
+    """What the IRS website reports about one published version of an
+    archive"""
+
+    etag: Optional[str]
+    last_modified: Optional[str]
+    size: Optional[int]
+
+
+class ProcessedArchiveManifest:
+    """Record the version of every archive that was ingested in a JSON file, so
+    an archive is only ingested again once the IRS publishes a new version
+
+    :param manifest_path: The path to the JSON file
+    :type manifest_path: pathlib.Path
+    """
+
+    def __init__(self, manifest_path: pathlib.Path) -> None:
+        self.manifest_path = manifest_path
+
+    def get(self, url: str) -> Optional[ArchiveVersion]:
+        """Return the version of an archive that was ingested
+
+        :param url: The link to the archive
+        :type url: str
+        :return: The version, or None if the archive was never ingested
+        :rtype: Optional[ArchiveVersion]
+        """
+        entry = self._read().get(url)
+        return ArchiveVersion(**entry) if entry is not None else None
+
+    def mark_processed(self, url: str, version: ArchiveVersion) -> None:
+        """Record that a version of an archive was ingested
+
+        :param url: The link to the archive
+        :type url: str
+        :param version: The version that was ingested
+        :type version: ArchiveVersion
+        """
+        entries = self._read()
+        entries[url] = version._asdict()
+        # Same as the link cache, an interrupted write never truncates it
+        temp_path = self.manifest_path.with_name(f"{self.manifest_path.name}.tmp")
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(entries, f, indent=2)
+        os.replace(temp_path, self.manifest_path)
+
+    def _read(self) -> dict[str, dict]:
+        """Read every ingested archive
+
+        :return: The version of each archive, keyed by link
+        :rtype: dict[str, dict]
+        """
+        if not self.manifest_path.exists():
+            return {}
+        with open(self.manifest_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+
+class ArchiveWatcher:
+    """Poll the downloads page on a schedule, and report the archives that
+    are not in the manifest or whose version changed since they were ingested.
+    Versions are read with HEAD requests, so unchanged archives are never
+    downloaded.
+
+    :param start_year: The first year to watch (inclusive)
+    :type start_year: int
+    :param end_year: The last year to watch (inclusive), or None to watch
+        through the current year, including years published after the watcher
+        started
+    :type end_year: Optional[int]
+    :param manifest: The archives already ingested
+    :type manifest: ProcessedArchiveManifest
+    :param irs_url: The downloads page to poll, defaults to the IRS website
+    :type irs_url: Optional[str]
+    :param link_cache: Stores the links discovered on the page, so each poll
+        only revalidates it, defaults to fetching the page every poll
+    :type link_cache: Optional[link_retriever.LinkCache]
+    :param poll_seconds: The time between polls
+    :type poll_seconds: float
+    :param client: Sends the requests, defaults to the client shared by the
+        package
+    :type client: Optional[http_client.HTTPClient]
+    """
+
+    POLL_SEC = 60 * 60
+    TIMEOUT_SEC = 30
+
+    def __init__(
+        self,
+        start_year: int,
+        end_year: Optional[int],
+        manifest: ProcessedArchiveManifest,
+        irs_url: Optional[str] = None,
+        link_cache: Optional[link_retriever.LinkCache] = None,
+        poll_seconds: float = POLL_SEC,
+        client: Optional[http_client.HTTPClient] = None,
+    ) -> None:
+        self.start_year = start_year
+        self.end_year = end_year
+        self.manifest = manifest
+        self.irs_url = irs_url
+        self.link_cache = link_cache
+        self.poll_seconds = poll_seconds
+        self.client = client if client is not None else http_client.get_default_client()
+
+    def find_changed(self) -> dict[str, ArchiveVersion]:
+        """Poll the downloads page once
+
+        :raises requests.RequestException: The page or an archive could not be
+            reached
+        :return: The current version of every archive to ingest, keyed by link
+        :rtype: dict[str, ArchiveVersion]
+        """
+        end_year = (
+            self.end_year if self.end_year is not None else datetime.date.today().year
+        )
+        # The page is revalidated on every poll rather than read from the cache.
+        # The years only filter the links, so archives of years published
+        # after this release are found too
+        retriever = link_retriever.IRS990LinkRetriever(
+            self.start_year,
+            end_year,
+            self.irs_url,
+            self.link_cache,
+            ttl_seconds=0,
+            client=self.client,
+            latest_end_year=None,
+        )
+        changed = {}
+        for url in retriever.get_zip_links():
+            version = self.fetch_version(url)
+            if self.manifest.get(url) != version:
+                changed[url] = version
+        return changed
+
+    def fetch_version(self, url: str) -> ArchiveVersion:
+        """Read the version of an archive without downloading it
+
+        :param url: The link to the archive
+        :type url: str
+        :raises requests.HTTPError: The server answered with an error
+        :return: The version reported by the server
+        :rtype: ArchiveVersion
+        """
+        response = self.client.head(url, timeout=ArchiveWatcher.TIMEOUT_SEC)
+        response.raise_for_status()
+        size = response.headers.get("Content-Length")
+        return ArchiveVersion(
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified"),
+            size=int(size) if size is not None and size.isdigit() else None,
+        )
+
+    def polls(
+        self, max_polls: Optional[int] = None
+    ) -> Iterator[dict[str, ArchiveVersion]]:
+        """Poll the downloads page until stopped, waiting between polls.
+        A poll that fails is reported and retried at the next one
+
+        :param max_polls: The number of polls, defaults to polling forever
+        :type max_polls: Optional[int]
+        :return: The archives to ingest after each poll, keyed by link. An
+            archive stays there until it is marked processed in the manifest
+        :rtype: Iterator[dict[str, ArchiveVersion]]
+        """
+        poll = 0
+        while max_polls is None or poll < max_polls:
+            if poll > 0:
+                time.sleep(self.poll_seconds)
+            poll += 1
+            try:
+                changed = self.find_changed()
+            except requests.RequestException as e:
+                print(f"Polling {self.irs_url or 'the IRS website'} failed: {e}")
+                continue
+            yield changed
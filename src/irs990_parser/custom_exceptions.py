@@ -17,3 +17,7 @@ class MissingEINException(Exception):
 
 class MissingOrganizationNameException(Exception):
     """Thrown when an IRS form does not contain an organization name"""
+
+
+class LinksUnavailableException(Exception):
+    """Thrown when the links to IRS files cannot be found without the network"""
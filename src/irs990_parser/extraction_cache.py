@@ -0,0 +1,234 @@
+"""
+Persistent cache of the raw fields extracted from IRS 990 filings
+"""
+
+import hashlib
+import pathlib
+import sqlite3
+import zlib
+from typing import Iterator, NamedTuple, Optional
+
+import bs4
+
+
+class CachedFiling(NamedTuple):
+    """A filing stored in the extraction cache"""
+
+    file_name: str
+    irs_month: str
+    year: int
+    parsed_xml: bs4.BeautifulSoup
+
+
+class ExtractionCache:
+    """Store the parts of each filing the field extractors read, keyed by a
+    hash of the filing contents, the extractor version and the month the
+    filing was published in. Derived metrics can then be recomputed by running
+    the extractors over these small fragments instead of downloading and
+    parsing every filing again.
+
+    :param cache_path: The path to the SQLite cache file
+    :type cache_path: pathlib.Path
+    """
+
+    # Bump whenever an extractor starts reading a tag that is not listed below
+    EXTRACTOR_VERSION = "1"
+
+    # Tags whose first occurrence is kept
+    SINGLE_TAGS = [
+        "Filer",
+        "WhistleblowerPolicyInd",
+        "CompensationProcessCEOInd",
+        "CompensationProcessOtherInd",
+        "CYSalariesCompEmpBnftPaidAmt",
+        "EmployeeCnt",
+    ]
+    # Tags whose every occurrence is kept
+    REPEATED_TAGS = ["Form990PartVIISectionAGrp"]
+    SCHEDULE_J_TAG = "IRS990ScheduleJ"
+    SCHEDULE_J_PERSON_TAG = "RltdOrgOfficerTrstKeyEmplGrp"
+    ROOT_TAG = "Return"
+    PRIMARY_KEY = ["content_hash", "extractor_version", "year", "irs_month"]
+    LOCK_TIMEOUT_SEC = 60
+
+    def __init__(self, cache_path: pathlib.Path) -> None:
+        self.cache_path = cache_path
+        # Several parse workers may share one cache file
+        self._connection = sqlite3.connect(
+            cache_path, timeout=ExtractionCache.LOCK_TIMEOUT_SEC
+        )
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        with self._connection:
+            # Locked before reading the schema, so only one worker migrates it
+            self._connection.execute("BEGIN IMMEDIATE")
+            self._create_tables()
+
+    @staticmethod
+    def hash_contents(xml_file: str) -> str:
+        """Hash the contents of a filing
+
+        :param xml_file: The contents of the XML file
+        :type xml_file: str
+        :return: The hex digest of the contents
+        :rtype: str
+        """
+        return hashlib.sha256(xml_file.encode("utf-8")).hexdigest()
+
+    def get(self, content_hash: str) -> Optional[bs4.BeautifulSoup]:
+        """Return the cached fragment of a filing
+
+        :param content_hash: The hash of the filing contents
+        :type content_hash: str
+        :return: The parsed fragment, or None if the filing is not cached
+        :rtype: Optional[bs4.BeautifulSoup]
+        """
+        row = self._connection.execute(
+            "SELECT fragment FROM filings WHERE content_hash = ? AND extractor_version = ? LIMIT 1",
+            (content_hash, ExtractionCache.EXTRACTOR_VERSION),
+        ).fetchone()
+        if row is None:
+            return None
+
+        return self._parse_fragment(row[0])
+
+    def put(
+        self,
+        content_hash: str,
+        file_name: str,
+        irs_month: str,
+        year: int,
+        parsed_xml: bs4.BeautifulSoup,
+    ) -> None:
+        """Store the fragment of a filing read by the field extractors, for
+        the month it was published in
+
+        :param content_hash: The hash of the filing contents
+        :type content_hash: str
+        :param file_name: The name of the file
+        :type file_name: str
+        :param irs_month: The IRS month the filing was published in
+        :type irs_month: str
+        :param year: The year the filing was published in
+        :type year: int
+        :param parsed_xml: The full XML file parsed into a readable format
+        :type parsed_xml: bs4.BeautifulSoup
+        """
+        self._connection.execute(
+            "INSERT OR REPLACE INTO filings VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                content_hash,
+                ExtractionCache.EXTRACTOR_VERSION,
+                file_name,
+                irs_month,
+                year,
+                zlib.compress(self._build_fragment(parsed_xml).encode("utf-8")),
+            ),
+        )
+
+    def commit(self) -> None:
+        """Persist all stored fragments"""
+        self._connection.commit()
+
+    def close(self) -> None:
+        """Persist all stored fragments and close the cache"""
+        self._connection.commit()
+        self._connection.close()
+
+    def iter_filings(self, start_year: int, end_year: int) -> Iterator[CachedFiling]:
+        """Iterate over every cached filing published between two years
+
+        :param start_year: The first year (inclusive)
+        :type start_year: int
+        :param end_year: The last year (inclusive)
+        :type end_year: int
+        :return: Cached filings ordered by year and IRS month
+        :rtype: Iterator[CachedFiling]
+        """
+        rows = self._connection.execute(
+            """
+            SELECT file_name, irs_month, year, fragment FROM filings
+            WHERE extractor_version = ? AND year BETWEEN ? AND ?
+            ORDER BY year, irs_month
+            """,
+            (ExtractionCache.EXTRACTOR_VERSION, start_year, end_year),
+        )
+        for file_name, irs_month, year, fragment in rows:
+            yield CachedFiling(
+                file_name, irs_month, year, self._parse_fragment(fragment)
+            )
+
+    def _create_tables(self) -> None:
+        """Create the filings table. A filing republished in another monthly
+        archive is stored once for each month, so the month and year are part
+        of the key. Tables created before they were are migrated"""
+        primary_key = [
+            column
+            for _, column, _, _, _, pk in sorted(
+                self._connection.execute("PRAGMA table_info(filings)"),
+                key=lambda column: column[5],
+            )
+            if pk > 0
+        ]
+        migrate = bool(primary_key) and primary_key != ExtractionCache.PRIMARY_KEY
+        if migrate:
+            self._connection.execute("ALTER TABLE filings RENAME TO old_filings")
+            self._connection.execute("DROP INDEX IF EXISTS filings_by_year")
+
+        self._connection.execute(f"""
+            CREATE TABLE IF NOT EXISTS filings (
+                content_hash TEXT NOT NULL,
+                extractor_version TEXT NOT NULL,
+                file_name TEXT NOT NULL,
+                irs_month TEXT NOT NULL,
+                year INTEGER NOT NULL,
+                fragment BLOB NOT NULL,
+                PRIMARY KEY ({", ".join(ExtractionCache.PRIMARY_KEY)})
+            )
+            """)
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS filings_by_year ON filings (year, irs_month)"
+        )
+        if migrate:
+            self._connection.execute("INSERT INTO filings SELECT * FROM old_filings")
+            self._connection.execute("DROP TABLE old_filings")
+
+    def _build_fragment(self, parsed_xml: bs4.BeautifulSoup) -> str:
+        """Serialize the tags read by the field extractors
+
+        :param parsed_xml: The full XML file parsed into a readable format
+        :type parsed_xml: bs4.BeautifulSoup
+        :return: A minimal XML document holding only the extracted tags
+        :rtype: str
+        """
+        elements = []
+        for tag in ExtractionCache.SINGLE_TAGS:
+            xml_object = parsed_xml.find(tag)
+            if xml_object is not None:
+                elements.append(str(xml_object))
+
+        for tag in ExtractionCache.REPEATED_TAGS:
+            elements.extend(str(xml_object) for xml_object in parsed_xml.find_all(tag))
+
+        schedule_j = parsed_xml.find(ExtractionCache.SCHEDULE_J_TAG)
+        if schedule_j is not None:
+            key_employees = "".join(
+                str(xml_object)
+                for xml_object in schedule_j.find_all(
+                    ExtractionCache.SCHEDULE_J_PERSON_TAG
+                )
+            )
+            elements.append(
+                f"<{ExtractionCache.SCHEDULE_J_TAG}>{key_employees}</{ExtractionCache.SCHEDULE_J_TAG}>"
+            )
+
+        return f"<{ExtractionCache.ROOT_TAG}>{''.join(elements)}</{ExtractionCache.ROOT_TAG}>"
+
+    def _parse_fragment(self, fragment: bytes) -> bs4.BeautifulSoup:
+        """Parse a stored fragment
+
+        :param fragment: The compressed fragment
+        :type fragment: bytes
+        :return: The fragment parsed into a readable format
+        :rtype: bs4.BeautifulSoup
+        """
+        return bs4.BeautifulSoup(zlib.decompress(fragment).decode("utf-8"), "xml")
@@ -5,23 +5,35 @@ Download and extract information from IRS files
 import io
 import os
 import pathlib
+from typing import BinaryIO, Callable, Optional
 
-import requests
 import zipfile_deflate64 as zipfile
 
-from irs990_parser import custom_exceptions
+from irs990_parser import archive_reader, custom_exceptions, http_client
 
 
 class IRSZipFileExtractor:
     """
     Extract zip files from a URL request
+
+    :param client: Sends the download requests, defaults to the client shared by
+        the package
+    :ptype client: Optional[http_client.HTTPClient]
+    :param reader: Decompresses the members of zip files, defaults to doing so
+        in this process
+    :ptype reader: Optional[archive_reader.ArchiveReader]
     """
 
     TIMEOUT_SEC = 5
     ZIP_EXTENSION_LENGTH = 3
 
-    def __init__(self) -> None:
-        pass
+    def __init__(
+        self,
+        client: Optional[http_client.HTTPClient] = None,
+        reader: Optional[archive_reader.ArchiveReader] = None,
+    ) -> None:
+        self.client = client if client is not None else http_client.get_default_client()
+        self.reader = reader if reader is not None else archive_reader.ArchiveReader()
 
     def extract_zip(self, url: str, directory: pathlib.Path) -> pathlib.Path:
         """Extract XML files into a directory
@@ -33,13 +45,45 @@ class IRSZipFileExtractor:
         :return: The directory containing the XML files
         :rtype: pathlib.Path
         """
-        res = requests.get(url, timeout=IRSZipFileExtractor.TIMEOUT_SEC)
+        return self.extract_archive(self.download(url), url, directory)
+
+    def download(self, url: str) -> bytes:
+        """Download a zip file
+
+        :param url: The link to the zipped XML files
+        :ptype url: str
+        :return: The contents of the zip file
+        :rtype: bytes
+        """
+        return self.client.get(url, timeout=IRSZipFileExtractor.TIMEOUT_SEC).content
+
+    def extract_archive(
+        self,
+        content: bytes | BinaryIO,
+        url: str,
+        directory: pathlib.Path,
+        member_filter: Optional[Callable[[str], bool]] = None,
+    ) -> pathlib.Path:
+        """Extract downloaded XML files into a directory
+
+        :param content: The contents of the zip file, or the zip file opened for
+            reading
+        :ptype content: bytes | BinaryIO
+        :param url: The link the zip file was downloaded from
+        :ptype url: str
+        :param directory: The directory to extract the zipped XML files
+        :ptype directory: pathlib.Path
+        :param member_filter: Selects the files to extract by file name, defaults to all
+        :ptype member_filter: Optional[Callable[[str], bool]]
+        :raises custom_exceptions.InvalidZipFileException: The content is not a zip file
+        :return: The directory containing the XML files
+        :rtype: pathlib.Path
+        """
         try:
             monthly_reports_directory = pathlib.Path(
                 os.path.join(directory, self._get_monthly_reports_folder_name(url))
             )
-            with zipfile.ZipFile(io.BytesIO(res.content)) as zip_file:
-                zip_file.extractall(path=monthly_reports_directory)
+            self.reader.extract(content, monthly_reports_directory, member_filter)
 
             return monthly_reports_directory
         except zipfile.BadZipFile:
@@ -47,6 +91,32 @@ class IRSZipFileExtractor:
                 f"URL {url} does not yield a ZIP file"
             )
 
+    def list_members(self, content: bytes | BinaryIO, url: str) -> list[str]:
+        """List the names of the files in a downloaded zip file
+
+        :param content: The contents of the zip file, or the zip file opened for
+            reading
+        :ptype content: bytes | BinaryIO
+        :param url: The link the zip file was downloaded from
+        :ptype url: str
+        :raises custom_exceptions.InvalidZipFileException: The content is not a zip file
+        :return: The file names, without their directories
+        :rtype: list[str]
+        """
+        try:
+            with zipfile.ZipFile(
+                io.BytesIO(content) if isinstance(content, bytes) else content
+            ) as zip_file:
+                return [
+                    os.path.basename(name)
+                    for name in zip_file.namelist()
+                    if not name.endswith("/")
+                ]
+        except zipfile.BadZipFile:
+            raise custom_exceptions.InvalidZipFileException(
+                f"URL {url} does not yield a ZIP file"
+            )
+
     def _get_monthly_reports_folder_name(self, url: str) -> str:
         # remove the ".zip" from the zip file link
         return url.split("/")[-1][: -(IRSZipFileExtractor.ZIP_EXTENSION_LENGTH + 1)]
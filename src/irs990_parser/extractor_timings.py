@@ -0,0 +1,150 @@
+"""
+Opt-in timing of the field extractors and derived metric calculations
+"""
+
+import functools
+import inspect
+import time
+from types import ModuleType, TracebackType
+from typing import Callable, Optional
+
+from irs990_parser import irs_field_extractor
+
+
+class MethodTimings:
+    """Cumulative timings of one instrumented method"""
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.exceptions = 0
+        self.wall_seconds = 0.0
+        self.cpu_seconds = 0.0
+
+    def merge(self, other: "MethodTimings") -> None:
+        """Add the timings of another process or run
+
+        :param other: The timings to add
+        :type other: MethodTimings
+        """
+        self.calls += other.calls
+        self.exceptions += other.exceptions
+        self.wall_seconds += other.wall_seconds
+        self.cpu_seconds += other.cpu_seconds
+
+
+class ExtractorTimings:
+    """Time every public ``extract`` and ``calculate_*`` method of the classes
+    in a module. Methods are only wrapped while enabled, so there is no
+    overhead when timing is off. Timings are inclusive: an extractor that calls
+    another instrumented extractor includes that call's time.
+
+    :param module: The module whose classes are instrumented
+    :type module: ModuleType
+    """
+
+    INSTRUMENTED_PREFIXES = ("extract", "calculate_")
+
+    def __init__(self, module: ModuleType = irs_field_extractor) -> None:
+        self.module = module
+        self.timings: dict[str, MethodTimings] = {}
+        self._originals: list[tuple[type, str, Callable]] = []
+
+    def enable(self) -> None:
+        """Wrap the instrumented methods with timers"""
+        if self._originals:
+            return
+
+        for class_name, cls in inspect.getmembers(self.module, inspect.isclass):
+            if cls.__module__ != self.module.__name__:
+                continue
+            for method_name, method in list(vars(cls).items()):
+                if not (
+                    inspect.isfunction(method)
+                    and method_name.startswith(ExtractorTimings.INSTRUMENTED_PREFIXES)
+                ):
+                    continue
+                self._originals.append((cls, method_name, method))
+                setattr(
+                    cls,
+                    method_name,
+                    self._wrap(f"{class_name}.{method_name}", method),
+                )
+
+    def disable(self) -> None:
+        """Restore the original methods"""
+        for cls, method_name, method in self._originals:
+            setattr(cls, method_name, method)
+        self._originals = []
+
+    def _wrap(self, qualified_name: str, method: Callable) -> Callable:
+        """Wrap a method so every call is timed
+
+        :param qualified_name: The name the timings are reported under
+        :type qualified_name: str
+        :param method: The method to time
+        :type method: Callable
+        :return: The timed method
+        :rtype: Callable
+        """
+        method_timings = self.timings.setdefault(qualified_name, MethodTimings())
+
+        @functools.wraps(method)
+        def timed(*args, **kwargs):
+            wall_start = time.perf_counter()
+            cpu_start = time.process_time()
+            try:
+                return method(*args, **kwargs)
+            except BaseException:
+                method_timings.exceptions += 1
+                raise
+            finally:
+                method_timings.calls += 1
+                method_timings.wall_seconds += time.perf_counter() - wall_start
+                method_timings.cpu_seconds += time.process_time() - cpu_start
+
+        return timed
+
+    def merge(self, timings: dict[str, MethodTimings]) -> None:
+        """Add timings collected elsewhere, e.g. in a worker process
+
+        :param timings: Timings keyed by qualified method name
+        :type timings: dict[str, MethodTimings]
+        """
+        for qualified_name, method_timings in timings.items():
+            self.timings.setdefault(qualified_name, MethodTimings()).merge(
+                method_timings
+            )
+
+    def report(self) -> str:
+        """Format the timings as a table sorted by cumulative wall time
+
+        :return: The table
+        :rtype: str
+        """
+        header = f"{'method':<70} {'calls':>9} {'errors':>7} {'wall s':>10} {'cpu s':>10} {'wall ms/call':>13}"
+        lines = [header, "-" * len(header)]
+        for qualified_name, method_timings in sorted(
+            self.timings.items(),
+            key=lambda item: item[1].wall_seconds,
+            reverse=True,
+        ):
+            if method_timings.calls == 0:
+                continue
+            lines.append(
+                f"{qualified_name:<70} {method_timings.calls:>9} {method_timings.exceptions:>7} "
+                f"{method_timings.wall_seconds:>10.3f} {method_timings.cpu_seconds:>10.3f} "
+                f"{1000 * method_timings.wall_seconds / method_timings.calls:>13.3f}"
+            )
+        return "\n".join(lines)
+
+    def __enter__(self) -> "ExtractorTimings":
+        self.enable()
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[type[BaseException]],
+        exc_value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        self.disable()
@@ -0,0 +1,310 @@
+"""
+Turn a single parsed IRS 990 filing into table rows
+"""
+
+import os
+import pathlib
+import time
+from typing import NamedTuple, Optional
+
+import bs4
+
+from irs990_parser import (
+    extraction_cache,
+    gender_guesser,
+    irs_field_extractor,
+    slow_filings,
+)
+
+
+class ParsedFiling(NamedTuple):
+    """Rows extracted from a single filing, along with its trace"""
+
+    organization: irs_field_extractor.OrganizationRow
+    people: Optional[list[irs_field_extractor.PersonDataModel]]
+    trace: slow_filings.FilingTrace
+
+
+class FilingParser:
+    """Run every field extractor over a parsed IRS 990 form
+
+    :param guesser: A class to guess gender based off name
+    :type guesser: gender_guesser.GenderGuesser
+    """
+
+    def __init__(self, guesser: gender_guesser.GenderGuesser) -> None:
+        self.guesser = guesser
+
+    def parse_organization(
+        self,
+        file_name: str,
+        parsed_xml: bs4.BeautifulSoup,
+        irs_month: str,
+        year: int,
+        filing_guesser: Optional[gender_guesser.FilingGenderGuesser] = None,
+    ) -> irs_field_extractor.OrganizationRow:
+        """Extract the organization-level row of a filing. The row is not
+        validated; sinks validate rows once per batch
+
+        :param file_name: The name of the file
+        :type file_name: str
+        :param parsed_xml: The XML file parsed into a readable format
+        :type parsed_xml: bs4.BeautifulSoup
+        :param irs_month: The IRS month the filing was published in
+        :type irs_month: str
+        :param year: The year the filing was published in
+        :type year: int
+        :param filing_guesser: The genders guessed for the filing so far,
+            shared with parse_people, defaults to guessing afresh
+        :type filing_guesser: Optional[gender_guesser.FilingGenderGuesser]
+        :return: The organization row
+        :rtype: irs_field_extractor.OrganizationRow
+        """
+        if filing_guesser is None:
+            filing_guesser = self.make_filing_guesser()
+        ein = irs_field_extractor.EINEXtractor(file_name, parsed_xml).extract()
+
+        org_name = irs_field_extractor.OrgNameExtractor(file_name, parsed_xml).extract()
+
+        state = irs_field_extractor.StateExtractor(file_name, parsed_xml).extract()
+
+        whistleblower_policy = irs_field_extractor.WhistleblowerPolicyExtractor(
+            file_name, parsed_xml
+        ).extract()
+
+        ceo_compensation_review = irs_field_extractor.CEOCompensationReviewExtractor(
+            file_name, parsed_xml
+        ).extract()
+
+        other_compensation_review = (
+            irs_field_extractor.OtherCompensationReviewExtractor(
+                file_name, parsed_xml
+            ).extract()
+        )
+
+        trustee_stuff = irs_field_extractor.TrusteeExtractor(
+            file_name, parsed_xml, filing_guesser
+        )
+
+        key_employer_stuff = irs_field_extractor.KeyEmployeeExtractor(
+            file_name, parsed_xml, filing_guesser
+        )
+
+        return irs_field_extractor.OrganizationRow(
+            ein=ein,
+            instnm=org_name,
+            irs_month=irs_month,
+            year=year,
+            percentage_women_trustees=trustee_stuff.calculate_trustee_female_percentage(),
+            percentage_women_key_employees=key_employer_stuff.calculate_key_employee_female_percentage(),
+            whistleblower_policy=whistleblower_policy,
+            ceo_reviewed_compensation=ceo_compensation_review,
+            other_reviewed_compensation=other_compensation_review,
+            male_to_female_pay_ratio=key_employer_stuff.calculate_male_to_female_pay_ratio(),
+            president_to_average_pay_ratio=key_employer_stuff.calculate_president_to_average_pay_ratio(),
+            state=state,
+        )
+
+    def parse_people(
+        self,
+        file_name: str,
+        parsed_xml: bs4.BeautifulSoup,
+        filing_guesser: Optional[gender_guesser.FilingGenderGuesser] = None,
+    ) -> list[irs_field_extractor.PersonDataModel]:
+        """Extract the person-level records of a filing
+
+        :param file_name: The name of the file
+        :type file_name: str
+        :param parsed_xml: The XML file parsed into a readable format
+        :type parsed_xml: bs4.BeautifulSoup
+        :param filing_guesser: The genders guessed for the filing so far,
+            shared with parse_organization, defaults to guessing afresh
+        :type filing_guesser: Optional[gender_guesser.FilingGenderGuesser]
+        :return: One record per person listed in Part VII and Schedule J
+        :rtype: list[irs_field_extractor.PersonDataModel]
+        """
+        if filing_guesser is None:
+            filing_guesser = self.make_filing_guesser()
+        return irs_field_extractor.PersonExtractor(
+            file_name, parsed_xml, filing_guesser
+        ).extract()
+
+    def make_filing_guesser(self) -> gender_guesser.FilingGenderGuesser:
+        """Create the guesser of a single filing, which guesses each person's
+        gender once however many extractors ask for it
+
+        :return: The guesser
+        :rtype: gender_guesser.FilingGenderGuesser
+        """
+        return gender_guesser.FilingGenderGuesser(self.guesser)
+
+
+class FilingFileParser:
+    """Read, parse and extract rows from IRS 990 XML files. Instances are sent
+    to parse worker processes, so the extraction cache is opened lazily by the
+    process that uses it
+
+    :param parser: Extracts records from a parsed filing
+    :type parser: FilingParser
+    :param cache_path: The path to the extraction cache, if enabled
+    :type cache_path: Optional[pathlib.Path]
+    :param include_people: Whether person-level records are extracted
+    :type include_people: bool
+    :param count_rows: Whether Part VII and Schedule J rows are counted for traces
+    :type count_rows: bool
+    :param cache_commit_interval: The number of new cache entries per commit
+    :type cache_commit_interval: int
+    """
+
+    CACHE_COMMIT_INTERVAL = 500
+
+    def __init__(
+        self,
+        parser: FilingParser,
+        cache_path: Optional[pathlib.Path] = None,
+        include_people: bool = False,
+        count_rows: bool = False,
+        cache_commit_interval: int = CACHE_COMMIT_INTERVAL,
+    ) -> None:
+        self.parser = parser
+        self.cache_path = cache_path
+        self.include_people = include_people
+        self.count_rows = count_rows
+        self.cache_commit_interval = cache_commit_interval
+        self._cache: Optional[extraction_cache.ExtractionCache] = None
+        self._uncommitted_puts = 0
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        state["_cache"] = None
+        state["_uncommitted_puts"] = 0
+        return state
+
+    def parse_file(self, xml_file_path: str, irs_month: str, year: int) -> ParsedFiling:
+        """Read, parse and extract rows from an XML file. When the cache is
+        enabled, cached filings are read from their stored fragment and new
+        filings are added to it
+
+        :param xml_file_path: The path to the XML file
+        :type xml_file_path: str
+        :param irs_month: The IRS month the filing was published in
+        :type irs_month: str
+        :param year: The year the filing was published in
+        :type year: int
+        :return: The extracted rows and the filing's trace
+        :rtype: ParsedFiling
+        """
+        file_name = os.path.basename(xml_file_path)
+        start = time.perf_counter()
+        with open(xml_file_path, "r", encoding="utf-8") as f:
+            xml_file = f.read()
+        trace = slow_filings.FilingTrace(
+            file_name, irs_month, year, os.path.getsize(xml_file_path)
+        )
+        trace.stage_seconds["read"] = time.perf_counter() - start
+        return self.parse_contents(xml_file, trace)
+
+    def parse_contents(
+        self, xml_file: str, trace: slow_filings.FilingTrace
+    ) -> ParsedFiling:
+        """Parse and extract rows from the contents of an XML file, such as
+        one received without being written to disk
+
+        :param xml_file: The contents of the XML file
+        :type xml_file: str
+        :param trace: The filing's trace, which names the filing and receives
+            its timings
+        :type trace: slow_filings.FilingTrace
+        :return: The extracted rows and the filing's trace
+        :rtype: ParsedFiling
+        """
+        start = time.perf_counter()
+        if self.cache_path is None:
+            parsed_xml = bs4.BeautifulSoup(xml_file, "xml")
+        else:
+            parsed_xml = self._parse_with_cache(
+                xml_file, trace.file_name, trace.irs_month, trace.year
+            )
+        trace.stage_seconds["xml_parse"] = time.perf_counter() - start
+
+        return self.parse_xml(trace.file_name, parsed_xml, trace)
+
+    def parse_xml(
+        self,
+        file_name: str,
+        parsed_xml: bs4.BeautifulSoup,
+        trace: slow_filings.FilingTrace,
+    ) -> ParsedFiling:
+        """Extract rows from a parsed filing
+
+        :param file_name: The name of the file
+        :type file_name: str
+        :param parsed_xml: The XML file parsed into a readable format
+        :type parsed_xml: bs4.BeautifulSoup
+        :param trace: The filing's trace, which extraction timings are added to
+        :type trace: slow_filings.FilingTrace
+        :return: The extracted rows and the filing's trace
+        :rtype: ParsedFiling
+        """
+        # People listed in both the metrics and the person records are given
+        # the same gender in both
+        filing_guesser = self.parser.make_filing_guesser()
+        start = time.perf_counter()
+        organization = self.parser.parse_organization(
+            file_name, parsed_xml, trace.irs_month, trace.year, filing_guesser
+        )
+        trace.stage_seconds["extract"] = time.perf_counter() - start
+
+        people = None
+        if self.include_people:
+            start = time.perf_counter()
+            people = self.parser.parse_people(file_name, parsed_xml, filing_guesser)
+            trace.stage_seconds["persons"] = time.perf_counter() - start
+
+        if self.count_rows:
+            trace.count_rows(parsed_xml)
+
+        return ParsedFiling(organization, people, trace)
+
+    def commit(self) -> None:
+        """Persist the filings added to the extraction cache so far"""
+        if self._cache is not None:
+            self._cache.commit()
+            self._uncommitted_puts = 0
+
+    def close(self) -> None:
+        """Persist and close the extraction cache, if it was opened"""
+        if self._cache is not None:
+            self._cache.close()
+            self._cache = None
+
+    def _parse_with_cache(
+        self, xml_file: str, file_name: str, irs_month: str, year: int
+    ) -> bs4.BeautifulSoup:
+        """Parse a filing, reading its fragment from the cache when present
+
+        :param xml_file: The contents of the XML file
+        :type xml_file: str
+        :param file_name: The name of the file
+        :type file_name: str
+        :param irs_month: The IRS month the filing was published in
+        :type irs_month: str
+        :param year: The year the filing was published in
+        :type year: int
+        :return: The parsed filing or cached fragment
+        :rtype: bs4.BeautifulSoup
+        """
+        if self._cache is None:
+            self._cache = extraction_cache.ExtractionCache(self.cache_path)
+
+        content_hash = extraction_cache.ExtractionCache.hash_contents(xml_file)
+        parsed_xml = self._cache.get(content_hash)
+        if parsed_xml is not None:
+            return parsed_xml
+
+        parsed_xml = bs4.BeautifulSoup(xml_file, "xml")
+        self._cache.put(content_hash, file_name, irs_month, year, parsed_xml)
+        self._uncommitted_puts += 1
+        if self._uncommitted_puts >= self.cache_commit_interval:
+            self.commit()
+        return parsed_xml
@@ -5,8 +5,6 @@ Guess gender using a probabilities chart
 import pathlib
 import random
 
-import pandas as pd
-
 
 class GenderGuesser:
     """
@@ -20,6 +18,10 @@ class GenderGuesser:
     PROB_COL = "female_prob"
 
     def __init__(self, csv_file_path: pathlib.Path) -> None:
+        # pandas is slow to import and only needed to read the chart, so worker
+        # processes receiving a guesser never import it
+        import pandas as pd
+
         self.csv_file_path = csv_file_path
         self._gender_df = pd.read_csv(csv_file_path)
         self._gender_df[GenderGuesser.NAME_COL] = self._gender_df[
@@ -50,3 +52,33 @@ class GenderGuesser:
         :rtype: str
         """
         return "F" if random.random() < threshold else "M"
+
+
+class FilingGenderGuesser:
+    """
+    Guess genders for a single filing, guessing each first name once so the
+    metrics and person records extracted from the filing agree on every
+    person. Guesses depend on the first name alone, so people of the filing
+    sharing one are given the same guess.
+
+    :param guesser: Guesses the gender of a first name
+    :type guesser: GenderGuesser
+    """
+
+    def __init__(self, guesser: GenderGuesser) -> None:
+        self.guesser = guesser
+        self._guesses: dict[str, str] = {}
+
+    def guess(self, first_name: str) -> str:
+        """Return guessed gender based off first name, guessing only the first
+        time the name is seen in the filing
+
+        :param first_name: The first name
+        :type first_name: str
+        :return: M if male, F if female
+        :rtype: str
+        """
+        first_name = first_name.lower()
+        if first_name not in self._guesses:
+            self._guesses[first_name] = self.guesser.guess(first_name)
+        return self._guesses[first_name]
@@ -0,0 +1,254 @@
+"""
+The HTTP transport shared by every class that reaches the IRS website
+"""
+
+import random
+import threading
+import time
+from typing import Optional
+
+import requests
+import requests.adapters
+
+
+class TokenBucket:
+    """Allow ``rate`` requests per second, in bursts of up to ``capacity``.
+    The rate is halved whenever the server throttles, and grows back a little
+    after every successful request, up to its starting value.
+
+    :param rate: The starting and highest rate, in requests per second
+    :type rate: float
+    :param capacity: The largest burst of requests
+    :type capacity: float
+    """
+
+    MIN_RATE = 0.1
+    # Fraction of the highest rate regained after each successful request
+    RECOVERY_FRACTION = 0.05
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        self.max_rate = rate
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Wait until a request may start"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.capacity, self._tokens + (now - self._updated) * self.rate
+                )
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait_seconds = (1 - self._tokens) / self.rate
+            time.sleep(wait_seconds)
+
+    def throttle(self) -> None:
+        """Halve the rate after the server asked for fewer requests"""
+        with self._lock:
+            self.rate = max(TokenBucket.MIN_RATE, self.rate / 2)
+
+    def recover(self) -> None:
+        """Raise the rate after a successful request"""
+        with self._lock:
+            self.rate = min(
+                self.max_rate, self.rate + self.max_rate * TokenBucket.RECOVERY_FRACTION
+            )
+
+
+class HTTPClient:
+    """Send requests through one pooled session, retrying server errors and
+    timeouts with exponential backoff, and limiting both the request rate and
+    the number of requests in flight
+
+    :param max_retries: How many times a failed request is retried
+    :type max_retries: int
+    :param backoff_seconds: The delay before the first retry, doubled after
+        each one
+    :type backoff_seconds: float
+    :param rate: The highest rate, in requests per second
+    :type rate: float
+    :param max_concurrency: The most requests in flight at once
+    :type max_concurrency: int
+    """
+
+    MAX_RETRIES = 4
+    BACKOFF_SEC = 0.5
+    MAX_BACKOFF_SEC = 30
+    RATE = 10
+    MAX_CONCURRENCY = 8
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+    # Responses meaning the server wants fewer requests
+    THROTTLE_STATUSES = {429, 503}
+
+    def __init__(
+        self,
+        max_retries: int = MAX_RETRIES,
+        backoff_seconds: float = BACKOFF_SEC,
+        rate: float = RATE,
+        max_concurrency: int = MAX_CONCURRENCY,
+    ) -> None:
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.max_concurrency = max_concurrency
+        self.bucket = TokenBucket(rate, capacity=max_concurrency)
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+
+        self.session = requests.Session()
+        # Retries are handled here, so the bucket sees every throttled response
+        adapter = requests.adapters.HTTPAdapter(
+            pool_maxsize=max_concurrency, max_retries=0
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def get(
+        self, url: str, timeout: float, headers: Optional[dict[str, str]] = None
+    ) -> requests.Response:
+        """Send a GET request
+
+        :param url: The URL to request
+        :type url: str
+        :param timeout: The connect and read timeout in seconds
+        :type timeout: float
+        :param headers: Extra request headers, defaults to none
+        :type headers: Optional[dict[str, str]]
+        :raises requests.ConnectionError: The server could not be reached
+            after every retry
+        :raises requests.Timeout: The server did not answer after every retry
+        :return: The last response, which may still be an error
+        :rtype: requests.Response
+        """
+        return self.request("GET", url, timeout, headers)
+
+    def head(
+        self, url: str, timeout: float, headers: Optional[dict[str, str]] = None
+    ) -> requests.Response:
+        """Send a HEAD request, to read a resource's headers without
+        downloading it
+
+        :param url: The URL to request
+        :type url: str
+        :param timeout: The connect and read timeout in seconds
+        :type timeout: float
+        :param headers: Extra request headers, defaults to none
+        :type headers: Optional[dict[str, str]]
+        :raises requests.ConnectionError: The server could not be reached
+            after every retry
+        :raises requests.Timeout: The server did not answer after every retry
+        :return: The last response, which may still be an error
+        :rtype: requests.Response
+        """
+        return self.request("HEAD", url, timeout, headers)
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        timeout: float,
+        headers: Optional[dict[str, str]] = None,
+    ) -> requests.Response:
+        """Send a request, retrying server errors and timeouts
+
+        :param method: The HTTP method
+        :type method: str
+        :param url: The URL to request
+        :type url: str
+        :param timeout: The connect and read timeout in seconds
+        :type timeout: float
+        :param headers: Extra request headers, defaults to none
+        :type headers: Optional[dict[str, str]]
+        :raises requests.ConnectionError: The server could not be reached
+            after every retry
+        :raises requests.Timeout: The server did not answer after every retry
+        :return: The last response, which may still be an error
+        :rtype: requests.Response
+        """
+        for attempt in range(self.max_retries + 1):
+            self.bucket.acquire()
+            try:
+                with self._slots:
+                    response = self.session.request(
+                        method, url, headers=headers, timeout=timeout
+                    )
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == self.max_retries:
+                    raise
+                delay = self._backoff(attempt)
+            else:
+                if response.status_code in HTTPClient.THROTTLE_STATUSES:
+                    self.bucket.throttle()
+                elif response.ok:
+                    self.bucket.recover()
+                if (
+                    response.status_code not in HTTPClient.RETRY_STATUSES
+                    or attempt == self.max_retries
+                ):
+                    return response
+                delay = max(self._backoff(attempt), self._retry_after(response))
+                response.close()
+            time.sleep(delay)
+
+    def close(self) -> None:
+        """Close the pooled connections"""
+        self.session.close()
+
+    def _backoff(self, attempt: int) -> float:
+        """Return a random delay before a retry, so clients retrying together
+        spread out
+
+        :param attempt: The number of the failed attempt, from 0
+        :type attempt: int
+        :return: The delay in seconds
+        :rtype: float
+        """
+        return random.uniform(
+            0, min(HTTPClient.MAX_BACKOFF_SEC, self.backoff_seconds * 2**attempt)
+        )
+
+    def _retry_after(self, response: requests.Response) -> float:
+        """Return the delay a throttling server asked for
+
+        :param response: The throttled response
+        :type response: requests.Response
+        :return: The delay in seconds, or 0 if none was given in seconds
+        :rtype: float
+        """
+        retry_after = response.headers.get("Retry-After", "")
+        if not retry_after.isdigit():
+            return 0
+        return min(HTTPClient.MAX_BACKOFF_SEC, int(retry_after))
+
+
+_default_client: Optional[HTTPClient] = None
+_default_client_lock = threading.Lock()
+
+
+def get_default_client() -> HTTPClient:
+    """Return the client shared by the package, creating it on first use
+
+    :return: The shared client
+    :rtype: HTTPClient
+    """
+    global _default_client
+    with _default_client_lock:
+        if _default_client is None:
+            _default_client = HTTPClient()
+        return _default_client
+
+
+def set_default_client(client: HTTPClient) -> None:
+    """Replace the client shared by the package, e.g. to change its limits
+
+    :param client: The client to share
+    :type client: HTTPClient
+    """
+    global _default_client
+    with _default_client_lock:
+        _default_client = client
@@ -2,7 +2,7 @@
 Implementation of various field extractor classes
 """
 
-from typing import Optional
+from typing import NamedTuple, Optional
 
 import bs4
 import pydantic
@@ -26,6 +26,93 @@ class OrganizationDataModel(pydantic.BaseModel):
     other_reviewed_compensation: Optional[bool]
     male_to_female_pay_ratio: Optional[float]
     president_to_average_pay_ratio: Optional[float]
+    state: Optional[str] = None
+
+
+class OrganizationRow(NamedTuple):
+    """
+    Lightweight row with the same fields as OrganizationDataModel. Rows are
+    built without validation on the per-filing hot path and validated once per
+    batch with validate_organization_rows before being written
+    """
+
+    ein: str
+    instnm: str
+    irs_month: str
+    year: int
+    percentage_women_trustees: Optional[float]
+    percentage_women_key_employees: Optional[float]
+    whistleblower_policy: Optional[bool]
+    ceo_reviewed_compensation: Optional[bool]
+    other_reviewed_compensation: Optional[bool]
+    male_to_female_pay_ratio: Optional[float]
+    president_to_average_pay_ratio: Optional[float]
+    state: Optional[str] = None
+
+
+ORGANIZATION_ROWS_ADAPTER = pydantic.TypeAdapter(list[OrganizationRow])
+ORGANIZATION_PRIMARY_KEY = ("ein", "irs_month", "year")
+
+
+def validate_organization_rows(rows: list[OrganizationRow]) -> list[OrganizationRow]:
+    """Validate a batch of organization rows against their field types
+
+    :param rows: Rows built on the hot path
+    :type rows: list[OrganizationRow]
+    :raises pydantic.ValidationError: A row does not match its field types
+    :return: The validated rows
+    :rtype: list[OrganizationRow]
+    """
+    return ORGANIZATION_ROWS_ADAPTER.validate_python(rows)
+
+
+def drop_duplicate_rows(rows: list[OrganizationRow]) -> list[OrganizationRow]:
+    """Keep the first row for each primary key, as every sink stores them
+
+    :param rows: Organization rows
+    :type rows: list[OrganizationRow]
+    :return: Rows with unique primary keys, in their original order
+    :rtype: list[OrganizationRow]
+    """
+    seen_keys = set()
+    unique_rows = []
+    for row in rows:
+        key = tuple(getattr(row, col) for col in ORGANIZATION_PRIMARY_KEY)
+        if key in seen_keys:
+            continue
+        seen_keys.add(key)
+        unique_rows.append(row)
+    return unique_rows
+
+
+class PersonDataModel(pydantic.BaseModel):
+    """
+    Type safety for table representation of a person listed in Part VII,
+    Section A or Schedule J, Part II of an IRS 990 form
+    """
+
+    ein: str
+    object_id: str
+    source: str
+    person_name: Optional[str]
+    title: Optional[str]
+    gender: Optional[str]
+    average_hours_per_week: Optional[float]
+    individual_trustee_or_director: Optional[bool]
+    institutional_trustee: Optional[bool]
+    officer: Optional[bool]
+    key_employee: Optional[bool]
+    highest_compensated_employee: Optional[bool]
+    former_officer_director_trustee: Optional[bool]
+    reportable_comp_from_org: Optional[float]
+    reportable_comp_from_related_org: Optional[float]
+    other_compensation: Optional[float]
+    base_compensation: Optional[float]
+    bonus_compensation: Optional[float]
+    other_reportable_compensation: Optional[float]
+    deferred_compensation: Optional[float]
+    nontaxable_benefits: Optional[float]
+    total_compensation: Optional[float]
 
 
 class EINEXtractor:
@@ -98,6 +185,41 @@ class OrgNameExtractor:
         )
 
 
+class StateExtractor:
+    """Extract the state of the filer's US address from IRS 990 form
+
+    :param file_name: The name of the file
+    :type file_name: str
+    :param parsed_xml: The XML file parsed into a readable format
+    :type parsed_xml: bs4.BeautifulSoup
+    """
+
+    def __init__(self, file_name: str, parsed_xml: bs4.BeautifulSoup) -> None:
+        self.file_name = file_name
+        self.parsed_xml = parsed_xml
+
+    def extract(self) -> Optional[str]:
+        """Extract the filer's state from IRS 990 form
+
+        :return: The state's abbreviation, or None if the filer has a foreign
+            address
+        :rtype: Optional[str]
+        """
+        filer_xml_object = self.parsed_xml.find("Filer")
+        if filer_xml_object is None:
+            raise custom_exceptions.MissingFilerException(
+                f"Filer section missing from file {self.file_name}"
+            )
+
+        address_xml_object = filer_xml_object.find("USAddress")
+        if address_xml_object is None:
+            return None
+        state_xml_object = address_xml_object.find("StateAbbreviationCd")
+        if state_xml_object is None:
+            return None
+        return state_xml_object.text
+
+
 class TotalCompensationExtractor:
     """Extract total compensation from IRS 990 form. Total compensation is based on
     Part I, question 15 in the IRS 990 form
@@ -307,15 +429,16 @@ class TrusteeExtractor:
     :type file_name: str
     :param parsed_xml: The XML file parsed into a readable format
     :type parsed_xml: bs4.BeautifulSoup
-    :param guesser: A class to guess gender based off name
-    :type guesser: gender_guesser.GenderGuesser
+    :param guesser: A class to guess gender based off name, shared by the
+        extractors of a filing so each person is guessed once
+    :type guesser: gender_guesser.GenderGuesser | gender_guesser.FilingGenderGuesser
     """
 
     def __init__(
         self,
         file_name: str,
         parsed_xml: bs4.BeautifulSoup,
-        guesser: gender_guesser.GenderGuesser,
+        guesser: gender_guesser.GenderGuesser | gender_guesser.FilingGenderGuesser,
     ) -> None:
         self.file_name = file_name
         self.parsed_xml = parsed_xml
@@ -443,15 +566,16 @@ class KeyEmployeeExtractor:
     :type file_name: str
     :param parsed_xml: The XML file parsed into a readable format
     :type parsed_xml: bs4.BeautifulSoup
-    :param guesser: A class to guess gender based off name
-    :type guesser: gender_guesser.GenderGuesser
+    :param guesser: A class to guess gender based off name, shared by the
+        extractors of a filing so each person is guessed once
+    :type guesser: gender_guesser.GenderGuesser | gender_guesser.FilingGenderGuesser
     """
 
     def __init__(
         self,
         file_name: str,
         parsed_xml: bs4.BeautifulSoup,
-        guesser: gender_guesser.GenderGuesser,
+        guesser: gender_guesser.GenderGuesser | gender_guesser.FilingGenderGuesser,
     ) -> None:
         self.file_name = file_name
         self.parsed_xml = parsed_xml
@@ -651,3 +775,171 @@ class KeyEmployeeExtractor:
             return 0
 
         return len(key_employee_xml_objects)
+
+
+class PersonExtractor:
+    """Extract every person listed in Part VII, Section A and Schedule J, Part II
+    of an IRS 990 form, along with their role checkboxes and compensation
+
+    :param file_name: The name of the file
+    :type file_name: str
+    :param parsed_xml: The XML file parsed into a readable format
+    :type parsed_xml: bs4.BeautifulSoup
+    :param guesser: A class to guess gender based off name, shared by the
+        extractors of a filing so each person is guessed once
+    :type guesser: gender_guesser.GenderGuesser | gender_guesser.FilingGenderGuesser
+    """
+
+    PART_VII_SOURCE = "part_vii"
+    SCHEDULE_J_SOURCE = "schedule_j"
+
+    PART_VII_ROLE_TAGS = {
+        "individual_trustee_or_director": "IndividualTrusteeOrDirectorInd",
+        "institutional_trustee": "InstitutionalTrusteeInd",
+        "officer": "OfficerInd",
+        "key_employee": "KeyEmployeeInd",
+        "highest_compensated_employee": "HighestCompensatedEmployeeInd",
+        "former_officer_director_trustee": "FormerOfcrDirectorTrusteeInd",
+    }
+    PART_VII_AMOUNT_TAGS = {
+        "average_hours_per_week": "AverageHoursPerWeekRt",
+        "reportable_comp_from_org": "ReportableCompFromOrgAmt",
+        "reportable_comp_from_related_org": "ReportableCompFromRltdOrgAmt",
+        "other_compensation": "OtherCompensationAmt",
+    }
+    SCHEDULE_J_AMOUNT_TAGS = {
+        "base_compensation": "BaseCompensationFilingOrgAmt",
+        "bonus_compensation": "BonusFilingOrganizationAmount",
+        "other_reportable_compensation": "OtherCompensationFilingOrgAmt",
+        "deferred_compensation": "DeferredCompensationFlngOrgAmt",
+        "nontaxable_benefits": "NontaxableBenefitsFilingOrgAmt",
+        "total_compensation": "TotalCompensationFilingOrgAmt",
+    }
+
+    def __init__(
+        self,
+        file_name: str,
+        parsed_xml: bs4.BeautifulSoup,
+        guesser: gender_guesser.GenderGuesser | gender_guesser.FilingGenderGuesser,
+    ) -> None:
+        self.file_name = file_name
+        self.parsed_xml = parsed_xml
+        self.guesser = guesser
+
+    def extract(self) -> list[PersonDataModel]:
+        """Extract all people listed in Part VII and Schedule J
+
+        :return: One record per listed person
+        :rtype: list[PersonDataModel]
+        """
+        ein = EINEXtractor(self.file_name, self.parsed_xml).extract()
+        object_id = self._get_object_id()
+
+        people = [
+            self._extract_person(
+                ein,
+                object_id,
+                PersonExtractor.PART_VII_SOURCE,
+                person_xml_object,
+                PersonExtractor.PART_VII_AMOUNT_TAGS,
+            )
+            for person_xml_object in self.parsed_xml.find_all(
+                "Form990PartVIISectionAGrp"
+            )
+        ]
+
+        schedule_j = self.parsed_xml.find("IRS990ScheduleJ")
+        if schedule_j is not None:
+            people.extend(
+                self._extract_person(
+                    ein,
+                    object_id,
+                    PersonExtractor.SCHEDULE_J_SOURCE,
+                    person_xml_object,
+                    PersonExtractor.SCHEDULE_J_AMOUNT_TAGS,
+                )
+                for person_xml_object in schedule_j.find_all(
+                    "RltdOrgOfficerTrstKeyEmplGrp"
+                )
+            )
+
+        return people
+
+    def _get_object_id(self) -> str:
+        """Return the IRS object id, which prefixes the file name
+
+        :return: The object id
+        :rtype: str
+        """
+        return self.file_name.split("_")[0]
+
+    def _extract_person(
+        self,
+        ein: str,
+        object_id: str,
+        source: str,
+        person_xml_object: bs4.element.Tag,
+        amount_tags: dict[str, str],
+    ) -> PersonDataModel:
+        """Extract a single person's record
+
+        :param ein: The EIN of the filing organization
+        :type ein: str
+        :param object_id: The IRS object id of the filing
+        :type object_id: str
+        :param source: The section of the form the person is listed in
+        :type source: str
+        :param person_xml_object: The XML representation of a person
+        :type person_xml_object: bs4.element.Tag
+        :param amount_tags: Maps record fields to the XML tags holding amounts
+        :type amount_tags: dict[str, str]
+        :return: The person's record
+        :rtype: PersonDataModel
+        """
+        fields = dict.fromkeys(PersonDataModel.model_fields)
+        fields.update(ein=ein, object_id=object_id, source=source)
+
+        name_xml_object = person_xml_object.find("PersonNm")
+        if name_xml_object is not None and name_xml_object.text.split():
+            fields["person_name"] = name_xml_object.text
+            fields["gender"] = self.guesser.guess(name_xml_object.text.split()[0])
+
+        title_xml_object = person_xml_object.find("TitleTxt")
+        if title_xml_object is not None:
+            fields["title"] = title_xml_object.text
+
+        if source == PersonExtractor.PART_VII_SOURCE:
+            for field, tag in PersonExtractor.PART_VII_ROLE_TAGS.items():
+                fields[field] = self._is_checked(person_xml_object.find(tag))
+
+        for field, tag in amount_tags.items():
+            fields[field] = self._get_amount(person_xml_object.find(tag))
+
+        return PersonDataModel(**fields)
+
+    def _is_checked(self, checkbox_xml_object: Optional[bs4.element.Tag]) -> bool:
+        """See if the checkbox is selected
+
+        :param checkbox_xml_object: The XML representation of a checkbox
+        :type checkbox_xml_object: Optional[bs4.element.Tag]
+        :return: True if it is selected, False otherwise
+        :rtype: bool
+        """
+        return checkbox_xml_object is not None and checkbox_xml_object.text == "X"
+
+    def _get_amount(
+        self, amount_xml_object: Optional[bs4.element.Tag]
+    ) -> Optional[float]:
+        """Read an amount field
+
+        :param amount_xml_object: The XML representation of an amount
+        :type amount_xml_object: Optional[bs4.element.Tag]
+        :return: The amount, or None if missing or malformed
+        :rtype: Optional[float]
+        """
+        try:
+            return float(amount_xml_object.text)
+        except AttributeError:
+            return None
+        except ValueError:
+            return None
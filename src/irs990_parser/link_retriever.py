@@ -2,8 +2,80 @@
 Download IRS 990 files and save at specified directory
 """
 
+import json
+import os
+import pathlib
+import time
+from typing import TYPE_CHECKING, NamedTuple, Optional
+
 import bs4
-import requests
+
+from irs990_parser import custom_exceptions
+
+if TYPE_CHECKING:
+    from irs990_parser import http_client
+
+
+class DiscoveredLinks(NamedTuple):
+    """The links found on a downloads page, with what is needed to revalidate
+    them"""
+
+    zip_links: list[str]
+    index_csv_links: list[str]
+    fetched_at: float
+    etag: Optional[str]
+    last_modified: Optional[str]
+
+
+class LinkCache:
+    """Persist the links discovered on each downloads page in a JSON file, so
+    runs can be planned without fetching the page
+
+    :param cache_path: The path to the JSON file
+    :type cache_path: pathlib.Path
+    """
+
+    def __init__(self, cache_path: pathlib.Path) -> None:
+        self.cache_path = cache_path
+
+    def get(self, url: str) -> Optional[DiscoveredLinks]:
+        """Return the links discovered on a downloads page
+
+        :param url: The downloads page
+        :type url: str
+        :return: The links, or None if the page was never fetched
+        :rtype: Optional[DiscoveredLinks]
+        """
+        entry = self._read().get(url)
+        return DiscoveredLinks(**entry) if entry is not None else None
+
+    def put(self, url: str, links: DiscoveredLinks) -> None:
+        """Store the links discovered on a downloads page
+
+        :param url: The downloads page
+        :type url: str
+        :param links: The links
+        :type links: DiscoveredLinks
+        """
+        entries = self._read()
+        entries[url] = links._asdict()
+        # Written to a temporary file first, so an interrupted run never leaves
+        # a truncated cache behind
+        temp_path = self.cache_path.with_name(f"{self.cache_path.name}.tmp")
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(entries, f, indent=2)
+        os.replace(temp_path, self.cache_path)
+
+    def _read(self) -> dict[str, dict]:
+        """Read every cached downloads page
+
+        :return: The links of each page, keyed by URL
+        :rtype: dict[str, dict]
+        """
+        if not self.cache_path.exists():
+            return {}
+        with open(self.cache_path, "r", encoding="utf-8") as f:
+            return json.load(f)
 
 
 class IRS990LinkRetriever:
@@ -13,21 +85,58 @@ class IRS990LinkRetriever:
     :type start_year: int
     :param end_year: The end year from which to download published IRS forms
     :type end_year: int
+    :param irs_url: The downloads page to scrape, defaults to the IRS website
+    :type irs_url: Optional[str]
+    :param link_cache: Stores the links discovered on the page, defaults to
+        always fetching the page
+    :type link_cache: Optional[LinkCache]
+    :param ttl_seconds: How long cached links are used before the page is
+        revalidated
+    :type ttl_seconds: float
+    :param offline: Whether to use the cached links alone, however old
+    :type offline: bool
+    :param client: Sends the requests, defaults to the client shared by the
+        package
+    :type client: Optional[http_client.HTTPClient]
+    :param latest_end_year: The latest year that may be requested, or None to
+        accept years the IRS has yet to publish
+    :type latest_end_year: Optional[int]
     """
 
     IRS_URL = "https://www.irs.gov/charities-non-profits/form-990-series-downloads"
     EARLIEST_START_YEAR = 2019
     LATEST_END_YEAR = 2024
     IRS_REQUEST_TIMEOUT_SEC = 5
+    LINK_CACHE_TTL_SEC = 24 * 60 * 60
+    ZIP_LINK_SELECTOR = ".collapsible-item-body a[href$='.zip']"
+    INDEX_CSV_LINK_SELECTOR = ".collapsible-item-body > p a"
+    HTTP_NOT_MODIFIED = 304
+
+    def __init__(
+        self,
+        start_year: int,
+        end_year: int,
+        irs_url: Optional[str] = None,
+        link_cache: Optional[LinkCache] = None,
+        ttl_seconds: float = LINK_CACHE_TTL_SEC,
+        offline: bool = False,
+        client: Optional["http_client.HTTPClient"] = None,
+        latest_end_year: Optional[int] = LATEST_END_YEAR,
+    ) -> None:
+        self.irs_url = irs_url if irs_url is not None else IRS990LinkRetriever.IRS_URL
+        self.link_cache = link_cache
+        self.ttl_seconds = ttl_seconds
+        self.offline = offline
+        self.client = client
+        self.latest_end_year = latest_end_year
 
-    def __init__(self, start_year: int, end_year: int) -> None:
         self._validate_start_year(start_year)
         self.start_year = start_year
 
         self._validate_end_year(end_year)
         self.end_year = end_year
 
-        self._irs_website_html_elements = self._parse_website()
+        self._links = self._discover_links()
 
     def _validate_start_year(self, start_year: int) -> None:
         """Ensures start year is between the earliest available year in IRS and current year
@@ -41,9 +150,9 @@ class IRS990LinkRetriever:
                 f"Invalid start year {start_year}. The earliest available year is {IRS990LinkRetriever.EARLIEST_START_YEAR}"
             )
 
-        if start_year > IRS990LinkRetriever.LATEST_END_YEAR:
+        if self.latest_end_year is not None and start_year > self.latest_end_year:
             raise ValueError(
-                f"Invalid start year {start_year}. The latest available year is {IRS990LinkRetriever.LATEST_END_YEAR}"
+                f"Invalid start year {start_year}. The latest available year is {self.latest_end_year}"
             )
 
     def _validate_end_year(self, end_year: int) -> None:
@@ -53,9 +162,9 @@ class IRS990LinkRetriever:
         :type start_year: int
         :raises ValueError: Invalid start year
         """
-        if end_year > IRS990LinkRetriever.LATEST_END_YEAR:
+        if self.latest_end_year is not None and end_year > self.latest_end_year:
             raise ValueError(
-                f"Invalid end year {end_year}. The latest available year is {IRS990LinkRetriever.LATEST_END_YEAR}"
+                f"Invalid end year {end_year}. The latest available year is {self.latest_end_year}"
             )
 
         if end_year < self.start_year:
@@ -63,17 +172,80 @@ class IRS990LinkRetriever:
                 f"Invalid end year {end_year}. The earliest available year is {self.start_year}"
             )
 
-    def _parse_website(self) -> bs4.BeautifulSoup:
-        """Retrieves HTML elements of the IRS 990 website
+    def _discover_links(self) -> DiscoveredLinks:
+        """Find the links on the downloads page, from the cache while it is
+        fresh and by revalidating or fetching the page otherwise
 
-        :returns: Parsed HTML elements
-        :rtype: bs4.BeautifulSoup
+        :raises custom_exceptions.LinksUnavailableException: Offline, and the
+            page was never cached
+        :return: The links on the page
+        :rtype: DiscoveredLinks
         """
-        response = requests.get(
-            IRS990LinkRetriever.IRS_URL,
-            timeout=IRS990LinkRetriever.IRS_REQUEST_TIMEOUT_SEC,
+        cached = (
+            self.link_cache.get(self.irs_url) if self.link_cache is not None else None
+        )
+        if self.offline:
+            if cached is None:
+                raise custom_exceptions.LinksUnavailableException(
+                    f"No cached links for {self.irs_url}. Run once without offline mode to cache them"
+                )
+            return cached
+        if cached is not None and time.time() - cached.fetched_at < self.ttl_seconds:
+            return cached
+
+        # requests is slow to import and not needed while the cache is fresh
+        import requests
+
+        from irs990_parser import http_client
+
+        client = (
+            self.client if self.client is not None else http_client.get_default_client()
         )
-        return bs4.BeautifulSoup(response.text, "html.parser")
+
+        headers = {}
+        if cached is not None and cached.etag is not None:
+            headers["If-None-Match"] = cached.etag
+        if cached is not None and cached.last_modified is not None:
+            headers["If-Modified-Since"] = cached.last_modified
+        try:
+            response = client.get(
+                self.irs_url,
+                headers=headers,
+                timeout=IRS990LinkRetriever.IRS_REQUEST_TIMEOUT_SEC,
+            )
+            response.raise_for_status()
+        except requests.RequestException:
+            # A stale plan beats no plan when the page is slow or down
+            if cached is not None:
+                return cached
+            raise
+
+        if cached is not None and (
+            response.status_code == IRS990LinkRetriever.HTTP_NOT_MODIFIED
+        ):
+            links = cached._replace(fetched_at=time.time())
+        else:
+            html_elements = bs4.BeautifulSoup(response.text, "html.parser")
+            links = DiscoveredLinks(
+                zip_links=[
+                    link["href"]
+                    for link in html_elements.select(
+                        IRS990LinkRetriever.ZIP_LINK_SELECTOR
+                    )
+                ],
+                index_csv_links=[
+                    link["href"]
+                    for link in html_elements.select(
+                        IRS990LinkRetriever.INDEX_CSV_LINK_SELECTOR
+                    )
+                ],
+                fetched_at=time.time(),
+                etag=response.headers.get("ETag"),
+                last_modified=response.headers.get("Last-Modified"),
+            )
+        if self.link_cache is not None:
+            self.link_cache.put(self.irs_url, links)
+        return links
 
     def get_index_csv_links(self) -> list[str | list[str]]:
         """Return links to index csv files from the start year onward
@@ -81,13 +253,10 @@ class IRS990LinkRetriever:
         :return: A collection of all links to CSV index files
         :rtype: list[str | list[str]]
         """
-        href_elements_by_year = self._irs_website_html_elements.select(
-            ".collapsible-item-body > p a"
-        )
         return [
-            csv_link["href"]
-            for csv_link in href_elements_by_year
-            if self._link_within_year_range(csv_link["href"])
+            csv_link
+            for csv_link in self._links.index_csv_links
+            if self._link_within_year_range(csv_link)
         ]
 
     def get_zip_links(self) -> list[str | list[str]]:
@@ -96,20 +265,11 @@ class IRS990LinkRetriever:
         :return: A collection of all zip files
         :rtype: list[str | list[str]]
         """
-        list_elements_by_year = self._irs_website_html_elements.select(
-            ".collapsible-item-body"
-        )
-        zip_links = []
-        for item in list_elements_by_year:
-            zip_links.extend(
-                [
-                    link["href"]
-                    for link in item.select("a[href$='.zip']")
-                    if self._link_within_year_range(link["href"])
-                ]
-            )
-
-        return zip_links
+        return [
+            zip_link
+            for zip_link in self._links.zip_links
+            if self._link_within_year_range(zip_link)
+        ]
 
     def _link_within_year_range(self, link: str) -> bool:
         """Verify the link to a yearly record is within the start and end year
@@ -5,8 +5,8 @@ Stores functionality to load data for transfer into a database
 import configparser
 import os
 import pathlib
+from typing import Optional
 
-import pandas as pd
 import sqlalchemy
 
 from irs990_parser import irs_field_extractor
@@ -27,21 +27,50 @@ class Loader:
     DATABASE_CONFIG_KEY = "database"
     PORT_CONFIG_KEY = "port"
     TABLE_NAME_CONFIG_KEY = "table_name"
+    DRIVERNAME_CONFIG_KEY = "drivername"
+
+    DEFAULT_DRIVERNAME = "mysql+mysqlconnector"
+    # File-based databases (used for local runs and benchmarks) have no server
+    SERVERLESS_DRIVERNAME_PREFIX = "sqlite"
 
     PRIMARY_KEY = ["ein", "irs_month", "year"]
+    INSERT_BATCH_SIZE = 10_000
+    PLACEHOLDERS = {"qmark": "?", "format": "%s", "pyformat": "%s"}
+    MYSQL_DIALECTS = ("mysql", "mariadb")
+    SQLITE_DIALECT = "sqlite"
+    POSTGRESQL_DIALECT = "postgresql"
 
     def __init__(self, ini_config_path: pathlib.Path) -> None:
         self._validate_config_file(ini_config_path)
         config = configparser.ConfigParser()
         config.read(ini_config_path)
-        self.user = config.get(Loader.CONFIG_SECTION, Loader.USER_CONFIG_KEY)
-        self.hostname = config.get(Loader.CONFIG_SECTION, Loader.HOSTNAME_CONFIG_KEY)
-        self.password = config.get(Loader.CONFIG_SECTION, Loader.PASSWORD_CONFIG_KEY)
+        self.drivername = config.get(
+            Loader.CONFIG_SECTION,
+            Loader.DRIVERNAME_CONFIG_KEY,
+            fallback=Loader.DEFAULT_DRIVERNAME,
+        )
+        server_fallback = (
+            {"fallback": None}
+            if self.drivername.startswith(Loader.SERVERLESS_DRIVERNAME_PREFIX)
+            else {}
+        )
+        self.user = config.get(
+            Loader.CONFIG_SECTION, Loader.USER_CONFIG_KEY, **server_fallback
+        )
+        self.hostname = config.get(
+            Loader.CONFIG_SECTION, Loader.HOSTNAME_CONFIG_KEY, **server_fallback
+        )
+        self.password = config.get(
+            Loader.CONFIG_SECTION, Loader.PASSWORD_CONFIG_KEY, **server_fallback
+        )
         self.database = config.get(Loader.CONFIG_SECTION, Loader.DATABASE_CONFIG_KEY)
-        self.port = config.get(Loader.CONFIG_SECTION, Loader.PORT_CONFIG_KEY)
+        self.port = config.get(
+            Loader.CONFIG_SECTION, Loader.PORT_CONFIG_KEY, **server_fallback
+        )
         self.table_name = config.get(
             Loader.CONFIG_SECTION, Loader.TABLE_NAME_CONFIG_KEY
         )
+        self._engine: Optional[sqlalchemy.Engine] = None
 
     def _validate_config_file(self, ini_config_path: pathlib.Path) -> None:
         """Ensure config file exists and is an ini file
@@ -60,19 +89,148 @@ class Loader:
             raise ValueError(f"{ini_config_path} does not lead to an ini file")
 
     def load_into_db(
-        self, organizations: list[irs_field_extractor.OrganizationDataModel]
+        self, organizations: list[irs_field_extractor.OrganizationRow]
     ) -> None:
-        """Load saved records into a database
+        """Validate and load saved rows into a database
 
         :param organizations: Data representations of organizations
-        :type organizations: list[irs_field_extractor.OrganizationDataModel]
+        :type organizations: list[irs_field_extractor.OrganizationRow]
         """
-        records_df = pd.DataFrame([record.__dict__ for record in organizations])
+        # Only this load path needs pandas, which is slow to import
+        import pandas as pd
+
+        organizations = irs_field_extractor.validate_organization_rows(organizations)
+        records_df = pd.DataFrame(
+            organizations, columns=irs_field_extractor.OrganizationRow._fields
+        )
         records_df.drop_duplicates(
             subset=Loader.PRIMARY_KEY, keep="first", inplace=True
         )
-        connection = sqlalchemy.create_engine(
-            f"mysql+mysqlconnector://{self.user}:{self.password}@{self.hostname}:{self.port}/{self.database}"
-        )
+        connection = self.create_engine()
         records_df.to_sql(self.table_name, connection, index=False, if_exists="append")
         connection.dispose()
+
+    def load_rows(
+        self, organizations: list[irs_field_extractor.OrganizationRow]
+    ) -> None:
+        """Validate and upsert saved rows into a database with batched
+        executemany statements, skipping rows whose primary key was already seen.
+        Stored rows with the same primary key are replaced, so loading a
+        republished or retried archive again does not fail on rows an earlier
+        load committed
+
+        :param organizations: Data representations of organizations
+        :type organizations: list[irs_field_extractor.OrganizationRow]
+        :raises ValueError: The database driver uses an unsupported parameter
+            style, or the database has no supported upsert
+        """
+        organizations = irs_field_extractor.validate_organization_rows(organizations)
+        engine = self._get_engine()
+        upsert_statement = self._build_upsert_statement(engine)
+
+        batch = []
+        with engine.begin() as connection:
+            for row in irs_field_extractor.drop_duplicate_rows(organizations):
+                batch.append(tuple(row))
+                if len(batch) >= Loader.INSERT_BATCH_SIZE:
+                    connection.exec_driver_sql(upsert_statement, batch)
+                    batch = []
+
+            if batch:
+                connection.exec_driver_sql(upsert_statement, batch)
+
+    def close(self) -> None:
+        """Close the connections opened by load_rows"""
+        if self._engine is not None:
+            self._engine.dispose()
+            self._engine = None
+
+    def _build_insert_statement(self, engine: sqlalchemy.Engine) -> str:
+        """Build a parameterized INSERT statement for organization rows
+
+        :param engine: The database engine
+        :type engine: sqlalchemy.Engine
+        :raises ValueError: The database driver uses an unsupported parameter style
+        :return: The INSERT statement in the driver's parameter style
+        :rtype: str
+        """
+        paramstyle = engine.dialect.paramstyle
+        if paramstyle not in Loader.PLACEHOLDERS:
+            raise ValueError(f"Unsupported database parameter style {paramstyle}")
+
+        quote = engine.dialect.identifier_preparer.quote
+        columns = ", ".join(
+            quote(col) for col in irs_field_extractor.OrganizationRow._fields
+        )
+        placeholders = ", ".join(
+            [Loader.PLACEHOLDERS[paramstyle]]
+            * len(irs_field_extractor.OrganizationRow._fields)
+        )
+        return (
+            f"INSERT INTO {quote(self.table_name)} ({columns}) VALUES ({placeholders})"
+        )
+
+    def _build_upsert_statement(self, engine: sqlalchemy.Engine) -> str:
+        """Build a parameterized INSERT statement for organization rows that
+        replaces stored rows with the same primary key. The upsert is a single
+        statement, so drivers such as mysql-connector still send each batch as
+        one multi-row INSERT
+
+        :param engine: The database engine
+        :type engine: sqlalchemy.Engine
+        :raises ValueError: The database driver uses an unsupported parameter style
+        :raises ValueError: The database has no supported upsert
+        :return: The upsert statement in the driver's parameter style
+        :rtype: str
+        """
+        insert_statement = self._build_insert_statement(engine)
+        quote = engine.dialect.identifier_preparer.quote
+        updated_columns = [
+            quote(col)
+            for col in irs_field_extractor.OrganizationRow._fields
+            if col not in Loader.PRIMARY_KEY
+        ]
+        dialect_name = engine.dialect.name
+        if dialect_name in Loader.MYSQL_DIALECTS:
+            assignments = ", ".join(f"{col} = VALUES({col})" for col in updated_columns)
+            return f"{insert_statement} ON DUPLICATE KEY UPDATE {assignments}"
+        if dialect_name == Loader.SQLITE_DIALECT:
+            return insert_statement.replace("INSERT", "INSERT OR REPLACE", 1)
+        if dialect_name == Loader.POSTGRESQL_DIALECT:
+            conflict_columns = ", ".join(quote(col) for col in Loader.PRIMARY_KEY)
+            assignments = ", ".join(
+                f"{col} = EXCLUDED.{col}" for col in updated_columns
+            )
+            return (
+                f"{insert_statement} ON CONFLICT ({conflict_columns}) "
+                f"DO UPDATE SET {assignments}"
+            )
+        raise ValueError(f"Unsupported database dialect {dialect_name}")
+
+    def create_engine(self) -> sqlalchemy.Engine:
+        """Create an engine connected to the configured database
+
+        :return: The database engine
+        :rtype: sqlalchemy.Engine
+        """
+        return sqlalchemy.create_engine(
+            sqlalchemy.URL.create(
+                self.drivername,
+                username=self.user,
+                password=self.password,
+                host=self.hostname,
+                port=int(self.port) if self.port else None,
+                database=self.database,
+            )
+        )
+
+    def _get_engine(self) -> sqlalchemy.Engine:
+        """Create the engine on first use and keep it, so each load does not
+        connect again
+
+        :return: The database engine
+        :rtype: sqlalchemy.Engine
+        """
+        if self._engine is None:
+            self._engine = self.create_engine()
+        return self._engine
@@ -0,0 +1,283 @@
+"""
+Throughput metrics for each stage of the pipeline
+"""
+
+import bisect
+import contextlib
+import json
+import os
+import pathlib
+import time
+from typing import Iterator
+
+
+class Counter:
+    """A monotonically increasing value, optionally split by stage
+
+    :param name: The metric name
+    :type name: str
+    :param description: What the metric counts
+    :type description: str
+    """
+
+    TYPE = "counter"
+
+    def __init__(self, name: str, description: str) -> None:
+        self.name = name
+        self.description = description
+        self.values: dict[str, float] = {}
+
+    def inc(self, amount: float = 1, stage: str = "") -> None:
+        """Increase the counter
+
+        :param amount: The amount to add
+        :type amount: float
+        :param stage: The pipeline stage, if the counter is split by stage
+        :type stage: str
+        """
+        self.values[stage] = self.values.get(stage, 0) + amount
+
+    def to_prometheus_lines(self) -> list[str]:
+        """Render the counter in the Prometheus text format
+
+        :return: One line per stage
+        :rtype: list[str]
+        """
+        return [
+            f"{self.name}{_format_labels(stage=stage)} {value}"
+            for stage, value in sorted(self.values.items())
+        ]
+
+
+class Histogram:
+    """A distribution of observed values, split by stage
+
+    :param name: The metric name
+    :type name: str
+    :param description: What the metric measures
+    :type description: str
+    :param buckets: Upper bounds of the histogram buckets, in increasing order
+    :type buckets: list[float]
+    """
+
+    TYPE = "histogram"
+
+    def __init__(self, name: str, description: str, buckets: list[float]) -> None:
+        self.name = name
+        self.description = description
+        self.buckets = buckets
+        self.bucket_counts: dict[str, list[int]] = {}
+        self.sums: dict[str, float] = {}
+        self.counts: dict[str, int] = {}
+
+    def observe(self, value: float, stage: str = "") -> None:
+        """Record an observed value
+
+        :param value: The observed value
+        :type value: float
+        :param stage: The pipeline stage the value was observed in
+        :type stage: str
+        """
+        if stage not in self.bucket_counts:
+            self.bucket_counts[stage] = [0] * len(self.buckets)
+            self.sums[stage] = 0.0
+            self.counts[stage] = 0
+
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.buckets):
+            self.bucket_counts[stage][index] += 1
+        self.sums[stage] += value
+        self.counts[stage] += 1
+
+    def to_prometheus_lines(self) -> list[str]:
+        """Render the histogram in the Prometheus text format
+
+        :return: Cumulative bucket, sum and count lines per stage
+        :rtype: list[str]
+        """
+        lines = []
+        for stage in sorted(self.bucket_counts):
+            cumulative = 0
+            for bound, count in zip(self.buckets, self.bucket_counts[stage]):
+                cumulative += count
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(stage=stage, le=repr(float(bound)))} {cumulative}"
+                )
+            lines.append(
+                f"{self.name}_bucket{_format_labels(stage=stage, le='+Inf')} {self.counts[stage]}"
+            )
+            lines.append(
+                f"{self.name}_sum{_format_labels(stage=stage)} {self.sums[stage]}"
+            )
+            lines.append(
+                f"{self.name}_count{_format_labels(stage=stage)} {self.counts[stage]}"
+            )
+        return lines
+
+
+def _format_labels(**labels: str) -> str:
+    """Format non-empty labels in the Prometheus text format
+
+    :return: The labels in braces, or an empty string if there are none
+    :rtype: str
+    """
+    formatted = ",".join(
+        f'{name}="{value}"' for name, value in labels.items() if value != ""
+    )
+    return f"{{{formatted}}}" if formatted else ""
+
+
+class PipelineMetrics:
+    """Counters and histograms describing a run of the pipeline. Stages are
+    ``download``, ``decompress``, ``parse`` (one observation per filing) and
+    ``load`` (one observation per month)
+    """
+
+    DOWNLOAD_STAGE = "download"
+    DECOMPRESS_STAGE = "decompress"
+    PARSE_STAGE = "parse"
+    LOAD_STAGE = "load"
+
+    DURATION_BUCKETS_SEC = [
+        0.001,
+        0.005,
+        0.01,
+        0.025,
+        0.05,
+        0.1,
+        0.25,
+        0.5,
+        1,
+        2.5,
+        5,
+        10,
+        30,
+        60,
+        300,
+        900,
+        3600,
+    ]
+
+    def __init__(self) -> None:
+        self.start_time = time.time()
+        self.downloaded_bytes = Counter(
+            "irs990_downloaded_bytes_total", "Bytes of zip files downloaded"
+        )
+        self.files_processed = Counter(
+            "irs990_files_processed_total", "Items that completed a stage"
+        )
+        self.rows_loaded = Counter(
+            "irs990_rows_loaded_total", "Organization rows handed to the output"
+        )
+        self.failures = Counter("irs990_failures_total", "Failures raised by a stage")
+        self.stage_duration = Histogram(
+            "irs990_stage_duration_seconds",
+            "Wall time spent per item in a stage",
+            PipelineMetrics.DURATION_BUCKETS_SEC,
+        )
+
+    @contextlib.contextmanager
+    def time_stage(self, stage: str) -> Iterator[None]:
+        """Time one item passing through a stage, counting it as processed on
+        success and as a failure if it raises
+
+        :param stage: The pipeline stage
+        :type stage: str
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            self.failures.inc(stage=stage)
+            raise
+        self.observe_stage(stage, time.perf_counter() - start)
+
+    def observe_stage(self, stage: str, seconds: float) -> None:
+        """Record one item that completed a stage
+
+        :param stage: The pipeline stage
+        :type stage: str
+        :param seconds: The wall time the item spent in the stage
+        :type seconds: float
+        """
+        self.stage_duration.observe(seconds, stage=stage)
+        self.files_processed.inc(stage=stage)
+
+    def to_prometheus_text(self) -> str:
+        """Render every metric in the Prometheus text exposition format
+
+        :return: The metrics, ending with a newline
+        :rtype: str
+        """
+        lines = []
+        for metric in [
+            self.downloaded_bytes,
+            self.files_processed,
+            self.rows_loaded,
+            self.failures,
+            self.stage_duration,
+        ]:
+            lines.append(f"# HELP {metric.name} {metric.description}")
+            lines.append(f"# TYPE {metric.name} {metric.TYPE}")
+            lines.extend(metric.to_prometheus_lines())
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> dict:
+        """Summarize the run
+
+        :return: Totals for the run and count, time and throughput per stage
+        :rtype: dict
+        """
+        elapsed = time.time() - self.start_time
+        stages = {}
+        for stage, count in self.stage_duration.counts.items():
+            seconds = self.stage_duration.sums[stage]
+            stages[stage] = {
+                "count": count,
+                "seconds": seconds,
+                "mean_seconds": seconds / count,
+                "per_second": count / seconds if seconds > 0 else None,
+                "failures": self.failures.values.get(stage, 0),
+            }
+        for stage, failures in self.failures.values.items():
+            stages.setdefault(stage, {"count": 0, "failures": failures})
+
+        parsed_files = self.files_processed.values.get(PipelineMetrics.PARSE_STAGE, 0)
+        return {
+            "start_time": self.start_time,
+            "elapsed_seconds": elapsed,
+            "downloaded_bytes": self.downloaded_bytes.values.get("", 0),
+            "rows_loaded": self.rows_loaded.values.get("", 0),
+            "files_per_second": parsed_files / elapsed if elapsed > 0 else 0.0,
+            "stages": stages,
+        }
+
+    def write_prometheus_textfile(self, path: pathlib.Path) -> None:
+        """Atomically write the metrics for the node exporter textfile collector
+
+        :param path: The path of the ``.prom`` file
+        :type path: pathlib.Path
+        """
+        _write_atomically(path, self.to_prometheus_text())
+
+    def write_json_report(self, path: pathlib.Path) -> None:
+        """Write the run summary as JSON
+
+        :param path: The path of the report
+        :type path: pathlib.Path
+        """
+        _write_atomically(path, json.dumps(self.summary(), indent=2) + "\n")
+
+
+def _write_atomically(path: pathlib.Path, contents: str) -> None:
+    """Write a file so readers never observe it partially written
+
+    :param path: The path of the file
+    :type path: pathlib.Path
+    :param contents: The contents of the file
+    :type contents: str
+    """
+    temp_path = pathlib.Path(f"{path}.tmp")
+    with open(temp_path, "w", encoding="utf-8") as f:
+        f.write(contents)
+    os.replace(temp_path, path)
@@ -0,0 +1,242 @@
+"""
+Write extracted data into a partitioned Parquet dataset
+"""
+
+import pathlib
+import shutil
+import tempfile
+from types import TracebackType
+from typing import Optional
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from irs990_parser import irs_field_extractor
+
+
+class ParquetDatasetWriter:
+    """Write organization records into a Hive-partitioned Parquet dataset
+    (``year=YYYY/irs_month=MMA``). Each call replaces only the partitions it
+    writes, so months can be appended incrementally and readers can prune by
+    year and month.
+
+    :param dataset_dir: The root directory of the Parquet dataset
+    :type dataset_dir: pathlib.Path
+    """
+
+    PARTITION_COLS = ["year", "irs_month"]
+
+    # A month of filings is well under a million rows, so each partition is
+    # written as a single row group unless it is unusually large
+    MAX_ROWS_PER_GROUP = 1_000_000
+    MIN_ROWS_PER_GROUP = 100_000
+    COMPRESSION = "zstd"
+    BASENAME_TEMPLATE = "part-{i}.parquet"
+
+    SCHEMA = pa.schema(
+        [
+            pa.field("ein", pa.string(), nullable=False),
+            pa.field("instnm", pa.string(), nullable=False),
+            pa.field("irs_month", pa.string(), nullable=False),
+            pa.field("year", pa.int32(), nullable=False),
+            pa.field("percentage_women_trustees", pa.float64()),
+            pa.field("percentage_women_key_employees", pa.float64()),
+            pa.field("whistleblower_policy", pa.bool_()),
+            pa.field("ceo_reviewed_compensation", pa.bool_()),
+            pa.field("other_reviewed_compensation", pa.bool_()),
+            pa.field("male_to_female_pay_ratio", pa.float64()),
+            pa.field("president_to_average_pay_ratio", pa.float64()),
+            pa.field("state", pa.string()),
+        ]
+    )
+
+    def __init__(self, dataset_dir: pathlib.Path) -> None:
+        self.dataset_dir = dataset_dir
+
+    def write(self, organizations: list[irs_field_extractor.OrganizationRow]) -> None:
+        """Validate and write rows into the dataset, replacing the partitions
+        they belong to
+
+        :param organizations: Data representations of organizations
+        :type organizations: list[irs_field_extractor.OrganizationRow]
+        """
+        organizations = irs_field_extractor.validate_organization_rows(organizations)
+        table = self._to_table(irs_field_extractor.drop_duplicate_rows(organizations))
+        if table.num_rows == 0:
+            return
+
+        ds.write_dataset(
+            table,
+            self.dataset_dir,
+            format="parquet",
+            partitioning=ds.partitioning(
+                pa.schema(
+                    [
+                        ParquetDatasetWriter.SCHEMA.field(col)
+                        for col in ParquetDatasetWriter.PARTITION_COLS
+                    ]
+                ),
+                flavor="hive",
+            ),
+            basename_template=ParquetDatasetWriter.BASENAME_TEMPLATE,
+            existing_data_behavior="delete_matching",
+            file_options=ds.ParquetFileFormat().make_write_options(
+                compression=ParquetDatasetWriter.COMPRESSION,
+                write_statistics=True,
+            ),
+            max_rows_per_group=ParquetDatasetWriter.MAX_ROWS_PER_GROUP,
+            min_rows_per_group=ParquetDatasetWriter.MIN_ROWS_PER_GROUP,
+        )
+
+    def _to_table(
+        self, organizations: list[irs_field_extractor.OrganizationRow]
+    ) -> pa.Table:
+        """Convert rows into a columnar table
+
+        :param organizations: Data representations of organizations
+        :type organizations: list[irs_field_extractor.OrganizationRow]
+        :return: Table matching the dataset schema
+        :rtype: pa.Table
+        """
+        columns = dict.fromkeys(ParquetDatasetWriter.SCHEMA.names, [])
+        if organizations:
+            columns.update(
+                zip(irs_field_extractor.OrganizationRow._fields, zip(*organizations))
+            )
+        return pa.Table.from_pydict(columns, schema=ParquetDatasetWriter.SCHEMA)
+
+
+class PersonParquetWriter:
+    """Stream person records for a single year and IRS month into a
+    Hive-partitioned Parquet dataset, flushing a record batch whenever enough
+    records are buffered. Records are written to a hidden directory, which
+    replaces the month's partition once the writer is closed. A writer that is
+    aborted, or exits its ``with`` block with an exception, leaves the
+    partition as it was.
+
+    :param dataset_dir: The root directory of the Parquet dataset
+    :type dataset_dir: pathlib.Path
+    :param year: The year of the filings being written
+    :type year: int
+    :param irs_month: The IRS month of the filings being written
+    :type irs_month: str
+    """
+
+    # Each flushed batch becomes one row group in the Parquet file
+    BATCH_SIZE = 50_000
+    COMPRESSION = "zstd"
+    FILE_NAME = "part-0.parquet"
+
+    SCHEMA = pa.schema(
+        [
+            pa.field("ein", pa.string(), nullable=False),
+            pa.field("object_id", pa.string(), nullable=False),
+            pa.field("source", pa.string(), nullable=False),
+            pa.field("person_name", pa.string()),
+            pa.field("title", pa.string()),
+            pa.field("gender", pa.string()),
+            pa.field("average_hours_per_week", pa.float64()),
+            pa.field("individual_trustee_or_director", pa.bool_()),
+            pa.field("institutional_trustee", pa.bool_()),
+            pa.field("officer", pa.bool_()),
+            pa.field("key_employee", pa.bool_()),
+            pa.field("highest_compensated_employee", pa.bool_()),
+            pa.field("former_officer_director_trustee", pa.bool_()),
+            pa.field("reportable_comp_from_org", pa.float64()),
+            pa.field("reportable_comp_from_related_org", pa.float64()),
+            pa.field("other_compensation", pa.float64()),
+            pa.field("base_compensation", pa.float64()),
+            pa.field("bonus_compensation", pa.float64()),
+            pa.field("other_reportable_compensation", pa.float64()),
+            pa.field("deferred_compensation", pa.float64()),
+            pa.field("nontaxable_benefits", pa.float64()),
+            pa.field("total_compensation", pa.float64()),
+        ]
+    )
+
+    def __init__(self, dataset_dir: pathlib.Path, year: int, irs_month: str) -> None:
+        self.partition_dir = pathlib.Path(
+            dataset_dir, f"year={year}", f"irs_month={irs_month}"
+        )
+        self.partition_dir.parent.mkdir(parents=True, exist_ok=True)
+        # Dataset readers skip names starting with a dot, so the partition
+        # being written is never read
+        self.temp_dir = pathlib.Path(
+            tempfile.mkdtemp(
+                prefix=f".{self.partition_dir.name}.", dir=self.partition_dir.parent
+            )
+        )
+
+        self._writer = pq.ParquetWriter(
+            self.temp_dir / PersonParquetWriter.FILE_NAME,
+            PersonParquetWriter.SCHEMA,
+            compression=PersonParquetWriter.COMPRESSION,
+            write_statistics=True,
+        )
+        self._buffer: list[irs_field_extractor.PersonDataModel] = []
+
+    def write(self, people: list[irs_field_extractor.PersonDataModel]) -> None:
+        """Buffer person records, flushing a record batch once the buffer is full
+
+        :param people: Data representations of people
+        :type people: list[irs_field_extractor.PersonDataModel]
+        """
+        self._buffer.extend(people)
+        if len(self._buffer) >= PersonParquetWriter.BATCH_SIZE:
+            self._flush()
+
+    def close(self) -> None:
+        """Flush any buffered records, finalize the Parquet file and replace
+        the month's partition with it"""
+        self._flush()
+        self._writer.close()
+
+        if self.partition_dir.exists():
+            # Directories cannot be replaced in one rename, so the old
+            # partition is moved aside first
+            old_dir = pathlib.Path(
+                tempfile.mkdtemp(
+                    prefix=f".{self.partition_dir.name}.",
+                    dir=self.partition_dir.parent,
+                )
+            )
+            self.partition_dir.rename(old_dir / self.partition_dir.name)
+            self.temp_dir.rename(self.partition_dir)
+            shutil.rmtree(old_dir)
+        else:
+            self.temp_dir.rename(self.partition_dir)
+
+    def abort(self) -> None:
+        """Discard the records written so far, keeping the month's partition"""
+        self._buffer = []
+        self._writer.close()
+        shutil.rmtree(self.temp_dir)
+
+    def _flush(self) -> None:
+        """Write buffered records as a single record batch"""
+        if not self._buffer:
+            return
+
+        columns = {
+            name: [getattr(person, name) for person in self._buffer]
+            for name in PersonParquetWriter.SCHEMA.names
+        }
+        self._writer.write_batch(
+            pa.RecordBatch.from_pydict(columns, schema=PersonParquetWriter.SCHEMA)
+        )
+        self._buffer = []
+
+    def __enter__(self) -> "PersonParquetWriter":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[type[BaseException]],
+        exc_value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
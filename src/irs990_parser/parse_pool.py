@@ -0,0 +1,431 @@
+"""
+Parse IRS 990 XML files in this process or across a pool of worker processes
+"""
+
+import collections
+import concurrent.futures
+import multiprocessing
+import multiprocessing.util
+import os
+import pathlib
+import shutil
+import tempfile
+from typing import Iterable, Iterator, Optional
+
+from irs990_parser import extraction_cache, filing_parser, profiling, slow_filings
+
+# Set in each worker process by _init_worker
+_worker_file_parser: Optional[filing_parser.FilingFileParser] = None
+_worker_instrumentation: Optional[profiling.ParseInstrumentation] = None
+
+
+def _init_worker(
+    file_parser: filing_parser.FilingFileParser,
+    profile: bool,
+    time_extractors: bool,
+    dump_dir: pathlib.Path,
+) -> None:
+    """Set up a worker process
+
+    :param file_parser: Parses the XML files sent to the worker
+    :type file_parser: filing_parser.FilingFileParser
+    :param profile: Whether the parse stage is profiled with cProfile
+    :type profile: bool
+    :param time_extractors: Whether the field extractors are timed
+    :type time_extractors: bool
+    :param dump_dir: The directory the worker dumps its results to on exit
+    :type dump_dir: pathlib.Path
+    """
+    global _worker_file_parser, _worker_instrumentation
+    # Workers share the cache file, and an open transaction holds its write
+    # lock, so each new entry is committed right away
+    file_parser.cache_commit_interval = 1
+    _worker_file_parser = file_parser
+    _worker_instrumentation = profiling.ParseInstrumentation(profile, time_extractors)
+    _worker_instrumentation.start()
+    # Workers are only told to exit once the pool shuts down, so results are
+    # dumped by an exit finalizer rather than after each task
+    multiprocessing.util.Finalize(
+        None, _finish_worker, args=(dump_dir,), exitpriority=10
+    )
+
+
+def _finish_worker(dump_dir: pathlib.Path) -> None:
+    """Persist the worker's cache and dump its results
+
+    :param dump_dir: The directory shared by all workers
+    :type dump_dir: pathlib.Path
+    """
+    _worker_file_parser.close()
+    _worker_instrumentation.dump(dump_dir)
+
+
+def _parse_file_in_worker(
+    xml_file_path: str, irs_month: str, year: int
+) -> filing_parser.ParsedFiling:
+    """Parse an XML file in a worker process
+
+    :param xml_file_path: The path to the XML file
+    :type xml_file_path: str
+    :param irs_month: The IRS month the filing was published in
+    :type irs_month: str
+    :param year: The year the filing was published in
+    :type year: int
+    :return: The extracted rows and the filing's trace
+    :rtype: filing_parser.ParsedFiling
+    """
+    with _worker_instrumentation.measure():
+        return _worker_file_parser.parse_file(xml_file_path, irs_month, year)
+
+
+def _parse_document(
+    file_parser: filing_parser.FilingFileParser,
+    file_name: str,
+    contents: bytes,
+    irs_month: str,
+    year: int,
+) -> filing_parser.ParsedFiling:
+    """Parse the contents of an XML file
+
+    :param file_parser: Parses the contents
+    :type file_parser: filing_parser.FilingFileParser
+    :param file_name: The name of the file
+    :type file_name: str
+    :param contents: The contents of the file
+    :type contents: bytes
+    :param irs_month: The IRS month the filing was published in
+    :type irs_month: str
+    :param year: The year the filing was published in
+    :type year: int
+    :return: The extracted rows and the filing's trace
+    :rtype: filing_parser.ParsedFiling
+    """
+    trace = slow_filings.FilingTrace(file_name, irs_month, year, len(contents))
+    return file_parser.parse_contents(contents.decode("utf-8"), trace)
+
+
+def _parse_documents_in_worker(
+    documents: list[tuple[str, bytes]], irs_month: str, year: int
+) -> list[filing_parser.ParsedFiling]:
+    """Parse a chunk of XML file contents in a worker process
+
+    :param documents: The name and contents of each file
+    :type documents: list[tuple[str, bytes]]
+    :param irs_month: The IRS month the filings were published in
+    :type irs_month: str
+    :param year: The year the filings were published in
+    :type year: int
+    :return: The extracted rows and trace of each filing, in chunk order
+    :rtype: list[filing_parser.ParsedFiling]
+    """
+    parsed_filings = []
+    for file_name, contents in documents:
+        with _worker_instrumentation.measure():
+            parsed_filings.append(
+                _parse_document(
+                    _worker_file_parser, file_name, contents, irs_month, year
+                )
+            )
+    return parsed_filings
+
+
+def _ready_in_worker() -> int:
+    """Do nothing, so that submitting it starts a worker process
+
+    :return: The process ID of the worker
+    :rtype: int
+    """
+    return os.getpid()
+
+
+def _parse_chunk_in_worker(
+    xml_file_paths: list[str], irs_month: str, year: int
+) -> list[filing_parser.ParsedFiling]:
+    """Parse a chunk of XML files in a worker process
+
+    :param xml_file_paths: The paths to the XML files
+    :type xml_file_paths: list[str]
+    :param irs_month: The IRS month the filings were published in
+    :type irs_month: str
+    :param year: The year the filings were published in
+    :type year: int
+    :return: The extracted rows and trace of each filing, in chunk order
+    :rtype: list[filing_parser.ParsedFiling]
+    """
+    return [
+        _parse_file_in_worker(xml_file_path, irs_month, year)
+        for xml_file_path in xml_file_paths
+    ]
+
+
+def plan_chunks(
+    sizes: list[int], max_chunk_bytes: int, max_chunk_files: int
+) -> list[list[int]]:
+    """Group files into chunks to dispatch largest first. The largest files
+    start before anything else, so no worker is left parsing one after the
+    others finish, and the small files at the end fill the gaps. Chunks hold
+    about the same number of bytes rather than of files.
+
+    :param sizes: The size of each file in bytes
+    :type sizes: list[int]
+    :param max_chunk_bytes: The bytes after which a chunk is closed
+    :type max_chunk_bytes: int
+    :param max_chunk_files: The most files in a chunk
+    :type max_chunk_files: int
+    :return: The indices of the files in each chunk, in dispatch order
+    :rtype: list[list[int]]
+    """
+    chunks = []
+    chunk: list[int] = []
+    chunk_bytes = 0
+    for index in sorted(range(len(sizes)), key=lambda index: -sizes[index]):
+        chunk.append(index)
+        chunk_bytes += sizes[index]
+        if chunk_bytes >= max_chunk_bytes or len(chunk) >= max_chunk_files:
+            chunks.append(chunk)
+            chunk = []
+            chunk_bytes = 0
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+
+class ParsePool:
+    """Parse XML files with a pool of worker processes, or in this process
+    when a single worker is requested. Results are yielded in input order.
+
+    :param file_parser: Parses each XML file
+    :type file_parser: filing_parser.FilingFileParser
+    :param workers: The number of worker processes
+    :type workers: int
+    :param instrumentation: Profiles the parse stage, merged across workers
+    :type instrumentation: profiling.ParseInstrumentation
+    """
+
+    # Files sent to a worker at a time, to amortize inter-process overhead
+    CHUNK_SIZE = 32
+    CHUNK_BYTES = 4 * 1024 * 1024
+    # Each worker gets at least this many chunks, so the last ones are small
+    CHUNKS_PER_WORKER = 8
+    # Chunks read ahead per worker when streaming contents, bounding memory
+    STREAM_CHUNKS_PER_WORKER = 2
+
+    def __init__(
+        self,
+        file_parser: filing_parser.FilingFileParser,
+        workers: int,
+        instrumentation: profiling.ParseInstrumentation,
+    ) -> None:
+        self.file_parser = file_parser
+        self.workers = workers
+        self.instrumentation = instrumentation
+        self._executor: Optional[concurrent.futures.ProcessPoolExecutor] = None
+        self._dump_dir: Optional[pathlib.Path] = None
+        self._started = False
+
+    def parse_files(
+        self, xml_file_paths: Iterable[str], irs_month: str, year: int
+    ) -> Iterator[filing_parser.ParsedFiling]:
+        """Parse XML files published in the same month
+
+        :param xml_file_paths: The paths to the XML files
+        :type xml_file_paths: Iterable[str]
+        :param irs_month: The IRS month the filings were published in
+        :type irs_month: str
+        :param year: The year the filings were published in
+        :type year: int
+        :return: The extracted rows and trace of each filing
+        :rtype: Iterator[filing_parser.ParsedFiling]
+        """
+        if self.workers <= 1:
+            self._start_in_process()
+            for xml_file_path in xml_file_paths:
+                with self.instrumentation.measure():
+                    parsed_filing = self.file_parser.parse_file(
+                        xml_file_path, irs_month, year
+                    )
+                yield parsed_filing
+            self.file_parser.commit()
+            return
+
+        xml_file_paths = list(xml_file_paths)
+        # The same sizes the zip central directory lists for these members
+        sizes = [os.path.getsize(xml_file_path) for xml_file_path in xml_file_paths]
+        chunks = plan_chunks(
+            sizes,
+            min(
+                ParsePool.CHUNK_BYTES,
+                max(1, sum(sizes) // (self.workers * ParsePool.CHUNKS_PER_WORKER)),
+            ),
+            ParsePool.CHUNK_SIZE,
+        )
+
+        executor = self._get_executor()
+        # Where each file's result is found, so results keep the input order
+        locations: dict[int, tuple[concurrent.futures.Future, int]] = {}
+        futures = []
+        for chunk in chunks:
+            future = executor.submit(
+                _parse_chunk_in_worker,
+                [xml_file_paths[index] for index in chunk],
+                irs_month,
+                year,
+            )
+            futures.append(future)
+            for position, index in enumerate(chunk):
+                locations[index] = (future, position)
+
+        try:
+            for index in range(len(xml_file_paths)):
+                future, position = locations[index]
+                yield future.result()[position]
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def parse_documents(
+        self, documents: Iterable[tuple[str, bytes]], irs_month: str, year: int
+    ) -> Iterator[filing_parser.ParsedFiling]:
+        """Parse the contents of XML files published in the same month, such
+        as members read from a zip file without extracting it. Only a few
+        chunks are read ahead of the results being consumed, so memory stays
+        bounded however many files there are. Results are yielded in input
+        order.
+
+        :param documents: The name and contents of each file
+        :type documents: Iterable[tuple[str, bytes]]
+        :param irs_month: The IRS month the filings were published in
+        :type irs_month: str
+        :param year: The year the filings were published in
+        :type year: int
+        :return: The extracted rows and trace of each filing
+        :rtype: Iterator[filing_parser.ParsedFiling]
+        """
+        if self.workers <= 1:
+            self._start_in_process()
+            for file_name, contents in documents:
+                with self.instrumentation.measure():
+                    parsed_filing = _parse_document(
+                        self.file_parser, file_name, contents, irs_month, year
+                    )
+                yield parsed_filing
+            self.file_parser.commit()
+            return
+
+        executor = self._get_executor()
+        pending: collections.deque[concurrent.futures.Future] = collections.deque()
+        try:
+            for chunk in self._chunk_documents(documents):
+                pending.append(
+                    executor.submit(_parse_documents_in_worker, chunk, irs_month, year)
+                )
+                if len(pending) >= self.workers * ParsePool.STREAM_CHUNKS_PER_WORKER:
+                    yield from pending.popleft().result()
+            while pending:
+                yield from pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def warm_up(self) -> None:
+        """Start the worker processes now instead of with the first files, so
+        that the first files do not wait for them to import the package and
+        load the file parser"""
+        if self.workers <= 1:
+            self._start_in_process()
+            return
+
+        executor = self._get_executor()
+        # Workers are spawned as tasks arrive while none is idle, so this
+        # starts every one of them
+        concurrent.futures.wait(
+            [executor.submit(_ready_in_worker) for _ in range(self.workers)]
+        )
+
+    def parse_cached(
+        self, cached_filings: Iterable[extraction_cache.CachedFiling]
+    ) -> Iterator[filing_parser.ParsedFiling]:
+        """Extract rows from cached filings. Fragments are small and already
+        parsed, so they are always extracted in this process
+
+        :param cached_filings: Filings read from the extraction cache
+        :type cached_filings: Iterable[extraction_cache.CachedFiling]
+        :return: The extracted rows and trace of each filing
+        :rtype: Iterator[filing_parser.ParsedFiling]
+        """
+        self._start_in_process()
+        for filing in cached_filings:
+            trace = slow_filings.FilingTrace(
+                filing.file_name, filing.irs_month, filing.year
+            )
+            with self.instrumentation.measure():
+                parsed_filing = self.file_parser.parse_xml(
+                    filing.file_name, filing.parsed_xml, trace
+                )
+            yield parsed_filing
+
+    def close(self) -> None:
+        """Shut down the workers and merge their results into the
+        instrumentation"""
+        if self._executor is not None:
+            # Waiting lets every worker run its exit finalizer
+            self._executor.shutdown(wait=True)
+            self._executor = None
+            self.instrumentation.merge_dumps(self._dump_dir)
+            shutil.rmtree(self._dump_dir, ignore_errors=True)
+        if self._started:
+            self.instrumentation.stop()
+        self.file_parser.close()
+
+    def _chunk_documents(
+        self, documents: Iterable[tuple[str, bytes]]
+    ) -> Iterator[list[tuple[str, bytes]]]:
+        """Group consecutive files into chunks capped by bytes and by count
+
+        :param documents: The name and contents of each file
+        :type documents: Iterable[tuple[str, bytes]]
+        :return: The chunks, in input order
+        :rtype: Iterator[list[tuple[str, bytes]]]
+        """
+        chunk: list[tuple[str, bytes]] = []
+        chunk_bytes = 0
+        for document in documents:
+            chunk.append(document)
+            chunk_bytes += len(document[1])
+            if (
+                chunk_bytes >= ParsePool.CHUNK_BYTES
+                or len(chunk) >= ParsePool.CHUNK_SIZE
+            ):
+                yield chunk
+                chunk = []
+                chunk_bytes = 0
+        if chunk:
+            yield chunk
+
+    def _start_in_process(self) -> None:
+        """Start the instrumentation of this process"""
+        if not self._started:
+            self.instrumentation.start()
+            self._started = True
+
+    def _get_executor(self) -> concurrent.futures.ProcessPoolExecutor:
+        """Start the worker processes on first use
+
+        :return: The worker pool
+        :rtype: concurrent.futures.ProcessPoolExecutor
+        """
+        if self._executor is None:
+            self._dump_dir = pathlib.Path(tempfile.mkdtemp(prefix="irs990-parse-"))
+            self._executor = concurrent.futures.ProcessPoolExecutor(
+                self.workers,
+                # Forking while the pool's management thread runs can deadlock
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(
+                    self.file_parser,
+                    self.instrumentation.profile,
+                    self.instrumentation.time_extractors,
+                    self._dump_dir,
+                ),
+            )
+        return self._executor
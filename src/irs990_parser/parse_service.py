@@ -0,0 +1,257 @@
+"""
+Serve parse requests from a process that keeps the parser and its workers warm
+"""
+
+import http.server
+import json
+import os
+import pathlib
+import tempfile
+import urllib.parse
+from typing import Callable, Optional
+
+import pydantic
+
+from irs990_parser import (
+    archive_reader,
+    filing_parser,
+    irs_field_extractor,
+    parse_pool,
+    slow_filings,
+)
+
+
+class ParseService:
+    """Parse filings sent as XML, or as paths to XML files, zip files and
+    directories on this machine. The gender guesser, extractors, worker
+    processes and output sink are loaded once, so a request only pays for
+    parsing its own filings.
+
+    :param pool: Parses the XML files, with its workers started
+    :type pool: parse_pool.ParsePool
+    :param reader: Decompresses the members of zip files
+    :type reader: archive_reader.ArchiveReader
+    :param load_organizations: Loads organization records into the output, if
+        requests may ask for it
+    :type load_organizations: Optional[Callable[[list[irs_field_extractor.OrganizationRow]], None]]
+    """
+
+    DEFAULT_FILE_NAME = "filing.xml"
+    XML_FILE_EXTENSION = ".xml"
+    ZIP_FILE_EXTENSION = ".zip"
+
+    def __init__(
+        self,
+        pool: parse_pool.ParsePool,
+        reader: archive_reader.ArchiveReader,
+        load_organizations: Optional[
+            Callable[[list[irs_field_extractor.OrganizationRow]], None]
+        ] = None,
+    ) -> None:
+        self.pool = pool
+        self.reader = reader
+        self.load_organizations = load_organizations
+
+    def parse_xml(
+        self, xml_file: str, file_name: str, irs_month: str, year: int
+    ) -> list[filing_parser.ParsedFiling]:
+        """Parse a filing received as XML. A single filing is parsed in this
+        process, since sending it to a worker would take longer
+
+        :param xml_file: The contents of the XML file
+        :type xml_file: str
+        :param file_name: The name of the filing
+        :type file_name: str
+        :param irs_month: The IRS month the filing was published in
+        :type irs_month: str
+        :param year: The year the filing was published in
+        :type year: int
+        :return: The extracted rows and trace of the filing
+        :rtype: list[filing_parser.ParsedFiling]
+        """
+        trace = slow_filings.FilingTrace(
+            file_name, irs_month, year, len(xml_file.encode("utf-8"))
+        )
+        parsed_filing = self.pool.file_parser.parse_contents(xml_file, trace)
+        self.pool.file_parser.commit()
+        return [parsed_filing]
+
+    def parse_paths(
+        self, paths: list[str], irs_month: str, year: int
+    ) -> list[filing_parser.ParsedFiling]:
+        """Parse XML files, the members of zip files and the XML files in
+        directories, across the parse workers
+
+        :param paths: The paths to parse
+        :type paths: list[str]
+        :param irs_month: The IRS month the filings were published in
+        :type irs_month: str
+        :param year: The year the filings were published in
+        :type year: int
+        :raises FileNotFoundError: A path does not exist
+        :return: The extracted rows and trace of every filing
+        :rtype: list[filing_parser.ParsedFiling]
+        """
+        for path in paths:
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"{path} does not lead to a file")
+
+        with tempfile.TemporaryDirectory() as temp_dir_path:
+            xml_file_paths = []
+            for index, path in enumerate(paths):
+                if path.endswith(ParseService.ZIP_FILE_EXTENSION):
+                    # Each zip file gets its own directory, in case members
+                    # share names
+                    directory = pathlib.Path(temp_dir_path) / str(index)
+                    with open(path, "rb") as f:
+                        self.reader.extract(f.read(), directory)
+                    xml_file_paths.extend(self._list_xml_files(str(directory)))
+                elif os.path.isdir(path):
+                    xml_file_paths.extend(self._list_xml_files(path))
+                else:
+                    xml_file_paths.append(path)
+            return list(self.pool.parse_files(xml_file_paths, irs_month, year))
+
+    def handle(self, request: dict) -> dict:
+        """Answer a parse request
+
+        :param request: The request, with either ``xml`` or ``paths``, the
+            ``irs_month`` and ``year`` of the filings, and optionally a
+            ``file_name`` for the XML and whether to ``load`` the rows
+        :type request: dict
+        :raises ValueError: The request is malformed, or asks to load rows
+            without an output
+        :raises FileNotFoundError: A path does not exist
+        :raises pydantic.ValidationError: A row does not match its field types
+        :return: The rows, or how many rows were loaded
+        :rtype: dict
+        """
+        if ("xml" in request) == ("paths" in request):
+            raise ValueError("Send either xml or paths")
+        if "irs_month" not in request or "year" not in request:
+            raise ValueError("irs_month and year are required")
+        load = bool(request.get("load", False))
+        if load and self.load_organizations is None:
+            raise ValueError("The service was started without an output to load")
+
+        irs_month = str(request["irs_month"])
+        year = int(request["year"])
+        if "xml" in request:
+            parsed_filings = self.parse_xml(
+                request["xml"],
+                request.get("file_name", ParseService.DEFAULT_FILE_NAME),
+                irs_month,
+                year,
+            )
+        else:
+            parsed_filings = self.parse_paths(
+                [str(path) for path in request["paths"]], irs_month, year
+            )
+
+        organizations = [filing.organization for filing in parsed_filings]
+        if load:
+            self.load_organizations(organizations)
+            return {"loaded": len(organizations)}
+        # Rows are returned the way the sinks would store them
+        organizations = irs_field_extractor.validate_organization_rows(organizations)
+        return {"rows": [organization._asdict() for organization in organizations]}
+
+    def make_server(self, host: str, port: int) -> http.server.HTTPServer:
+        """Create the HTTP server for this service. Requests are answered one
+        at a time, each using every parse worker
+
+        :param host: The address to listen on
+        :type host: str
+        :param port: The port to listen on, 0 for any free port
+        :type port: int
+        :return: The server, not yet serving
+        :rtype: http.server.HTTPServer
+        """
+        service = self
+
+        class Handler(ParseRequestHandler):
+            parse_service = service
+
+        return http.server.HTTPServer((host, port), Handler)
+
+    def _list_xml_files(self, directory: str) -> list[str]:
+        """List the XML files under a directory
+
+        :param directory: The directory
+        :type directory: str
+        :return: The paths of the XML files, in a stable order
+        :rtype: list[str]
+        """
+        return sorted(
+            os.path.join(root, file_name)
+            for root, _, file_names in os.walk(directory)
+            for file_name in file_names
+            if file_name.endswith(ParseService.XML_FILE_EXTENSION)
+        )
+
+
+class ParseRequestHandler(http.server.BaseHTTPRequestHandler):
+    """Answer ``POST /parse`` with a JSON request, or with XML in the body and
+    the other fields in the query string, and ``GET /health``"""
+
+    parse_service: ParseService
+    PARSE_PATH = "/parse"
+    HEALTH_PATH = "/health"
+    JSON_CONTENT_TYPE = "application/json"
+
+    def do_GET(self) -> None:
+        if urllib.parse.urlsplit(self.path).path != ParseRequestHandler.HEALTH_PATH:
+            self._send_json(404, {"error": f"No such endpoint {self.path}"})
+            return
+        self._send_json(
+            200, {"status": "ok", "workers": self.parse_service.pool.workers}
+        )
+
+    def do_POST(self) -> None:
+        url = urllib.parse.urlsplit(self.path)
+        if url.path != ParseRequestHandler.PARSE_PATH:
+            self._send_json(404, {"error": f"No such endpoint {self.path}"})
+            return
+
+        try:
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            if self.headers.get_content_type() == ParseRequestHandler.JSON_CONTENT_TYPE:
+                request = json.loads(body)
+                if not isinstance(request, dict):
+                    raise ValueError("The request must be a JSON object")
+            else:
+                request = dict(urllib.parse.parse_qsl(url.query))
+                request["xml"] = body.decode("utf-8")
+                if "load" in request:
+                    request["load"] = request["load"].lower() in ("1", "true")
+            response = self.parse_service.handle(request)
+        except pydantic.ValidationError as e:
+            # Checked first, as it is also a ValueError
+            self._send_json(422, {"error": str(e)})
+        except (ValueError, KeyError, TypeError) as e:
+            self._send_json(400, {"error": str(e)})
+        except FileNotFoundError as e:
+            self._send_json(404, {"error": str(e)})
+        except Exception as e:
+            # A filing that fails to parse must not bring the service down
+            self._send_json(500, {"error": f"{type(e).__name__}: {e}"})
+        else:
+            self._send_json(200, response)
+
+    def log_message(self, format: str, *args: object) -> None:
+        pass
+
+    def _send_json(self, status: int, body: dict) -> None:
+        """Send a JSON response
+
+        :param status: The HTTP status
+        :type status: int
+        :param body: The response body
+        :type body: dict
+        """
+        content = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", ParseRequestHandler.JSON_CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
@@ -0,0 +1,193 @@
+"""
+Profile pipeline stages with cProfile, including inside parse workers
+"""
+
+import contextlib
+import cProfile
+import os
+import pathlib
+import pickle
+import pstats
+from typing import Iterator, Optional
+
+from irs990_parser import extractor_timings
+
+
+def _profiler_stats(profiler: cProfile.Profile) -> Optional[pstats.Stats]:
+    """Return the stats collected by a profiler
+
+    :param profiler: The profiler
+    :type profiler: cProfile.Profile
+    :return: The stats, or None if nothing was profiled
+    :rtype: Optional[pstats.Stats]
+    """
+    profiler.create_stats()
+    if not profiler.stats:
+        return None
+
+    return pstats.Stats(profiler)
+
+
+class ParseInstrumentation:
+    """Profile the parse stage and time the field extractors of one process.
+    Parse workers dump their results to a directory when they exit, which the
+    parent process then merges
+
+    :param profile: Whether the parse stage is profiled with cProfile
+    :type profile: bool
+    :param time_extractors: Whether the field extractors are timed
+    :type time_extractors: bool
+    """
+
+    PROFILE_PATTERN = "parse-*.prof"
+    TIMINGS_PATTERN = "timings-*.pickle"
+
+    def __init__(self, profile: bool = False, time_extractors: bool = False) -> None:
+        self.profile = profile
+        self.time_extractors = time_extractors
+        self.timings = extractor_timings.ExtractorTimings()
+        self.stats: Optional[pstats.Stats] = None
+        self._profiler: Optional[cProfile.Profile] = None
+
+    def start(self) -> None:
+        """Start collecting in this process"""
+        if self.profile and self._profiler is None:
+            self._profiler = cProfile.Profile()
+        if self.time_extractors:
+            self.timings.enable()
+
+    @contextlib.contextmanager
+    def measure(self) -> Iterator[None]:
+        """Profile the enclosed parse call. Only parse calls are profiled, so
+        reading work items and sending back results are left out
+        """
+        if self._profiler is None:
+            yield
+            return
+
+        self._profiler.enable()
+        try:
+            yield
+        finally:
+            self._profiler.disable()
+
+    def stop(self) -> None:
+        """Stop collecting and keep what was collected"""
+        self.timings.disable()
+        if self._profiler is not None:
+            self._add_stats(_profiler_stats(self._profiler))
+            self._profiler = None
+
+    def dump(self, dump_dir: pathlib.Path) -> None:
+        """Stop collecting and write the results of this process
+
+        :param dump_dir: The directory shared by all parse workers
+        :type dump_dir: pathlib.Path
+        """
+        self.stop()
+        pid = os.getpid()
+        if self.stats is not None:
+            self.stats.dump_stats(dump_dir / f"parse-{pid}.prof")
+        if self.time_extractors:
+            with open(dump_dir / f"timings-{pid}.pickle", "wb") as f:
+                pickle.dump(self.timings.timings, f)
+
+    def merge_dumps(self, dump_dir: pathlib.Path) -> None:
+        """Add the results dumped by parse workers
+
+        :param dump_dir: The directory shared by all parse workers
+        :type dump_dir: pathlib.Path
+        """
+        for profile_path in sorted(dump_dir.glob(ParseInstrumentation.PROFILE_PATTERN)):
+            self._add_stats(pstats.Stats(str(profile_path)))
+        for timings_path in sorted(dump_dir.glob(ParseInstrumentation.TIMINGS_PATTERN)):
+            with open(timings_path, "rb") as f:
+                self.timings.merge(pickle.load(f))
+
+    def _add_stats(self, stats: Optional[pstats.Stats]) -> None:
+        """Merge stats into the stats collected so far
+
+        :param stats: The stats to add, if any
+        :type stats: Optional[pstats.Stats]
+        """
+        if stats is None:
+            return
+        if self.stats is None:
+            self.stats = stats
+        else:
+            self.stats.add(stats)
+
+
+class StageProfiler:
+    """Profile pipeline stages in this process and write a cProfile stats file
+    and a text summary per stage. Stages are profiled separately so network and
+    database time do not drown out parsing. When no directory is given,
+    nothing is profiled.
+
+    :param profile_dir: The directory the stats are written to, if enabled
+    :type profile_dir: Optional[pathlib.Path]
+    """
+
+    TOP_FUNCTIONS = 40
+    SORT_KEY = pstats.SortKey.CUMULATIVE
+
+    def __init__(self, profile_dir: Optional[pathlib.Path]) -> None:
+        self.profile_dir = profile_dir
+        self._stats: dict[str, pstats.Stats] = {}
+
+    @property
+    def enabled(self) -> bool:
+        """Return whether stages are profiled
+
+        :return: Whether stages are profiled
+        :rtype: bool
+        """
+        return self.profile_dir is not None
+
+    @contextlib.contextmanager
+    def profile(self, stage: str) -> Iterator[None]:
+        """Profile the enclosed block as part of a stage
+
+        :param stage: The name of the stage
+        :type stage: str
+        """
+        if not self.enabled:
+            yield
+            return
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            self.add_stats(stage, _profiler_stats(profiler))
+
+    def add_stats(self, stage: str, stats: Optional[pstats.Stats]) -> None:
+        """Add stats collected elsewhere, e.g. by parse workers, to a stage
+
+        :param stage: The name of the stage
+        :type stage: str
+        :param stats: The stats to add, if any
+        :type stats: Optional[pstats.Stats]
+        """
+        if stats is None:
+            return
+        if stage in self._stats:
+            self._stats[stage].add(stats)
+        else:
+            self._stats[stage] = stats
+
+    def write(self) -> None:
+        """Write ``<stage>.prof`` and ``<stage>.txt`` for every profiled stage"""
+        if not self.enabled:
+            return
+
+        self.profile_dir.mkdir(parents=True, exist_ok=True)
+        for stage, stats in self._stats.items():
+            stats.dump_stats(self.profile_dir / f"{stage}.prof")
+            with open(self.profile_dir / f"{stage}.txt", "w", encoding="utf-8") as f:
+                stats.stream = f
+                stats.sort_stats(StageProfiler.SORT_KEY).print_stats(
+                    StageProfiler.TOP_FUNCTIONS
+                )
@@ -0,0 +1,109 @@
+"""
+Deterministically sample the filings of each archive for approximate statistics
+"""
+
+import hashlib
+import os
+from typing import Callable, Iterable, NamedTuple, Optional
+
+
+def object_id(file_name: str) -> str:
+    """Return the IRS object ID of a filing, which names files such as
+    202401234567890123_public.xml
+
+    :param file_name: The name of the XML file
+    :type file_name: str
+    :return: The object ID, or the name without its extension if it has none
+    :rtype: str
+    """
+    stem = os.path.splitext(os.path.basename(file_name))[0]
+    return stem.split("_", 1)[0]
+
+
+def sample_key(file_name: str) -> float:
+    """Return where a filing falls in the sampling order. Keys are uniform in
+    [0, 1) and independent of the filing's contents, so any prefix of the
+    order is a simple random sample
+
+    :param file_name: The name of the XML file
+    :type file_name: str
+    :return: The key
+    :rtype: float
+    """
+    digest = hashlib.sha256(object_id(file_name).encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") / 2**64
+
+
+class Sample:
+    """The filings chosen from an archive, usable as a member filter
+
+    :param population: The number of filings the sample was drawn from
+    :type population: int
+    :param chosen: The names of the chosen files
+    :type chosen: frozenset[str]
+    """
+
+    def __init__(self, population: int, chosen: frozenset[str]) -> None:
+        self.population = population
+        self.chosen = chosen
+
+    def __call__(self, file_name: str) -> bool:
+        return os.path.basename(file_name) in self.chosen
+
+    def __len__(self) -> int:
+        return len(self.chosen)
+
+    @property
+    def weight(self) -> float:
+        """How many filings of the archive each chosen filing stands for.
+        Archives differ in size, so ``n`` keeps a different share of each
+
+        :return: The number of filings over the number chosen, 1 if none were
+        :rtype: float
+        """
+        return self.population / len(self.chosen) if self.chosen else 1
+
+
+class Sampler(NamedTuple):
+    """Keep the filings whose key is below ``rate``, then at most ``n`` of
+    them per archive, those with the lowest keys. Every run, node and shard
+    keeps the same filings"""
+
+    rate: Optional[float] = None
+    n: Optional[int] = None
+
+    def selects(self, file_name: str) -> bool:
+        """Return whether the rate keeps a filing, which is known without
+        listing the rest of the archive
+
+        :param file_name: The name of the XML file
+        :type file_name: str
+        :return: True if the filing is within the rate, False otherwise
+        :rtype: bool
+        """
+        return self.rate is None or sample_key(file_name) < self.rate
+
+    def sample(
+        self,
+        file_names: Iterable[str],
+        member_filter: Optional[Callable[[str], bool]] = None,
+    ) -> Sample:
+        """Choose the filings of an archive
+
+        :param file_names: The names of every file in the archive
+        :type file_names: Iterable[str]
+        :param member_filter: Selects the files the sample is drawn from, such
+            as those of a shard, defaults to all
+        :type member_filter: Optional[Callable[[str], bool]]
+        :return: The chosen filings
+        :rtype: Sample
+        """
+        population = [
+            os.path.basename(file_name)
+            for file_name in file_names
+            if member_filter is None or member_filter(os.path.basename(file_name))
+        ]
+        chosen = [file_name for file_name in population if self.selects(file_name)]
+        if self.n is not None and len(chosen) > self.n:
+            chosen = sorted(chosen, key=sample_key)[: self.n]
+        return Sample(len(population), frozenset(chosen))
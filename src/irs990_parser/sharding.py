@@ -0,0 +1,184 @@
+"""
+Split the workload across nodes and verify the shards cover it exactly once
+"""
+
+import collections
+import hashlib
+import json
+import pathlib
+from typing import Iterable, NamedTuple
+
+
+class Shard(NamedTuple):
+    """One of ``count`` disjoint slices of the workload, numbered from 0
+
+    Work items are assigned by a stable hash of their name, so every node
+    computes the same assignment without coordinating, and an item keeps its
+    shard when other items are added or removed.
+    """
+
+    index: int
+    count: int
+
+    @classmethod
+    def parse(cls, spec: str) -> "Shard":
+        """Parse a shard given as ``i/n``
+
+        :param spec: The shard, e.g. 0/4 for the first of four shards
+        :type spec: str
+        :raises ValueError: The shard is malformed or out of range
+        :return: The shard
+        :rtype: Shard
+        """
+        index, separator, count = spec.partition("/")
+        if not separator or not index.isdigit() or not count.isdigit():
+            raise ValueError(f"Invalid shard {spec}. Expected the form i/n")
+
+        shard = cls(int(index), int(count))
+        if not 0 <= shard.index < shard.count:
+            raise ValueError(
+                f"Invalid shard {spec}. The index must be between 0 and {shard.count - 1}"
+            )
+        return shard
+
+    @staticmethod
+    def owner(key: str, count: int) -> int:
+        """Return the shard a work item belongs to
+
+        :param key: The name of the work item
+        :type key: str
+        :param count: The number of shards
+        :type count: int
+        :return: The index of the owning shard
+        :rtype: int
+        """
+        digest = hashlib.sha256(key.encode("utf-8")).digest()
+        return int.from_bytes(digest[:8], "big") % count
+
+    def owns(self, key: str) -> bool:
+        """Return whether a work item belongs to this shard
+
+        :param key: The name of the work item
+        :type key: str
+        :return: True if this shard processes the item, False otherwise
+        :rtype: bool
+        """
+        return Shard.owner(key, self.count) == self.index
+
+    def __str__(self) -> str:
+        return f"{self.index}/{self.count}"
+
+
+class ShardManifest:
+    """The work items a node processed, written once its shard completes
+
+    :param shard: The shard the node processed
+    :type shard: Shard
+    :param shard_by: The granularity of the work items, archive or member
+    :type shard_by: str
+    """
+
+    def __init__(self, shard: Shard, shard_by: str) -> None:
+        self.shard = shard
+        self.shard_by = shard_by
+        self.keys: list[str] = []
+
+    def add(self, keys: Iterable[str]) -> None:
+        """Record processed work items
+
+        :param keys: The names of the work items
+        :type keys: Iterable[str]
+        """
+        self.keys.extend(keys)
+
+    def write(self, path: pathlib.Path) -> None:
+        """Write the manifest as JSON
+
+        :param path: The path of the manifest
+        :type path: pathlib.Path
+        """
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "shard": str(self.shard),
+                    "shard_by": self.shard_by,
+                    "keys": self.keys,
+                },
+                f,
+                indent=2,
+            )
+
+    @classmethod
+    def read(cls, path: pathlib.Path) -> "ShardManifest":
+        """Read a manifest written by a node
+
+        :param path: The path of the manifest
+        :type path: pathlib.Path
+        :return: The manifest
+        :rtype: ShardManifest
+        """
+        with open(path, "r", encoding="utf-8") as f:
+            contents = json.load(f)
+        manifest = cls(Shard.parse(contents["shard"]), contents["shard_by"])
+        manifest.add(contents["keys"])
+        return manifest
+
+
+class CoverageReport(NamedTuple):
+    """How the processed work items of all shards compare to the workload"""
+
+    expected: int
+    processed: int
+    missing: list[str]
+    duplicated: list[str]
+    unexpected: list[str]
+    problems: list[str]
+
+    @property
+    def ok(self) -> bool:
+        """Return whether every work item was processed exactly once
+
+        :return: True if the shards cover the workload exactly once
+        :rtype: bool
+        """
+        return not (self.missing or self.duplicated or self.unexpected or self.problems)
+
+
+def verify_coverage(
+    expected_keys: Iterable[str], manifests: list[ShardManifest]
+) -> CoverageReport:
+    """Check that the manifests of all shards cover the workload exactly once
+
+    :param expected_keys: The names of every work item
+    :type expected_keys: Iterable[str]
+    :param manifests: The manifest of every shard
+    :type manifests: list[ShardManifest]
+    :return: The missing, duplicated and unexpected work items
+    :rtype: CoverageReport
+    """
+    expected = set(expected_keys)
+    processed = collections.Counter(
+        key for manifest in manifests for key in manifest.keys
+    )
+
+    problems = []
+    if len({(manifest.shard.count, manifest.shard_by) for manifest in manifests}) > 1:
+        problems.append("Manifests disagree on the shard count or granularity")
+    shard_indices = collections.Counter(manifest.shard.index for manifest in manifests)
+    if manifests:
+        count = manifests[0].shard.count
+        absent = sorted(set(range(count)) - set(shard_indices))
+        if absent:
+            problems.append(f"No manifest for shard(s) {absent} of {count}")
+    repeated = sorted(index for index, seen in shard_indices.items() if seen > 1)
+    if repeated:
+        problems.append(f"More than one manifest for shard(s) {repeated}")
+
+    return CoverageReport(
+        expected=len(expected),
+        processed=sum(processed.values()),
+        missing=sorted(expected - set(processed)),
+        duplicated=sorted(key for key, seen in processed.items() if seen > 1),
+        unexpected=sorted(set(processed) - expected),
+        problems=problems,
+    )
@@ -0,0 +1,399 @@
+"""
+Mergeable distribution sketches of organization rows, built while rows are
+loaded so reports do not need to query the loaded tables
+"""
+
+import json
+import math
+import os
+import pathlib
+from typing import Iterable, Optional
+
+from irs990_parser import irs_field_extractor
+
+SKETCHED_FIELDS = (
+    "percentage_women_trustees",
+    "percentage_women_key_employees",
+    "male_to_female_pay_ratio",
+    "president_to_average_pay_ratio",
+)
+REPORT_QUANTILES = (0.5, 0.9, 0.99)
+GROUP_BY_YEAR = "year"
+GROUP_BY_MONTH = "month"
+GROUP_BY_STATE = "state"
+# Filers with a foreign address report no state
+UNKNOWN_STATE = "unknown"
+
+
+class TDigest:
+    """A merging t-digest, which estimates quantiles from a bounded number of
+    weighted centroids. Centroids are kept small near both tails, so high
+    quantiles such as p99 stay accurate. Digests built from disjoint rows merge
+    into the digest of all of them.
+
+    :param compression: Bounds the number of centroids, which stays below
+        this. Larger values are more accurate and take more space
+    :type compression: float
+    """
+
+    COMPRESSION = 200
+    # Values are buffered and merged into the centroids a batch at a time
+    BUFFER_FACTOR = 5
+
+    def __init__(self, compression: float = COMPRESSION) -> None:
+        self.compression = compression
+        self.centroids: list[tuple[float, float]] = []
+        self.count = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self._buffer: list[tuple[float, float]] = []
+
+    def add(self, value: float, weight: float = 1) -> None:
+        """Add a value
+
+        :param value: The value
+        :type value: float
+        :param weight: How many times the value was seen
+        :type weight: float
+        """
+        self._buffer.append((value, weight))
+        self.count += weight
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        if len(self._buffer) >= self.compression * TDigest.BUFFER_FACTOR:
+            self._compress()
+
+    def merge(self, other: "TDigest") -> None:
+        """Add the values of another digest
+
+        :param other: The other digest
+        :type other: TDigest
+        """
+        other._compress()
+        self._buffer.extend(other.centroids)
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate a quantile by interpolating between centroids
+
+        :param q: The quantile, from 0 to 1
+        :type q: float
+        :return: The estimate, or None if the digest is empty
+        :rtype: Optional[float]
+        """
+        self._compress()
+        if not self.centroids:
+            return None
+        if len(self.centroids) == 1:
+            return self.centroids[0][0]
+
+        target = q * self.count
+        # Each centroid's mean is placed at the middle of its weight, and the
+        # extremes at both ends
+        previous_mean, previous_position = self.min, 0.0
+        cumulative = 0.0
+        for mean, weight in self.centroids:
+            position = cumulative + weight / 2
+            if target < position:
+                break
+            previous_mean, previous_position = mean, position
+            cumulative += weight
+        else:
+            mean, position = self.max, self.count
+        if position <= previous_position:
+            return mean
+        estimate = previous_mean + (mean - previous_mean) * (
+            target - previous_position
+        ) / (position - previous_position)
+        return min(max(estimate, self.min), self.max)
+
+    def to_dict(self) -> dict:
+        """Serialize the digest
+
+        :return: The centroids, count and extremes
+        :rtype: dict
+        """
+        self._compress()
+        return {
+            "compression": self.compression,
+            "count": self.count,
+            "min": self.min if self.centroids else None,
+            "max": self.max if self.centroids else None,
+            "centroids": [list(centroid) for centroid in self.centroids],
+        }
+
+    @classmethod
+    def from_dict(cls, contents: dict) -> "TDigest":
+        """Deserialize a digest written by to_dict
+
+        :param contents: The serialized digest
+        :type contents: dict
+        :return: The digest
+        :rtype: TDigest
+        """
+        digest = cls(contents["compression"])
+        digest.centroids = [(mean, weight) for mean, weight in contents["centroids"]]
+        digest.count = contents["count"]
+        if digest.centroids:
+            digest.min = contents["min"]
+            digest.max = contents["max"]
+        return digest
+
+    def _compress(self) -> None:
+        """Merge the buffered values into the centroids. Neighbouring points
+        are combined while the combined centroid stays within the size the
+        scale function allows at its quantile"""
+        if not self._buffer:
+            return
+        points = sorted(self.centroids + self._buffer)
+        self._buffer = []
+
+        merged = []
+        weight_before = 0.0
+        mean, weight = points[0]
+        limit = self.count * self._quantile_limit(0)
+        for next_mean, next_weight in points[1:]:
+            if weight_before + weight + next_weight <= limit:
+                weight += next_weight
+                mean += (next_mean - mean) * next_weight / weight
+            else:
+                merged.append((mean, weight))
+                weight_before += weight
+                limit = self.count * self._quantile_limit(weight_before / self.count)
+                mean, weight = next_mean, next_weight
+        merged.append((mean, weight))
+        self.centroids = merged
+
+    def _quantile_limit(self, q: float) -> float:
+        """Return the highest quantile a centroid starting at ``q`` may reach,
+        one step of the arcsine scale function further
+
+        :param q: The quantile the centroid starts at
+        :type q: float
+        :return: The quantile it may reach
+        :rtype: float
+        """
+        k = self.compression / (2 * math.pi) * math.asin(2 * min(q, 1) - 1) + 1
+        return (math.sin(min(k * 2 * math.pi / self.compression, math.pi / 2)) + 1) / 2
+
+
+class FieldSketch:
+    """The count, missing count, sum and distribution of one field. Sampled
+    filings are weighted by the number of filings each one stands for, so
+    counts and sums estimate those of every filing"""
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.missing = 0
+        self.total = 0.0
+        self.digest = TDigest()
+
+    def add(self, value: Optional[float], weight: float = 1) -> None:
+        """Add a value of the field
+
+        :param value: The value, None if the filing does not report it
+        :type value: Optional[float]
+        :param weight: How many filings the filing stands for, more than one
+            if it was sampled
+        :type weight: float
+        """
+        if value is None or math.isnan(value):
+            self.missing += weight
+            return
+        self.count += weight
+        self.total += value * weight
+        self.digest.add(value, weight)
+
+    def merge(self, other: "FieldSketch") -> None:
+        """Add the values of another sketch of the same field
+
+        :param other: The other sketch
+        :type other: FieldSketch
+        """
+        self.count += other.count
+        self.missing += other.missing
+        self.total += other.total
+        self.digest.merge(other.digest)
+
+    def summary(self, quantiles: Iterable[float] = REPORT_QUANTILES) -> dict:
+        """Summarize the field
+
+        :param quantiles: The quantiles to estimate
+        :type quantiles: Iterable[float]
+        :return: The counts, mean, extremes and quantile estimates
+        :rtype: dict
+        """
+        summary = {
+            "count": self.count,
+            "missing": self.missing,
+            "mean": self.total / self.count if self.count else None,
+            "min": self.digest.min if self.count else None,
+            "max": self.digest.max if self.count else None,
+        }
+        for q in quantiles:
+            summary[f"p{q * 100:g}"] = self.digest.quantile(q)
+        return summary
+
+    def to_dict(self) -> dict:
+        """Serialize the sketch
+
+        :return: The counts, sum and digest
+        :rtype: dict
+        """
+        return {
+            "count": self.count,
+            "missing": self.missing,
+            "total": self.total,
+            "digest": self.digest.to_dict(),
+        }
+
+    @classmethod
+    def from_dict(cls, contents: dict) -> "FieldSketch":
+        """Deserialize a sketch written by to_dict
+
+        :param contents: The serialized sketch
+        :type contents: dict
+        :return: The sketch
+        :rtype: FieldSketch
+        """
+        sketch = cls()
+        sketch.count = contents["count"]
+        sketch.missing = contents["missing"]
+        sketch.total = contents["total"]
+        sketch.digest = TDigest.from_dict(contents["digest"])
+        return sketch
+
+
+class RowSketches:
+    """Sketches of the numeric organization fields for each filer state in each
+    IRS month of each year. Sketches of disjoint rows, such as those of other
+    shards or nodes, merge into the sketches of all of them
+    """
+
+    def __init__(self) -> None:
+        self.groups: dict[tuple[int, str, str], dict[str, FieldSketch]] = {}
+
+    def add_rows(
+        self, rows: Iterable[irs_field_extractor.OrganizationRow], weight: float = 1
+    ) -> None:
+        """Add organization rows
+
+        :param rows: The rows
+        :type rows: Iterable[irs_field_extractor.OrganizationRow]
+        :param weight: How many filings each row stands for, the number of
+            filings in the archive over the number sampled
+        :type weight: float
+        """
+        for row in rows:
+            fields = self._group(row.year, row.irs_month, row.state or UNKNOWN_STATE)
+            for field in SKETCHED_FIELDS:
+                fields[field].add(getattr(row, field), weight)
+
+    def merge(self, other: "RowSketches") -> None:
+        """Add the rows sketched by another instance
+
+        :param other: The other sketches
+        :type other: RowSketches
+        """
+        for (year, irs_month, state), other_fields in other.groups.items():
+            fields = self._group(year, irs_month, state)
+            for field, sketch in other_fields.items():
+                fields[field].merge(sketch)
+
+    def report(
+        self,
+        group_by: str = GROUP_BY_YEAR,
+        quantiles: Iterable[float] = REPORT_QUANTILES,
+    ) -> dict[str, dict[str, dict]]:
+        """Summarize each field by year, by IRS month of each year, or by filer
+        state in each year
+
+        :param group_by: year, month or state
+        :type group_by: str
+        :param quantiles: The quantiles to estimate
+        :type quantiles: Iterable[float]
+        :return: The summary of each field, keyed by group then field
+        :rtype: dict[str, dict[str, dict]]
+        """
+        merged: dict[str, dict[str, FieldSketch]] = {}
+        for (year, irs_month, state), fields in sorted(self.groups.items()):
+            if group_by == GROUP_BY_YEAR:
+                key = str(year)
+            elif group_by == GROUP_BY_MONTH:
+                key = f"{year}_{irs_month}"
+            else:
+                key = f"{year}_{state}"
+            target = merged.setdefault(
+                key, {field: FieldSketch() for field in SKETCHED_FIELDS}
+            )
+            for field, sketch in fields.items():
+                target[field].merge(sketch)
+        return {
+            key: {field: sketch.summary(quantiles) for field, sketch in fields.items()}
+            for key, fields in merged.items()
+        }
+
+    def write(self, path: pathlib.Path) -> None:
+        """Write the sketches as JSON, so readers never observe a partial file
+
+        :param path: The path of the sketches
+        :type path: pathlib.Path
+        """
+        contents = {
+            "groups": [
+                {
+                    "year": year,
+                    "irs_month": irs_month,
+                    "state": state,
+                    "fields": {
+                        field: sketch.to_dict() for field, sketch in fields.items()
+                    },
+                }
+                for (year, irs_month, state), fields in sorted(self.groups.items())
+            ]
+        }
+        temp_path = pathlib.Path(f"{path}.tmp")
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(contents, f)
+        os.replace(temp_path, path)
+
+    @classmethod
+    def read(cls, path: pathlib.Path) -> "RowSketches":
+        """Read sketches written by a run
+
+        :param path: The path of the sketches
+        :type path: pathlib.Path
+        :return: The sketches
+        :rtype: RowSketches
+        """
+        with open(path, "r", encoding="utf-8") as f:
+            contents = json.load(f)
+        sketches = cls()
+        for group in contents["groups"]:
+            # Sketches written before states were sketched have none
+            fields = sketches._group(
+                group["year"], group["irs_month"], group.get("state", UNKNOWN_STATE)
+            )
+            for field, sketch in group["fields"].items():
+                fields[field] = FieldSketch.from_dict(sketch)
+        return sketches
+
+    def _group(self, year: int, irs_month: str, state: str) -> dict[str, FieldSketch]:
+        """Return the sketches of a state in a month, creating them if needed
+
+        :param year: The year
+        :type year: int
+        :param irs_month: The IRS month
+        :type irs_month: str
+        :param state: The filer state
+        :type state: str
+        :return: The sketch of each field
+        :rtype: dict[str, FieldSketch]
+        """
+        key = (year, irs_month, state)
+        if key not in self.groups:
+            self.groups[key] = {field: FieldSketch() for field in SKETCHED_FIELDS}
+        return self.groups[key]
@@ -0,0 +1,151 @@
+"""
+Track the slowest and largest filings of a run
+"""
+
+import heapq
+import itertools
+import json
+import pathlib
+from typing import Optional
+
+import bs4
+
+
+class FilingTrace:
+    """Size, row counts and per-stage timings of a single filing
+
+    :param file_name: The name of the file
+    :type file_name: str
+    :param irs_month: The IRS month the filing was published in
+    :type irs_month: str
+    :param year: The year the filing was published in
+    :type year: int
+    :param size_bytes: The size of the XML file, if known
+    :type size_bytes: Optional[int]
+    """
+
+    def __init__(
+        self,
+        file_name: str,
+        irs_month: str,
+        year: int,
+        size_bytes: Optional[int] = None,
+    ) -> None:
+        self.file_name = file_name
+        self.irs_month = irs_month
+        self.year = year
+        self.size_bytes = size_bytes
+        self.part_vii_rows: Optional[int] = None
+        self.schedule_j_rows: Optional[int] = None
+        self.stage_seconds: dict[str, float] = {}
+
+    @property
+    def total_seconds(self) -> float:
+        """Return the time spent on the filing across all stages
+
+        :return: Total seconds
+        :rtype: float
+        """
+        return sum(self.stage_seconds.values())
+
+    def count_rows(self, parsed_xml: bs4.BeautifulSoup) -> None:
+        """Count the Part VII and Schedule J rows of the filing
+
+        :param parsed_xml: The XML file parsed into a readable format
+        :type parsed_xml: bs4.BeautifulSoup
+        """
+        self.part_vii_rows = len(parsed_xml.find_all("Form990PartVIISectionAGrp"))
+        schedule_j = parsed_xml.find("IRS990ScheduleJ")
+        self.schedule_j_rows = (
+            0
+            if schedule_j is None
+            else len(schedule_j.find_all("RltdOrgOfficerTrstKeyEmplGrp"))
+        )
+
+    def to_dict(self) -> dict:
+        """Return the trace as a JSON-serializable dictionary
+
+        :return: The trace
+        :rtype: dict
+        """
+        return {
+            "file_name": self.file_name,
+            "irs_month": self.irs_month,
+            "year": self.year,
+            "size_bytes": self.size_bytes,
+            "part_vii_rows": self.part_vii_rows,
+            "schedule_j_rows": self.schedule_j_rows,
+            "total_seconds": self.total_seconds,
+            "stage_seconds": self.stage_seconds,
+        }
+
+
+class SlowFilingTracker:
+    """Keep the K slowest and K largest filings seen, using bounded min-heaps
+
+    :param max_filings: The number of filings kept per ranking
+    :type max_filings: int
+    """
+
+    def __init__(self, max_filings: int) -> None:
+        self.max_filings = max_filings
+        self._slowest: list[tuple[float, int, FilingTrace]] = []
+        self._largest: list[tuple[int, int, FilingTrace]] = []
+        # Breaks ties so traces themselves are never compared
+        self._sequence = itertools.count()
+
+    def add(self, trace: FilingTrace) -> None:
+        """Consider a filing for both rankings
+
+        :param trace: The filing's trace
+        :type trace: FilingTrace
+        """
+        sequence = next(self._sequence)
+        self._push(self._slowest, (trace.total_seconds, sequence, trace))
+        if trace.size_bytes is not None:
+            self._push(self._largest, (trace.size_bytes, sequence, trace))
+
+    def _push(self, heap: list[tuple], entry: tuple) -> None:
+        """Push an entry, evicting the smallest once the heap is full
+
+        :param heap: The heap
+        :type heap: list[tuple]
+        :param entry: The entry, ordered by its first element
+        :type entry: tuple
+        """
+        if len(heap) < self.max_filings:
+            heapq.heappush(heap, entry)
+        elif entry[0] > heap[0][0]:
+            heapq.heapreplace(heap, entry)
+
+    def slowest(self) -> list[FilingTrace]:
+        """Return the slowest filings, slowest first
+
+        :return: The slowest filings
+        :rtype: list[FilingTrace]
+        """
+        return [trace for *_, trace in sorted(self._slowest, reverse=True)]
+
+    def largest(self) -> list[FilingTrace]:
+        """Return the largest filings, largest first
+
+        :return: The largest filings
+        :rtype: list[FilingTrace]
+        """
+        return [trace for *_, trace in sorted(self._largest, reverse=True)]
+
+    def write_json(self, path: pathlib.Path) -> None:
+        """Write both rankings to a JSON trace file
+
+        :param path: The path of the trace file
+        :type path: pathlib.Path
+        """
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "slowest": [trace.to_dict() for trace in self.slowest()],
+                    "largest": [trace.to_dict() for trace in self.largest()],
+                },
+                f,
+                indent=2,
+            )
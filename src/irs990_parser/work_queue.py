@@ -0,0 +1,369 @@
+"""
+A shared queue of jobs that nodes lease, so multi-node runs balance themselves
+"""
+
+import contextlib
+import os
+import pathlib
+import socket
+import threading
+import time
+import uuid
+from typing import Callable, Iterable, Iterator, NamedTuple, Optional
+
+import sqlalchemy
+
+from irs990_parser import sharding
+
+
+class Job(NamedTuple):
+    """An archive, or one chunk of its members, processed by a single node"""
+
+    key: str
+    archive: str
+    chunk: int
+    chunk_count: int
+    attempts: int
+
+    @property
+    def member_filter(self) -> Optional[Callable[[str], bool]]:
+        """Return the filter selecting the members of this job's chunk
+
+        :return: The filter, or None if the job covers the whole archive
+        :rtype: Optional[Callable[[str], bool]]
+        """
+        if self.chunk_count == 1:
+            return None
+        # Chunks are the shards of the archive's members
+        return sharding.Shard(self.chunk, self.chunk_count).owns
+
+
+def make_jobs(archives: Iterable[str], chunk_count: int) -> list[Job]:
+    """Split archives into jobs
+
+    :param archives: Local paths or links to the archives
+    :type archives: Iterable[str]
+    :param chunk_count: The number of member chunks per archive, 1 for whole
+        archives
+    :type chunk_count: int
+    :return: The jobs, keyed by archive name and chunk
+    :rtype: list[Job]
+    """
+    jobs = []
+    for archive in archives:
+        archive_name = os.path.basename(archive)
+        for chunk in range(chunk_count):
+            key = (
+                archive_name
+                if chunk_count == 1
+                else f"{archive_name}#{sharding.Shard(chunk, chunk_count)}"
+            )
+            jobs.append(Job(key, archive, chunk, chunk_count, 0))
+    return jobs
+
+
+class WorkQueue:
+    """Lease jobs from a table shared by every node. A lease expires unless its
+    node renews it, so the jobs of a crashed node are leased again by another.
+    Jobs are processed at least once: a node whose lease expired while it was
+    still working, e.g. after a long pause, may overlap with the next node, and
+    a job is leased again after a crash even if its rows were committed. Sinks
+    must therefore be idempotent, as the database loader is by replacing rows
+    with the same primary key.
+
+    Leases are compared against each node's clock, so the clocks must agree to
+    well within the lease duration.
+
+    :param engine: The database holding the queue
+    :type engine: sqlalchemy.Engine
+    :param lease_seconds: How long a lease lasts without being renewed
+    :type lease_seconds: float
+    :param owner: Identifies this node's leases, defaults to the host, process
+        and a random suffix
+    :type owner: Optional[str]
+    :param max_attempts: How many times a job is leased before it is failed
+    :type max_attempts: int
+    """
+
+    TABLE_NAME = "work_queue_jobs"
+    PENDING = "pending"
+    LEASED = "leased"
+    DONE = "done"
+    FAILED = "failed"
+
+    LEASE_SEC = 300
+    MAX_ATTEMPTS = 3
+    # Leases are renewed several times per lease, so one slow renewal is not fatal
+    HEARTBEATS_PER_LEASE = 3
+    MAX_POLL_SEC = 5
+    LEASE_RETRIES = 5
+    LOCK_TIMEOUT_SEC = 60
+    CREDENTIALS_FILE_EXTENSION = ".ini"
+
+    def __init__(
+        self,
+        engine: sqlalchemy.Engine,
+        lease_seconds: float = LEASE_SEC,
+        owner: Optional[str] = None,
+        max_attempts: int = MAX_ATTEMPTS,
+    ) -> None:
+        self.engine = engine
+        self.lease_seconds = lease_seconds
+        self.owner = (
+            owner
+            if owner is not None
+            else f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        )
+        self.max_attempts = max_attempts
+        self.poll_seconds = min(lease_seconds / 4, WorkQueue.MAX_POLL_SEC)
+
+        self.jobs = sqlalchemy.Table(
+            WorkQueue.TABLE_NAME,
+            sqlalchemy.MetaData(),
+            sqlalchemy.Column("job_key", sqlalchemy.String(255), primary_key=True),
+            sqlalchemy.Column("archive", sqlalchemy.String(1024), nullable=False),
+            sqlalchemy.Column("chunk", sqlalchemy.Integer, nullable=False),
+            sqlalchemy.Column("chunk_count", sqlalchemy.Integer, nullable=False),
+            sqlalchemy.Column("status", sqlalchemy.String(16), nullable=False),
+            sqlalchemy.Column("owner", sqlalchemy.String(255)),
+            sqlalchemy.Column("lease_expires", sqlalchemy.Float),
+            sqlalchemy.Column("attempts", sqlalchemy.Integer, nullable=False),
+        )
+        self.jobs.create(engine, checkfirst=True)
+
+    @classmethod
+    def connect(cls, location: str, lease_seconds: float = LEASE_SEC) -> "WorkQueue":
+        """Connect to the queue in a SQLite file or in the database described by
+        a credentials file
+
+        :param location: The path to a SQLite file or an ini credentials file
+        :type location: str
+        :param lease_seconds: How long a lease lasts without being renewed
+        :type lease_seconds: float
+        :return: The queue
+        :rtype: WorkQueue
+        """
+        if location.endswith(WorkQueue.CREDENTIALS_FILE_EXTENSION):
+            from irs990_parser import loader
+
+            engine = loader.Loader(pathlib.Path(location)).create_engine()
+        else:
+            # The default rollback journal, unlike WAL, works on network file
+            # systems, so the file can sit on storage shared by every node
+            engine = sqlalchemy.create_engine(
+                f"sqlite:///{location}",
+                connect_args={"timeout": WorkQueue.LOCK_TIMEOUT_SEC},
+            )
+        return cls(engine, lease_seconds)
+
+    def add_jobs(self, jobs: Iterable[Job]) -> None:
+        """Add jobs that are not already queued. Every node may add the same
+        jobs when it starts
+
+        :param jobs: The jobs to add
+        :type jobs: Iterable[Job]
+        """
+        for job in jobs:
+            try:
+                with self.engine.begin() as connection:
+                    connection.execute(
+                        self.jobs.insert().values(
+                            job_key=job.key,
+                            archive=job.archive,
+                            chunk=job.chunk,
+                            chunk_count=job.chunk_count,
+                            status=WorkQueue.PENDING,
+                            attempts=0,
+                        )
+                    )
+            except sqlalchemy.exc.IntegrityError:
+                # Another node already queued the job
+                pass
+
+    def lease(self, wait: bool = True) -> Optional[Job]:
+        """Lease the next job
+
+        :param wait: Whether to wait for leases held by other nodes to either
+            finish or expire when no job is free, defaults to True
+        :type wait: bool
+        :return: The leased job, or None once no job is left to lease
+        :rtype: Optional[Job]
+        """
+        while True:
+            job = self._try_lease()
+            if job is not None or not wait:
+                return job
+            if not self._has_unfinished_jobs():
+                return None
+            time.sleep(self.poll_seconds)
+
+    def heartbeat(self, job: Job) -> bool:
+        """Renew the lease on a job
+
+        :param job: The leased job
+        :type job: Job
+        :return: True if the lease was renewed, False if it was lost
+        :rtype: bool
+        """
+        return self._update_own_lease(
+            job, lease_expires=time.time() + self.lease_seconds
+        )
+
+    def complete(self, job: Job) -> bool:
+        """Mark a leased job as done
+
+        :param job: The leased job
+        :type job: Job
+        :return: True if this node still held the lease, False if it expired
+            and the job may be processed again
+        :rtype: bool
+        """
+        return self._update_own_lease(job, status=WorkQueue.DONE, lease_expires=None)
+
+    def release(self, job: Job) -> None:
+        """Give up the lease on a job that failed, so it is leased again unless
+        it has used up its attempts
+
+        :param job: The leased job
+        :type job: Job
+        """
+        self._update_own_lease(
+            job,
+            status=(
+                WorkQueue.FAILED
+                if job.attempts >= self.max_attempts
+                else WorkQueue.PENDING
+            ),
+            owner=None,
+            lease_expires=None,
+        )
+
+    @contextlib.contextmanager
+    def keep_alive(self, job: Job) -> Iterator[None]:
+        """Renew the lease on a job in the background while it is processed
+
+        :param job: The leased job
+        :type job: Job
+        """
+        stopped = threading.Event()
+
+        def renew() -> None:
+            while not stopped.wait(self.lease_seconds / WorkQueue.HEARTBEATS_PER_LEASE):
+                try:
+                    if not self.heartbeat(job):
+                        return
+                except sqlalchemy.exc.DBAPIError:
+                    # Retried at the next heartbeat, before the lease expires
+                    pass
+
+        thread = threading.Thread(target=renew, daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            stopped.set()
+            thread.join()
+
+    def counts(self) -> dict[str, int]:
+        """Count the jobs in each status
+
+        :return: The number of jobs per status
+        :rtype: dict[str, int]
+        """
+        with self.engine.connect() as connection:
+            rows = connection.execute(
+                sqlalchemy.select(self.jobs.c.status, sqlalchemy.func.count()).group_by(
+                    self.jobs.c.status
+                )
+            )
+            return {status: count for status, count in rows}
+
+    def close(self) -> None:
+        """Close the connections to the queue"""
+        self.engine.dispose()
+
+    def _try_lease(self) -> Optional[Job]:
+        """Lease a pending job or one whose lease expired, if there is one
+
+        :return: The leased job, or None if no job can be leased right now
+        :rtype: Optional[Job]
+        """
+        now = time.time()
+        expired = sqlalchemy.and_(
+            self.jobs.c.status == WorkQueue.LEASED, self.jobs.c.lease_expires < now
+        )
+        leasable = sqlalchemy.or_(
+            self.jobs.c.status == WorkQueue.PENDING,
+            sqlalchemy.and_(expired, self.jobs.c.attempts < self.max_attempts),
+        )
+        for _ in range(WorkQueue.LEASE_RETRIES):
+            with self.engine.begin() as connection:
+                # Jobs that keep crashing their nodes are not retried forever
+                connection.execute(
+                    self.jobs.update()
+                    .where(expired, self.jobs.c.attempts >= self.max_attempts)
+                    .values(status=WorkQueue.FAILED, owner=None, lease_expires=None)
+                )
+                row = connection.execute(
+                    sqlalchemy.select(self.jobs)
+                    .where(leasable)
+                    .order_by(self.jobs.c.job_key)
+                    .limit(1)
+                ).first()
+                if row is None:
+                    return None
+
+                # Only succeeds if no other node leased the job since it was read
+                result = connection.execute(
+                    self.jobs.update()
+                    .where(self.jobs.c.job_key == row.job_key, leasable)
+                    .values(
+                        status=WorkQueue.LEASED,
+                        owner=self.owner,
+                        lease_expires=now + self.lease_seconds,
+                        attempts=self.jobs.c.attempts + 1,
+                    )
+                )
+                if result.rowcount == 1:
+                    return Job(
+                        row.job_key,
+                        row.archive,
+                        row.chunk,
+                        row.chunk_count,
+                        row.attempts + 1,
+                    )
+        return None
+
+    def _has_unfinished_jobs(self) -> bool:
+        """Return whether any job is pending or leased
+
+        :return: True if a job may still need to be leased, False otherwise
+        :rtype: bool
+        """
+        with self.engine.connect() as connection:
+            row = connection.execute(
+                sqlalchemy.select(self.jobs.c.job_key)
+                .where(self.jobs.c.status.in_([WorkQueue.PENDING, WorkQueue.LEASED]))
+                .limit(1)
+            ).first()
+        return row is not None
+
+    def _update_own_lease(self, job: Job, **values: object) -> bool:
+        """Update a job only while this node holds its lease
+
+        :param job: The leased job
+        :type job: Job
+        :return: True if the job was updated, False if the lease was lost
+        :rtype: bool
+        """
+        with self.engine.begin() as connection:
+            result = connection.execute(
+                self.jobs.update()
+                .where(
+                    self.jobs.c.job_key == job.key,
+                    self.jobs.c.owner == self.owner,
+                    self.jobs.c.status == WorkQueue.LEASED,
+                )
+                .values(**values)
+            )
+        return result.rowcount == 1
@@ -1,22 +1,35 @@
 import argparse
+import contextlib
+import itertools
+import json
 import os
 import pathlib
+import sys
 import tempfile
+from typing import Callable, Iterable, Iterator, Optional
 
-import bs4
 import tqdm
 
 from irs990_parser import (
-    extractor,
+    archive_reader,
+    extraction_cache,
+    filing_parser,
     gender_guesser,
     irs_field_extractor,
-    link_retriever,
-    loader,
+    metrics,
+    parse_pool,
+    profiling,
+    sampling,
+    sharding,
+    sketches,
+    slow_filings,
 )
 
 NAME_TO_GENDER_PROBABILITY_CSV = pathlib.Path(
     "../src/irs990_parser/first_name_gender_probabilities.csv"
 )
+SHARD_BY_ARCHIVE = "archive"
+SHARD_BY_MEMBER = "member"
 
 
 def get_year_from_url(url: str) -> int:
@@ -45,92 +58,986 @@ def get_irs_month_from_url(url: str) -> str:
     return separate_by_period[0]
 
 
+def get_year_from_archive_name(archive_name: str) -> int:
+    """Retrieve year from the name of a local IRS archive or directory, such
+    as 2024_TEOS_XML_01A
+
+    :param archive_name: The name of the archive or directory
+    :type archive_name: str
+    :return: The year within the name
+    :rtype: int
+    """
+    return int(os.path.basename(archive_name).split("_")[0])
+
+
+def list_xml_files(xml_files_dir: str) -> list[str]:
+    """List the paths of every XML file in a directory
+
+    :param xml_files_dir: The directory containing the XML files
+    :type xml_files_dir: str
+    :return: The paths of the XML files
+    :rtype: list[str]
+    """
+    return [
+        os.path.join(xml_files_dir, xml_file_name)
+        for xml_file_name in os.listdir(xml_files_dir)
+    ]
+
+
+def list_archives(
+    input_path: Optional[str],
+    start_year: Optional[int],
+    end_year: Optional[int],
+    irs_url: Optional[str],
+    link_cache_path: Optional[pathlib.Path],
+    link_cache_ttl_seconds: float,
+    offline: bool,
+) -> list[str]:
+    """List the monthly archives to process, either a single local archive or
+    every IRS archive published between two years
+
+    :param input_path: A local zip file or directory of XML files, if given
+    :type input_path: Optional[str]
+    :param start_year: The first year (inclusive)
+    :type start_year: Optional[int]
+    :param end_year: The last year (inclusive)
+    :type end_year: Optional[int]
+    :param irs_url: The downloads page to scrape, defaults to the IRS website
+    :type irs_url: Optional[str]
+    :param link_cache_path: The file caching the links on the downloads page,
+        if enabled
+    :type link_cache_path: Optional[pathlib.Path]
+    :param link_cache_ttl_seconds: How long cached links are used before the
+        downloads page is revalidated
+    :type link_cache_ttl_seconds: float
+    :param offline: Whether to use the cached links alone
+    :type offline: bool
+    :return: Local paths or links to the archives
+    :rtype: list[str]
+    """
+    if input_path is not None:
+        return [os.path.normpath(input_path)]
+
+    from irs990_parser import link_retriever
+
+    return link_retriever.IRS990LinkRetriever(
+        start_year,
+        end_year,
+        irs_url,
+        (
+            link_retriever.LinkCache(link_cache_path)
+            if link_cache_path is not None
+            else None
+        ),
+        link_cache_ttl_seconds,
+        offline,
+    ).get_zip_links()
+
+
+def read_archive(
+    archive: str,
+    is_local: bool,
+    run_metrics: metrics.PipelineMetrics,
+    stage_profiler: profiling.StageProfiler,
+) -> bytes:
+    """Read a local zip file or download one from the IRS
+
+    :param archive: The local path or link to the zip file
+    :type archive: str
+    :param is_local: Whether the archive is a local file
+    :type is_local: bool
+    :param run_metrics: Metrics of the current run
+    :type run_metrics: metrics.PipelineMetrics
+    :param stage_profiler: Profiles the download stage, if enabled
+    :type stage_profiler: profiling.StageProfiler
+    :return: The contents of the zip file
+    :rtype: bytes
+    """
+    if is_local:
+        with open(archive, "rb") as f:
+            return f.read()
+
+    from irs990_parser import extractor
+
+    with (
+        run_metrics.time_stage(metrics.PipelineMetrics.DOWNLOAD_STAGE),
+        stage_profiler.profile(metrics.PipelineMetrics.DOWNLOAD_STAGE),
+    ):
+        content = extractor.IRSZipFileExtractor().download(archive)
+    run_metrics.downloaded_bytes.inc(len(content))
+    return content
+
+
+def list_work_items(
+    archives: list[str],
+    shard_by: str,
+    is_local: bool,
+    run_metrics: metrics.PipelineMetrics,
+    stage_profiler: profiling.StageProfiler,
+) -> list[str]:
+    """List the names of every work item shards are assigned. Listing members
+    reads every archive, but does not extract them
+
+    :param archives: Local paths or links to the archives
+    :type archives: list[str]
+    :param shard_by: The granularity of the work items, archive or member
+    :type shard_by: str
+    :param is_local: Whether the archives are local
+    :type is_local: bool
+    :param run_metrics: Metrics of the current run
+    :type run_metrics: metrics.PipelineMetrics
+    :param stage_profiler: Profiles the download stage, if enabled
+    :type stage_profiler: profiling.StageProfiler
+    :return: Archive names or XML file names
+    :rtype: list[str]
+    """
+    if shard_by == SHARD_BY_ARCHIVE:
+        return [os.path.basename(archive) for archive in archives]
+
+    from irs990_parser import extractor
+
+    members = []
+    for archive in archives:
+        if os.path.isdir(archive):
+            members.extend(os.listdir(archive))
+        else:
+            members.extend(
+                extractor.IRSZipFileExtractor().list_members(
+                    read_archive(archive, is_local, run_metrics, stage_profiler),
+                    archive,
+                )
+            )
+    return members
+
+
+def fetch_archives(
+    archives: list[str],
+    is_local: bool,
+    parallel_downloads: int,
+    range_size: int,
+    run_metrics: metrics.PipelineMetrics,
+) -> Iterator[tuple[str, Optional[bytes]]]:
+    """Download remote archives concurrently, yielding each as it completes.
+    Local archives are read when they are processed instead
+
+    :param archives: Local paths or links to the archives
+    :type archives: list[str]
+    :param is_local: Whether the archives are local
+    :type is_local: bool
+    :param parallel_downloads: The most archives downloaded at once
+    :type parallel_downloads: int
+    :param range_size: The size of the byte ranges each download is split into
+    :type range_size: int
+    :param run_metrics: Metrics of the current run
+    :type run_metrics: metrics.PipelineMetrics
+    :return: Each archive, with its contents if it was downloaded
+    :rtype: Iterator[tuple[str, Optional[bytes]]]
+    """
+    if is_local:
+        for archive in archives:
+            yield archive, None
+        return
+
+    from irs990_parser import archive_fetcher
+
+    fetcher = archive_fetcher.ArchiveFetcher(
+        max_parallel=parallel_downloads, range_size=range_size
+    )
+    try:
+        for fetched in fetcher.fetch(archives):
+            run_metrics.observe_stage(
+                metrics.PipelineMetrics.DOWNLOAD_STAGE, fetched.seconds
+            )
+            run_metrics.downloaded_bytes.inc(len(fetched.content))
+            yield fetched.url, fetched.content
+    except Exception:
+        run_metrics.failures.inc(stage=metrics.PipelineMetrics.DOWNLOAD_STAGE)
+        raise
+
+
+def process_month(
+    filings: Iterable[filing_parser.ParsedFiling],
+    irs_month: str,
+    year: int,
+    load_organizations: Callable[[list[irs_field_extractor.OrganizationRow]], None],
+    persons_dir: Optional[pathlib.Path],
+    run_metrics: metrics.PipelineMetrics,
+    slow_filing_tracker: Optional[slow_filings.SlowFilingTracker],
+    stage_profiler: profiling.StageProfiler,
+    row_sketches: Optional[sketches.RowSketches] = None,
+    sample_weight: float = 1,
+) -> None:
+    """Load the records of every filing published in a month
+
+    :param filings: The extracted rows and trace of each filing
+    :type filings: Iterable[filing_parser.ParsedFiling]
+    :param irs_month: The IRS month the filings were published in
+    :type irs_month: str
+    :param year: The year the filings were published in
+    :type year: int
+    :param load_organizations: Loads organization records into the output
+    :type load_organizations: Callable[[list[irs_field_extractor.OrganizationRow]], None]
+    :param persons_dir: The directory of the person-level dataset, if enabled
+    :type persons_dir: Optional[pathlib.Path]
+    :param run_metrics: Metrics of the current run
+    :type run_metrics: metrics.PipelineMetrics
+    :param slow_filing_tracker: Tracks the slowest and largest filings, if enabled
+    :type slow_filing_tracker: Optional[slow_filings.SlowFilingTracker]
+    :param stage_profiler: Profiles the load stage, if enabled
+    :type stage_profiler: profiling.StageProfiler
+    :param row_sketches: Sketches the loaded organization records, if enabled
+    :type row_sketches: Optional[sketches.RowSketches]
+    :param sample_weight: How many filings of the month each filing stands
+        for, more than one if they were sampled
+    :type sample_weight: float
+    """
+    person_writer_context = contextlib.nullcontext()
+    if persons_dir is not None:
+        # pyarrow is an optional dependency, so only import it when requested
+        from irs990_parser import parquet_writer
+
+        person_writer_context = parquet_writer.PersonParquetWriter(
+            persons_dir, year, irs_month
+        )
+
+    # The month's people replace its partition only once every filing was
+    # parsed and loaded
+    with person_writer_context as person_writer:
+        monthly_org_data = []
+        try:
+            for organization, people, trace in tqdm.tqdm(filings):
+                monthly_org_data.append(organization)
+                if person_writer is not None:
+                    person_writer.write(people)
+                if slow_filing_tracker is not None:
+                    slow_filing_tracker.add(trace)
+                # Parse time covers reading, parsing and running the extractors,
+                # wherever the filing was parsed
+                run_metrics.observe_stage(
+                    metrics.PipelineMetrics.PARSE_STAGE, trace.total_seconds
+                )
+        except Exception:
+            run_metrics.failures.inc(stage=metrics.PipelineMetrics.PARSE_STAGE)
+            raise
+
+        with (
+            run_metrics.time_stage(metrics.PipelineMetrics.LOAD_STAGE),
+            stage_profiler.profile(metrics.PipelineMetrics.LOAD_STAGE),
+        ):
+            load_organizations(monthly_org_data)
+        run_metrics.rows_loaded.inc(len(monthly_org_data))
+        if row_sketches is not None:
+            # Rows are sketched once loaded, so the sketches cover exactly the
+            # loaded rows even if the run stops early. Sinks keep the first row
+            # of a repeated filing, and so do sketches
+            row_sketches.add_rows(
+                irs_field_extractor.drop_duplicate_rows(monthly_org_data),
+                sample_weight,
+            )
+
+
+def process_archive(
+    archive: str,
+    is_local: bool,
+    member_filter: Optional[Callable[[str], bool]],
+    pool: parse_pool.ParsePool,
+    load_organizations: Callable[[list[irs_field_extractor.OrganizationRow]], None],
+    persons_dir: Optional[pathlib.Path],
+    run_metrics: metrics.PipelineMetrics,
+    slow_filing_tracker: Optional[slow_filings.SlowFilingTracker],
+    stage_profiler: profiling.StageProfiler,
+    reader: archive_reader.ArchiveReader,
+    content: Optional[bytes] = None,
+    sampler: Optional[sampling.Sampler] = None,
+    row_sketches: Optional[sketches.RowSketches] = None,
+) -> list[str]:
+    """Download or read a monthly archive, then parse and load its filings
+
+    :param archive: The local path or link to the archive
+    :type archive: str
+    :param is_local: Whether the archive is local
+    :type is_local: bool
+    :param member_filter: Selects the XML files to process by file name,
+        defaults to all
+    :type member_filter: Optional[Callable[[str], bool]]
+    :param pool: Parses the XML files
+    :type pool: parse_pool.ParsePool
+    :param load_organizations: Loads organization records into the output
+    :type load_organizations: Callable[[list[irs_field_extractor.OrganizationRow]], None]
+    :param persons_dir: The directory of the person-level dataset, if enabled
+    :type persons_dir: Optional[pathlib.Path]
+    :param run_metrics: Metrics of the current run
+    :type run_metrics: metrics.PipelineMetrics
+    :param slow_filing_tracker: Tracks the slowest and largest filings, if enabled
+    :type slow_filing_tracker: Optional[slow_filings.SlowFilingTracker]
+    :param stage_profiler: Profiles each stage, if enabled
+    :type stage_profiler: profiling.StageProfiler
+    :param reader: Decompresses the members of the archive
+    :type reader: archive_reader.ArchiveReader
+    :param content: The contents of the archive if it was already downloaded,
+        defaults to downloading or reading it here
+    :type content: Optional[bytes]
+    :param sampler: Chooses a sample of the selected XML files to process,
+        defaults to processing all of them. A remote archive that was not
+        downloaded is then read by byte ranges, if that transfers less
+    :type sampler: Optional[sampling.Sampler]
+    :param row_sketches: Sketches the loaded organization records, if enabled
+    :type row_sketches: Optional[sketches.RowSketches]
+    :return: The names of the processed XML files
+    :rtype: list[str]
+    """
+    # Workers spawned by the parse pool re-import this module, so modules only
+    # needed to fetch and extract archives are imported here
+    from irs990_parser import extractor
+
+    irs_month = get_irs_month_from_url(archive)
+    year = (
+        get_year_from_archive_name(archive) if is_local else get_year_from_url(archive)
+    )
+    with tempfile.TemporaryDirectory() as temp_dir_path:
+        if os.path.isdir(archive):
+            # A local directory of XML files is parsed in place
+            xml_files_dir = archive
+            if sampler is not None:
+                member_filter = sampler.sample(os.listdir(archive), member_filter)
+        else:
+            remote_file = None
+            if content is None and sampler is not None and not is_local:
+                from irs990_parser import archive_fetcher
+
+                # The central directory is read by ranges to draw the sample,
+                # then the sampled members too unless they are most of the file
+                with (
+                    run_metrics.time_stage(metrics.PipelineMetrics.DOWNLOAD_STAGE),
+                    stage_profiler.profile(metrics.PipelineMetrics.DOWNLOAD_STAGE),
+                ):
+                    remote_file = archive_fetcher.RemoteFile(archive)
+                    member_filter = sampler.sample(
+                        extractor.IRSZipFileExtractor().list_members(
+                            remote_file, archive
+                        ),
+                        member_filter,
+                    )
+                    if not remote_file.ranges_save_bandwidth(len(member_filter)):
+                        content = remote_file.read_all()
+            else:
+                if content is None:
+                    content = read_archive(
+                        archive, is_local, run_metrics, stage_profiler
+                    )
+                if sampler is not None:
+                    member_filter = sampler.sample(
+                        extractor.IRSZipFileExtractor().list_members(content, archive),
+                        member_filter,
+                    )
+            # zip file directory (irs_990_dir) > the only file unzipped (directory_containing_xml_files) > xml files
+            with (
+                run_metrics.time_stage(metrics.PipelineMetrics.DECOMPRESS_STAGE),
+                stage_profiler.profile(metrics.PipelineMetrics.DECOMPRESS_STAGE),
+            ):
+                irs_990_dir = extractor.IRSZipFileExtractor(
+                    reader=reader
+                ).extract_archive(
+                    content if content is not None else remote_file,
+                    archive,
+                    pathlib.Path(temp_dir_path),
+                    member_filter,
+                )
+            if remote_file is not None:
+                run_metrics.downloaded_bytes.inc(remote_file.fetched_bytes)
+            del content, remote_file
+            # Nothing is extracted when a shard owns none of the files
+            xml_files_dir = None
+            if irs_990_dir.exists():
+                directory_containing_xml_files = os.listdir(irs_990_dir)[0]
+                xml_files_dir = os.path.join(
+                    irs_990_dir, directory_containing_xml_files
+                )
+
+        sample_weight = 1
+        if sampler is not None:
+            print(
+                f"Sampled {len(member_filter)} of {member_filter.population} "
+                f"filings from {archive}"
+            )
+            sample_weight = member_filter.weight
+        xml_file_paths = (
+            list_xml_files(xml_files_dir) if xml_files_dir is not None else []
+        )
+        if member_filter is not None:
+            # Only needed for directories, which are not filtered while
+            # extracting
+            xml_file_paths = [
+                xml_file_path
+                for xml_file_path in xml_file_paths
+                if member_filter(os.path.basename(xml_file_path))
+            ]
+        process_month(
+            pool.parse_files(xml_file_paths, irs_month, year),
+            irs_month,
+            year,
+            load_organizations,
+            persons_dir,
+            run_metrics,
+            slow_filing_tracker,
+            stage_profiler,
+            row_sketches,
+            sample_weight,
+        )
+    return [os.path.basename(xml_file_path) for xml_file_path in xml_file_paths]
+
+
 if __name__ == "__main__":
     arg_parser = argparse.ArgumentParser()
-    arg_parser.add_argument("--start-year", type=int, required=True)
-    arg_parser.add_argument("--end-year", type=int, required=True)
-    arg_parser.add_argument("--credentials-file", type=str, required=True)
+    arg_parser.add_argument("--start-year", type=int)
+    arg_parser.add_argument("--end-year", type=int)
+    arg_parser.add_argument("--input", type=str)
+    arg_parser.add_argument("--irs-url", type=str)
+    arg_parser.add_argument("--link-cache", type=str, default="irs_links.json")
+    arg_parser.add_argument("--link-cache-ttl-hours", type=float, default=24)
+    arg_parser.add_argument("--offline", action="store_true")
+    arg_parser.add_argument("--http-rate", type=float, default=10)
+    arg_parser.add_argument("--http-concurrency", type=int, default=8)
+    arg_parser.add_argument("--parallel-downloads", type=int, default=2)
+    arg_parser.add_argument("--download-range-mib", type=int, default=64)
+    arg_parser.add_argument("--decompress-workers", type=int, default=1)
+    arg_parser.add_argument("--credentials-file", type=str)
+    arg_parser.add_argument(
+        "--output-format", choices=["mysql", "parquet", "none"], default="mysql"
+    )
+    arg_parser.add_argument("--parquet-dir", type=str)
+    arg_parser.add_argument("--persons-dir", type=str)
+    arg_parser.add_argument("--cache-file", type=str)
+    arg_parser.add_argument("--rederive-from-cache", action="store_true")
+    arg_parser.add_argument("--workers", type=int, default=1)
+    arg_parser.add_argument("--metrics-textfile", type=str)
+    arg_parser.add_argument("--run-report", type=str)
+    arg_parser.add_argument("--extractor-timings", action="store_true")
+    arg_parser.add_argument("--slow-filings-trace", type=str)
+    arg_parser.add_argument("--slow-filings-count", type=int, default=50)
+    arg_parser.add_argument("--profile", type=str)
+    arg_parser.add_argument("--shard", type=str)
+    arg_parser.add_argument(
+        "--shard-by",
+        choices=[SHARD_BY_ARCHIVE, SHARD_BY_MEMBER],
+        default=SHARD_BY_ARCHIVE,
+    )
+    arg_parser.add_argument("--shard-manifest", type=str)
+    arg_parser.add_argument("--verify-shards", type=str, nargs="+")
+    arg_parser.add_argument("--work-queue", type=str)
+    arg_parser.add_argument("--queue-chunks", type=int, default=1)
+    arg_parser.add_argument("--lease-seconds", type=float, default=300)
+    arg_parser.add_argument("--watch", action="store_true")
+    arg_parser.add_argument("--watch-interval-minutes", type=float, default=60)
+    arg_parser.add_argument("--watch-polls", type=int)
+    arg_parser.add_argument(
+        "--processed-manifest", type=str, default="processed_archives.json"
+    )
+    arg_parser.add_argument("--serve", type=int)
+    arg_parser.add_argument("--serve-host", type=str, default="127.0.0.1")
+    arg_parser.add_argument("--sample-rate", type=float)
+    arg_parser.add_argument("--sample-n", type=int)
+    arg_parser.add_argument("--sketches", type=str)
+    arg_parser.add_argument("--sketch-report", type=str, nargs="+")
+    arg_parser.add_argument(
+        "--sketch-report-by",
+        choices=[
+            sketches.GROUP_BY_YEAR,
+            sketches.GROUP_BY_MONTH,
+            sketches.GROUP_BY_STATE,
+        ],
+        default=sketches.GROUP_BY_YEAR,
+    )
     args = arg_parser.parse_args()
 
+    if args.sketch_report is not None:
+        # Reports read the sketches of finished runs, without parsing anything
+        row_sketches = sketches.RowSketches()
+        for sketch_path in args.sketch_report:
+            row_sketches.merge(sketches.RowSketches.read(pathlib.Path(sketch_path)))
+        print(json.dumps(row_sketches.report(args.sketch_report_by), indent=2))
+        sys.exit(0)
+
+    if args.serve is not None and (
+        args.input is not None
+        or args.rederive_from_cache
+        or args.work_queue is not None
+        or args.watch
+        or args.shard is not None
+        or args.verify_shards is not None
+    ):
+        arg_parser.error(
+            "--serve parses the filings it receives, so it cannot be combined with "
+            "--input, --rederive-from-cache, --work-queue, --watch, --shard or "
+            "--verify-shards"
+        )
+    if (
+        args.input is None
+        and args.serve is None
+        and (args.start_year is None or (args.end_year is None and not args.watch))
+    ):
+        # Watching without an end year follows the archives as they are published
+        arg_parser.error("--start-year and --end-year are required without --input")
+    if args.input is not None and args.rederive_from_cache:
+        arg_parser.error("--input cannot be combined with --rederive-from-cache")
+    if (
+        args.output_format == "mysql"
+        and args.credentials_file is None
+        and args.verify_shards is None
+    ):
+        arg_parser.error("--credentials-file is required for mysql output")
+    if args.output_format == "parquet" and args.parquet_dir is None:
+        arg_parser.error("--parquet-dir is required for parquet output")
+    if args.rederive_from_cache and args.cache_file is None:
+        arg_parser.error("--cache-file is required to rederive from the cache")
+    shard = None
+    if args.shard is not None:
+        try:
+            shard = sharding.Shard.parse(args.shard)
+        except ValueError as e:
+            arg_parser.error(str(e))
+    if shard is not None and args.shard_by == SHARD_BY_MEMBER:
+        # These sinks replace a whole month at a time, which would drop the
+        # rows written by the other shards of that month
+        if args.output_format == "parquet" or args.persons_dir is not None:
+            arg_parser.error("--shard-by member requires mysql or none output")
+    if (
+        shard is not None
+        and args.rederive_from_cache
+        and args.shard_by == SHARD_BY_ARCHIVE
+    ):
+        arg_parser.error("--rederive-from-cache can only be sharded by member")
+    if args.shard_manifest is not None and shard is None:
+        arg_parser.error("--shard is required to write a shard manifest")
+    if args.work_queue is not None:
+        if shard is not None or args.rederive_from_cache:
+            arg_parser.error(
+                "--work-queue cannot be combined with --shard or --rederive-from-cache"
+            )
+        if args.queue_chunks > 1 and (
+            args.output_format == "parquet" or args.persons_dir is not None
+        ):
+            # Same as sharding by member, chunks of a month would replace
+            # each other's partitions
+            arg_parser.error("--queue-chunks requires mysql or none output")
+    if args.watch and (
+        args.input is not None
+        or args.rederive_from_cache
+        or args.work_queue is not None
+        or shard is not None
+        or args.offline
+        or args.verify_shards is not None
+    ):
+        arg_parser.error(
+            "--watch polls the IRS website, so it cannot be combined with --input, "
+            "--rederive-from-cache, --work-queue, --shard, --offline or --verify-shards"
+        )
+    sampler = None
+    if args.sample_rate is not None or args.sample_n is not None:
+        if args.sample_rate is not None and not 0 < args.sample_rate <= 1:
+            arg_parser.error("--sample-rate must be greater than 0 and at most 1")
+        if args.sample_n is not None and args.sample_n < 1:
+            arg_parser.error("--sample-n must be at least 1")
+        if args.serve is not None or args.shard_manifest is not None or args.watch:
+            # A sampled run does not cover its work items, so its manifest
+            # would never verify, and the watcher would record sampled archives
+            # as fully ingested
+            arg_parser.error(
+                "--sample-rate and --sample-n cannot be combined with --serve, "
+                "--shard-manifest or --watch"
+            )
+        if args.sample_n is not None and (
+            (shard is not None and args.shard_by == SHARD_BY_MEMBER)
+            or args.queue_chunks > 1
+        ):
+            # Each part of an archive would keep its own n filings
+            arg_parser.error(
+                "--sample-n takes n filings per archive, so it cannot be combined "
+                "with --shard-by member or --queue-chunks"
+            )
+        sampler = sampling.Sampler(args.sample_rate, args.sample_n)
+    if args.offline and not args.link_cache:
+        arg_parser.error("--offline requires --link-cache")
+    if args.queue_chunks < 1:
+        arg_parser.error("--queue-chunks must be at least 1")
+    if args.http_rate <= 0 or args.http_concurrency < 1:
+        arg_parser.error("--http-rate and --http-concurrency must be positive")
+    if args.parallel_downloads < 1 or args.download_range_mib < 1:
+        arg_parser.error(
+            "--parallel-downloads and --download-range-mib must be positive"
+        )
+
     start_year = args.start_year
     end_year = args.end_year
-    credentials_file = pathlib.Path(args.credentials_file)
-    irs_990_links = link_retriever.IRS990LinkRetriever(
-        start_year, end_year
-    ).get_zip_links()
+    # An empty path disables the cache, so the downloads page is always fetched
+    link_cache_path = pathlib.Path(args.link_cache) if args.link_cache else None
+    link_cache_ttl_seconds = args.link_cache_ttl_hours * 60 * 60
+    if args.input is None and not args.rederive_from_cache and args.serve is None:
+        # requests is only needed to reach the IRS website
+        from irs990_parser import http_client
+
+        http_client.set_default_client(
+            http_client.HTTPClient(
+                rate=args.http_rate, max_concurrency=args.http_concurrency
+            )
+        )
+
+    if args.verify_shards is not None:
+        if args.rederive_from_cache:
+            arg_parser.error("--verify-shards cannot verify a rederive run")
+        manifests = [
+            sharding.ShardManifest.read(pathlib.Path(manifest_path))
+            for manifest_path in args.verify_shards
+        ]
+        report = sharding.verify_coverage(
+            list_work_items(
+                list_archives(
+                    args.input,
+                    start_year,
+                    end_year,
+                    args.irs_url,
+                    link_cache_path,
+                    link_cache_ttl_seconds,
+                    args.offline,
+                ),
+                manifests[0].shard_by,
+                args.input is not None,
+                metrics.PipelineMetrics(),
+                profiling.StageProfiler(None),
+            ),
+            manifests,
+        )
+        print(
+            f"{report.processed} of {report.expected} {manifests[0].shard_by}s "
+            f"processed across {len(manifests)} manifest(s)"
+        )
+        for problem in report.problems:
+            print(problem)
+        for label, keys in [
+            ("Missing", report.missing),
+            ("Processed more than once", report.duplicated),
+            ("Not part of the workload", report.unexpected),
+        ]:
+            if keys:
+                print(f"{label} ({len(keys)}): {', '.join(keys[:20])}")
+        sys.exit(0 if report.ok else 1)
+
+    persons_dir = pathlib.Path(args.persons_dir) if args.persons_dir else None
+    cache_path = pathlib.Path(args.cache_file) if args.cache_file else None
 
     guesser = gender_guesser.GenderGuesser(NAME_TO_GENDER_PROBABILITY_CSV)
+    db_loader = None
+    parser = filing_parser.FilingParser(guesser)
 
-    data_loader = loader.Loader(credentials_file)
+    if args.output_format == "parquet":
+        from irs990_parser import parquet_writer
 
-    for url in irs_990_links:
-        irs_month = get_irs_month_from_url(url)
-        year = get_year_from_url(url)
-        with tempfile.TemporaryDirectory() as temp_dir_path:
-            zip_file_extractor = extractor.IRSZipFileExtractor()
+        load_organizations = parquet_writer.ParquetDatasetWriter(
+            pathlib.Path(args.parquet_dir)
+        ).write
+    elif args.output_format == "mysql":
+        from irs990_parser import loader
 
-            # zip file directory (irs_990_dir) > the only file unzipped (directory_containing_xml_files) > xml files
-            irs_990_dir = zip_file_extractor.extract_zip(
-                url, pathlib.Path(temp_dir_path)
-            )
-            directory_containing_xml_files = os.listdir(irs_990_dir)[0]
-            xml_files_dir = os.path.join(irs_990_dir, directory_containing_xml_files)
-
-            monthly_org_data = []
-            for xml_file_name in tqdm.tqdm(os.listdir(xml_files_dir)):
-                xml_file_path = os.path.join(xml_files_dir, xml_file_name)
-                with open(xml_file_path, "r", encoding="utf-8") as f:
-                    xml_file = f.read()
-                    file_name = os.path.basename(xml_file)
-                    parsed_xml = bs4.BeautifulSoup(xml_file, "xml")
-
-                    ein = irs_field_extractor.EINEXtractor(
-                        file_name, parsed_xml
-                    ).extract()
-
-                    org_name = irs_field_extractor.OrgNameExtractor(
-                        file_name, parsed_xml
-                    ).extract()
-
-                    whistleblower_policy = (
-                        irs_field_extractor.WhistleblowerPolicyExtractor(
-                            file_name, parsed_xml
-                        )
-                    ).extract()
+        db_loader = loader.Loader(pathlib.Path(args.credentials_file))
+        load_organizations = db_loader.load_rows
+    else:
 
-                    ceo_compensation_review = (
-                        irs_field_extractor.CEOCompensationReviewExtractor(
-                            file_name, parsed_xml
-                        ).extract()
-                    )
+        def load_organizations(rows: list[irs_field_extractor.OrganizationRow]) -> None:
+            pass
 
-                    other_compensation_review = (
-                        irs_field_extractor.OtherCompensationReviewExtractor(
-                            file_name, parsed_xml
-                        ).extract()
+    # Sketches are written after every archive or month, and when the run
+    # stops, rather than after every load
+    row_sketches = sketches.RowSketches() if args.sketches is not None else None
+
+    run_metrics = metrics.PipelineMetrics()
+    stage_profiler = profiling.StageProfiler(
+        pathlib.Path(args.profile) if args.profile is not None else None
+    )
+    instrumentation = profiling.ParseInstrumentation(
+        profile=stage_profiler.enabled, time_extractors=args.extractor_timings
+    )
+    slow_filing_tracker = (
+        slow_filings.SlowFilingTracker(args.slow_filings_count)
+        if args.slow_filings_trace is not None
+        else None
+    )
+    shard_manifest = (
+        sharding.ShardManifest(shard, args.shard_by) if shard is not None else None
+    )
+    reader = archive_reader.ArchiveReader(args.decompress_workers)
+    pool = parse_pool.ParsePool(
+        filing_parser.FilingFileParser(
+            parser,
+            # Rederiving reads the cache, so filings are not written back to it
+            cache_path=None if args.rederive_from_cache else cache_path,
+            include_people=persons_dir is not None,
+            count_rows=slow_filing_tracker is not None,
+        ),
+        args.workers,
+        instrumentation,
+    )
+    try:
+        if args.serve is not None:
+            from irs990_parser import parse_service
+
+            load_requested_rows = load_organizations
+            if row_sketches is not None:
+                # Requests are not grouped by month, so their rows are
+                # sketched as they are loaded, and written when the service
+                # stops
+                def load_requested_rows(
+                    rows: list[irs_field_extractor.OrganizationRow],
+                ) -> None:
+                    load_organizations(rows)
+                    row_sketches.add_rows(irs_field_extractor.drop_duplicate_rows(rows))
+
+            pool.warm_up()
+            server = parse_service.ParseService(
+                pool,
+                reader,
+                # Parquet output replaces whole months, so requests can only
+                # add rows to a database
+                load_requested_rows if args.output_format == "mysql" else None,
+            ).make_server(args.serve_host, args.serve)
+            print(
+                f"Serving parse requests on "
+                f"http://{args.serve_host}:{server.server_address[1]}"
+            )
+            try:
+                server.serve_forever()
+            except KeyboardInterrupt:
+                pass
+            finally:
+                server.server_close()
+        elif args.rederive_from_cache:
+            cache = extraction_cache.ExtractionCache(cache_path)
+            try:
+                cached_filings = cache.iter_filings(start_year, end_year)
+                if shard is not None:
+                    cached_filings = (
+                        filing
+                        for filing in cached_filings
+                        if shard.owns(filing.file_name)
+                    )
+                for (year, irs_month), monthly_filings in itertools.groupby(
+                    cached_filings,
+                    key=lambda filing: (filing.year, filing.irs_month),
+                ):
+                    monthly_filings = list(monthly_filings)
+                    sample_weight = 1
+                    if sampler is not None:
+                        sample = sampler.sample(
+                            filing.file_name for filing in monthly_filings
+                        )
+                        monthly_filings = [
+                            filing
+                            for filing in monthly_filings
+                            if sample(filing.file_name)
+                        ]
+                        sample_weight = sample.weight
+                    if shard_manifest is not None:
+                        shard_manifest.add(
+                            filing.file_name for filing in monthly_filings
+                        )
+                    process_month(
+                        pool.parse_cached(monthly_filings),
+                        irs_month,
+                        year,
+                        load_organizations,
+                        persons_dir,
+                        run_metrics,
+                        slow_filing_tracker,
+                        stage_profiler,
+                        row_sketches,
+                        sample_weight,
                     )
+                    if row_sketches is not None:
+                        row_sketches.write(pathlib.Path(args.sketches))
+            finally:
+                cache.close()
+        elif args.watch:
+            from irs990_parser import archive_watcher, link_retriever
 
-                    trustee_stuff = irs_field_extractor.TrusteeExtractor(
-                        file_name, parsed_xml, guesser
+            watcher = archive_watcher.ArchiveWatcher(
+                start_year,
+                end_year,
+                archive_watcher.ProcessedArchiveManifest(
+                    pathlib.Path(args.processed_manifest)
+                ),
+                args.irs_url,
+                (
+                    link_retriever.LinkCache(link_cache_path)
+                    if link_cache_path is not None
+                    else None
+                ),
+                args.watch_interval_minutes * 60,
+            )
+            for changed in watcher.polls(args.watch_polls):
+                print(f"Found {len(changed)} new or republished archive(s)")
+                try:
+                    for archive, content in fetch_archives(
+                        list(changed),
+                        False,
+                        args.parallel_downloads,
+                        args.download_range_mib * 1024 * 1024,
+                        run_metrics,
+                    ):
+                        process_archive(
+                            archive,
+                            False,
+                            None,
+                            pool,
+                            load_organizations,
+                            persons_dir,
+                            run_metrics,
+                            slow_filing_tracker,
+                            stage_profiler,
+                            reader,
+                            content,
+                            sampler,
+                            row_sketches,
+                        )
+                        watcher.manifest.mark_processed(archive, changed[archive])
+                        if row_sketches is not None:
+                            row_sketches.write(pathlib.Path(args.sketches))
+                except Exception as e:
+                    # Archives not marked processed are found again next poll,
+                    # so one bad archive does not stop the watcher
+                    print(f"Ingesting failed, retrying at the next poll: {e}")
+                if args.metrics_textfile is not None:
+                    run_metrics.write_prometheus_textfile(
+                        pathlib.Path(args.metrics_textfile)
                     )
+        elif args.work_queue is not None:
+            # sqlalchemy is only needed to reach the queue
+            from irs990_parser import work_queue
 
-                    key_employer_stuff = irs_field_extractor.KeyEmployeeExtractor(
-                        file_name, parsed_xml, guesser
+            queue = work_queue.WorkQueue.connect(args.work_queue, args.lease_seconds)
+            try:
+                queue.add_jobs(
+                    work_queue.make_jobs(
+                        list_archives(
+                            args.input,
+                            start_year,
+                            end_year,
+                            args.irs_url,
+                            link_cache_path,
+                            link_cache_ttl_seconds,
+                            args.offline,
+                        ),
+                        args.queue_chunks,
                     )
+                )
+                while (job := queue.lease()) is not None:
+                    try:
+                        with queue.keep_alive(job):
+                            process_archive(
+                                job.archive,
+                                args.input is not None,
+                                job.member_filter,
+                                pool,
+                                load_organizations,
+                                persons_dir,
+                                run_metrics,
+                                slow_filing_tracker,
+                                stage_profiler,
+                                reader,
+                                sampler=sampler,
+                                row_sketches=row_sketches,
+                            )
+                    except Exception as e:
+                        # The job is leased again, here or by another node,
+                        # until it uses up its attempts, so one bad job does
+                        # not stop the node
+                        print(f"Processing {job.key} failed, releasing it: {e}")
+                        queue.release(job)
+                        continue
+                    if not queue.complete(job):
+                        print(
+                            f"The lease on {job.key} expired before it finished, "
+                            "so another node may process it again"
+                        )
+                    if row_sketches is not None:
+                        row_sketches.write(pathlib.Path(args.sketches))
+                print(f"Work queue drained: {queue.counts()}")
+            finally:
+                queue.close()
+        else:
+            archives = [
+                archive
+                for archive in list_archives(
+                    args.input,
+                    start_year,
+                    end_year,
+                    args.irs_url,
+                    link_cache_path,
+                    link_cache_ttl_seconds,
+                    args.offline,
+                )
+                if shard is None
+                or args.shard_by != SHARD_BY_ARCHIVE
+                or shard.owns(os.path.basename(archive))
+            ]
+            member_filter = None
+            if shard is not None and args.shard_by == SHARD_BY_MEMBER:
+                member_filter = shard.owns
 
-                    org_data = irs_field_extractor.OrganizationDataModel(
-                        ein=ein,
-                        instnm=org_name,
-                        irs_month=irs_month,
-                        year=year,
-                        percentage_women_trustees=trustee_stuff.calculate_trustee_female_percentage(),
-                        percentage_women_key_employees=key_employer_stuff.calculate_key_employee_female_percentage(),
-                        whistleblower_policy=whistleblower_policy,
-                        ceo_reviewed_compensation=ceo_compensation_review,
-                        other_reviewed_compensation=other_compensation_review,
-                        male_to_female_pay_ratio=key_employer_stuff.calculate_male_to_female_pay_ratio(),
-                        president_to_average_pay_ratio=key_employer_stuff.calculate_president_to_average_pay_ratio(),
+            # Sampled archives are read when they are processed, so only the
+            # sampled members are fetched
+            for archive, content in (
+                ((archive, None) for archive in archives)
+                if sampler is not None
+                else fetch_archives(
+                    archives,
+                    args.input is not None,
+                    args.parallel_downloads,
+                    args.download_range_mib * 1024 * 1024,
+                    run_metrics,
+                )
+            ):
+                processed_files = process_archive(
+                    archive,
+                    args.input is not None,
+                    member_filter,
+                    pool,
+                    load_organizations,
+                    persons_dir,
+                    run_metrics,
+                    slow_filing_tracker,
+                    stage_profiler,
+                    reader,
+                    content,
+                    sampler,
+                    row_sketches,
+                )
+                if row_sketches is not None:
+                    row_sketches.write(pathlib.Path(args.sketches))
+                if shard_manifest is not None:
+                    shard_manifest.add(
+                        [os.path.basename(archive)]
+                        if args.shard_by == SHARD_BY_ARCHIVE
+                        else processed_files
                     )
-                    monthly_org_data.append(org_data)
 
-            data_loader.load_into_db(monthly_org_data)
+        # Only a shard that finished claims its work items
+        if args.shard_manifest is not None:
+            shard_manifest.write(pathlib.Path(args.shard_manifest))
+    finally:
+        pool.close()
+        reader.close()
+        if db_loader is not None:
+            db_loader.close()
+        if row_sketches is not None:
+            row_sketches.write(pathlib.Path(args.sketches))
+        if args.metrics_textfile is not None:
+            run_metrics.write_prometheus_textfile(pathlib.Path(args.metrics_textfile))
+        if args.run_report is not None:
+            run_metrics.write_json_report(pathlib.Path(args.run_report))
+        if args.extractor_timings:
+            print(instrumentation.timings.report())
+        if slow_filing_tracker is not None:
+            slow_filing_tracker.write_json(pathlib.Path(args.slow_filings_trace))
+        stage_profiler.add_stats(
+            metrics.PipelineMetrics.PARSE_STAGE, instrumentation.stats
+        )
+        stage_profiler.write()
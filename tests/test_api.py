@@ -0,0 +1,186 @@
+"""
+Tests the library API for parsing filings from other programs
+"""
+
+import os
+import pathlib
+import shutil
+import zipfile
+
+import pytest
+
+import irs990_parser
+from irs990_parser import gender_guesser, irs_field_extractor
+
+SAMPLE_DIR = os.path.join("sample_irs_xml_files", "key_employees")
+SAMPLE_FILE_NAMES = sorted(os.listdir(SAMPLE_DIR))
+SAMPLE_EIN = "640579585"
+
+
+def _identify(
+    row: irs_field_extractor.OrganizationRow,
+) -> tuple[str, str, str, int]:
+    """Return the fields of a row that do not depend on guessed genders, which
+    are random for names missing from the chart
+
+    :param row: The row
+    :type row: irs_field_extractor.OrganizationRow
+    :return: The EIN, name, IRS month and year
+    :rtype: tuple[str, str, str, int]
+    """
+    return row.ein, row.instnm, row.irs_month, row.year
+
+
+@pytest.fixture
+def guesser(tmp_path: pathlib.Path) -> gender_guesser.GenderGuesser:
+    """Create a gender guesser from a small chart
+
+    :param tmp_path: Function-level directory fixture
+    :type tmp_path: pathlib.Path
+    :return: A gender guesser
+    :rtype: gender_guesser.GenderGuesser
+    """
+    csv_file_path = tmp_path / "first_name_gender_probabilities.csv"
+    csv_file_path.write_text("Name,female_prob\nmary,1.0\n", encoding="utf-8")
+    return gender_guesser.GenderGuesser(csv_file_path)
+
+
+@pytest.fixture
+def archive_path(tmp_path: pathlib.Path) -> pathlib.Path:
+    """Zip the sample filings the way the IRS lays out monthly archives
+
+    :param tmp_path: Function-level directory fixture
+    :type tmp_path: pathlib.Path
+    :return: The path to the zip file
+    :rtype: pathlib.Path
+    """
+    zip_path = tmp_path / "2023_TEOS_XML_05A.zip"
+    with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zip_file:
+        for file_name in SAMPLE_FILE_NAMES:
+            zip_file.write(
+                os.path.join(SAMPLE_DIR, file_name), f"2023_TEOS_XML_05A/{file_name}"
+            )
+    return zip_path
+
+
+class TestParseFiling:
+    """Tests the parse_filing function"""
+
+    def test_parse_filing_bytes_and_path_expected_same_row(
+        self, guesser: gender_guesser.GenderGuesser
+    ) -> None:
+        """Tests that a filing is parsed the same from its contents or path
+
+        :param guesser: Gender guesser fixture
+        :type guesser: gender_guesser.GenderGuesser
+        """
+        sample_file = os.path.join(SAMPLE_DIR, "both.xml")
+        with open(sample_file, "rb") as f:
+            from_bytes = irs990_parser.parse_filing(f.read(), "01A", 2024, guesser)
+        from_path = irs990_parser.parse_filing(sample_file, "01A", 2024, guesser)
+
+        assert _identify(from_bytes) == _identify(from_path)
+        assert (from_path.ein, from_path.irs_month, from_path.year) == (
+            SAMPLE_EIN,
+            "01A",
+            2024,
+        )
+
+
+class TestIterRows:
+    """Tests the iter_rows and iter_row_batches functions"""
+
+    @pytest.mark.parametrize("workers", [1, 2])
+    def test_iter_rows_zip_expected_rows_in_storage_order(
+        self,
+        guesser: gender_guesser.GenderGuesser,
+        archive_path: pathlib.Path,
+        workers: int,
+    ) -> None:
+        """Tests that every member is parsed, in order, with the date read
+        from the archive name
+
+        :param guesser: Gender guesser fixture
+        :type guesser: gender_guesser.GenderGuesser
+        :param archive_path: Zip file fixture
+        :type archive_path: pathlib.Path
+        :param workers: The number of worker processes
+        :type workers: int
+        """
+        rows = list(
+            irs990_parser.iter_rows(archive_path, workers=workers, guesser=guesser)
+        )
+
+        expected = [
+            irs990_parser.parse_filing(
+                os.path.join(SAMPLE_DIR, file_name), "05A", 2023, guesser
+            )
+            for file_name in SAMPLE_FILE_NAMES
+        ]
+        assert [_identify(row) for row in rows] == [_identify(row) for row in expected]
+
+    def test_iter_rows_directory_expected_member_filter_applied(
+        self, guesser: gender_guesser.GenderGuesser, tmp_path: pathlib.Path
+    ) -> None:
+        """Tests that a directory of XML files is parsed, keeping only the
+        selected files
+
+        :param guesser: Gender guesser fixture
+        :type guesser: gender_guesser.GenderGuesser
+        :param tmp_path: Function-level directory fixture
+        :type tmp_path: pathlib.Path
+        """
+        xml_dir = tmp_path / "2024_TEOS_XML_01A"
+        shutil.copytree(SAMPLE_DIR, xml_dir)
+
+        rows = list(
+            irs990_parser.iter_rows(
+                xml_dir,
+                guesser=guesser,
+                member_filter=lambda file_name: file_name == "both.xml",
+            )
+        )
+
+        assert [(row.ein, row.irs_month, row.year) for row in rows] == [
+            (SAMPLE_EIN, "01A", 2024)
+        ]
+
+    def test_iter_rows_bytes_without_date_expected_value_error(
+        self, guesser: gender_guesser.GenderGuesser, archive_path: pathlib.Path
+    ) -> None:
+        """Tests that zip file contents, which have no name, need a date
+
+        :param guesser: Gender guesser fixture
+        :type guesser: gender_guesser.GenderGuesser
+        :param archive_path: Zip file fixture
+        :type archive_path: pathlib.Path
+        """
+        with pytest.raises(ValueError):
+            next(irs990_parser.iter_rows(archive_path.read_bytes(), guesser=guesser))
+
+    def test_iter_row_batches_expected_columns_capped_by_batch_size(
+        self, guesser: gender_guesser.GenderGuesser, archive_path: pathlib.Path
+    ) -> None:
+        """Tests that rows are grouped into columns of at most the batch size
+
+        :param guesser: Gender guesser fixture
+        :type guesser: gender_guesser.GenderGuesser
+        :param archive_path: Zip file fixture
+        :type archive_path: pathlib.Path
+        """
+        batches = list(
+            irs990_parser.iter_row_batches(
+                archive_path.read_bytes(),
+                batch_size=4,
+                irs_month="05A",
+                year=2023,
+                guesser=guesser,
+            )
+        )
+
+        assert [len(batch["ein"]) for batch in batches] == [4, 2]
+        assert all(
+            list(batch) == list(irs_field_extractor.OrganizationRow._fields)
+            for batch in batches
+        )
+        assert batches[0]["year"] == [2023] * 4
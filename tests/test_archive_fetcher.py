@@ -0,0 +1,374 @@
+"""
+Tests downloading archives concurrently from a local asyncio HTTP server
+"""
+
+import asyncio
+import io
+import random
+import threading
+import zipfile
+import zlib
+from typing import Iterator
+
+import pytest
+import requests
+
+from irs990_parser import archive_fetcher, archive_reader, http_client
+
+ARCHIVES = {
+    f"/2024_TEOS_XML_{month:02d}A.zip": bytes([month]) * (month * 1000)
+    for month in range(1, 7)
+}
+MEMBERS = {
+    f"2024_TEOS_XML_07A/2024{index:014d}_public.xml": random.Random(index).randbytes(
+        2000
+    )
+    for index in range(200)
+}
+
+
+def _zip_members() -> bytes:
+    """Zip the members without compression, so the archive is as large as them
+
+    :return: The contents of the zip file
+    :rtype: bytes
+    """
+    content = io.BytesIO()
+    with zipfile.ZipFile(content, "w", zipfile.ZIP_STORED) as zip_file:
+        for name, data in MEMBERS.items():
+            zip_file.writestr(name, data)
+    return content.getvalue()
+
+
+ZIP_PATH = "/2024_TEOS_XML_07A.zip"
+SERVED = {**ARCHIVES, ZIP_PATH: _zip_members()}
+
+
+class StandInServer:
+    """A minimal asyncio HTTP server serving archives, optionally in byte
+    ranges, that records how many requests it serves at once
+
+    :param serve_ranges: Whether Range headers are honored
+    :type serve_ranges: bool
+    :param delay_seconds: How long each response is held back
+    :type delay_seconds: float
+    """
+
+    def __init__(self, serve_ranges: bool, delay_seconds: float) -> None:
+        self.serve_ranges = serve_ranges
+        self.delay_seconds = delay_seconds
+        self.ranges_served: list[str] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.served = dict(SERVED)
+        # Archives replaced by a new version once their first request is read
+        self.republished: dict[str, bytes] = {}
+        self.honor_if_range = True
+        # Whether ranges after the first are answered with the whole archive
+        self.whole_later_ranges = False
+
+    async def handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """Answer one request, then close the connection
+
+        :param reader: The request stream
+        :type reader: asyncio.StreamReader
+        :param writer: The response stream
+        :type writer: asyncio.StreamWriter
+        """
+        request = (await reader.readuntil(b"\r\n\r\n")).decode("latin-1")
+        request_line, *header_lines = request.strip().split("\r\n")
+        path = request_line.split(" ")[1]
+        headers = dict(line.split(": ", 1) for line in header_lines)
+
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(self.delay_seconds)
+        self.in_flight -= 1
+
+        body = self.served.get(path)
+        if path in self.republished:
+            self.served[path] = self.republished.pop(path)
+        etag = f'"{zlib.crc32(body or b"")}"'
+        if body is None:
+            status, extra_headers, body = "404 Not Found", "", b""
+        elif (
+            not self.serve_ranges
+            or "Range" not in headers
+            or (self.honor_if_range and headers.get("If-Range", etag) != etag)
+            or (self.whole_later_ranges and not headers["Range"].startswith("bytes=0-"))
+        ):
+            status, extra_headers = "200 OK", f"ETag: {etag}\r\n"
+        else:
+            first, last = headers["Range"].removeprefix("bytes=").split("-")
+            if not first:
+                # A suffix range asks for the last bytes of the file
+                first, last = str(max(len(body) - int(last), 0)), len(body) - 1
+            last = min(int(last), len(body) - 1)
+            self.ranges_served.append(f"{first}-{last}")
+            status = "206 Partial Content"
+            extra_headers = (
+                f"Content-Range: bytes {first}-{last}/{len(body)}\r\n"
+                f"ETag: {etag}\r\n"
+            )
+            body = body[int(first) : last + 1]
+        writer.write(
+            f"HTTP/1.1 {status}\r\nContent-Length: {len(body)}\r\n{extra_headers}"
+            "Connection: close\r\n\r\n".encode("latin-1") + body
+        )
+        await writer.drain()
+        writer.close()
+
+
+def _serve(server: StandInServer) -> Iterator[str]:
+    """Run a stand-in server on an event loop in a background thread
+
+    :param server: The server to run
+    :type server: StandInServer
+    :return: The base URL of the server
+    :rtype: Iterator[str]
+    """
+    loop = asyncio.new_event_loop()
+    listening = loop.run_until_complete(
+        asyncio.start_server(server.handle, "127.0.0.1", 0)
+    )
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{listening.sockets[0].getsockname()[1]}"
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+    listening.close()
+    loop.close()
+
+
+@pytest.fixture
+def ranged_server() -> Iterator[tuple[StandInServer, str]]:
+    """Serve archives in byte ranges
+
+    :return: The server and its base URL
+    :rtype: Iterator[tuple[StandInServer, str]]
+    """
+    server = StandInServer(serve_ranges=True, delay_seconds=0.05)
+    for base_url in _serve(server):
+        yield server, base_url
+
+
+@pytest.fixture
+def plain_server() -> Iterator[tuple[StandInServer, str]]:
+    """Serve whole archives, ignoring byte ranges
+
+    :return: The server and its base URL
+    :rtype: Iterator[tuple[StandInServer, str]]
+    """
+    server = StandInServer(serve_ranges=False, delay_seconds=0.05)
+    for base_url in _serve(server):
+        yield server, base_url
+
+
+def _fetcher(max_parallel: int, range_size: int) -> archive_fetcher.ArchiveFetcher:
+    """Create a fetcher that retries without waiting
+
+    :param max_parallel: The most archives downloaded at once
+    :type max_parallel: int
+    :param range_size: The size of each byte range
+    :type range_size: int
+    :return: The fetcher
+    :rtype: archive_fetcher.ArchiveFetcher
+    """
+    return archive_fetcher.ArchiveFetcher(
+        http_client.HTTPClient(max_retries=0, rate=1000),
+        max_parallel=max_parallel,
+        range_size=range_size,
+    )
+
+
+class TestArchiveFetcher:
+    """Tests the ArchiveFetcher class"""
+
+    def test_fetch_expected_every_archive_downloaded(
+        self, ranged_server: tuple[StandInServer, str]
+    ) -> None:
+        """Tests that every archive is downloaded whole
+
+        :param ranged_server: Server fixture
+        :type ranged_server: tuple[StandInServer, str]
+        """
+        _, base_url = ranged_server
+        urls = [f"{base_url}{path}" for path in ARCHIVES]
+        fetched = {
+            archive.url: archive.content
+            for archive in _fetcher(max_parallel=3, range_size=100_000).fetch(urls)
+        }
+        assert fetched == {f"{base_url}{path}": body for path, body in ARCHIVES.items()}
+
+    def test_fetch_large_archive_expected_split_into_ranges(
+        self, ranged_server: tuple[StandInServer, str]
+    ) -> None:
+        """Tests that an archive larger than a range is fetched in ranges
+
+        :param ranged_server: Server fixture
+        :type ranged_server: tuple[StandInServer, str]
+        """
+        server, base_url = ranged_server
+        path = "/2024_TEOS_XML_06A.zip"
+        (archive,) = _fetcher(max_parallel=1, range_size=2500).fetch(
+            [f"{base_url}{path}"]
+        )
+        assert archive.content == ARCHIVES[path]
+        assert sorted(server.ranges_served) == ["0-2499", "2500-4999", "5000-5999"]
+
+    @pytest.mark.parametrize("honor_if_range", [True, False])
+    def test_fetch_republished_during_download_expected_new_archive(
+        self, ranged_server: tuple[StandInServer, str], honor_if_range: bool
+    ) -> None:
+        """Tests that an archive replaced between its ranges is downloaded
+        again whole, rather than joined from both versions
+
+        :param ranged_server: Server fixture
+        :type ranged_server: tuple[StandInServer, str]
+        :param honor_if_range: Whether the server checks If-Range
+        :type honor_if_range: bool
+        """
+        server, base_url = ranged_server
+        path = "/2024_TEOS_XML_06A.zip"
+        server.honor_if_range = honor_if_range
+        server.republished[path] = bytes(reversed(range(250))) * 24
+
+        (archive,) = _fetcher(max_parallel=1, range_size=2500).fetch(
+            [f"{base_url}{path}"]
+        )
+
+        assert archive.content == bytes(reversed(range(250))) * 24
+
+    def test_fetch_later_range_whole_archive_expected_downloaded_again(
+        self, ranged_server: tuple[StandInServer, str]
+    ) -> None:
+        """Tests that a later range answered with the whole archive is not
+        joined onto the first range
+
+        :param ranged_server: Server fixture
+        :type ranged_server: tuple[StandInServer, str]
+        """
+        server, base_url = ranged_server
+        path = "/2024_TEOS_XML_06A.zip"
+        server.whole_later_ranges = True
+
+        (archive,) = _fetcher(max_parallel=1, range_size=2500).fetch(
+            [f"{base_url}{path}"]
+        )
+
+        assert archive.content == ARCHIVES[path]
+
+    def test_fetch_without_range_support_expected_whole_archive(
+        self, plain_server: tuple[StandInServer, str]
+    ) -> None:
+        """Tests that servers ignoring byte ranges still work
+
+        :param plain_server: Server fixture
+        :type plain_server: tuple[StandInServer, str]
+        """
+        _, base_url = plain_server
+        path = "/2024_TEOS_XML_06A.zip"
+        (archive,) = _fetcher(max_parallel=1, range_size=2500).fetch(
+            [f"{base_url}{path}"]
+        )
+        assert archive.content == ARCHIVES[path]
+
+    def test_fetch_expected_parallelism_bounded(
+        self, plain_server: tuple[StandInServer, str]
+    ) -> None:
+        """Tests that no more than the allowed archives download at once
+
+        :param plain_server: Server fixture
+        :type plain_server: tuple[StandInServer, str]
+        """
+        server, base_url = plain_server
+        urls = [f"{base_url}{path}" for path in ARCHIVES]
+        fetcher = _fetcher(max_parallel=2, range_size=100_000)
+        fetcher.prefetch = len(urls)
+        assert len(list(fetcher.fetch(urls))) == len(urls)
+        assert server.max_in_flight == 2
+
+    def test_fetch_missing_archive_expected_http_error(
+        self, plain_server: tuple[StandInServer, str]
+    ) -> None:
+        """Tests that a failed download is raised to the consumer
+
+        :param plain_server: Server fixture
+        :type plain_server: tuple[StandInServer, str]
+        """
+        _, base_url = plain_server
+        with pytest.raises(requests.HTTPError):
+            list(
+                _fetcher(max_parallel=2, range_size=100_000).fetch(
+                    [f"{base_url}/missing.zip"]
+                )
+            )
+
+
+class TestRemoteFile:
+    """Tests the RemoteFile class"""
+
+    SAMPLED = list(MEMBERS)[::40]
+
+    def _read_sampled(self, remote_file: archive_fetcher.RemoteFile) -> dict:
+        """Read the sampled members of the zip file
+
+        :param remote_file: The zip file
+        :type remote_file: archive_fetcher.RemoteFile
+        :return: The contents of each sampled member, keyed by name
+        :rtype: dict
+        """
+        sampled_names = {name.split("/")[-1] for name in TestRemoteFile.SAMPLED}
+        entries = archive_reader.read_entries(
+            remote_file, lambda file_name: file_name in sampled_names
+        )
+        return {
+            entry.name: contents
+            for entry, contents in archive_reader.iter_members(remote_file, entries)
+        }
+
+    def test_read_members_expected_only_ranges_fetched(
+        self, ranged_server: tuple[StandInServer, str]
+    ) -> None:
+        """Tests that reading a few members fetches a small part of the file
+
+        :param ranged_server: Server fixture
+        :type ranged_server: tuple[StandInServer, str]
+        """
+        _, base_url = ranged_server
+        remote_file = archive_fetcher.RemoteFile(
+            f"{base_url}{ZIP_PATH}",
+            http_client.HTTPClient(max_retries=0, rate=1000),
+            block_size=4096,
+        )
+
+        members = self._read_sampled(remote_file)
+
+        assert members == {name: MEMBERS[name] for name in TestRemoteFile.SAMPLED}
+        assert remote_file.supports_ranges
+        assert remote_file.ranges_save_bandwidth(len(members))
+        assert remote_file.fetched_bytes < len(SERVED[ZIP_PATH]) / 4
+
+    def test_read_members_without_range_support_expected_whole_file(
+        self, plain_server: tuple[StandInServer, str]
+    ) -> None:
+        """Tests that a server ignoring ranges is read from one download
+
+        :param plain_server: Server fixture
+        :type plain_server: tuple[StandInServer, str]
+        """
+        _, base_url = plain_server
+        remote_file = archive_fetcher.RemoteFile(
+            f"{base_url}{ZIP_PATH}",
+            http_client.HTTPClient(max_retries=0, rate=1000),
+            block_size=4096,
+        )
+
+        members = self._read_sampled(remote_file)
+
+        assert members == {name: MEMBERS[name] for name in TestRemoteFile.SAMPLED}
+        assert not remote_file.ranges_save_bandwidth(len(members))
+        assert remote_file.read_all() == SERVED[ZIP_PATH]
+        assert remote_file.fetched_bytes == len(SERVED[ZIP_PATH])
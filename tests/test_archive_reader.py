@@ -0,0 +1,184 @@
+"""
+Tests extracting zip members in this process and across worker processes
+"""
+
+import io
+import pathlib
+import zipfile
+
+import pytest
+import zipfile_deflate64
+
+from irs990_parser import archive_reader
+
+MEMBERS = {
+    f"2024_TEOS_XML_01A/{index:018d}_public.xml": (
+        f"<Return><EIN>{index:09d}</EIN></Return>" * (index + 1)
+    ).encode("utf-8")
+    for index in range(20)
+}
+# Holds a Deflate64 member, which uses a match longer than 258 bytes and a
+# distance beyond 32 KiB that plain deflate cannot express, and a deflate member
+DEFLATE64_ZIP = pathlib.Path("sample_archives", "deflate64.zip")
+DEFLATE64_MEMBER = "202400000000000001_public.bin"
+CENTRAL_HEADER_SIGNATURE = b"PK\x01\x02"
+CENTRAL_HEADER_CRC_OFFSET = 16
+
+
+def _make_zip(members: dict[str, bytes], compression: int) -> bytes:
+    """Create a zip file in memory
+
+    :param members: The contents of each member, by name
+    :type members: dict[str, bytes]
+    :param compression: The compression method of every member
+    :type compression: int
+    :return: The contents of the zip file
+    :rtype: bytes
+    """
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression=compression) as zip_file:
+        for name, contents in members.items():
+            zip_file.writestr(name, contents)
+    return buffer.getvalue()
+
+
+def _read_tree(directory: pathlib.Path) -> dict[str, bytes]:
+    """Read every file below a directory
+
+    :param directory: The directory
+    :type directory: pathlib.Path
+    :return: The contents of each file, by path relative to the directory
+    :rtype: dict[str, bytes]
+    """
+    return {
+        path.relative_to(directory).as_posix(): path.read_bytes()
+        for path in directory.rglob("*")
+        if path.is_file()
+    }
+
+
+class TestArchiveReader:
+    """Tests the ArchiveReader class"""
+
+    @pytest.mark.parametrize("workers", [1, 2])
+    @pytest.mark.parametrize("compression", [zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED])
+    def test_extract_expected_same_files_as_zipfile(
+        self, tmp_path: pathlib.Path, workers: int, compression: int
+    ) -> None:
+        """Tests that members are extracted exactly as zipfile extracts them
+
+        :param tmp_path: Function-level directory fixture
+        :type tmp_path: pathlib.Path
+        :param workers: The number of worker processes
+        :type workers: int
+        :param compression: The compression method of the members
+        :type compression: int
+        """
+        content = _make_zip(MEMBERS, compression)
+        with zipfile.ZipFile(io.BytesIO(content)) as zip_file:
+            zip_file.extractall(tmp_path / "expected")
+
+        reader = archive_reader.ArchiveReader(workers)
+        # Every member lands in its own batch, spread over the workers
+        reader.BATCH_BYTES = 1
+        try:
+            extracted = reader.extract(content, tmp_path / "actual")
+        finally:
+            reader.close()
+        assert extracted == len(MEMBERS)
+        assert _read_tree(tmp_path / "actual") == _read_tree(tmp_path / "expected")
+
+    def test_extract_with_member_filter_expected_only_selected_files(
+        self, tmp_path: pathlib.Path
+    ) -> None:
+        """Tests that only the members selected by file name are extracted
+
+        :param tmp_path: Function-level directory fixture
+        :type tmp_path: pathlib.Path
+        """
+        content = _make_zip(MEMBERS, zipfile.ZIP_DEFLATED)
+        archive_reader.ArchiveReader().extract(
+            content, tmp_path, lambda name: name.startswith("00000000000000000")
+        )
+        assert sorted(_read_tree(tmp_path)) == sorted(MEMBERS)[:10]
+
+    def test_extract_corrupt_member_expected_bad_zip_file_error(
+        self, tmp_path: pathlib.Path
+    ) -> None:
+        """Tests that a member whose contents do not match its checksum is
+        rejected
+
+        :param tmp_path: Function-level directory fixture
+        :type tmp_path: pathlib.Path
+        """
+        contents = b"<Return></Return>"
+        content = _make_zip({"a_public.xml": contents}, zipfile.ZIP_STORED)
+        corrupt = content.replace(contents, b"<Return></Retura>")
+        with pytest.raises(zipfile.BadZipFile, match="Bad CRC-32"):
+            archive_reader.ArchiveReader().extract(corrupt, tmp_path)
+
+    def test_extract_member_outside_directory_expected_kept_inside(
+        self, tmp_path: pathlib.Path
+    ) -> None:
+        """Tests that member names cannot escape the extraction directory
+
+        :param tmp_path: Function-level directory fixture
+        :type tmp_path: pathlib.Path
+        """
+        content = _make_zip({"../../evil_public.xml": b"<Return/>"}, zipfile.ZIP_STORED)
+        archive_reader.ArchiveReader().extract(content, tmp_path / "out")
+        assert _read_tree(tmp_path / "out") == {"evil_public.xml": b"<Return/>"}
+
+    def test_extract_not_zip_expected_bad_zip_file_error(
+        self, tmp_path: pathlib.Path
+    ) -> None:
+        """Tests that content that is not a zip file is rejected
+
+        :param tmp_path: Function-level directory fixture
+        :type tmp_path: pathlib.Path
+        """
+        with pytest.raises(zipfile.BadZipFile):
+            archive_reader.ArchiveReader().extract(b"<html></html>", tmp_path)
+
+    @pytest.mark.parametrize("workers", [1, 2])
+    def test_extract_deflate64_expected_same_files_as_zipfile_deflate64(
+        self, tmp_path: pathlib.Path, workers: int
+    ) -> None:
+        """Tests that Deflate64 members are extracted exactly as the
+        zipfile-deflate64 extension extracts them
+
+        :param tmp_path: Function-level directory fixture
+        :type tmp_path: pathlib.Path
+        :param workers: The number of worker processes
+        :type workers: int
+        """
+        content = DEFLATE64_ZIP.read_bytes()
+        with zipfile_deflate64.ZipFile(io.BytesIO(content)) as zip_file:
+            assert zip_file.infolist()[0].compress_type == archive_reader.ZIP_DEFLATED64
+            zip_file.extractall(tmp_path / "expected")
+
+        reader = archive_reader.ArchiveReader(workers)
+        reader.BATCH_BYTES = 1
+        try:
+            extracted = reader.extract(content, tmp_path / "actual")
+        finally:
+            reader.close()
+        assert extracted == 2
+        assert _read_tree(tmp_path / "actual") == _read_tree(tmp_path / "expected")
+
+    def test_extract_deflate64_bad_crc_expected_bad_zip_file_error(
+        self, tmp_path: pathlib.Path
+    ) -> None:
+        """Tests that a Deflate64 member is checked against its checksum
+
+        :param tmp_path: Function-level directory fixture
+        :type tmp_path: pathlib.Path
+        """
+        content = bytearray(DEFLATE64_ZIP.read_bytes())
+        # The Deflate64 member's entry comes first in the central directory
+        crc_offset = content.index(CENTRAL_HEADER_SIGNATURE) + CENTRAL_HEADER_CRC_OFFSET
+        content[crc_offset] ^= 0xFF
+        with pytest.raises(zipfile.BadZipFile, match="Bad CRC-32"):
+            archive_reader.ArchiveReader().extract(
+                bytes(content), tmp_path, lambda name: name == DEFLATE64_MEMBER
+            )
@@ -0,0 +1,426 @@
+"""
+Tests watching the IRS downloads page for new and republished archives
+"""
+
+import configparser
+import functools
+import http.server
+import io
+import json
+import os
+import pathlib
+import sqlite3
+import subprocess
+import sys
+import threading
+import zipfile
+from typing import Iterator, NamedTuple, Optional
+
+import pytest
+
+from irs990_parser import archive_watcher, http_client, irs_field_extractor, loader
+
+PAGE_NAME = "form-990-series-downloads"
+ARCHIVE_DIR = "pub/epostcard/990/xml"
+MAIN_PATH = pathlib.Path("../src/main.py").resolve()
+SAMPLE_DIR = pathlib.Path("sample_irs_xml_files", "key_employees")
+SAMPLE_NAME = b"WESLEY BIBLICAL SEMINARY"
+
+
+class QuietHandler(http.server.SimpleHTTPRequestHandler):
+    """Serve files without logging every request"""
+
+    def log_message(self, format: str, *args: object) -> None:
+        pass
+
+
+class StandInSite(NamedTuple):
+    """A local copy of the IRS downloads page and its archives"""
+
+    site_dir: pathlib.Path
+    base_url: str
+
+    @property
+    def page_url(self) -> str:
+        """Return the URL of the downloads page
+
+        :return: The URL
+        :rtype: str
+        """
+        return f"{self.base_url}/{PAGE_NAME}"
+
+    def archive_url(self, archive_name: str) -> str:
+        """Return the link to an archive, laid out like the IRS website under
+        the year the archive name starts with
+
+        :param archive_name: The name of the archive
+        :type archive_name: str
+        :return: The link
+        :rtype: str
+        """
+        return f"{self.base_url}/{ARCHIVE_DIR}/{archive_name[:4]}/{archive_name}"
+
+    def publish(self, archives: dict[str, bytes]) -> None:
+        """Replace the archives listed on the downloads page
+
+        :param archives: The contents of each archive, keyed by name
+        :type archives: dict[str, bytes]
+        """
+        for archive_name, content in archives.items():
+            archive_dir = self.site_dir / ARCHIVE_DIR / archive_name[:4]
+            archive_dir.mkdir(parents=True, exist_ok=True)
+            (archive_dir / archive_name).write_bytes(content)
+        links = "".join(
+            f'<a href="{self.archive_url(archive_name)}">{archive_name}</a>'
+            for archive_name in archives
+        )
+        (self.site_dir / PAGE_NAME).write_text(
+            f'<html><body><div class="collapsible-item-body">{links}</div></body></html>',
+            encoding="utf-8",
+        )
+
+
+@pytest.fixture
+def site(tmp_path: pathlib.Path) -> Iterator[StandInSite]:
+    """Serve a downloads page whose archives change during a test
+
+    :param tmp_path: Function-level directory fixture
+    :type tmp_path: pathlib.Path
+    :return: The stand-in site
+    :rtype: Iterator[StandInSite]
+    """
+    site_dir = tmp_path / "site"
+    site_dir.mkdir()
+    server = http.server.ThreadingHTTPServer(
+        ("127.0.0.1", 0),
+        functools.partial(QuietHandler, directory=str(site_dir)),
+    )
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield StandInSite(site_dir, f"http://127.0.0.1:{server.server_address[1]}")
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def watcher(
+    site: StandInSite, tmp_path: pathlib.Path
+) -> archive_watcher.ArchiveWatcher:
+    """Create a watcher of the stand-in site that does not wait between polls
+
+    :param site: Stand-in site fixture
+    :type site: StandInSite
+    :param tmp_path: Function-level directory fixture
+    :type tmp_path: pathlib.Path
+    :return: The watcher
+    :rtype: archive_watcher.ArchiveWatcher
+    """
+    return archive_watcher.ArchiveWatcher(
+        2024,
+        2024,
+        archive_watcher.ProcessedArchiveManifest(tmp_path / "processed.json"),
+        site.page_url,
+        poll_seconds=0,
+        client=http_client.HTTPClient(backoff_seconds=0),
+    )
+
+
+class TestProcessedArchiveManifest:
+    """Tests the ProcessedArchiveManifest class"""
+
+    def test_mark_processed_expected_version_read_back(
+        self, tmp_path: pathlib.Path
+    ) -> None:
+        """Tests that recorded versions persist across manifest instances
+
+        :param tmp_path: Function-level directory fixture
+        :type tmp_path: pathlib.Path
+        """
+        manifest_path = tmp_path / "processed.json"
+        version = archive_watcher.ArchiveVersion('"abc"', None, 10)
+        archive_watcher.ProcessedArchiveManifest(manifest_path).mark_processed(
+            "a.zip", version
+        )
+
+        manifest = archive_watcher.ProcessedArchiveManifest(manifest_path)
+        assert manifest.get("a.zip") == version
+        assert manifest.get("b.zip") is None
+
+
+class TestArchiveWatcher:
+    """Tests the ArchiveWatcher class"""
+
+    def test_find_changed_expected_only_unprocessed_archives(
+        self, site: StandInSite, watcher: archive_watcher.ArchiveWatcher
+    ) -> None:
+        """Tests that archives are reported until they are processed, and that
+        an archive published later is reported alone
+
+        :param site: Stand-in site fixture
+        :type site: StandInSite
+        :param watcher: Watcher fixture
+        :type watcher: archive_watcher.ArchiveWatcher
+        """
+        site.publish({"2024_TEOS_XML_01A.zip": b"january"})
+        changed = watcher.find_changed()
+        assert list(changed) == [site.archive_url("2024_TEOS_XML_01A.zip")]
+        assert changed[site.archive_url("2024_TEOS_XML_01A.zip")].size == 7
+
+        for url, version in changed.items():
+            watcher.manifest.mark_processed(url, version)
+        assert watcher.find_changed() == {}
+
+        site.publish(
+            {"2024_TEOS_XML_01A.zip": b"january", "2024_TEOS_XML_02A.zip": b"feb"}
+        )
+        assert list(watcher.find_changed()) == [
+            site.archive_url("2024_TEOS_XML_02A.zip")
+        ]
+
+    def test_find_changed_republished_expected_reported_again(
+        self, site: StandInSite, watcher: archive_watcher.ArchiveWatcher
+    ) -> None:
+        """Tests that an archive the IRS replaced is ingested again
+
+        :param site: Stand-in site fixture
+        :type site: StandInSite
+        :param watcher: Watcher fixture
+        :type watcher: archive_watcher.ArchiveWatcher
+        """
+        site.publish({"2024_TEOS_XML_01A.zip": b"january"})
+        for url, version in watcher.find_changed().items():
+            watcher.manifest.mark_processed(url, version)
+
+        site.publish({"2024_TEOS_XML_01A.zip": b"january, corrected"})
+        assert list(watcher.find_changed()) == [
+            site.archive_url("2024_TEOS_XML_01A.zip")
+        ]
+
+    @pytest.mark.parametrize(
+        "end_year, expected_archives",
+        [
+            (None, ["2024_TEOS_XML_01A.zip", "2026_TEOS_XML_01A.zip"]),
+            (2024, ["2024_TEOS_XML_01A.zip"]),
+        ],
+    )
+    def test_find_changed_later_years_expected_within_end_year(
+        self,
+        site: StandInSite,
+        watcher: archive_watcher.ArchiveWatcher,
+        end_year: Optional[int],
+        expected_archives: list[str],
+    ) -> None:
+        """Tests that archives of years after the latest release of the link
+        retriever are watched, unless the end year excludes them
+
+        :param site: Stand-in site fixture
+        :type site: StandInSite
+        :param watcher: Watcher fixture
+        :type watcher: archive_watcher.ArchiveWatcher
+        :param end_year: The last year to watch
+        :type end_year: Optional[int]
+        :param expected_archives: The archives expected to be reported
+        :type expected_archives: list[str]
+        """
+        site.publish(
+            {"2024_TEOS_XML_01A.zip": b"january", "2026_TEOS_XML_01A.zip": b"later"}
+        )
+        watcher.end_year = end_year
+
+        assert list(watcher.find_changed()) == [
+            site.archive_url(archive_name) for archive_name in expected_archives
+        ]
+
+    def test_polls_page_down_expected_poll_skipped(
+        self, watcher: archive_watcher.ArchiveWatcher
+    ) -> None:
+        """Tests that a failed poll is skipped rather than stopping the watcher
+
+        :param watcher: Watcher fixture
+        :type watcher: archive_watcher.ArchiveWatcher
+        """
+        # Nothing was published, so the page is missing
+        assert list(watcher.polls(max_polls=2)) == []
+
+    def test_polls_expected_max_polls(
+        self, site: StandInSite, watcher: archive_watcher.ArchiveWatcher
+    ) -> None:
+        """Tests that the watcher stops after the requested number of polls
+
+        :param site: Stand-in site fixture
+        :type site: StandInSite
+        :param watcher: Watcher fixture
+        :type watcher: archive_watcher.ArchiveWatcher
+        """
+        site.publish({"2024_TEOS_XML_01A.zip": b"january"})
+        polls = list(watcher.polls(max_polls=3))
+        # Nothing was marked processed, so every poll reports the archive
+        assert [len(changed) for changed in polls] == [1, 1, 1]
+
+
+def _zip_filings(filings: dict[str, bytes]) -> bytes:
+    """Zip filings the way the IRS lays out monthly archives
+
+    :param filings: The contents of each XML file, keyed by name
+    :type filings: dict[str, bytes]
+    :return: The contents of the zip file
+    :rtype: bytes
+    """
+    content = io.BytesIO()
+    with zipfile.ZipFile(content, "w", zipfile.ZIP_DEFLATED) as zip_file:
+        for file_name, xml_file in filings.items():
+            zip_file.writestr(f"2024_TEOS_XML_01A/{file_name}", xml_file)
+    return content.getvalue()
+
+
+@pytest.fixture
+def run_dir(tmp_path: pathlib.Path) -> pathlib.Path:
+    """Lay out a directory to run the pipeline from, with a small gender chart
+    where the pipeline looks for it and credentials for an empty SQLite table
+
+    :param tmp_path: Function-level directory fixture
+    :type tmp_path: pathlib.Path
+    :return: The directory to run the pipeline from
+    :rtype: pathlib.Path
+    """
+    run_dir = tmp_path / "run"
+    run_dir.mkdir()
+    chart_dir = tmp_path / "src" / "irs990_parser"
+    chart_dir.mkdir(parents=True)
+    (chart_dir / "first_name_gender_probabilities.csv").write_text(
+        "Name,female_prob\nmary,1.0\n", encoding="utf-8"
+    )
+
+    database = run_dir / "irs990.sqlite"
+    with sqlite3.connect(database) as connection:
+        connection.execute(
+            f"CREATE TABLE Organizations ({', '.join(irs_field_extractor.OrganizationRow._fields)}, PRIMARY KEY (ein, irs_month, year))"
+        )
+    config = configparser.ConfigParser()
+    config[loader.Loader.CONFIG_SECTION] = {
+        loader.Loader.DRIVERNAME_CONFIG_KEY: "sqlite",
+        loader.Loader.DATABASE_CONFIG_KEY: str(database),
+        loader.Loader.TABLE_NAME_CONFIG_KEY: "Organizations",
+    }
+    with open(run_dir / "creds.ini", "w", encoding="utf-8") as f:
+        config.write(f)
+    return run_dir
+
+
+class TestWatchMode:
+    """Tests ingesting archives with the pipeline in watch mode"""
+
+    def _watch_once(self, site: StandInSite, run_dir: pathlib.Path) -> str:
+        """Run the pipeline for a single poll of the stand-in site
+
+        :param site: The stand-in site
+        :type site: StandInSite
+        :param run_dir: The directory to run the pipeline from
+        :type run_dir: pathlib.Path
+        :return: What the pipeline printed
+        :rtype: str
+        """
+        completed = subprocess.run(
+            [
+                sys.executable,
+                str(MAIN_PATH),
+                # Without an end year, the watcher follows every later year
+                "--start-year",
+                "2024",
+                "--irs-url",
+                site.page_url,
+                "--link-cache",
+                "",
+                "--credentials-file",
+                "creds.ini",
+                "--watch",
+                "--watch-polls",
+                "1",
+            ],
+            cwd=run_dir,
+            env={**os.environ, "PYTHONPATH": str(MAIN_PATH.parent)},
+            capture_output=True,
+            text=True,
+            check=True,
+            timeout=300,
+        )
+        return completed.stdout
+
+    def _read_rows(self, run_dir: pathlib.Path) -> dict[str, str]:
+        """Read the names of the loaded organizations
+
+        :param run_dir: The directory the pipeline ran from
+        :type run_dir: pathlib.Path
+        :return: The name of each organization, keyed by EIN
+        :rtype: dict[str, str]
+        """
+        with sqlite3.connect(run_dir / "irs990.sqlite") as connection:
+            return dict(
+                connection.execute(
+                    "SELECT ein, instnm FROM Organizations ORDER BY ein"
+                ).fetchall()
+            )
+
+    def test_watch_republished_archive_expected_rows_replaced(
+        self, site: StandInSite, run_dir: pathlib.Path
+    ) -> None:
+        """Tests that an archive republished after it was loaded is loaded
+        again, replacing its stored rows, and recorded as processed
+
+        :param site: Stand-in site fixture
+        :type site: StandInSite
+        :param run_dir: Pipeline directory fixture
+        :type run_dir: pathlib.Path
+        """
+        filings = {
+            file_name: (SAMPLE_DIR / file_name).read_bytes()
+            for file_name in sorted(os.listdir(SAMPLE_DIR))
+        }
+        site.publish({"2024_TEOS_XML_01A.zip": _zip_filings(filings)})
+        self._watch_once(site, run_dir)
+        loaded_rows = self._read_rows(run_dir)
+
+        filings = {
+            file_name: xml_file.replace(SAMPLE_NAME, SAMPLE_NAME + b" CORRECTED")
+            for file_name, xml_file in filings.items()
+        }
+        site.publish({"2024_TEOS_XML_01A.zip": _zip_filings(filings)})
+        output = self._watch_once(site, run_dir)
+
+        assert "Ingesting failed" not in output
+        reloaded_rows = self._read_rows(run_dir)
+        assert list(reloaded_rows) == list(loaded_rows)
+        assert f"{SAMPLE_NAME.decode()} CORRECTED" in reloaded_rows.values()
+        assert f"{SAMPLE_NAME.decode()} CORRECTED" not in loaded_rows.values()
+        with open(run_dir / "processed_archives.json", "r", encoding="utf-8") as f:
+            processed = json.load(f)
+        assert list(processed) == [site.archive_url("2024_TEOS_XML_01A.zip")]
+
+    def test_watch_sampled_expected_rejected(self, run_dir: pathlib.Path) -> None:
+        """Tests that watch mode refuses to sample archives, which it would
+        then record as ingested and never load in full
+
+        :param run_dir: Pipeline directory fixture
+        :type run_dir: pathlib.Path
+        """
+        completed = subprocess.run(
+            [
+                sys.executable,
+                str(MAIN_PATH),
+                "--start-year",
+                "2024",
+                "--credentials-file",
+                "creds.ini",
+                "--watch",
+                "--sample-n",
+                "10",
+            ],
+            cwd=run_dir,
+            env={**os.environ, "PYTHONPATH": str(MAIN_PATH.parent)},
+            capture_output=True,
+            text=True,
+            timeout=300,
+        )
+
+        assert completed.returncode == 2
+        assert "--watch" in completed.stderr
+        assert not (run_dir / "processed_archives.json").exists()
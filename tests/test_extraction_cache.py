@@ -0,0 +1,188 @@
+"""
+Tests the raw-field extraction cache
+"""
+
+import os
+import pathlib
+import sqlite3
+import zlib
+
+import bs4
+import pytest
+import pytest_mock
+
+from irs990_parser import extraction_cache, filing_parser, gender_guesser
+
+SAMPLE_FILES_DIR = pathlib.Path("sample_irs_xml_files/")
+
+
+@pytest.fixture
+def parser(mocker: pytest_mock.MockerFixture) -> filing_parser.FilingParser:
+    """Create a filing parser whose gender guesses are deterministic
+
+    :param mocker: Mock fixture
+    :type mocker: pytest_mock.MockerFixture
+    :return: A filing parser
+    :rtype: filing_parser.FilingParser
+    """
+    guesser = mocker.Mock(spec=gender_guesser.GenderGuesser)
+    guesser.guess.side_effect = lambda name: "F" if len(name) % 2 else "M"
+    return filing_parser.FilingParser(guesser)
+
+
+class TestExtractionCache:
+    """Tests the ExtractionCache class"""
+
+    @pytest.mark.parametrize(
+        "sample_file",
+        [
+            os.path.join("key_employees", "both.xml"),
+            os.path.join("key_employees", "has_non_key_employees.xml"),
+            os.path.join("key_employees", "missing_schedule_j.xml"),
+            os.path.join("trustees", "both.xml"),
+            os.path.join("compensation_review", "ceo", "true.xml"),
+            os.path.join("whistleblower_policy", "true.xml"),
+        ],
+    )
+    def test_cached_fragment_expected_same_records_as_full_filing(
+        self,
+        tmp_path: pathlib.Path,
+        parser: filing_parser.FilingParser,
+        sample_file: str,
+    ) -> None:
+        """Tests that extracting from the cached fragment matches the full filing
+
+        :param tmp_path: Function-level directory fixture
+        :type tmp_path: pathlib.Path
+        :param parser: Filing parser fixture
+        :type parser: filing_parser.FilingParser
+        :param sample_file: The sample file relative to the samples directory
+        :type sample_file: str
+        """
+        with open(SAMPLE_FILES_DIR / sample_file, "r", encoding="utf-8") as f:
+            xml_file = f.read()
+        file_name = os.path.basename(sample_file)
+        parsed_xml = bs4.BeautifulSoup(xml_file, "xml")
+
+        cache = extraction_cache.ExtractionCache(tmp_path / "cache.sqlite")
+        content_hash = extraction_cache.ExtractionCache.hash_contents(xml_file)
+        cache.put(content_hash, file_name, "01A", 2024, parsed_xml)
+        fragment = cache.get(content_hash)
+
+        assert parser.parse_organization(
+            file_name, fragment, "01A", 2024
+        ) == parser.parse_organization(file_name, parsed_xml, "01A", 2024)
+        assert parser.parse_people(file_name, fragment) == parser.parse_people(
+            file_name, parsed_xml
+        )
+
+    def test_get_uncached_filing_expected_none(self, tmp_path: pathlib.Path) -> None:
+        """Tests that a filing that was never stored is a cache miss
+
+        :param tmp_path: Function-level directory fixture
+        :type tmp_path: pathlib.Path
+        """
+        cache = extraction_cache.ExtractionCache(tmp_path / "cache.sqlite")
+        assert cache.get("not-a-hash") is None
+
+    def test_get_other_extractor_version_expected_none(
+        self, tmp_path: pathlib.Path, mocker: pytest_mock.MockerFixture
+    ) -> None:
+        """Tests that entries written by another extractor version are ignored
+
+        :param tmp_path: Function-level directory fixture
+        :type tmp_path: pathlib.Path
+        :param mocker: Mock fixture
+        :type mocker: pytest_mock.MockerFixture
+        """
+        cache = extraction_cache.ExtractionCache(tmp_path / "cache.sqlite")
+        cache.put("hash", "file.xml", "01A", 2024, bs4.BeautifulSoup("", "xml"))
+        mocker.patch.object(
+            extraction_cache.ExtractionCache, "EXTRACTOR_VERSION", "next"
+        )
+        assert cache.get("hash") is None
+
+    def test_iter_filings_expected_only_years_in_range_after_reopen(
+        self, tmp_path: pathlib.Path
+    ) -> None:
+        """Tests that cached filings persist and are filtered by year
+
+        :param tmp_path: Function-level directory fixture
+        :type tmp_path: pathlib.Path
+        """
+        cache = extraction_cache.ExtractionCache(tmp_path / "cache.sqlite")
+        empty_xml = bs4.BeautifulSoup("", "xml")
+        cache.put("a", "a.xml", "01A", 2019, empty_xml)
+        cache.put("b", "b.xml", "02A", 2020, empty_xml)
+        cache.put("c", "c.xml", "01A", 2021, empty_xml)
+        cache.close()
+
+        cache = extraction_cache.ExtractionCache(tmp_path / "cache.sqlite")
+        assert [
+            (filing.file_name, filing.irs_month, filing.year)
+            for filing in cache.iter_filings(2020, 2021)
+        ] == [("b.xml", "02A", 2020), ("c.xml", "01A", 2021)]
+
+    def test_put_same_filing_other_month_expected_both_months_kept(
+        self, tmp_path: pathlib.Path
+    ) -> None:
+        """Tests that a filing published in two monthly archives is rederived
+        for both months
+
+        :param tmp_path: Function-level directory fixture
+        :type tmp_path: pathlib.Path
+        """
+        cache = extraction_cache.ExtractionCache(tmp_path / "cache.sqlite")
+        empty_xml = bs4.BeautifulSoup("", "xml")
+        cache.put("a", "a.xml", "01A", 2024, empty_xml)
+        cache.put("a", "a.xml", "03A", 2024, empty_xml)
+        cache.put("a", "a.xml", "03A", 2024, empty_xml)
+
+        assert [
+            (filing.file_name, filing.irs_month, filing.year)
+            for filing in cache.iter_filings(2024, 2024)
+        ] == [("a.xml", "01A", 2024), ("a.xml", "03A", 2024)]
+        assert cache.get("a") is not None
+
+    def test_open_cache_keyed_by_hash_expected_filings_migrated(
+        self, tmp_path: pathlib.Path
+    ) -> None:
+        """Tests that a cache written before filings were keyed by month keeps
+        its filings
+
+        :param tmp_path: Function-level directory fixture
+        :type tmp_path: pathlib.Path
+        """
+        cache_path = tmp_path / "cache.sqlite"
+        with sqlite3.connect(cache_path) as connection:
+            connection.execute("""
+                CREATE TABLE filings (
+                    content_hash TEXT NOT NULL,
+                    extractor_version TEXT NOT NULL,
+                    file_name TEXT NOT NULL,
+                    irs_month TEXT NOT NULL,
+                    year INTEGER NOT NULL,
+                    fragment BLOB NOT NULL,
+                    PRIMARY KEY (content_hash, extractor_version)
+                )
+                """)
+            connection.execute(
+                "INSERT INTO filings VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    "a",
+                    extraction_cache.ExtractionCache.EXTRACTOR_VERSION,
+                    "a.xml",
+                    "01A",
+                    2024,
+                    zlib.compress(b"<Return></Return>"),
+                ),
+            )
+        connection.close()
+
+        cache = extraction_cache.ExtractionCache(cache_path)
+        cache.put("a", "a.xml", "03A", 2024, bs4.BeautifulSoup("", "xml"))
+
+        assert [
+            (filing.file_name, filing.irs_month)
+            for filing in cache.iter_filings(2024, 2024)
+        ] == [("a.xml", "01A"), ("a.xml", "03A")]
@@ -2,8 +2,10 @@
 Tests downloading and extracting information from IRS files
 """
 
+import io
 import os
 import pathlib
+import zipfile
 
 import pytest
 
@@ -23,6 +25,20 @@ def temp_dir(tmp_path_factory: pytest.TempPathFactory) -> pathlib.Path:
     return tmp_path_factory.mktemp(TEMP_DIR_NAME)
 
 
+@pytest.fixture
+def local_zip() -> bytes:
+    """Create a small zip file laid out like the IRS monthly archives
+
+    :return: The contents of the zip file
+    :rtype: bytes
+    """
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as zip_file:
+        for name in ["a_public.xml", "b_public.xml", "c_public.xml"]:
+            zip_file.writestr(f"2024_TEOS_XML_01A/{name}", "<Return/>")
+    return buffer.getvalue()
+
+
 class TestIRSZipFileExtractor:
     """
     Tests the IRSZipFileExtractor class
@@ -61,3 +77,40 @@ class TestIRSZipFileExtractor:
         assert path_to_xml_files == pathlib.Path(
             os.path.join(temp_dir, "2024_TEOS_XML_01A")
         )
+
+    def test_list_members_expected_file_names_without_directories(
+        self, local_zip: bytes
+    ) -> None:
+        """Tests that the files of a zip file are listed by file name
+
+        :param local_zip: The contents of a local zip file
+        :ptype local_zip: bytes
+        """
+        irs_extractor = extractor.IRSZipFileExtractor()
+        assert irs_extractor.list_members(local_zip, "2024_TEOS_XML_01A.zip") == [
+            "a_public.xml",
+            "b_public.xml",
+            "c_public.xml",
+        ]
+
+    def test_extract_archive_with_member_filter_expected_only_selected_files(
+        self, local_zip: bytes, tmp_path: pathlib.Path
+    ) -> None:
+        """Tests that only the files selected by name are extracted
+
+        :param local_zip: The contents of a local zip file
+        :ptype local_zip: bytes
+        :param tmp_path: A temporary directory
+        :ptype tmp_path: pathlib.Path
+        """
+        irs_extractor = extractor.IRSZipFileExtractor()
+        path_to_xml_files = irs_extractor.extract_archive(
+            local_zip,
+            "2024_TEOS_XML_01A.zip",
+            tmp_path,
+            lambda name: name != "b_public.xml",
+        )
+        assert sorted(os.listdir(path_to_xml_files / "2024_TEOS_XML_01A")) == [
+            "a_public.xml",
+            "c_public.xml",
+        ]
@@ -0,0 +1,79 @@
+"""
+Tests opt-in timing of the field extractors
+"""
+
+import os
+import pathlib
+
+import bs4
+import pytest
+
+from irs990_parser import custom_exceptions, extractor_timings, irs_field_extractor
+
+
+class TestExtractorTimings:
+    """Tests the ExtractorTimings class"""
+
+    SAMPLE_FILES_DIR = pathlib.Path("sample_irs_xml_files/")
+
+    def _parse_sample(self, *path: str) -> bs4.BeautifulSoup:
+        """Parse a sample IRS file
+
+        :return: The parsed XML file
+        :rtype: bs4.BeautifulSoup
+        """
+        with open(
+            os.path.join(TestExtractorTimings.SAMPLE_FILES_DIR, *path),
+            "r",
+            encoding="utf-8",
+        ) as f:
+            return bs4.BeautifulSoup(f.read(), "xml")
+
+    def test_enabled_expected_calls_and_exceptions_counted(self) -> None:
+        """Tests that calls and raised exceptions are counted while enabled"""
+        contains_ein = self._parse_sample("ein", "contains_ein.xml")
+        missing_ein = self._parse_sample("ein", "missing_ein.xml")
+
+        with extractor_timings.ExtractorTimings() as timings:
+            irs_field_extractor.EINEXtractor("a.xml", contains_ein).extract()
+            irs_field_extractor.EINEXtractor("a.xml", contains_ein).extract()
+            with pytest.raises(custom_exceptions.MissingEINException):
+                irs_field_extractor.EINEXtractor("b.xml", missing_ein).extract()
+
+        ein_timings = timings.timings["EINEXtractor.extract"]
+        assert ein_timings.calls == 3
+        assert ein_timings.exceptions == 1
+        assert ein_timings.wall_seconds > 0
+
+    def test_disabled_expected_original_methods_restored(self) -> None:
+        """Tests that disabling restores the unwrapped methods"""
+        original = irs_field_extractor.KeyEmployeeExtractor.__dict__[
+            "calculate_president_to_average_pay_ratio"
+        ]
+        timings = extractor_timings.ExtractorTimings()
+        timings.enable()
+        assert (
+            irs_field_extractor.KeyEmployeeExtractor.__dict__[
+                "calculate_president_to_average_pay_ratio"
+            ]
+            is not original
+        )
+        timings.disable()
+        assert (
+            irs_field_extractor.KeyEmployeeExtractor.__dict__[
+                "calculate_president_to_average_pay_ratio"
+            ]
+            is original
+        )
+
+    def test_report_expected_sorted_by_wall_time(self) -> None:
+        """Tests that the report lists the slowest method first"""
+        timings = extractor_timings.ExtractorTimings()
+        fast = extractor_timings.MethodTimings()
+        fast.calls, fast.wall_seconds = 10, 1.0
+        slow = extractor_timings.MethodTimings()
+        slow.calls, slow.wall_seconds = 1, 5.0
+        timings.merge({"Fast.extract": fast, "Slow.extract": slow})
+
+        rows = timings.report().splitlines()[2:]
+        assert [row.split()[0] for row in rows] == ["Slow.extract", "Fast.extract"]
@@ -38,3 +38,30 @@ class TestGenderGuesser:
 
         guesser = gender_guesser.GenderGuesser(TestGenderGuesser.PROBABILITY_CSV)
         assert guesser.guess("notinthefile") == "M"
+
+
+class TestFilingGenderGuesser:
+    """Tests guessing each first name once per filing"""
+
+    def test_guess_expected_same_guess_within_filing(
+        self, tmp_path: pathlib.Path, mocker: pytest_mock.MockerFixture
+    ) -> None:
+        """Tests that a first name is guessed once, whatever its case, while
+        other names and filings are guessed afresh
+
+        :param tmp_path: Function-level directory fixture
+        :type tmp_path: pathlib.Path
+        :param mocker: Mock fixture
+        :type mocker: pytest_mock.MockerFixture
+        """
+        csv_file_path = tmp_path / "first_name_gender_probabilities.csv"
+        csv_file_path.write_text("Name,female_prob\nmary,1.0\n", encoding="utf-8")
+        guesser = gender_guesser.GenderGuesser(csv_file_path)
+        mocker.patch("random.random", side_effect=[0.1, 0.9, 0.9, 0.9])
+
+        filing_guesser = gender_guesser.FilingGenderGuesser(guesser)
+        assert filing_guesser.guess("ALEX") == "F"
+        assert filing_guesser.guess("alex") == "F"
+        assert filing_guesser.guess("JORDAN") == "M"
+        assert filing_guesser.guess("Mary") == "F"
+        assert gender_guesser.FilingGenderGuesser(guesser).guess("ALEX") == "M"
@@ -0,0 +1,157 @@
+"""
+Tests the HTTP transport shared by the network-facing classes
+"""
+
+import http.server
+import threading
+from typing import Iterator
+
+import pytest
+import requests
+
+from irs990_parser import http_client
+
+
+class ScriptedHandler(http.server.BaseHTTPRequestHandler):
+    """Answer each request with the next status of a script, then with 200"""
+
+    statuses: list[int] = []
+    requests_seen = 0
+
+    def do_GET(self) -> None:
+        ScriptedHandler.requests_seen += 1
+        status = ScriptedHandler.statuses.pop(0) if ScriptedHandler.statuses else 200
+        self.send_response(status)
+        if status == 429:
+            self.send_header("Retry-After", "0")
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(b"ok")
+
+    do_HEAD = do_GET
+
+    def log_message(self, format: str, *args: object) -> None:
+        pass
+
+
+@pytest.fixture
+def server_url() -> Iterator[str]:
+    """Serve scripted responses on a local port
+
+    :return: The URL of the server
+    :rtype: Iterator[str]
+    """
+    ScriptedHandler.statuses = []
+    ScriptedHandler.requests_seen = 0
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), ScriptedHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/"
+    server.shutdown()
+    server.server_close()
+
+
+class TestTokenBucket:
+    """Tests the TokenBucket class"""
+
+    def test_throttle_expected_rate_halved_down_to_minimum(self) -> None:
+        """Tests that throttling halves the rate, but never stops requests"""
+        bucket = http_client.TokenBucket(rate=1, capacity=1)
+        bucket.throttle()
+        assert bucket.rate == 0.5
+        for _ in range(10):
+            bucket.throttle()
+        assert bucket.rate == http_client.TokenBucket.MIN_RATE
+
+    def test_recover_expected_rate_capped_at_starting_rate(self) -> None:
+        """Tests that the rate grows back to, but not beyond, its start"""
+        bucket = http_client.TokenBucket(rate=10, capacity=1)
+        bucket.throttle()
+        bucket.recover()
+        assert bucket.rate == 5.5
+        for _ in range(100):
+            bucket.recover()
+        assert bucket.rate == 10
+
+    def test_acquire_beyond_capacity_expected_wait(self) -> None:
+        """Tests that requests beyond a burst wait for new tokens"""
+        bucket = http_client.TokenBucket(rate=20, capacity=2)
+        bucket.acquire()
+        bucket.acquire()
+        assert bucket._tokens < 1
+        bucket.acquire()
+        assert bucket._tokens < 1
+
+
+class TestHTTPClient:
+    """Tests the HTTPClient class"""
+
+    def test_server_errors_expected_retried_until_success(
+        self, server_url: str
+    ) -> None:
+        """Tests that server errors are retried
+
+        :param server_url: Server fixture
+        :type server_url: str
+        """
+        ScriptedHandler.statuses = [500, 502]
+        client = http_client.HTTPClient(backoff_seconds=0)
+        response = client.get(server_url, timeout=5)
+        assert response.status_code == 200
+        assert ScriptedHandler.requests_seen == 3
+
+    def test_client_error_expected_not_retried(self, server_url: str) -> None:
+        """Tests that errors caused by the request are not retried
+
+        :param server_url: Server fixture
+        :type server_url: str
+        """
+        ScriptedHandler.statuses = [404]
+        client = http_client.HTTPClient(backoff_seconds=0)
+        assert client.get(server_url, timeout=5).status_code == 404
+        assert ScriptedHandler.requests_seen == 1
+
+    def test_retries_exhausted_expected_last_response(self, server_url: str) -> None:
+        """Tests that the last error is returned once retries run out
+
+        :param server_url: Server fixture
+        :type server_url: str
+        """
+        ScriptedHandler.statuses = [503] * 3
+        client = http_client.HTTPClient(max_retries=2, backoff_seconds=0)
+        assert client.get(server_url, timeout=5).status_code == 503
+        assert ScriptedHandler.requests_seen == 3
+
+    def test_throttled_expected_rate_lowered(self, server_url: str) -> None:
+        """Tests that a throttled request lowers the request rate
+
+        :param server_url: Server fixture
+        :type server_url: str
+        """
+        ScriptedHandler.statuses = [429]
+        client = http_client.HTTPClient(backoff_seconds=0, rate=100)
+        assert client.get(server_url, timeout=5).status_code == 200
+        assert client.bucket.rate < 100
+
+    def test_head_server_error_expected_retried_without_body(
+        self, server_url: str
+    ) -> None:
+        """Tests that HEAD requests are retried like GET requests
+
+        :param server_url: Server fixture
+        :type server_url: str
+        """
+        ScriptedHandler.statuses = [502]
+        client = http_client.HTTPClient(backoff_seconds=0)
+        response = client.head(server_url, timeout=5)
+        assert response.status_code == 200
+        assert response.headers["Content-Length"] == "2"
+        assert response.content == b""
+        assert ScriptedHandler.requests_seen == 2
+
+    def test_unreachable_expected_connection_error_after_retries(self) -> None:
+        """Tests that connection failures are raised once retries run out"""
+        client = http_client.HTTPClient(max_retries=1, backoff_seconds=0)
+        with pytest.raises(requests.ConnectionError):
+            # Port 9 (discard) is closed on test machines
+            client.get("http://127.0.0.1:9/", timeout=1)
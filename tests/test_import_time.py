@@ -0,0 +1,79 @@
+"""
+Tests that starting the pipeline and its parse workers stays fast
+"""
+
+import os
+import pathlib
+import subprocess
+import sys
+
+import pytest
+
+SRC_DIR = pathlib.Path("../src").resolve()
+
+
+def _run_python(*args: str) -> subprocess.CompletedProcess:
+    """Run a fresh interpreter with the package on its path
+
+    :return: The completed process, with stdout and stderr captured as text
+    :rtype: subprocess.CompletedProcess
+    """
+    return subprocess.run(
+        [sys.executable, *args],
+        env={**os.environ, "PYTHONPATH": str(SRC_DIR)},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+class TestImportTime:
+    """Tests the import cost of the entry point and worker modules"""
+
+    # Only imported by the code paths that need them
+    DEFERRED_MODULES = ["pandas", "sqlalchemy", "requests", "zipfile_deflate64"]
+    # Only imported by modules that parse filings
+    PARSER_MODULES = ["irs990_parser.api", "pydantic", "bs4"]
+    # Generous, so slow machines pass while eager heavy imports still fail
+    IMPORT_BUDGET_SEC = 1.0
+
+    @pytest.mark.parametrize("module", ["main", "irs990_parser.parse_pool"])
+    def test_import_expected_heavy_modules_deferred(self, module: str) -> None:
+        """Tests that importing the entry point or worker module, which spawned
+        workers also do, does not import heavy dependencies
+
+        :param module: The module to import
+        :type module: str
+        """
+        completed = _run_python(
+            "-c",
+            f"import sys, {module}; print(' '.join(sys.modules))",
+        )
+        imported = set(completed.stdout.split())
+        assert imported.isdisjoint(TestImportTime.DEFERRED_MODULES)
+
+    @pytest.mark.parametrize(
+        "module", ["irs990_parser.archive_reader", "irs990_parser.sharding"]
+    )
+    def test_import_submodule_expected_library_api_deferred(self, module: str) -> None:
+        """Tests that importing a submodule, which runs the package first, does
+        not import the library API and the parser it needs
+
+        :param module: The module to import
+        :type module: str
+        """
+        completed = _run_python(
+            "-c",
+            f"import sys, {module}; print(' '.join(sys.modules))",
+        )
+        imported = set(completed.stdout.split())
+        assert imported.isdisjoint(
+            [*TestImportTime.DEFERRED_MODULES, *TestImportTime.PARSER_MODULES]
+        )
+
+    def test_import_main_expected_within_budget(self) -> None:
+        """Tests that importing the entry point stays within the time budget"""
+        completed = _run_python("-X", "importtime", "-c", "import main")
+        # The last line reports the cumulative time of main in microseconds
+        cumulative_us = int(completed.stderr.strip().splitlines()[-1].split("|")[1])
+        assert cumulative_us / 1e6 < TestImportTime.IMPORT_BUDGET_SEC
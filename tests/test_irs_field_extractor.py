@@ -4,6 +4,7 @@ Tests all implementations of IRSFieldExtractor
 
 import os
 import pathlib
+from typing import Optional
 
 import bs4
 import pytest
@@ -165,6 +166,29 @@ class TestIRSFieldExtractor:
                 org_name_extractor.extract()
             assert f"Filer section missing from file {file_name}" in str(excinfo)
 
+    @pytest.mark.parametrize(
+        "file_name, expected_state",
+        [("us_address.xml", "CO"), ("foreign_address.xml", None)],
+    )
+    def test_state_extractor_expected_filer_state(
+        self, file_name: str, expected_state: Optional[str]
+    ) -> None:
+        """Tests for extracting the state of the filer's address, and not of
+        the preparer's
+
+        :param file_name: The name of the sample file
+        :type file_name: str
+        :param expected_state: The state of the filer
+        :type expected_state: Optional[str]
+        """
+        state_path = pathlib.Path(
+            os.path.join(TestIRSFieldExtractor.SAMPLE_FILES_DIR, "state", file_name)
+        )
+        with open(state_path, "r", encoding="utf-8") as f:
+            parsed_xml = bs4.BeautifulSoup(f.read(), "xml")
+            state_extractor = irs_field_extractor.StateExtractor(file_name, parsed_xml)
+            assert state_extractor.extract() == expected_state
+
     def test_total_compensation_extractor_expected_122207(self) -> None:
         """Tests for proper extraction of total compensation"""
         total_compensation_path = pathlib.Path(
@@ -823,4 +847,98 @@ class TestIRSFieldExtractor:
         :type base_value: float
         """
         print(percentage * (base_value / 100))
-        return percentage * (base_value / 100)
\ No newline at end of file
+        return percentage * (base_value / 100)
+
+
+class TestPersonExtractor:
+    """
+    Tests extraction of person-level records from Part VII and Schedule J
+    """
+
+    SAMPLE_FILES_DIR = pathlib.Path("sample_irs_xml_files/")
+
+    def test_person_extractor_expected_part_vii_and_schedule_j_rows(
+        self, mocker: pytest_mock.MockerFixture
+    ) -> None:
+        """Tests that every Part VII and Schedule J person is extracted
+
+        :param mocker: Mock fixture
+        :type mocker: pytest_mock.MockerFixture
+        """
+        both_path = pathlib.Path(
+            os.path.join(
+                TestPersonExtractor.SAMPLE_FILES_DIR, "key_employees", "both.xml"
+            )
+        )
+        guesser = mocker.Mock(spec=gender_guesser.GenderGuesser)
+        guesser.guess.return_value = "F"
+        with open(both_path, "r", encoding="utf-8") as f:
+            parsed_xml = bs4.BeautifulSoup(f.read(), "xml")
+            people = irs_field_extractor.PersonExtractor(
+                "202400000000000000_public.xml", parsed_xml, guesser
+            ).extract()
+
+        part_vii = [person for person in people if person.source == "part_vii"]
+        schedule_j = [person for person in people if person.source == "schedule_j"]
+        assert len(part_vii) == 20
+        assert len(schedule_j) == 2
+        assert all(person.ein == "640579585" for person in people)
+        assert all(person.object_id == "202400000000000000" for person in people)
+        assert all(person.gender == "F" for person in people)
+
+    def test_person_extractor_expected_president_fields(
+        self, mocker: pytest_mock.MockerFixture
+    ) -> None:
+        """Tests that role checkboxes and compensation amounts are extracted
+
+        :param mocker: Mock fixture
+        :type mocker: pytest_mock.MockerFixture
+        """
+        both_path = pathlib.Path(
+            os.path.join(
+                TestPersonExtractor.SAMPLE_FILES_DIR, "key_employees", "both.xml"
+            )
+        )
+        guesser = mocker.Mock(spec=gender_guesser.GenderGuesser)
+        guesser.guess.return_value = "M"
+        with open(both_path, "r", encoding="utf-8") as f:
+            parsed_xml = bs4.BeautifulSoup(f.read(), "xml")
+            people = irs_field_extractor.PersonExtractor(
+                os.path.basename(both_path), parsed_xml, guesser
+            ).extract()
+
+        part_vii_president, schedule_j_president = [
+            person for person in people if person.person_name == "DR MATT AYARS"
+        ]
+        assert part_vii_president.officer is True
+        assert part_vii_president.individual_trustee_or_director is False
+        assert part_vii_president.reportable_comp_from_org == 123197.0
+        assert part_vii_president.total_compensation is None
+        assert schedule_j_president.officer is None
+        assert schedule_j_president.base_compensation == 123197.0
+        assert schedule_j_president.total_compensation == 151195.0
+
+    def test_person_extractor_missing_schedule_j_expected_only_part_vii_rows(
+        self, mocker: pytest_mock.MockerFixture
+    ) -> None:
+        """Tests that a missing Schedule J yields only Part VII rows
+
+        :param mocker: Mock fixture
+        :type mocker: pytest_mock.MockerFixture
+        """
+        missing_schedule_j_path = pathlib.Path(
+            os.path.join(
+                TestPersonExtractor.SAMPLE_FILES_DIR,
+                "key_employees",
+                "missing_schedule_j.xml",
+            )
+        )
+        guesser = mocker.Mock(spec=gender_guesser.GenderGuesser)
+        guesser.guess.return_value = "M"
+        with open(missing_schedule_j_path, "r", encoding="utf-8") as f:
+            parsed_xml = bs4.BeautifulSoup(f.read(), "xml")
+            people = irs_field_extractor.PersonExtractor(
+                os.path.basename(missing_schedule_j_path), parsed_xml, guesser
+            ).extract()
+
+        assert all(person.source == "part_vii" for person in people)
@@ -0,0 +1,180 @@
+"""
+Tests discovering and caching the links on the IRS downloads page
+"""
+
+import functools
+import http.server
+import pathlib
+import threading
+from typing import Iterator
+
+import pytest
+import requests
+
+from irs990_parser import custom_exceptions, link_retriever
+
+ZIP_LINKS = [
+    f"https://apps.irs.gov/pub/epostcard/990/xml/{year}/{year}_TEOS_XML_01A.zip"
+    for year in [2022, 2023, 2024]
+]
+PAGE_NAME = "form-990-series-downloads"
+
+
+class RecordingHandler(http.server.SimpleHTTPRequestHandler):
+    """Serve files, recording the status of every response"""
+
+    statuses: list[int] = []
+
+    def send_response(self, code: int, message: str | None = None) -> None:
+        RecordingHandler.statuses.append(code)
+        super().send_response(code, message)
+
+    def log_message(self, format: str, *args: object) -> None:
+        pass
+
+
+@pytest.fixture
+def downloads_url(tmp_path: pathlib.Path) -> Iterator[str]:
+    """Serve a downloads page laid out like the IRS website
+
+    :param tmp_path: Function-level directory fixture
+    :type tmp_path: pathlib.Path
+    :return: The URL of the downloads page
+    :rtype: Iterator[str]
+    """
+    site_dir = tmp_path / "site"
+    site_dir.mkdir()
+    links = "".join(f'<a href="{link}">{link}</a>' for link in ZIP_LINKS)
+    (site_dir / PAGE_NAME).write_text(
+        f'<html><body><div class="collapsible-item-body">{links}</div></body></html>',
+        encoding="utf-8",
+    )
+    RecordingHandler.statuses = []
+    server = http.server.ThreadingHTTPServer(
+        ("127.0.0.1", 0),
+        functools.partial(RecordingHandler, directory=str(site_dir)),
+    )
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/{PAGE_NAME}"
+    server.shutdown()
+    server.server_close()
+
+
+class TestIRS990LinkRetriever:
+    """Tests the IRS990LinkRetriever class"""
+
+    def test_get_zip_links_expected_links_within_year_range(
+        self, downloads_url: str
+    ) -> None:
+        """Tests that only the links of the selected years are returned
+
+        :param downloads_url: Downloads page fixture
+        :type downloads_url: str
+        """
+        retriever = link_retriever.IRS990LinkRetriever(2023, 2024, downloads_url)
+        assert retriever.get_zip_links() == ZIP_LINKS[1:]
+
+    def test_fresh_cache_expected_page_not_fetched(
+        self, downloads_url: str, tmp_path: pathlib.Path
+    ) -> None:
+        """Tests that cached links are used until they expire
+
+        :param downloads_url: Downloads page fixture
+        :type downloads_url: str
+        :param tmp_path: Function-level directory fixture
+        :type tmp_path: pathlib.Path
+        """
+        link_cache = link_retriever.LinkCache(tmp_path / "links.json")
+        link_retriever.IRS990LinkRetriever(2022, 2024, downloads_url, link_cache)
+        retriever = link_retriever.IRS990LinkRetriever(
+            2022, 2024, downloads_url, link_cache
+        )
+        assert RecordingHandler.statuses == [200]
+        assert retriever.get_zip_links() == ZIP_LINKS
+
+    def test_expired_cache_expected_page_revalidated(
+        self, downloads_url: str, tmp_path: pathlib.Path
+    ) -> None:
+        """Tests that expired links are revalidated with a conditional request
+
+        :param downloads_url: Downloads page fixture
+        :type downloads_url: str
+        :param tmp_path: Function-level directory fixture
+        :type tmp_path: pathlib.Path
+        """
+        link_cache = link_retriever.LinkCache(tmp_path / "links.json")
+        link_retriever.IRS990LinkRetriever(2022, 2024, downloads_url, link_cache)
+        first_fetch = link_cache.get(downloads_url).fetched_at
+        retriever = link_retriever.IRS990LinkRetriever(
+            2022, 2024, downloads_url, link_cache, ttl_seconds=0
+        )
+        assert RecordingHandler.statuses == [200, 304]
+        assert retriever.get_zip_links() == ZIP_LINKS
+        assert link_cache.get(downloads_url).fetched_at > first_fetch
+
+    def test_offline_expected_cached_links_without_request(
+        self, downloads_url: str, tmp_path: pathlib.Path
+    ) -> None:
+        """Tests that offline mode uses expired links without a request
+
+        :param downloads_url: Downloads page fixture
+        :type downloads_url: str
+        :param tmp_path: Function-level directory fixture
+        :type tmp_path: pathlib.Path
+        """
+        link_cache = link_retriever.LinkCache(tmp_path / "links.json")
+        link_retriever.IRS990LinkRetriever(2022, 2024, downloads_url, link_cache)
+        retriever = link_retriever.IRS990LinkRetriever(
+            2022, 2024, downloads_url, link_cache, ttl_seconds=0, offline=True
+        )
+        assert RecordingHandler.statuses == [200]
+        assert retriever.get_zip_links() == ZIP_LINKS
+
+    def test_offline_without_cache_expected_links_unavailable_error(
+        self, tmp_path: pathlib.Path
+    ) -> None:
+        """Tests that offline mode fails when the page was never cached
+
+        :param tmp_path: Function-level directory fixture
+        :type tmp_path: pathlib.Path
+        """
+        with pytest.raises(custom_exceptions.LinksUnavailableException):
+            link_retriever.IRS990LinkRetriever(
+                2022,
+                2024,
+                link_cache=link_retriever.LinkCache(tmp_path / "links.json"),
+                offline=True,
+            )
+
+    def test_page_unreachable_expected_expired_cached_links(
+        self, downloads_url: str, tmp_path: pathlib.Path
+    ) -> None:
+        """Tests that expired links are used when the page cannot be fetched
+
+        :param downloads_url: Downloads page fixture
+        :type downloads_url: str
+        :param tmp_path: Function-level directory fixture
+        :type tmp_path: pathlib.Path
+        """
+        link_cache = link_retriever.LinkCache(tmp_path / "links.json")
+        link_retriever.IRS990LinkRetriever(2022, 2024, downloads_url, link_cache)
+        missing_url = downloads_url.replace(PAGE_NAME, "missing")
+        link_cache.put(missing_url, link_cache.get(downloads_url))
+        retriever = link_retriever.IRS990LinkRetriever(
+            2022, 2024, missing_url, link_cache, ttl_seconds=0
+        )
+        assert RecordingHandler.statuses == [200, 404]
+        assert retriever.get_zip_links() == ZIP_LINKS
+
+    def test_page_unreachable_without_cache_expected_request_error(
+        self, downloads_url: str
+    ) -> None:
+        """Tests that a failed fetch is raised when nothing is cached
+
+        :param downloads_url: Downloads page fixture
+        :type downloads_url: str
+        """
+        with pytest.raises(requests.HTTPError):
+            link_retriever.IRS990LinkRetriever(
+                2022, 2024, downloads_url.replace(PAGE_NAME, "missing")
+            )
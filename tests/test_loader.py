@@ -4,10 +4,13 @@ Tests loader functionality
 
 import configparser
 import pathlib
+import sqlite3
 
 import pytest
+import pytest_mock
+import sqlalchemy
 
-from irs990_parser import loader
+from irs990_parser import irs_field_extractor, loader
 
 
 class TestLoaderFileValidation:
@@ -36,3 +39,144 @@ class TestLoaderFileValidation:
         with pytest.raises(ValueError) as excinfo:
             data_loader = loader.Loader(fake_file)
         assert f"{fake_file} does not lead to an ini file" in str(excinfo)
+
+
+@pytest.fixture
+def sqlite_loader(tmp_path: pathlib.Path) -> loader.Loader:
+    """Create a loader connected to an empty SQLite table
+
+    :param tmp_path: Function-level directory fixture
+    :type tmp_path: pathlib.Path
+    :return: A loader writing into the SQLite table
+    :rtype: loader.Loader
+    """
+    database = tmp_path / "irs990.sqlite"
+    with sqlite3.connect(database) as connection:
+        connection.execute(
+            f"CREATE TABLE Organizations ({', '.join(irs_field_extractor.OrganizationRow._fields)}, PRIMARY KEY (ein, irs_month, year))"
+        )
+
+    config = configparser.ConfigParser()
+    config[loader.Loader.CONFIG_SECTION] = {
+        loader.Loader.DRIVERNAME_CONFIG_KEY: "sqlite",
+        loader.Loader.DATABASE_CONFIG_KEY: str(database),
+        loader.Loader.TABLE_NAME_CONFIG_KEY: "Organizations",
+    }
+    config_path = tmp_path / "creds.ini"
+    with open(config_path, "w", encoding="utf-8") as f:
+        config.write(f)
+    return loader.Loader(config_path)
+
+
+def _make_row(ein: str, instnm: str = "ORG") -> irs_field_extractor.OrganizationRow:
+    """Create an organization row with empty metrics
+
+    :param ein: The EIN
+    :type ein: str
+    :param instnm: The organization name
+    :type instnm: str
+    :return: An organization row
+    :rtype: irs_field_extractor.OrganizationRow
+    """
+    return irs_field_extractor.OrganizationRow(
+        ein, instnm, "01A", 2024, 0.5, None, True, None, False, None, 2.0
+    )
+
+
+class TestLoaderLoadRows:
+    """Tests loading rows with batched executemany statements"""
+
+    def test_load_rows_duplicate_primary_keys_expected_first_kept(
+        self, sqlite_loader: loader.Loader
+    ) -> None:
+        """Tests that rows with a repeated primary key are skipped
+
+        :param sqlite_loader: Loader connected to an empty SQLite table
+        :type sqlite_loader: loader.Loader
+        """
+        sqlite_loader.load_rows(
+            [_make_row("1", "FIRST"), _make_row("2"), _make_row("1", "SECOND")]
+        )
+        with sqlite3.connect(sqlite_loader.database) as connection:
+            rows = connection.execute(
+                "SELECT ein, instnm, whistleblower_policy FROM Organizations ORDER BY ein"
+            ).fetchall()
+        assert rows == [("1", "FIRST", 1), ("2", "ORG", 1)]
+
+    def test_load_rows_more_rows_than_batch_expected_all_inserted(
+        self, sqlite_loader: loader.Loader, mocker: pytest_mock.MockerFixture
+    ) -> None:
+        """Tests that rows spanning several batches are all inserted
+
+        :param sqlite_loader: Loader connected to an empty SQLite table
+        :type sqlite_loader: loader.Loader
+        :param mocker: Mock fixture
+        :type mocker: pytest_mock.MockerFixture
+        """
+        mocker.patch.object(loader.Loader, "INSERT_BATCH_SIZE", 2)
+        sqlite_loader.load_rows([_make_row(str(ein)) for ein in range(5)])
+        with sqlite3.connect(sqlite_loader.database) as connection:
+            (count,) = connection.execute(
+                "SELECT COUNT(*) FROM Organizations"
+            ).fetchone()
+        assert count == 5
+
+    def test_load_rows_twice_expected_engine_reused(
+        self, sqlite_loader: loader.Loader
+    ) -> None:
+        """Tests that consecutive loads share one engine until the loader is
+        closed
+
+        :param sqlite_loader: Loader connected to an empty SQLite table
+        :type sqlite_loader: loader.Loader
+        """
+        sqlite_loader.load_rows([_make_row("1")])
+        engine = sqlite_loader._engine
+        sqlite_loader.load_rows([_make_row("2")])
+        assert sqlite_loader._engine is engine
+
+        sqlite_loader.close()
+        assert sqlite_loader._engine is None
+
+    def test_load_rows_again_expected_stored_rows_replaced(
+        self, sqlite_loader: loader.Loader
+    ) -> None:
+        """Tests that loading rows already stored, as a republished or retried
+        archive does, replaces them instead of failing on the primary key
+
+        :param sqlite_loader: Loader connected to an empty SQLite table
+        :type sqlite_loader: loader.Loader
+        """
+        sqlite_loader.load_rows([_make_row("1", "FIRST"), _make_row("2")])
+        sqlite_loader.load_rows([_make_row("1", "CORRECTED")])
+        with sqlite3.connect(sqlite_loader.database) as connection:
+            rows = connection.execute(
+                "SELECT ein, instnm FROM Organizations ORDER BY ein"
+            ).fetchall()
+        assert rows == [("1", "CORRECTED"), ("2", "ORG")]
+
+    def test_build_upsert_statement_mysql_expected_on_duplicate_key_update(
+        self, sqlite_loader: loader.Loader
+    ) -> None:
+        """Tests that MySQL rows are upserted by a single INSERT statement,
+        which mysql-connector sends as one multi-row INSERT per batch
+
+        :param sqlite_loader: Loader connected to an empty SQLite table
+        :type sqlite_loader: loader.Loader
+        """
+        engine = sqlalchemy.create_engine("mysql+mysqlconnector://user@localhost/irs")
+
+        statement = sqlite_loader._build_upsert_statement(engine)
+
+        assert statement.startswith("INSERT INTO `Organizations`")
+        assert statement.endswith(
+            "ON DUPLICATE KEY UPDATE instnm = VALUES(instnm), "
+            "percentage_women_trustees = VALUES(percentage_women_trustees), "
+            "percentage_women_key_employees = VALUES(percentage_women_key_employees), "
+            "whistleblower_policy = VALUES(whistleblower_policy), "
+            "ceo_reviewed_compensation = VALUES(ceo_reviewed_compensation), "
+            "other_reviewed_compensation = VALUES(other_reviewed_compensation), "
+            "male_to_female_pay_ratio = VALUES(male_to_female_pay_ratio), "
+            "president_to_average_pay_ratio = VALUES(president_to_average_pay_ratio), "
+            "state = VALUES(state)"
+        )
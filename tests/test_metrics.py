@@ -0,0 +1,88 @@
+"""
+Tests pipeline throughput metrics
+"""
+
+import json
+import pathlib
+
+import pytest
+
+from irs990_parser import metrics
+
+
+class TestHistogram:
+    """Tests the Histogram class"""
+
+    def test_histogram_expected_cumulative_prometheus_buckets(self) -> None:
+        """Tests that buckets are rendered cumulatively with sum and count"""
+        histogram = metrics.Histogram("latency_seconds", "Latency", [0.1, 1])
+        histogram.observe(0.05, stage="parse")
+        histogram.observe(0.5, stage="parse")
+        histogram.observe(5, stage="parse")
+
+        assert histogram.to_prometheus_lines() == [
+            'latency_seconds_bucket{stage="parse",le="0.1"} 1',
+            'latency_seconds_bucket{stage="parse",le="1.0"} 2',
+            'latency_seconds_bucket{stage="parse",le="+Inf"} 3',
+            'latency_seconds_sum{stage="parse"} 5.55',
+            'latency_seconds_count{stage="parse"} 3',
+        ]
+
+
+class TestPipelineMetrics:
+    """Tests the PipelineMetrics class"""
+
+    def test_time_stage_raises_expected_failure_counted(self) -> None:
+        """Tests that a failing stage counts a failure and no completed item"""
+        run_metrics = metrics.PipelineMetrics()
+        with pytest.raises(ValueError):
+            with run_metrics.time_stage(metrics.PipelineMetrics.LOAD_STAGE):
+                raise ValueError("load failed")
+
+        assert run_metrics.failures.values == {"load": 1}
+        assert run_metrics.files_processed.values == {}
+
+    def test_write_prometheus_textfile_expected_help_and_type_lines(
+        self, tmp_path: pathlib.Path
+    ) -> None:
+        """Tests that the textfile follows the Prometheus exposition format
+
+        :param tmp_path: Function-level directory fixture
+        :type tmp_path: pathlib.Path
+        """
+        run_metrics = metrics.PipelineMetrics()
+        run_metrics.downloaded_bytes.inc(1024)
+        textfile = tmp_path / "irs990.prom"
+        run_metrics.write_prometheus_textfile(textfile)
+
+        lines = textfile.read_text(encoding="utf-8").splitlines()
+        assert "# TYPE irs990_downloaded_bytes_total counter" in lines
+        assert "irs990_downloaded_bytes_total 1024" in lines
+        assert "# TYPE irs990_stage_duration_seconds histogram" in lines
+        assert not (tmp_path / "irs990.prom.tmp").exists()
+
+    def test_write_json_report_expected_per_stage_summary(
+        self, tmp_path: pathlib.Path
+    ) -> None:
+        """Tests that the JSON report summarizes every stage
+
+        :param tmp_path: Function-level directory fixture
+        :type tmp_path: pathlib.Path
+        """
+        run_metrics = metrics.PipelineMetrics()
+        run_metrics.observe_stage(metrics.PipelineMetrics.PARSE_STAGE, 0.5)
+        run_metrics.observe_stage(metrics.PipelineMetrics.PARSE_STAGE, 1.5)
+        run_metrics.rows_loaded.inc(2)
+        report_path = tmp_path / "report.json"
+        run_metrics.write_json_report(report_path)
+
+        with open(report_path, "r", encoding="utf-8") as f:
+            report = json.load(f)
+        assert report["rows_loaded"] == 2
+        assert report["stages"]["parse"] == {
+            "count": 2,
+            "seconds": 2.0,
+            "mean_seconds": 1.0,
+            "per_second": 1.0,
+            "failures": 0,
+        }
@@ -0,0 +1,237 @@
+"""
+Tests writing extracted data into a partitioned Parquet dataset
+"""
+
+import pathlib
+
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+import pydantic
+import pytest
+import pytest_mock
+
+from irs990_parser import irs_field_extractor, parquet_writer
+
+
+def _make_organization(
+    ein: str, irs_month: str, year: int, instnm: str = "ORG"
+) -> irs_field_extractor.OrganizationRow:
+    """Create an organization row
+
+    :param ein: The EIN
+    :type ein: str
+    :param irs_month: The IRS month
+    :type irs_month: str
+    :param year: The year
+    :type year: int
+    :param instnm: The organization name
+    :type instnm: str
+    :return: An organization row
+    :rtype: irs_field_extractor.OrganizationRow
+    """
+    return irs_field_extractor.OrganizationRow(
+        ein=ein,
+        instnm=instnm,
+        irs_month=irs_month,
+        year=year,
+        percentage_women_trustees=0.5,
+        percentage_women_key_employees=None,
+        whistleblower_policy=True,
+        ceo_reviewed_compensation=None,
+        other_reviewed_compensation=False,
+        male_to_female_pay_ratio=None,
+        president_to_average_pay_ratio=2.0,
+    )
+
+
+class TestParquetDatasetWriter:
+    """Tests the ParquetDatasetWriter class"""
+
+    def test_write_expected_hive_partition_directories(
+        self, tmp_path: pathlib.Path
+    ) -> None:
+        """Tests that records are split into year and month partitions
+
+        :param tmp_path: Function-level directory fixture
+        :type tmp_path: pathlib.Path
+        """
+        writer = parquet_writer.ParquetDatasetWriter(tmp_path)
+        writer.write(
+            [
+                _make_organization("1", "01A", 2024),
+                _make_organization("2", "02A", 2024),
+            ]
+        )
+        assert (tmp_path / "year=2024" / "irs_month=01A").is_dir()
+        assert (tmp_path / "year=2024" / "irs_month=02A").is_dir()
+
+    def test_write_duplicate_primary_keys_expected_first_kept(
+        self, tmp_path: pathlib.Path
+    ) -> None:
+        """Tests that duplicate primary keys keep the first record
+
+        :param tmp_path: Function-level directory fixture
+        :type tmp_path: pathlib.Path
+        """
+        writer = parquet_writer.ParquetDatasetWriter(tmp_path)
+        writer.write(
+            [
+                _make_organization("1", "01A", 2024, "FIRST"),
+                _make_organization("1", "01A", 2024, "SECOND"),
+            ]
+        )
+        table = ds.dataset(tmp_path, partitioning="hive").to_table()
+        assert table.column("instnm").to_pylist() == ["FIRST"]
+
+    def test_write_same_month_twice_expected_partition_replaced(
+        self, tmp_path: pathlib.Path
+    ) -> None:
+        """Tests that rewriting a month replaces only that month's partition
+
+        :param tmp_path: Function-level directory fixture
+        :type tmp_path: pathlib.Path
+        """
+        writer = parquet_writer.ParquetDatasetWriter(tmp_path)
+        writer.write([_make_organization("1", "01A", 2024)])
+        writer.write([_make_organization("2", "02A", 2024)])
+        writer.write([_make_organization("3", "02A", 2024)])
+
+        table = ds.dataset(tmp_path, partitioning="hive").to_table()
+        assert sorted(table.column("ein").to_pylist()) == ["1", "3"]
+
+    def test_write_invalid_row_expected_validation_error(
+        self, tmp_path: pathlib.Path
+    ) -> None:
+        """Tests that rows are validated before anything is written
+
+        :param tmp_path: Function-level directory fixture
+        :type tmp_path: pathlib.Path
+        """
+        writer = parquet_writer.ParquetDatasetWriter(tmp_path)
+        invalid_row = _make_organization("1", "01A", 2024)._replace(ein=None)
+        with pytest.raises(pydantic.ValidationError):
+            writer.write([_make_organization("2", "01A", 2024), invalid_row])
+        assert not any(tmp_path.iterdir())
+
+    def test_write_expected_column_statistics(self, tmp_path: pathlib.Path) -> None:
+        """Tests that written row groups carry min/max statistics
+
+        :param tmp_path: Function-level directory fixture
+        :type tmp_path: pathlib.Path
+        """
+        writer = parquet_writer.ParquetDatasetWriter(tmp_path)
+        writer.write(
+            [
+                _make_organization("1", "01A", 2024),
+                _make_organization("9", "01A", 2024),
+            ]
+        )
+        (parquet_file,) = (tmp_path / "year=2024" / "irs_month=01A").iterdir()
+        row_group = pq.ParquetFile(parquet_file).metadata.row_group(0)
+        ein_statistics = row_group.column(0).statistics
+        assert ein_statistics.has_min_max
+        assert (ein_statistics.min, ein_statistics.max) == ("1", "9")
+
+
+class TestPersonParquetWriter:
+    """Tests the PersonParquetWriter class"""
+
+    def _make_person(self, ein: str) -> irs_field_extractor.PersonDataModel:
+        """Create a Schedule J person record
+
+        :param ein: The EIN
+        :type ein: str
+        :return: A person record
+        :rtype: irs_field_extractor.PersonDataModel
+        """
+        fields = dict.fromkeys(irs_field_extractor.PersonDataModel.model_fields)
+        fields.update(
+            ein=ein,
+            object_id="1",
+            source="schedule_j",
+            person_name="JANE DOE",
+            gender="F",
+            total_compensation=100.0,
+        )
+        return irs_field_extractor.PersonDataModel(**fields)
+
+    def test_write_expected_one_record_batch_per_flush(
+        self, tmp_path: pathlib.Path, mocker: pytest_mock.MockerFixture
+    ) -> None:
+        """Tests that buffered records are flushed in record batches
+
+        :param tmp_path: Function-level directory fixture
+        :type tmp_path: pathlib.Path
+        :param mocker: Mock fixture
+        :type mocker: pytest_mock.MockerFixture
+        """
+        mocker.patch.object(parquet_writer.PersonParquetWriter, "BATCH_SIZE", 2)
+        with parquet_writer.PersonParquetWriter(tmp_path, 2024, "01A") as writer:
+            writer.write([self._make_person("1"), self._make_person("2")])
+            writer.write([self._make_person("3")])
+
+        parquet_file = pq.ParquetFile(
+            tmp_path / "year=2024" / "irs_month=01A" / "part-0.parquet"
+        )
+        assert parquet_file.metadata.num_row_groups == 2
+        assert parquet_file.read().column("ein").to_pylist() == ["1", "2", "3"]
+
+    def test_reopen_month_expected_previous_data_replaced(
+        self, tmp_path: pathlib.Path
+    ) -> None:
+        """Tests that reopening a month replaces its partition
+
+        :param tmp_path: Function-level directory fixture
+        :type tmp_path: pathlib.Path
+        """
+        with parquet_writer.PersonParquetWriter(tmp_path, 2024, "01A") as writer:
+            writer.write([self._make_person("1")])
+        with parquet_writer.PersonParquetWriter(tmp_path, 2024, "01A") as writer:
+            writer.write([self._make_person("2")])
+
+        table = ds.dataset(tmp_path, partitioning="hive").to_table()
+        assert table.column("ein").to_pylist() == ["2"]
+
+    def test_exception_while_writing_expected_previous_data_kept(
+        self, tmp_path: pathlib.Path
+    ) -> None:
+        """Tests that a month whose processing fails keeps its previous
+        partition, and leaves no partial file behind
+
+        :param tmp_path: Function-level directory fixture
+        :type tmp_path: pathlib.Path
+        """
+        with parquet_writer.PersonParquetWriter(tmp_path, 2024, "01A") as writer:
+            writer.write([self._make_person("1")])
+
+        with pytest.raises(RuntimeError):
+            with parquet_writer.PersonParquetWriter(tmp_path, 2024, "01A") as writer:
+                writer.write([self._make_person("2")])
+                raise RuntimeError("parsing failed")
+
+        table = ds.dataset(tmp_path, partitioning="hive").to_table()
+        assert table.column("ein").to_pylist() == ["1"]
+        assert [path.name for path in (tmp_path / "year=2024").iterdir()] == [
+            "irs_month=01A"
+        ]
+
+    def test_open_month_expected_partition_unchanged_until_closed(
+        self, tmp_path: pathlib.Path
+    ) -> None:
+        """Tests that readers see the previous partition while a month is
+        being written
+
+        :param tmp_path: Function-level directory fixture
+        :type tmp_path: pathlib.Path
+        """
+        with parquet_writer.PersonParquetWriter(tmp_path, 2024, "01A") as writer:
+            writer.write([self._make_person("1")])
+
+        writer = parquet_writer.PersonParquetWriter(tmp_path, 2024, "01A")
+        writer.write([self._make_person("2")])
+        table = ds.dataset(tmp_path, partitioning="hive").to_table()
+        assert table.column("ein").to_pylist() == ["1"]
+
+        writer.close()
+        table = ds.dataset(tmp_path, partitioning="hive").to_table()
+        assert table.column("ein").to_pylist() == ["2"]
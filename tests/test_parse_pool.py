@@ -0,0 +1,168 @@
+"""
+Tests parsing XML files in this process and across worker processes
+"""
+
+import os
+import pathlib
+
+import pytest
+
+from irs990_parser import filing_parser, gender_guesser, parse_pool, profiling
+
+SAMPLE_FILES = [
+    os.path.join("sample_irs_xml_files", "key_employees", sample_file)
+    for sample_file in [
+        "both.xml",
+        "has_non_key_employees.xml",
+        "missing_schedule_j.xml",
+        "no_female.xml",
+        "no_male.xml",
+    ]
+]
+
+
+@pytest.fixture
+def file_parser(tmp_path: pathlib.Path) -> filing_parser.FilingFileParser:
+    """Create a file parser that can be sent to worker processes
+
+    :param tmp_path: Function-level directory fixture
+    :type tmp_path: pathlib.Path
+    :return: A file parser
+    :rtype: filing_parser.FilingFileParser
+    """
+    csv_file_path = tmp_path / "first_name_gender_probabilities.csv"
+    csv_file_path.write_text("Name,female_prob\nmary,1.0\n", encoding="utf-8")
+    return filing_parser.FilingFileParser(
+        filing_parser.FilingParser(gender_guesser.GenderGuesser(csv_file_path)),
+        include_people=True,
+    )
+
+
+class TestPlanChunks:
+    """Tests the plan_chunks function"""
+
+    def test_plan_chunks_expected_largest_first(self) -> None:
+        """Tests that chunks are dispatched from the largest files down"""
+        chunks = parse_pool.plan_chunks([1, 50, 10, 30], 1000, 1)
+
+        assert chunks == [[1], [3], [2], [0]]
+
+    def test_plan_chunks_expected_byte_cap(self) -> None:
+        """Tests that a large file is sent alone and small files are grouped
+        until their bytes reach the cap"""
+        chunks = parse_pool.plan_chunks([5, 100, 20, 5, 5, 20], 40, 32)
+
+        assert chunks == [[1], [2, 5], [0, 3, 4]]
+
+    def test_plan_chunks_expected_every_file_once(self) -> None:
+        """Tests that every file is in exactly one chunk"""
+        sizes = [index * 7 % 13 for index in range(100)]
+
+        chunks = parse_pool.plan_chunks(sizes, 30, 4)
+
+        assert sorted(index for chunk in chunks for index in chunk) == list(
+            range(len(sizes))
+        )
+        assert all(len(chunk) <= 4 for chunk in chunks)
+
+
+class TestFilingFileParser:
+    """Tests the FilingFileParser class"""
+
+    def test_parse_file_expected_people_agree_with_metrics(
+        self, file_parser: filing_parser.FilingFileParser
+    ) -> None:
+        """Tests that the key employee percentage counts the genders of the
+        filing's Schedule J person records, although unknown names are guessed
+        at random
+
+        :param file_parser: File parser fixture
+        :type file_parser: filing_parser.FilingFileParser
+        """
+        for _ in range(20):
+            organization, people, _ = file_parser.parse_file(
+                SAMPLE_FILES[0], "01A", 2024
+            )
+            genders = [
+                person.gender
+                for person in people
+                if person.source == "schedule_j" and person.gender is not None
+            ]
+
+            assert organization.percentage_women_key_employees == genders.count(
+                "F"
+            ) / len(genders)
+
+
+class TestParsePool:
+    """Tests the ParsePool class"""
+
+    @pytest.mark.parametrize("workers", [1, 2])
+    def test_parse_files_expected_rows_in_input_order(
+        self, file_parser: filing_parser.FilingFileParser, workers: int
+    ) -> None:
+        """Tests that every file is parsed and results keep the input order
+
+        :param file_parser: File parser fixture
+        :type file_parser: filing_parser.FilingFileParser
+        :param workers: The number of worker processes
+        :type workers: int
+        """
+        pool = parse_pool.ParsePool(
+            file_parser, workers, profiling.ParseInstrumentation()
+        )
+        try:
+            parsed_filings = list(pool.parse_files(SAMPLE_FILES, "01A", 2024))
+        finally:
+            pool.close()
+
+        assert [filing.trace.file_name for filing in parsed_filings] == [
+            os.path.basename(sample_file) for sample_file in SAMPLE_FILES
+        ]
+        assert all(filing.organization.year == 2024 for filing in parsed_filings)
+        assert all(filing.people is not None for filing in parsed_filings)
+        assert all(
+            filing.trace.stage_seconds.keys() >= {"read", "xml_parse", "extract"}
+            for filing in parsed_filings
+        )
+
+    def test_warm_up_expected_every_worker_started(
+        self, file_parser: filing_parser.FilingFileParser
+    ) -> None:
+        """Tests that warming up starts the workers before any file is parsed
+
+        :param file_parser: File parser fixture
+        :type file_parser: filing_parser.FilingFileParser
+        """
+        pool = parse_pool.ParsePool(file_parser, 2, profiling.ParseInstrumentation())
+        try:
+            pool.warm_up()
+            assert len(pool._executor._processes) == 2
+        finally:
+            pool.close()
+
+    def test_close_with_workers_expected_instrumentation_merged(
+        self, file_parser: filing_parser.FilingFileParser
+    ) -> None:
+        """Tests that profiles and extractor timings of workers are merged
+
+        :param file_parser: File parser fixture
+        :type file_parser: filing_parser.FilingFileParser
+        """
+        instrumentation = profiling.ParseInstrumentation(
+            profile=True, time_extractors=True
+        )
+        pool = parse_pool.ParsePool(file_parser, 2, instrumentation)
+        try:
+            list(pool.parse_files(SAMPLE_FILES, "01A", 2024))
+        finally:
+            pool.close()
+
+        assert instrumentation.stats is not None
+        profiled_functions = {
+            function_name for _, _, function_name in instrumentation.stats.stats
+        }
+        assert "parse_file" in profiled_functions
+        assert instrumentation.timings.timings["OrgNameExtractor.extract"].calls == len(
+            SAMPLE_FILES
+        )
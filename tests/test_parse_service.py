@@ -0,0 +1,304 @@
+"""
+Tests serving parse requests from a warm parse pool
+"""
+
+import json
+import os
+import pathlib
+import threading
+import urllib.error
+import urllib.request
+import zipfile
+from typing import Iterator
+
+import pydantic
+import pytest
+
+from irs990_parser import (
+    archive_reader,
+    filing_parser,
+    gender_guesser,
+    irs_field_extractor,
+    parse_pool,
+    parse_service,
+    profiling,
+)
+
+SAMPLE_DIR = os.path.join("sample_irs_xml_files", "key_employees")
+SAMPLE_FILE = os.path.join(SAMPLE_DIR, "both.xml")
+SAMPLE_EIN = "640579585"
+
+
+@pytest.fixture
+def invalid_field(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Make filings extract a whistleblower policy that is not a boolean
+
+    :param monkeypatch: Monkeypatch fixture
+    :type monkeypatch: pytest.MonkeyPatch
+    """
+    monkeypatch.setattr(
+        irs_field_extractor.WhistleblowerPolicyExtractor, "extract", lambda _: "maybe"
+    )
+
+
+@pytest.fixture
+def loaded_rows() -> list[irs_field_extractor.OrganizationRow]:
+    """Collect the rows the service is asked to load
+
+    :return: The loaded rows
+    :rtype: list[irs_field_extractor.OrganizationRow]
+    """
+    return []
+
+
+@pytest.fixture
+def service(
+    tmp_path: pathlib.Path, loaded_rows: list[irs_field_extractor.OrganizationRow]
+) -> Iterator[parse_service.ParseService]:
+    """Create a service that parses in this process and loads into a list
+
+    :param tmp_path: Function-level directory fixture
+    :type tmp_path: pathlib.Path
+    :param loaded_rows: Loaded rows fixture
+    :type loaded_rows: list[irs_field_extractor.OrganizationRow]
+    :return: The service
+    :rtype: Iterator[parse_service.ParseService]
+    """
+    csv_file_path = tmp_path / "first_name_gender_probabilities.csv"
+    csv_file_path.write_text("Name,female_prob\nmary,1.0\n", encoding="utf-8")
+    pool = parse_pool.ParsePool(
+        filing_parser.FilingFileParser(
+            filing_parser.FilingParser(gender_guesser.GenderGuesser(csv_file_path))
+        ),
+        1,
+        profiling.ParseInstrumentation(),
+    )
+    pool.warm_up()
+    yield parse_service.ParseService(
+        pool, archive_reader.ArchiveReader(), loaded_rows.extend
+    )
+    pool.close()
+
+
+@pytest.fixture
+def service_url(service: parse_service.ParseService) -> Iterator[str]:
+    """Serve the service on a local port
+
+    :param service: Service fixture
+    :type service: parse_service.ParseService
+    :return: The URL of the service
+    :rtype: Iterator[str]
+    """
+    server = service.make_server("127.0.0.1", 0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def _post(url: str, body: bytes, content_type: str) -> tuple[int, dict]:
+    """Send a POST request
+
+    :param url: The URL to request
+    :type url: str
+    :param body: The request body
+    :type body: bytes
+    :param content_type: The type of the body
+    :type content_type: str
+    :return: The status and decoded JSON body of the response
+    :rtype: tuple[int, dict]
+    """
+    request = urllib.request.Request(
+        url, data=body, headers={"Content-Type": content_type}
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=30) as response:
+            return response.status, json.load(response)
+    except urllib.error.HTTPError as e:
+        return e.code, json.load(e)
+
+
+class TestParseService:
+    """Tests the ParseService class"""
+
+    def test_handle_xml_expected_row(self, service: parse_service.ParseService) -> None:
+        """Tests that XML sent in the request is parsed into a row
+
+        :param service: Service fixture
+        :type service: parse_service.ParseService
+        """
+        with open(SAMPLE_FILE, "r", encoding="utf-8") as f:
+            xml_file = f.read()
+
+        response = service.handle({"xml": xml_file, "irs_month": "01A", "year": 2024})
+
+        assert [row["ein"] for row in response["rows"]] == [SAMPLE_EIN]
+        assert response["rows"][0]["year"] == 2024
+
+    def test_handle_paths_expected_zip_and_directory_members(
+        self, service: parse_service.ParseService, tmp_path: pathlib.Path
+    ) -> None:
+        """Tests that zip files and directories are expanded into their XML
+        files
+
+        :param service: Service fixture
+        :type service: parse_service.ParseService
+        :param tmp_path: Function-level directory fixture
+        :type tmp_path: pathlib.Path
+        """
+        zip_path = tmp_path / "2024_TEOS_XML_01A.zip"
+        with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zip_file:
+            zip_file.write(SAMPLE_FILE, "2024_TEOS_XML_01A/both.xml")
+
+        response = service.handle(
+            {"paths": [str(zip_path), SAMPLE_DIR], "irs_month": "01A", "year": 2024}
+        )
+
+        assert len(response["rows"]) == 1 + len(os.listdir(SAMPLE_DIR))
+
+    def test_handle_load_expected_rows_loaded(
+        self,
+        service: parse_service.ParseService,
+        loaded_rows: list[irs_field_extractor.OrganizationRow],
+    ) -> None:
+        """Tests that rows are sent to the output instead of returned when asked
+
+        :param service: Service fixture
+        :type service: parse_service.ParseService
+        :param loaded_rows: Loaded rows fixture
+        :type loaded_rows: list[irs_field_extractor.OrganizationRow]
+        """
+        response = service.handle(
+            {"paths": [SAMPLE_FILE], "irs_month": "01A", "year": 2024, "load": True}
+        )
+
+        assert response == {"loaded": 1}
+        assert [row.ein for row in loaded_rows] == [SAMPLE_EIN]
+
+    @pytest.mark.usefixtures("invalid_field")
+    def test_handle_invalid_field_expected_validation_error(
+        self, service: parse_service.ParseService
+    ) -> None:
+        """Tests that rows are validated before being returned
+
+        :param service: Service fixture
+        :type service: parse_service.ParseService
+        """
+        with pytest.raises(pydantic.ValidationError):
+            service.handle({"paths": [SAMPLE_FILE], "irs_month": "01A", "year": 2024})
+
+    @pytest.mark.parametrize(
+        "request_body",
+        [
+            {"irs_month": "01A", "year": 2024},
+            {"xml": "", "paths": [], "irs_month": "01A", "year": 2024},
+            {"paths": [SAMPLE_FILE], "year": 2024},
+        ],
+    )
+    def test_handle_malformed_expected_value_error(
+        self, service: parse_service.ParseService, request_body: dict
+    ) -> None:
+        """Tests that requests without exactly one input or a date are rejected
+
+        :param service: Service fixture
+        :type service: parse_service.ParseService
+        :param request_body: The malformed request
+        :type request_body: dict
+        """
+        with pytest.raises(ValueError):
+            service.handle(request_body)
+
+
+class TestParseRequestHandler:
+    """Tests the HTTP endpoints of the service"""
+
+    def test_post_xml_expected_rows(self, service_url: str) -> None:
+        """Tests that XML posted with its date in the query string is parsed
+
+        :param service_url: Served service fixture
+        :type service_url: str
+        """
+        with open(SAMPLE_FILE, "rb") as f:
+            status, body = _post(
+                f"{service_url}/parse?irs_month=01A&year=2024",
+                f.read(),
+                "application/xml",
+            )
+
+        assert status == 200
+        assert [row["ein"] for row in body["rows"]] == [SAMPLE_EIN]
+
+    def test_post_json_load_expected_loaded(
+        self,
+        service_url: str,
+        loaded_rows: list[irs_field_extractor.OrganizationRow],
+    ) -> None:
+        """Tests that a JSON request can load rows into the output
+
+        :param service_url: Served service fixture
+        :type service_url: str
+        :param loaded_rows: Loaded rows fixture
+        :type loaded_rows: list[irs_field_extractor.OrganizationRow]
+        """
+        status, body = _post(
+            f"{service_url}/parse",
+            json.dumps(
+                {"paths": [SAMPLE_FILE], "irs_month": "01A", "year": 2024, "load": 1}
+            ).encode("utf-8"),
+            "application/json",
+        )
+
+        assert (status, body) == (200, {"loaded": 1})
+        assert len(loaded_rows) == 1
+
+    @pytest.mark.parametrize(
+        "request_body, expected_status",
+        [
+            ({"paths": ["missing.xml"], "irs_month": "01A", "year": 2024}, 404),
+            ({"paths": [SAMPLE_FILE]}, 400),
+            ([], 400),
+        ],
+    )
+    def test_post_bad_request_expected_error_status(
+        self, service_url: str, request_body: object, expected_status: int
+    ) -> None:
+        """Tests that bad requests are answered with an error, and the service
+        keeps serving
+
+        :param service_url: Served service fixture
+        :type service_url: str
+        :param request_body: The bad request
+        :type request_body: object
+        :param expected_status: The expected HTTP status
+        :type expected_status: int
+        """
+        status, body = _post(
+            f"{service_url}/parse",
+            json.dumps(request_body).encode("utf-8"),
+            "application/json",
+        )
+
+        assert status == expected_status
+        assert "error" in body
+        with urllib.request.urlopen(f"{service_url}/health", timeout=30) as response:
+            assert json.load(response)["status"] == "ok"
+
+    @pytest.mark.usefixtures("invalid_field")
+    def test_post_invalid_field_expected_unprocessable(self, service_url: str) -> None:
+        """Tests that a filing whose row fails validation is answered with an
+        error, and the service keeps serving
+
+        :param service_url: Served service fixture
+        :type service_url: str
+        """
+        with open(SAMPLE_FILE, "rb") as f:
+            status, body = _post(
+                f"{service_url}/parse?irs_month=01A&year=2024",
+                f.read(),
+                "application/xml",
+            )
+
+        assert status == 422
+        assert "maybe" in body["error"]
+        with urllib.request.urlopen(f"{service_url}/health", timeout=30) as response:
+            assert json.load(response)["status"] == "ok"
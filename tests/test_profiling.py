@@ -0,0 +1,83 @@
+"""
+Tests per-stage profiling
+"""
+
+import pathlib
+
+from irs990_parser import profiling
+
+
+def _busy_loop() -> int:
+    """Do some work to profile
+
+    :return: A sum
+    :rtype: int
+    """
+    return sum(i * i for i in range(10_000))
+
+
+class TestStageProfiler:
+    """Tests the StageProfiler class"""
+
+    def test_write_expected_stats_and_summary_per_stage(
+        self, tmp_path: pathlib.Path
+    ) -> None:
+        """Tests that each profiled stage gets a stats file and a summary
+
+        :param tmp_path: Function-level directory fixture
+        :type tmp_path: pathlib.Path
+        """
+        stage_profiler = profiling.StageProfiler(tmp_path / "profile")
+        with stage_profiler.profile("load"):
+            _busy_loop()
+        with stage_profiler.profile("load"):
+            _busy_loop()
+        stage_profiler.write()
+
+        assert sorted(path.name for path in (tmp_path / "profile").iterdir()) == [
+            "load.prof",
+            "load.txt",
+        ]
+        summary = (tmp_path / "profile" / "load.txt").read_text(encoding="utf-8")
+        assert "_busy_loop" in summary
+
+    def test_disabled_expected_nothing_written(self, tmp_path: pathlib.Path) -> None:
+        """Tests that stages are not profiled without a directory
+
+        :param tmp_path: Function-level directory fixture
+        :type tmp_path: pathlib.Path
+        """
+        stage_profiler = profiling.StageProfiler(None)
+        with stage_profiler.profile("load"):
+            _busy_loop()
+        stage_profiler.write()
+
+        assert not stage_profiler.enabled
+        assert list(tmp_path.iterdir()) == []
+
+
+class TestParseInstrumentation:
+    """Tests the ParseInstrumentation class"""
+
+    def test_dump_then_merge_expected_stats_combined(
+        self, tmp_path: pathlib.Path
+    ) -> None:
+        """Tests that dumped stats are merged back, as done for parse workers
+
+        :param tmp_path: Function-level directory fixture
+        :type tmp_path: pathlib.Path
+        """
+        worker_instrumentation = profiling.ParseInstrumentation(profile=True)
+        worker_instrumentation.start()
+        with worker_instrumentation.measure():
+            _busy_loop()
+        worker_instrumentation.dump(tmp_path)
+
+        instrumentation = profiling.ParseInstrumentation(profile=True)
+        instrumentation.merge_dumps(tmp_path)
+
+        assert instrumentation.stats is not None
+        assert any(
+            function_name == "_busy_loop"
+            for _, _, function_name in instrumentation.stats.stats
+        )
@@ -0,0 +1,67 @@
+"""
+Tests deterministically sampling the filings of an archive
+"""
+
+import pytest
+
+from irs990_parser import sampling
+
+FILE_NAMES = [f"2024{index:014d}_public.xml" for index in range(2000)]
+
+
+class TestSampler:
+    """Tests the Sampler class"""
+
+    def test_sample_expected_same_filings_every_time(self) -> None:
+        """Tests that a sample depends only on the object IDs, not their order
+        or the archive's directory"""
+        sampler = sampling.Sampler(rate=0.1)
+
+        first = sampler.sample(FILE_NAMES)
+        second = sampler.sample(
+            f"2024_TEOS_XML_01A/{file_name}" for file_name in reversed(FILE_NAMES)
+        )
+
+        assert first.chosen == second.chosen
+
+    def test_sample_rate_expected_close_to_fraction(self) -> None:
+        """Tests that a rate keeps about that share of the filings"""
+        sample = sampling.Sampler(rate=0.1).sample(FILE_NAMES)
+
+        assert sample.population == len(FILE_NAMES)
+        assert len(sample) == pytest.approx(200, abs=50)
+
+    def test_sample_n_expected_lowest_keys_within_rate(self) -> None:
+        """Tests that n keeps the filings with the lowest keys, so a smaller
+        sample is part of a larger one"""
+        small = sampling.Sampler(rate=0.5, n=10).sample(FILE_NAMES)
+        large = sampling.Sampler(rate=0.5, n=100).sample(FILE_NAMES)
+
+        assert len(small) == 10
+        assert small.chosen < large.chosen
+        assert max(sampling.sample_key(name) for name in small.chosen) < min(
+            sampling.sample_key(name) for name in large.chosen - small.chosen
+        )
+
+    def test_sample_member_filter_expected_drawn_from_selected(self) -> None:
+        """Tests that the sample is drawn only from the selected files, and
+        can itself select files"""
+        selected = set(FILE_NAMES[:500])
+
+        sample = sampling.Sampler(n=20).sample(FILE_NAMES, selected.__contains__)
+
+        assert sample.population == 500
+        assert sample.chosen <= selected
+        assert sample(f"2024_TEOS_XML_01A/{next(iter(sample.chosen))}")
+        assert not sample(FILE_NAMES[-1])
+
+    def test_sample_n_weight_expected_archive_size_over_sample_size(self) -> None:
+        """Tests that each filing of an n-sample stands for more filings of a
+        larger archive"""
+        small = sampling.Sampler(n=10).sample(FILE_NAMES[:100])
+        large = sampling.Sampler(n=10).sample(FILE_NAMES)
+        empty = sampling.Sampler(n=10).sample([])
+
+        assert small.weight == 10
+        assert large.weight == len(FILE_NAMES) / 10
+        assert empty.weight == 1
@@ -0,0 +1,130 @@
+"""
+Tests splitting the workload into shards and verifying their coverage
+"""
+
+import pathlib
+
+import pytest
+
+from irs990_parser import sharding
+
+KEYS = [f"2024{index:014d}_public.xml" for index in range(500)]
+
+
+def _manifests(count: int, keys: list[str]) -> list[sharding.ShardManifest]:
+    """Build the manifest every shard would write after processing its keys
+
+    :param count: The number of shards
+    :type count: int
+    :param keys: The names of every work item
+    :type keys: list[str]
+    :return: One manifest per shard
+    :rtype: list[sharding.ShardManifest]
+    """
+    manifests = []
+    for index in range(count):
+        shard = sharding.Shard(index, count)
+        manifest = sharding.ShardManifest(shard, "member")
+        manifest.add(key for key in keys if shard.owns(key))
+        manifests.append(manifest)
+    return manifests
+
+
+class TestShard:
+    """
+    Tests the Shard class
+    """
+
+    def test_parse_expected_zero_based_shard(self) -> None:
+        """Tests that a shard is parsed from the form i/n"""
+        assert sharding.Shard.parse("2/4") == sharding.Shard(2, 4)
+
+    @pytest.mark.parametrize("spec", ["4/4", "1", "a/4", "-1/4", "0/0"])
+    def test_parse_invalid_shard_expected_value_error(self, spec: str) -> None:
+        """Tests that malformed and out of range shards are rejected
+
+        :param spec: The invalid shard
+        :type spec: str
+        """
+        with pytest.raises(ValueError):
+            sharding.Shard.parse(spec)
+
+    def test_owns_expected_every_key_in_exactly_one_shard(self) -> None:
+        """Tests that the shards are disjoint and cover every key"""
+        shards = [sharding.Shard(index, 4) for index in range(4)]
+        for key in KEYS:
+            assert sum(shard.owns(key) for shard in shards) == 1
+        # Every shard gets a share of the work
+        assert all(any(shard.owns(key) for key in KEYS) for shard in shards)
+
+    def test_owner_expected_stable_value(self) -> None:
+        """Tests that the assignment does not depend on the process, unlike the
+        built-in hash of a string"""
+        assert sharding.Shard.owner("2024_TEOS_XML_01A.zip", 7) == 1
+
+
+class TestShardManifest:
+    """
+    Tests the ShardManifest class
+    """
+
+    def test_write_then_read_expected_same_manifest(
+        self, tmp_path: pathlib.Path
+    ) -> None:
+        """Tests that a written manifest reads back unchanged
+
+        :param tmp_path: A temporary directory
+        :type tmp_path: pathlib.Path
+        """
+        manifest = sharding.ShardManifest(sharding.Shard(1, 3), "archive")
+        manifest.add(["2024_TEOS_XML_01A.zip", "2024_TEOS_XML_02A.zip"])
+        manifest.write(tmp_path / "shard.json")
+
+        read = sharding.ShardManifest.read(tmp_path / "shard.json")
+        assert read.shard == manifest.shard
+        assert read.shard_by == manifest.shard_by
+        assert read.keys == manifest.keys
+
+
+class TestVerifyCoverage:
+    """
+    Tests the verify_coverage function
+    """
+
+    def test_all_shards_complete_expected_ok(self) -> None:
+        """Tests that complete, disjoint shards pass verification"""
+        report = sharding.verify_coverage(KEYS, _manifests(4, KEYS))
+        assert report.ok
+        assert report.expected == report.processed == len(KEYS)
+
+    def test_missing_shard_expected_missing_keys_and_problem(self) -> None:
+        """Tests that the keys of a shard without a manifest are reported"""
+        manifests = _manifests(4, KEYS)
+        absent = manifests.pop(2)
+        report = sharding.verify_coverage(KEYS, manifests)
+        assert not report.ok
+        assert report.missing == sorted(absent.keys)
+        assert report.problems == ["No manifest for shard(s) [2] of 4"]
+
+    def test_key_processed_twice_expected_duplicated(self) -> None:
+        """Tests that a key processed by two shards is reported"""
+        manifests = _manifests(4, KEYS)
+        manifests[0].add([manifests[1].keys[0]])
+        report = sharding.verify_coverage(KEYS, manifests)
+        assert report.duplicated == [manifests[1].keys[0]]
+        assert not report.missing
+
+    def test_key_outside_workload_expected_unexpected(self) -> None:
+        """Tests that a key that is not part of the workload is reported"""
+        manifests = _manifests(4, KEYS)
+        manifests[3].add(["unknown.xml"])
+        report = sharding.verify_coverage(KEYS, manifests)
+        assert report.unexpected == ["unknown.xml"]
+
+    def test_different_shard_counts_expected_problem(self) -> None:
+        """Tests that manifests from runs with different shard counts are
+        reported"""
+        manifests = _manifests(2, KEYS)
+        manifests[1].shard = sharding.Shard(1, 3)
+        report = sharding.verify_coverage(KEYS, manifests)
+        assert "Manifests disagree on the shard count or granularity" in report.problems
@@ -0,0 +1,261 @@
+"""
+Tests sketching the distributions of organization fields while loading rows
+"""
+
+import os
+import pathlib
+import random
+import shutil
+import subprocess
+import sys
+from typing import Optional
+
+import pytest
+
+import irs990_parser
+from irs990_parser import gender_guesser, irs_field_extractor, sketches
+
+RANDOM = random.Random(0)
+VALUES = [RANDOM.lognormvariate(0, 1) for _ in range(20_000)]
+MAIN_PATH = pathlib.Path("../src/main.py").resolve()
+# Several of these filings are by the same organization
+SAMPLE_DIR = pathlib.Path("sample_irs_xml_files", "key_employees")
+
+
+def _row(
+    year: int, irs_month: str, ratio: float, state: Optional[str] = "CO"
+) -> irs_field_extractor.OrganizationRow:
+    """Build a row with a pay ratio and no trustee percentages
+
+    :param year: The year
+    :type year: int
+    :param irs_month: The IRS month
+    :type irs_month: str
+    :param ratio: The president to average pay ratio
+    :type ratio: float
+    :param state: The filer state
+    :type state: Optional[str]
+    :return: The row
+    :rtype: irs_field_extractor.OrganizationRow
+    """
+    return irs_field_extractor.OrganizationRow(
+        "123456789",
+        "Org",
+        irs_month,
+        year,
+        None,
+        None,
+        True,
+        True,
+        False,
+        None,
+        ratio,
+        state,
+    )
+
+
+def _exact_quantile(values: list[float], q: float) -> float:
+    """Return a quantile of values by sorting them
+
+    :param values: The values
+    :type values: list[float]
+    :param q: The quantile
+    :type q: float
+    :return: The quantile
+    :rtype: float
+    """
+    return sorted(values)[int(q * (len(values) - 1))]
+
+
+class TestTDigest:
+    """Tests the TDigest class"""
+
+    @pytest.mark.parametrize("q", [0.01, 0.5, 0.9, 0.99])
+    def test_quantile_expected_close_to_exact(self, q: float) -> None:
+        """Tests that quantiles, including the tails, are estimated closely
+
+        :param q: The quantile
+        :type q: float
+        """
+        digest = sketches.TDigest()
+        for value in VALUES:
+            digest.add(value)
+
+        assert digest.quantile(q) == pytest.approx(_exact_quantile(VALUES, q), rel=0.02)
+        assert len(digest.centroids) < sketches.TDigest.COMPRESSION
+
+    def test_merge_expected_same_as_single_digest(self) -> None:
+        """Tests that digests of disjoint parts merge into the digest of the
+        whole"""
+        parts = [sketches.TDigest() for _ in range(4)]
+        for index, value in enumerate(VALUES):
+            parts[index % len(parts)].add(value)
+
+        merged = sketches.TDigest()
+        for part in parts:
+            merged.merge(part)
+
+        assert merged.count == len(VALUES)
+        assert (merged.min, merged.max) == (min(VALUES), max(VALUES))
+        for q in [0.5, 0.9, 0.99]:
+            assert merged.quantile(q) == pytest.approx(
+                _exact_quantile(VALUES, q), rel=0.02
+            )
+
+    def test_quantile_few_values_expected_exact_extremes(self) -> None:
+        """Tests that small digests keep every value, and empty ones have no
+        quantiles"""
+        digest = sketches.TDigest()
+        assert digest.quantile(0.5) is None
+        for value in [5, 1, 3]:
+            digest.add(value)
+
+        assert [digest.quantile(q) for q in (0, 0.5, 1)] == [1, 3, 5]
+
+
+class TestRowSketches:
+    """Tests the RowSketches class"""
+
+    def test_report_expected_grouped_by_year_or_month(self) -> None:
+        """Tests that months are sketched separately and merged by year"""
+        row_sketches = sketches.RowSketches()
+        row_sketches.add_rows(
+            [_row(2024, "01A", 1.0), _row(2024, "02A", 3.0), _row(2023, "12A", 2.0)]
+        )
+
+        by_year = row_sketches.report(sketches.GROUP_BY_YEAR)
+        by_month = row_sketches.report(sketches.GROUP_BY_MONTH)
+
+        assert list(by_year) == ["2023", "2024"]
+        ratio = by_year["2024"]["president_to_average_pay_ratio"]
+        assert (ratio["count"], ratio["mean"], ratio["min"], ratio["max"]) == (
+            2,
+            2.0,
+            1.0,
+            3.0,
+        )
+        trustees = by_year["2024"]["percentage_women_trustees"]
+        assert (trustees["count"], trustees["missing"], trustees["p50"]) == (
+            0,
+            2,
+            None,
+        )
+        assert list(by_month) == ["2023_12A", "2024_01A", "2024_02A"]
+
+    def test_report_by_state_expected_grouped_by_year_and_state(self) -> None:
+        """Tests that the months of a state are merged, apart from other
+        states and from filers without one"""
+        row_sketches = sketches.RowSketches()
+        row_sketches.add_rows(
+            [
+                _row(2024, "01A", 1.0, "CO"),
+                _row(2024, "02A", 3.0, "CO"),
+                _row(2024, "01A", 5.0, "NY"),
+                _row(2024, "01A", 7.0, None),
+            ]
+        )
+
+        by_state = row_sketches.report(sketches.GROUP_BY_STATE)
+
+        assert list(by_state) == ["2024_CO", "2024_NY", "2024_unknown"]
+        assert by_state["2024_CO"]["president_to_average_pay_ratio"]["mean"] == 2.0
+        assert (
+            row_sketches.report()["2024"]["president_to_average_pay_ratio"]["count"]
+            == 4
+        )
+
+    def test_add_sampled_rows_expected_weighted_by_archive(self) -> None:
+        """Tests that rows sampled from a larger archive count for more
+        filings, so pooled estimates match those of every filing"""
+        row_sketches = sketches.RowSketches()
+        # One filing stands for 3 of January's, and one for 1 of February's
+        row_sketches.add_rows([_row(2024, "01A", 1.0)], weight=3)
+        row_sketches.add_rows([_row(2024, "02A", 5.0)])
+
+        ratio = row_sketches.report()["2024"]["president_to_average_pay_ratio"]
+
+        assert (ratio["count"], ratio["mean"]) == (4, 2.0)
+        assert (
+            row_sketches.report()["2024"]["percentage_women_trustees"]["missing"] == 4
+        )
+
+    def test_write_read_merge_expected_sketches_of_every_shard(
+        self, tmp_path: pathlib.Path
+    ) -> None:
+        """Tests that sketches written by separate shards merge into the
+        sketches of all their rows
+
+        :param tmp_path: Function-level directory fixture
+        :type tmp_path: pathlib.Path
+        """
+        rows = [_row(2024, "01A", value) for value in VALUES]
+        for index in range(2):
+            shard_sketches = sketches.RowSketches()
+            shard_sketches.add_rows(rows[index::2])
+            shard_sketches.write(tmp_path / f"shard-{index}.json")
+
+        merged = sketches.RowSketches()
+        for index in range(2):
+            merged.merge(sketches.RowSketches.read(tmp_path / f"shard-{index}.json"))
+        whole = sketches.RowSketches()
+        whole.add_rows(rows)
+
+        merged_ratio = merged.report()["2024"]["president_to_average_pay_ratio"]
+        whole_ratio = whole.report()["2024"]["president_to_average_pay_ratio"]
+        assert merged_ratio["count"] == whole_ratio["count"] == len(VALUES)
+        assert merged_ratio["mean"] == pytest.approx(whole_ratio["mean"])
+        assert merged_ratio["p99"] == pytest.approx(whole_ratio["p99"], rel=0.02)
+
+
+class TestSketchesOption:
+    """Tests sketching the rows a pipeline run loads"""
+
+    def test_sketches_repeated_filings_expected_sketched_once(
+        self, tmp_path: pathlib.Path
+    ) -> None:
+        """Tests that filings sharing a primary key are sketched once, as the
+        sinks keep one row for them
+
+        :param tmp_path: Function-level directory fixture
+        :type tmp_path: pathlib.Path
+        """
+        run_dir = tmp_path / "run"
+        run_dir.mkdir()
+        # The pipeline reads the gender chart relative to where it runs
+        chart_dir = tmp_path / "src" / "irs990_parser"
+        chart_dir.mkdir(parents=True)
+        chart_path = chart_dir / "first_name_gender_probabilities.csv"
+        chart_path.write_text("Name,female_prob\nmary,1.0\n", encoding="utf-8")
+        input_dir = tmp_path / "2024_TEOS_XML_01A"
+        shutil.copytree(SAMPLE_DIR, input_dir)
+
+        subprocess.run(
+            [
+                sys.executable,
+                str(MAIN_PATH),
+                "--input",
+                str(input_dir),
+                "--output-format",
+                "none",
+                "--sketches",
+                "sketches.json",
+            ],
+            cwd=run_dir,
+            env={**os.environ, "PYTHONPATH": str(MAIN_PATH.parent)},
+            capture_output=True,
+            check=True,
+            timeout=300,
+        )
+
+        report = sketches.RowSketches.read(run_dir / "sketches.json").report()
+        organization_count = len(
+            {
+                (row.ein, row.irs_month, row.year)
+                for row in irs990_parser.iter_rows(
+                    input_dir, guesser=gender_guesser.GenderGuesser(chart_path)
+                )
+            }
+        )
+        assert organization_count < len(os.listdir(SAMPLE_DIR))
+        ratio = report["2024"]["president_to_average_pay_ratio"]
+        assert ratio["count"] + ratio["missing"] == organization_count
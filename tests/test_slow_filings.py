@@ -0,0 +1,81 @@
+"""
+Tests tracking of the slowest and largest filings
+"""
+
+import json
+import os
+import pathlib
+
+import bs4
+
+from irs990_parser import slow_filings
+
+
+def _make_trace(
+    file_name: str, seconds: float, size_bytes: int
+) -> slow_filings.FilingTrace:
+    """Create a trace with a single stage
+
+    :param file_name: The name of the file
+    :type file_name: str
+    :param seconds: The time spent parsing the file
+    :type seconds: float
+    :param size_bytes: The size of the file
+    :type size_bytes: int
+    :return: The trace
+    :rtype: slow_filings.FilingTrace
+    """
+    trace = slow_filings.FilingTrace(file_name, "01A", 2024, size_bytes)
+    trace.stage_seconds["xml_parse"] = seconds
+    return trace
+
+
+class TestSlowFilingTracker:
+    """Tests the SlowFilingTracker class"""
+
+    def test_add_more_than_max_expected_top_k_kept(self) -> None:
+        """Tests that only the K slowest and K largest filings are kept"""
+        tracker = slow_filings.SlowFilingTracker(2)
+        tracker.add(_make_trace("a.xml", 1.0, 400))
+        tracker.add(_make_trace("b.xml", 3.0, 100))
+        tracker.add(_make_trace("c.xml", 2.0, 300))
+        tracker.add(_make_trace("d.xml", 0.5, 200))
+
+        assert [trace.file_name for trace in tracker.slowest()] == ["b.xml", "c.xml"]
+        assert [trace.file_name for trace in tracker.largest()] == ["a.xml", "c.xml"]
+
+    def test_add_equal_times_expected_no_trace_comparison(self) -> None:
+        """Tests that ties are broken without comparing traces"""
+        tracker = slow_filings.SlowFilingTracker(1)
+        tracker.add(_make_trace("a.xml", 1.0, 100))
+        tracker.add(_make_trace("b.xml", 1.0, 100))
+        assert len(tracker.slowest()) == 1
+
+    def test_write_json_expected_row_counts_and_stages(
+        self, tmp_path: pathlib.Path
+    ) -> None:
+        """Tests that the trace file holds row counts and per-stage timings
+
+        :param tmp_path: Function-level directory fixture
+        :type tmp_path: pathlib.Path
+        """
+        with open(
+            os.path.join("sample_irs_xml_files", "key_employees", "both.xml"),
+            "r",
+            encoding="utf-8",
+        ) as f:
+            parsed_xml = bs4.BeautifulSoup(f.read(), "xml")
+        trace = _make_trace("both.xml", 1.5, 1000)
+        trace.count_rows(parsed_xml)
+
+        tracker = slow_filings.SlowFilingTracker(5)
+        tracker.add(trace)
+        trace_path = tmp_path / "slow.json"
+        tracker.write_json(trace_path)
+
+        with open(trace_path, "r", encoding="utf-8") as f:
+            (slowest,) = json.load(f)["slowest"]
+        assert slowest["part_vii_rows"] == 20
+        assert slowest["schedule_j_rows"] == 2
+        assert slowest["size_bytes"] == 1000
+        assert slowest["stage_seconds"] == {"xml_parse": 1.5}
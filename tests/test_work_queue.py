@@ -0,0 +1,180 @@
+"""
+Tests leasing jobs from a work queue shared by several nodes
+"""
+
+import concurrent.futures
+import multiprocessing
+import pathlib
+import time
+
+import pytest
+
+from irs990_parser import work_queue
+
+ARCHIVES = [
+    f"https://apps.irs.gov/pub/epostcard/990/xml/2024/2024_TEOS_XML_{month:02d}A.zip"
+    for month in range(1, 13)
+]
+
+
+def _drain(queue_path: str) -> list[str]:
+    """Lease and complete jobs until the queue is empty, as a node would
+
+    :param queue_path: The path to the SQLite queue
+    :type queue_path: str
+    :return: The keys of the completed jobs
+    :rtype: list[str]
+    """
+    queue = work_queue.WorkQueue.connect(queue_path, lease_seconds=30)
+    completed = []
+    while (job := queue.lease()) is not None:
+        with queue.keep_alive(job):
+            time.sleep(0.01)
+        assert queue.complete(job)
+        completed.append(job.key)
+    queue.close()
+    return completed
+
+
+@pytest.fixture
+def queue_path(tmp_path: pathlib.Path) -> str:
+    """Create a queue holding one job per archive
+
+    :param tmp_path: Function-level directory fixture
+    :type tmp_path: pathlib.Path
+    :return: The path to the SQLite queue
+    :rtype: str
+    """
+    path = str(tmp_path / "queue.sqlite")
+    queue = work_queue.WorkQueue.connect(path)
+    queue.add_jobs(work_queue.make_jobs(ARCHIVES, 1))
+    queue.close()
+    return path
+
+
+class TestMakeJobs:
+    """Tests the make_jobs function"""
+
+    def test_make_jobs_with_chunks_expected_one_job_per_chunk(self) -> None:
+        """Tests that each archive is split into chunks of its members"""
+        jobs = work_queue.make_jobs(ARCHIVES[:1], 3)
+        assert [job.key for job in jobs] == [
+            "2024_TEOS_XML_01A.zip#0/3",
+            "2024_TEOS_XML_01A.zip#1/3",
+            "2024_TEOS_XML_01A.zip#2/3",
+        ]
+        member = "202400000000000000_public.xml"
+        assert sum(job.member_filter(member) for job in jobs) == 1
+
+    def test_make_jobs_without_chunks_expected_no_member_filter(self) -> None:
+        """Tests that whole archives are not filtered"""
+        (job,) = work_queue.make_jobs(ARCHIVES[:1], 1)
+        assert job.key == "2024_TEOS_XML_01A.zip"
+        assert job.member_filter is None
+
+
+class TestWorkQueue:
+    """Tests the WorkQueue class"""
+
+    def test_add_jobs_twice_expected_jobs_queued_once(self, queue_path: str) -> None:
+        """Tests that every node can add the same jobs
+
+        :param queue_path: Queue fixture
+        :type queue_path: str
+        """
+        queue = work_queue.WorkQueue.connect(queue_path)
+        queue.add_jobs(work_queue.make_jobs(ARCHIVES, 1))
+        assert queue.counts() == {work_queue.WorkQueue.PENDING: len(ARCHIVES)}
+
+    def test_lease_from_two_nodes_expected_different_jobs(
+        self, queue_path: str
+    ) -> None:
+        """Tests that a leased job is not leased by another node
+
+        :param queue_path: Queue fixture
+        :type queue_path: str
+        """
+        first = work_queue.WorkQueue.connect(queue_path)
+        second = work_queue.WorkQueue.connect(queue_path)
+        assert first.lease().key != second.lease().key
+
+    def test_complete_every_job_expected_no_lease(self, queue_path: str) -> None:
+        """Tests that leasing stops once every job is done
+
+        :param queue_path: Queue fixture
+        :type queue_path: str
+        """
+        queue = work_queue.WorkQueue.connect(queue_path)
+        while (job := queue.lease()) is not None:
+            assert queue.complete(job)
+        assert queue.counts() == {work_queue.WorkQueue.DONE: len(ARCHIVES)}
+
+    def test_expired_lease_expected_job_leased_by_another_node(
+        self, queue_path: str
+    ) -> None:
+        """Tests that the job of a node that stopped renewing its lease is
+        leased again, and that the first node can no longer complete it
+
+        :param queue_path: Queue fixture
+        :type queue_path: str
+        """
+        crashed = work_queue.WorkQueue.connect(queue_path, lease_seconds=0.05)
+        job = crashed.lease()
+        time.sleep(0.1)
+
+        survivor = work_queue.WorkQueue.connect(queue_path)
+        retried = survivor.lease()
+        assert retried.key == job.key
+        assert retried.attempts == 2
+        assert not crashed.heartbeat(job)
+        assert not crashed.complete(job)
+        assert survivor.complete(retried)
+
+    def test_heartbeat_expected_lease_kept(self, queue_path: str) -> None:
+        """Tests that a renewed lease is not taken over
+
+        :param queue_path: Queue fixture
+        :type queue_path: str
+        """
+        node = work_queue.WorkQueue.connect(queue_path, lease_seconds=0.3)
+        job = node.lease()
+        other = work_queue.WorkQueue.connect(queue_path)
+        with node.keep_alive(job):
+            time.sleep(0.5)
+            leased = [other.lease(wait=False) for _ in range(len(ARCHIVES) - 1)]
+            assert job.key not in [other_job.key for other_job in leased]
+            assert other.lease(wait=False) is None
+        assert node.complete(job)
+
+    def test_release_after_last_attempt_expected_failed(self, queue_path: str) -> None:
+        """Tests that a job is not retried forever
+
+        :param queue_path: Queue fixture
+        :type queue_path: str
+        """
+        queue = work_queue.WorkQueue.connect(queue_path)
+        queue.max_attempts = 2
+        job = queue.lease()
+        queue.release(job)
+        retried = queue.lease()
+        assert retried.key == job.key
+        queue.release(retried)
+        assert queue.counts()[work_queue.WorkQueue.FAILED] == 1
+
+    def test_several_processes_expected_every_job_completed_once(
+        self, queue_path: str
+    ) -> None:
+        """Tests that processes sharing one SQLite file split the jobs
+
+        :param queue_path: Queue fixture
+        :type queue_path: str
+        """
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=3, mp_context=multiprocessing.get_context("spawn")
+        ) as executor:
+            results = list(executor.map(_drain, [queue_path] * 3))
+
+        completed = [key for keys in results for key in keys]
+        assert sorted(completed) == sorted(
+            job.key for job in work_queue.make_jobs(ARCHIVES, 1)
+        )